@@ -0,0 +1,217 @@
+# controladores/admin_controller.py
+# Rutas de administración y diagnóstico del proceso (equivalente a los health checks
+# y endpoints de métricas de ASP.NET Core)
+#
+# Las métricas son del proceso que atiende la solicitud: con gunicorn cada trabajador
+# tiene las suyas.
+
+from flask import Blueprint, current_app, jsonify, request
+import os
+
+from servicios.compilador_consultas import estadisticas_cache
+from servicios.planes_escritura import planes_escritura
+
+# Crear el blueprint del controlador (se registra en la aplicación desde app.py)
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+@admin_bp.route('/admision', methods=['GET'])
+def metricas_admision():
+    """
+    Devuelve las métricas del control de admisión del proceso:
+    límite vigente, solicitudes en curso y en cola, y contadores de admitidas,
+    encoladas y rechazadas (global y por tabla).
+    ---
+    responses:
+      200:
+        description: Métricas del control de admisión
+    """
+    control = current_app.extensions.get("control_admision")
+    if control is None:
+        return jsonify({"habilitado": False, "pid": os.getpid()})
+    return jsonify({"habilitado": True, "pid": os.getpid(), **control.metricas()})
+
+
+@admin_bp.route('/instantaneas', methods=['GET'])
+def estado_instantaneas():
+    """
+    Devuelve las tablas de referencia cargadas en memoria en este proceso
+    (filas, memoria, índices e instante de la última carga).
+    ---
+    responses:
+      200:
+        description: Estado de las instantáneas
+    """
+    almacen = current_app.extensions.get("instantaneas")
+    if almacen is None:
+        return jsonify({"habilitado": False, "pid": os.getpid()})
+    return jsonify({"habilitado": True, "pid": os.getpid(), "tablas": almacen.estadisticas()})
+
+
+@admin_bp.route('/eventos', methods=['GET'])
+def estado_eventos():
+    """
+    Devuelve los suscriptores de eventos SSE por tabla y los contadores de eventos
+    publicados y de suscriptores desconectados por lentos.
+    ---
+    responses:
+      200:
+        description: Estado del concentrador de eventos
+    """
+    concentrador = current_app.extensions.get("eventos")
+    if concentrador is None:
+        return jsonify({"habilitado": False, "pid": os.getpid()})
+    return jsonify({"habilitado": True, "pid": os.getpid(), **concentrador.estadisticas()})
+
+
+@admin_bp.route('/consultas', methods=['GET'])
+def estado_consultas():
+    """
+    Devuelve el uso de la caché de consultas compiladas (@nombre a "?"), de la caché
+    de sentencias preparadas de los pools de cada proyecto y de los planes de escritura,
+    junto con los nombres de las consultas registradas en ConsultasNombradas.
+    ---
+    responses:
+      200:
+        description: Estado de las cachés de consultas
+    """
+    registro = current_app.extensions.get("registro_proyectos")
+    pools = registro.estadisticas() if registro is not None else {}
+    return jsonify({
+        "pid": os.getpid(),
+        "compiladas": estadisticas_cache(),
+        "sentencias": {
+            proyecto: {clave: valor for clave, valor in datos.items() if clave.startswith("sentencias_")}
+            for proyecto, datos in pools.items()
+        },
+        "planes_escritura": planes_escritura.estadisticas(),
+        "nombradas": sorted(current_app.config["DATOS_CONFIG"].get("ConsultasNombradas", {})),
+    })
+
+
+@admin_bp.route('/escritura-diferida', methods=['GET'])
+def estado_escritura_diferida():
+    """
+    Devuelve el estado de la cola de escritura diferida del proceso: filas y memoria
+    en cola, contadores de filas escritas, fallidas y rechazadas, y los errores recientes
+    (con el id devuelto por crear).
+    ---
+    responses:
+      200:
+        description: Estado de la escritura diferida
+    """
+    cola = current_app.extensions.get("escritura_diferida")
+    if cola is None:
+        return jsonify({"habilitado": False, "pid": os.getpid()})
+    return jsonify({"habilitado": True, "pid": os.getpid(), **cola.estadisticas()})
+
+
+@admin_bp.route('/consultas-lentas', methods=['GET'])
+def consultas_lentas():
+    """
+    Devuelve las formas de consulta lenta con más tiempo total acumulado en este proceso.
+    ---
+    parameters:
+      - name: top
+        in: query
+        type: integer
+        default: 20
+        description: Número de formas a devolver
+    responses:
+      200:
+        description: Formas de consulta lenta ordenadas por tiempo total
+    """
+    registro = current_app.extensions.get("consultas_lentas")
+    if registro is None:
+        return jsonify({"habilitado": False, "pid": os.getpid()})
+    cantidad = request.args.get('top', default=20, type=int)
+    return jsonify({
+        "habilitado": True,
+        "pid": os.getpid(),
+        "umbral_ms": round(registro.umbral_segundos * 1000),
+        "archivo": registro.archivo,
+        "formas": registro.principales(max(1, cantidad)),
+    })
+
+
+@admin_bp.route('/consultas-lentas/<string:id_forma>', methods=['GET'])
+def detalle_consulta_lenta(id_forma):
+    """
+    Devuelve el acumulado de una forma de consulta lenta con su último plan de ejecución capturado.
+    ---
+    responses:
+      200:
+        description: Detalle de la forma
+      404:
+        description: La forma no está registrada en este proceso
+    """
+    registro = current_app.extensions.get("consultas_lentas")
+    detalle = registro.detalle(id_forma) if registro is not None else None
+    if detalle is None:
+        return jsonify({"error": f"No hay consultas lentas registradas con la forma '{id_forma}'"}), 404
+    return jsonify({"pid": os.getpid(), **detalle})
+
+
+@admin_bp.route('/indices', methods=['GET'])
+def recomendaciones_indices():
+    """
+    Devuelve recomendaciones de índices para las columnas que los clientes usan como
+    predicado y que ningún índice cubre, ordenadas por impacto estimado.
+    Solo son sugerencias: no se aplica ningún cambio en la base de datos.
+    ---
+    parameters:
+      - name: proyecto
+        in: query
+        type: string
+        description: Limitar a un proyecto
+      - name: top
+        in: query
+        type: integer
+        default: 20
+        description: Número máximo de recomendaciones
+    responses:
+      200:
+        description: Recomendaciones de índices
+    """
+    asesor = current_app.extensions.get("asesor_indices")
+    if asesor is None:
+        return jsonify({"habilitado": False, "pid": os.getpid()})
+    cantidad = request.args.get('top', default=20, type=int)
+    return jsonify({
+        "habilitado": True,
+        "pid": os.getpid(),
+        **asesor.estadisticas(),
+        **asesor.recomendaciones(request.args.get('proyecto'), max(1, cantidad)),
+    })
+
+
+@admin_bp.route('/trabajos', methods=['GET'])
+def estado_trabajos():
+    """
+    Devuelve el uso de los trabajos de consulta en segundo plano del proceso: trabajos
+    sin terminar, enviados, duplicados, rechazados y el directorio de resultados.
+    ---
+    responses:
+      200:
+        description: Estado de los trabajos de consulta
+    """
+    gestor = current_app.extensions.get("trabajos_consulta")
+    if gestor is None:
+        return jsonify({"habilitado": False, "pid": os.getpid()})
+    return jsonify({"habilitado": True, "pid": os.getpid(), **gestor.estadisticas()})
+
+
+@admin_bp.route('/busqueda', methods=['GET'])
+def estado_busqueda():
+    """
+    Devuelve los índices de búsqueda de texto cargados en este proceso (filas, términos,
+    memoria estimada, instante de construcción y si hay una reconstrucción pendiente).
+    ---
+    responses:
+      200:
+        description: Estado de los índices de búsqueda
+    """
+    buscador = current_app.extensions.get("busqueda_texto")
+    if buscador is None:
+        return jsonify({"habilitado": False, "pid": os.getpid()})
+    return jsonify({"habilitado": True, "pid": os.getpid(), "tablas": buscador.estadisticas()})
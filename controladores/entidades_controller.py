@@ -0,0 +1,1582 @@
+# controladores/entidades_controller.py
+# Equivalente a EntidadesController.cs en una API de C#
+
+# Importación de bibliotecas necesarias (equivalentes a los "using" en C#)
+from flask import Blueprint, current_app, g, jsonify, request, Response  # Blueprint agrupa las rutas del controlador
+import json  # Para serializar filas en las exportaciones
+import datetime  # Para manejo de fechas y tiempos
+import traceback  # Para depuración de errores
+import time  # Para medir tiempos y limitar el ritmo de las exportaciones
+import csv  # Para leer archivos CSV de forma incremental
+import gzip  # Para descomprimir cuerpos de solicitud comprimidos con gzip
+import io  # Para leer el cuerpo de la solicitud como texto sin cargarlo en memoria
+import pyodbc  # Para capturar errores de SQL Server (equivalente a SqlException)
+from werkzeug.local import LocalProxy  # Para acceder a los servicios de la solicitud actual
+
+# Importar servicios propios (equivalente a using csharpapigenerica.Services)
+from servicios.dependencias import obtener_configuracion, obtener_control_conexion, crear_control_conexion, obtener_registro_proyectos
+from servicios.errores import ErrorApi
+from servicios.formateador_respuesta import construir_respuesta, convertir_valor_json
+from servicios.conversion_tipos import obtener_convertidor, obtener_tipos_columnas
+from servicios.filtros import construir_filtros, resolver_columna
+from servicios.planes_escritura import planes_escritura, tamanos_lote, buscar_columna_contrasena, cifrar_contrasena, OPERACION_INSERTAR, OPERACION_ACTUALIZAR, OPERACION_COMBINAR
+from servicios.compilador_consultas import normalizar_nombre
+from servicios.agregados import construir_consulta_agregado
+from servicios.instantaneas import obtener_instantanea, normalizar_clave
+from servicios.escritura_diferida import obtener_cola_escritura
+from servicios.lectura_multiple import obtener_lector_multiple, validar_lecturas
+from servicios.trabajos_consulta import obtener_gestor_trabajos, ESTADO_TERMINADO
+from servicios.busqueda_texto import obtener_buscador_texto
+from servicios.plazos import obtener_limite_solicitud
+from servicios.esquema import obtener_clave_primaria
+from servicios.expansion import construir_respuesta_expandida
+from servicios.binarios import (
+    obtener_modo_binarios, columnas_binarias, construir_seleccion, aplicar_modo_binarios,
+    analizar_rango, leer_longitud, leer_bloques, TIPOS_BINARIOS, MODO_INCLUIR, MODO_ENLACE,
+)
+from servicios.eventos import obtener_concentrador, crear_predicado, OPERACIONES_EVENTOS
+from servicios.cambios import (
+    detectar_estrategia, leer_marca, formatear_marca, obtener_config_cambios,
+    consultar_cambios_seguimiento, consultar_cambios_rowversion, consultar_cambios_registro,
+    ESTRATEGIA_SEGUIMIENTO, ESTRATEGIA_ROWVERSION,
+)
+
+# Crear el blueprint del controlador (se registra en la aplicación desde app.py)
+entidades_bp = Blueprint('entidades', __name__)
+
+# Servicios inyectados (equivalente a los parámetros del constructor del controlador en C#)
+# Cada solicitud obtiene su propia ControlConexion, con conexiones del pool de su proyecto
+datos_config = LocalProxy(obtener_configuracion)
+control_conexion = LocalProxy(obtener_control_conexion)
+
+#######################################################################
+# IMPLEMENTACIÓN DE ENTIDADESCONTROLLER
+#######################################################################
+
+# Función para obtener el prefijo de parámetro según el proveedor de base de datos
+def obtener_prefijo_parametro(proveedor):
+    """
+    Obtiene el prefijo adecuado para los parámetros SQL según el proveedor.
+    Es equivalente al método ObtenerPrefijoParametro en C#.
+    
+    Args:
+        proveedor (str): Nombre del proveedor de base de datos.
+        
+    Returns:
+        str: Prefijo para los parámetros.
+    """
+    # Para SQL Server y LocalDB es "@", podríamos añadir más condiciones para otros proveedores
+    return "@"
+
+# Función para verificar que una columna existe en una tabla
+def existe_columna(conexion, nombre_tabla, nombre_columna):
+    """
+    Verifica en INFORMATION_SCHEMA que una columna pertenece a la tabla.
+    
+    Args:
+        conexion (ControlConexion): Conexión abierta a la base de datos.
+        nombre_tabla (str): Nombre de la tabla.
+        nombre_columna (str): Nombre de la columna.
+        
+    Returns:
+        bool: True si la columna existe en la tabla.
+    """
+    consulta_sql = "SELECT 1 AS existe FROM information_schema.columns WHERE table_name = @nombreTabla AND column_name = @nombreColumna"
+    parametros = [
+        conexion.crear_parametro("@nombreTabla", nombre_tabla),
+        conexion.crear_parametro("@nombreColumna", nombre_columna)
+    ]
+    return not conexion.ejecutar_consulta_sql(consulta_sql, parametros).empty
+
+# Función para responder una lectura, con las relaciones de ?expand= si se pidieron
+def responder_lectura(tabla_resultados, nombre_proyecto, nombre_tabla):
+    """
+    Construye la respuesta de listar u obtener_por_clave: en el formato negociado o,
+    con ?expand=, en JSON con las filas referidas por las claves foráneas
+    (ver servicios/expansion.py).
+    
+    Args:
+        tabla_resultados (pandas.DataFrame): Filas leídas.
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla leída.
+        
+    Returns:
+        Response: Respuesta de Flask.
+    """
+    if not request.args.get('expand'):
+        return construir_respuesta(tabla_resultados, request)
+    proyecto = obtener_registro_proyectos().obtener_configuracion_proyecto(nombre_proyecto).nombre
+    return construir_respuesta_expandida(control_conexion, proyecto, nombre_tabla, tabla_resultados, request, datos_config)
+
+# Rutas de EntidadesController
+
+# Listar todos los registros de una tabla
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>', methods=['GET'])
+def listar(nombre_proyecto, nombre_tabla):
+    """
+    Obtiene todos los registros de una tabla específica en la base de datos.
+    Es equivalente al método Listar() en EntidadesController.cs.
+    Acepta filtros opcionales ?filtro=columna:operador:valor (ver servicios/filtros.py),
+    ?expand=columna_fk para incluir las filas referidas (ver servicios/expansion.py)
+    y ?binarios=incluir|excluir|enlace para las columnas binarias (ver servicios/binarios.py).
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla a consultar.
+        
+    Returns:
+        JSON: Lista de registros en formato JSON si la consulta es exitosa, o un código de error en caso de fallo.
+    """
+    # Verificar si el nombre de la tabla está vacío
+    if not nombre_tabla or nombre_tabla.strip() == "":
+        return jsonify({"error": "El nombre de la tabla no puede estar vacío"}), 400
+    
+    # Tratamiento de las columnas binarias y ruta base de sus enlaces de descarga
+    modo_binarios = obtener_modo_binarios(request, datos_config)
+    ruta_tabla = f"/api/{nombre_proyecto}/{nombre_tabla}"
+    
+    # Tablas de referencia cargadas en memoria: se responden sin tocar la base de datos,
+    # también con filtros (se evalúan sobre las filas de la instantánea)
+    instantanea = obtener_instantanea(nombre_proyecto, nombre_tabla)
+    if instantanea is not None:
+        filtros = request.args.getlist('filtro')
+        datos = instantanea.filtrar(filtros) if filtros else instantanea.datos
+        datos = aplicar_modo_binarios(datos, modo_binarios, ruta_tabla, next(iter(instantanea.indices), None))
+        return responder_lectura(datos, nombre_proyecto, nombre_tabla)
+    
+    try:
+        parametros = None
+        
+        # Abrir conexión, ejecutar consulta y cerrar conexión
+        control_conexion.abrir_bd()
+        
+        # Filtros opcionales o columnas binarias que no se leen completas:
+        # solo entonces hace falta consultar el esquema de la tabla
+        filtros = request.args.getlist('filtro')
+        tipos_columnas = None
+        if filtros or modo_binarios != MODO_INCLUIR:
+            tipos_columnas = obtener_tipos_columnas(control_conexion, nombre_tabla)
+            if not tipos_columnas:
+                control_conexion.cerrar_bd()
+                return jsonify({"error": f"La tabla '{nombre_tabla}' no existe"}), 404
+        
+        # Consulta SQL simple para obtener todos los registros
+        comando_sql = f"SELECT {construir_seleccion(tipos_columnas, modo_binarios)} FROM {nombre_tabla}"
+        if filtros:
+            clausula_where, parametros = construir_filtros(filtros, tipos_columnas, control_conexion.crear_parametro)
+            comando_sql = f"{comando_sql} {clausula_where}"
+        
+        tabla_resultados = control_conexion.ejecutar_consulta_sql(comando_sql, parametros)
+        
+        # Enlaces de descarga de las columnas binarias (por la clave primaria, si es simple)
+        if modo_binarios != MODO_INCLUIR and columnas_binarias(tipos_columnas):
+            claves_primarias = obtener_clave_primaria(control_conexion, nombre_tabla) if modo_binarios == MODO_ENLACE else []
+            tabla_resultados = aplicar_modo_binarios(
+                tabla_resultados, modo_binarios, ruta_tabla,
+                claves_primarias[0] if len(claves_primarias) == 1 else None, columnas_binarias(tipos_columnas)
+            )
+        control_conexion.cerrar_bd()
+        
+        # Devolver las filas en el formato negociado (JSON, columnar o MessagePack)
+        return responder_lectura(tabla_resultados, nombre_proyecto, nombre_tabla)
+        
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except pyodbc.Error as ex:
+        # Mapear códigos de error SQL a códigos HTTP apropiados
+        codigo_error = 500
+        if hasattr(ex, 'args') and len(ex.args) > 0:
+            error_code = getattr(ex, 'args')[0]
+            if error_code == 208:  # Tabla no encontrada
+                codigo_error = 404
+            elif error_code in [547, 2627]:  # Violación de restricción o clave duplicada
+                codigo_error = 409
+                
+        mensaje_error = f"Error ({codigo_error}): {str(ex)}"
+        return jsonify({"error": mensaje_error}), codigo_error
+        
+    except Exception as ex:
+        # Para otros errores, devolver error 500
+        codigo_error = 500
+        mensaje_error = f"Error interno del servidor: {str(ex)}"
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        return jsonify({"error": mensaje_error}), codigo_error
+
+# Obtener conteos y agregados calculados en la base de datos
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/agregado', methods=['GET'])
+def agregado(nombre_proyecto, nombre_tabla):
+    """
+    Calcula count, sum, avg, min o max sobre una tabla, opcionalmente agrupando
+    por columnas o por día/mes de una columna de fecha. La agregación se ejecuta en SQL.
+    
+    Parámetros de la URL (ver servicios/agregados.py):
+        funciones: Lista como "count(*),sum(monto)" (por defecto count(*)).
+        group_by: Columnas de agrupación, por ejemplo "cliente,fecha:mes".
+        filtro: Filtros columna:operador:valor (repetible).
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla a agregar.
+        
+    Returns:
+        JSON: Una fila por grupo con los valores agregados, o un código de error en caso de fallo.
+    """
+    # Verificar si el nombre de la tabla está vacío
+    if not nombre_tabla or nombre_tabla.strip() == "":
+        return jsonify({"error": "El nombre de la tabla no puede estar vacío"}), 400
+    
+    try:
+        control_conexion.abrir_bd()
+        
+        # Las columnas recibidas se validan contra el esquema de la tabla
+        tipos_columnas = obtener_tipos_columnas(control_conexion, nombre_tabla)
+        if not tipos_columnas:
+            return jsonify({"error": f"La tabla '{nombre_tabla}' no existe"}), 404
+        
+        clausula_where, parametros = construir_filtros(
+            request.args.getlist('filtro'), tipos_columnas, control_conexion.crear_parametro
+        )
+        consulta_sql = construir_consulta_agregado(
+            nombre_tabla, tipos_columnas,
+            request.args.get('funciones'), request.args.get('group_by'), clausula_where
+        )
+        
+        print(f"Ejecutando agregado: {consulta_sql}")
+        resultado = control_conexion.ejecutar_consulta_sql(consulta_sql, parametros)
+        
+        # Devolver los grupos en el formato negociado (JSON, columnar o MessagePack)
+        return construir_respuesta(resultado, request)
+        
+    except ErrorApi:
+        # Errores con código HTTP propio (400, 503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except Exception as ex:
+        print(f"Ocurrió una excepción: {str(ex)}")
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+        
+    finally:
+        # Siempre cerrar la conexión, incluso si hay errores
+        control_conexion.cerrar_bd()
+
+# Buscar texto en las columnas configuradas de una tabla
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/buscar', methods=['GET'])
+def buscar(nombre_proyecto, nombre_tabla):
+    """
+    Busca filas por palabras en las columnas de texto configuradas en BusquedaTexto, con un
+    índice invertido en memoria (sin tildes, por prefijo y ordenado por relevancia) en lugar
+    de LIKE '%texto%' (ver servicios/busqueda_texto.py).
+    
+    Parámetros de consulta:
+        q: Texto a buscar; deben coincidir todas sus palabras (obligatorio).
+        pagina: Página de resultados, desde 1 (por defecto 1).
+        por_pagina: Resultados por página (por defecto BusquedaTexto.PorPagina, máximo MaxPorPagina).
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla en la base de datos.
+        
+    Returns:
+        JSON: {"total", "pagina", "por_pagina", "resultados"} con las filas de la página y su "_puntuacion".
+    """
+    buscador = obtener_buscador_texto()
+    if buscador is None:
+        return jsonify({"error": "La búsqueda de texto no está configurada"}), 404
+    
+    consulta = (request.args.get('q') or "").strip()
+    if not consulta:
+        return jsonify({"error": "Debe indicar el texto a buscar en el parámetro q"}), 400
+    try:
+        pagina = int(request.args.get('pagina', 1))
+        por_pagina = int(request.args.get('por_pagina', buscador.por_pagina))
+    except ValueError:
+        return jsonify({"error": "Los parámetros pagina y por_pagina deben ser números enteros"}), 400
+    if pagina < 1 or not 1 <= por_pagina <= buscador.max_por_pagina:
+        return jsonify({"error": f"pagina debe ser mayor que 0 y por_pagina estar entre 1 y {buscador.max_por_pagina}"}), 400
+    
+    total, resultados = buscador.buscar(nombre_proyecto, nombre_tabla, consulta, pagina, por_pagina)
+    return jsonify({"total": total, "pagina": pagina, "por_pagina": por_pagina, "resultados": resultados}), 200
+
+# Obtener las filas que cambiaron desde una marca de agua (sincronización incremental)
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/cambios', methods=['GET'])
+def cambios(nombre_proyecto, nombre_tabla):
+    """
+    Devuelve las filas insertadas, actualizadas o eliminadas desde la marca ?since=
+    (o la tabla completa si no se envía). La nueva marca viaja en la cabecera
+    X-Change-Watermark y debe enviarse en la siguiente llamada.
+    La estrategia (Change Tracking, rowversion o registro de la API) se elige
+    según la tabla; ver servicios/cambios.py.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla a sincronizar.
+        
+    Returns:
+        JSON: Filas cambiadas con la columna _operacion, o un código de error en caso de fallo.
+    """
+    # Verificar si el nombre de la tabla está vacío
+    if not nombre_tabla or nombre_tabla.strip() == "":
+        return jsonify({"error": "El nombre de la tabla no puede estar vacío"}), 400
+    
+    try:
+        control_conexion.abrir_bd()
+        
+        tipos_columnas = obtener_tipos_columnas(control_conexion, nombre_tabla)
+        if not tipos_columnas:
+            return jsonify({"error": f"La tabla '{nombre_tabla}' no existe"}), 404
+        
+        estrategia, columna_version = detectar_estrategia(control_conexion, nombre_tabla, tipos_columnas, datos_config)
+        if estrategia is None:
+            return jsonify({"error": "La tabla no tiene Change Tracking ni columna rowversion, "
+                                     "y el registro de cambios de la API está deshabilitado"}), 400
+        desde = leer_marca(request.args.get('since'), estrategia)
+        
+        if estrategia == ESTRATEGIA_SEGUIMIENTO:
+            claves_primarias = obtener_clave_primaria(control_conexion, nombre_tabla)
+            if not claves_primarias:
+                return jsonify({"error": "Change Tracking requiere que la tabla tenga clave primaria"}), 400
+            resultado, nueva_marca = consultar_cambios_seguimiento(
+                control_conexion, nombre_tabla, tipos_columnas, claves_primarias, desde
+            )
+        elif estrategia == ESTRATEGIA_ROWVERSION:
+            resultado, nueva_marca = consultar_cambios_rowversion(control_conexion, nombre_tabla, columna_version, desde)
+        else:
+            _, tabla_registro = obtener_config_cambios(datos_config)
+            resultado, nueva_marca = consultar_cambios_registro(
+                control_conexion, nombre_tabla, tipos_columnas, tabla_registro, desde
+            )
+        
+        # Devolver los cambios en el formato negociado, con la nueva marca en las cabeceras
+        respuesta = construir_respuesta(resultado, request)
+        if isinstance(respuesta, tuple):
+            return respuesta  # Formato no soportado (406)
+        respuesta.headers['X-Change-Watermark'] = formatear_marca(estrategia, nueva_marca)
+        respuesta.headers['X-Change-Strategy'] = estrategia
+        return respuesta
+        
+    except ErrorApi:
+        # Errores con código HTTP propio (400, 410, 503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except Exception as ex:
+        print(f"Ocurrió una excepción: {str(ex)}")
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+        
+    finally:
+        # Siempre cerrar la conexión, incluso si hay errores
+        control_conexion.cerrar_bd()
+
+# Suscribirse a los cambios de una tabla como Server-Sent Events
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/eventos', methods=['GET'])
+def eventos(nombre_proyecto, nombre_tabla):
+    """
+    Abre un flujo text/event-stream con los cambios que crear, actualizar y eliminar
+    hacen sobre la tabla, y los avisos de resincronización de las escrituras que no
+    identifican filas (ver servicios/eventos.py).
+    
+    Parámetros de consulta opcionales:
+        operaciones: Lista de operaciones a recibir (I, U, D, R); por defecto todas.
+        filtro: Filtros columna:operador:valor sobre los datos del evento (repetible).
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla a observar.
+        
+    Returns:
+        Response: Flujo de eventos SSE, o un código de error en caso de fallo.
+    """
+    # Verificar si el nombre de la tabla está vacío
+    if not nombre_tabla or nombre_tabla.strip() == "":
+        return jsonify({"error": "El nombre de la tabla no puede estar vacío"}), 400
+    
+    operaciones = {operacion.strip().upper() for operacion in request.args.get('operaciones', ','.join(OPERACIONES_EVENTOS)).split(',') if operacion.strip()}
+    if not operaciones or not operaciones <= set(OPERACIONES_EVENTOS):
+        return jsonify({"error": "El parámetro operaciones solo admite I, U, D y R"}), 400
+    
+    concentrador = obtener_concentrador()
+    suscripcion = concentrador.suscribir(
+        nombre_proyecto, nombre_tabla, operaciones, crear_predicado(request.args.getlist('filtro'))
+    )
+    
+    # El generador no usa la solicitud: no hace falta stream_with_context y los recursos de la
+    # solicitud (conexión, cupo de admisión) se liberan en cuanto empieza el flujo
+    return Response(
+        concentrador.generar_flujo(nombre_proyecto, nombre_tabla, suscripcion),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+# Obtener un registro específico por clave
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/<string:nombre_clave>/<string:valor>', methods=['GET'])
+def obtener_por_clave(nombre_proyecto, nombre_tabla, nombre_clave, valor):
+    """
+    Obtiene un registro específico de una tabla, basado en una clave y su valor.
+    Es equivalente al método ObtenerPorClave() en EntidadesController.cs.
+    Acepta ?expand=columna_fk para incluir las filas referidas (ver servicios/expansion.py)
+    y ?binarios=incluir|excluir|enlace para las columnas binarias (ver servicios/binarios.py).
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla en la base de datos.
+        nombre_clave (str): Nombre de la columna clave utilizada para la búsqueda.
+        valor (str): Valor de la clave para filtrar el registro.
+        
+    Returns:
+        JSON: Registro encontrado en formato JSON si la consulta es exitosa, o un código de error en caso de fallo.
+    """
+    # Verificar si los parámetros están vacíos
+    if not nombre_tabla or not nombre_clave or not valor:
+        return jsonify({"error": "El nombre de la tabla, el nombre de la clave y el valor no pueden estar vacíos"}), 400
+    
+    # Tratamiento de las columnas binarias y ruta base de sus enlaces de descarga
+    modo_binarios = obtener_modo_binarios(request, datos_config)
+    ruta_tabla = f"/api/{nombre_proyecto}/{nombre_tabla}"
+    
+    # Tablas de referencia cargadas en memoria: búsqueda en el índice de la columna clave
+    # (o recorriendo las filas si la columna no está indexada)
+    instantanea = obtener_instantanea(nombre_proyecto, nombre_tabla)
+    if instantanea is not None:
+        resultado = instantanea.buscar(nombre_clave, valor)
+        if resultado is not None:
+            if resultado.empty:
+                return jsonify({"error": "No se encontraron registros"}), 404
+            resultado = aplicar_modo_binarios(resultado, modo_binarios, ruta_tabla, nombre_clave)
+            return responder_lectura(resultado, nombre_proyecto, nombre_tabla)
+    
+    try:
+        # Abrir la conexión a la base de datos
+        control_conexion.abrir_bd()
+        
+        # Primero, obtener el tipo de dato de la columna para saber cómo tratar el valor
+        consulta_sql = "SELECT data_type FROM information_schema.columns WHERE table_name = @nombreTabla AND column_name = @nombreColumna"
+        parametros = [
+            control_conexion.crear_parametro("@nombreTabla", nombre_tabla),
+            control_conexion.crear_parametro("@nombreColumna", nombre_clave)
+        ]
+        
+        print(f"Ejecutando consulta SQL: {consulta_sql} con parámetros: nombreTabla={nombre_tabla}, nombreColumna={nombre_clave}")
+        
+        resultado_tipo_dato = control_conexion.ejecutar_consulta_sql(consulta_sql, parametros)
+        
+        # Verificar si se obtuvo resultado
+        if resultado_tipo_dato.empty:
+            return jsonify({"error": "No se pudo determinar el tipo de dato"}), 404
+        
+        # Obtener el tipo de dato
+        tipo_dato = resultado_tipo_dato.iloc[0]['data_type']
+        print(f"Tipo de dato detectado para la columna {nombre_clave}: {tipo_dato}")
+        
+        if not tipo_dato:
+            return jsonify({"error": "No se pudo determinar el tipo de dato"}), 404
+        
+        # Columnas del SELECT: sin las binarias o con su longitud, según ?binarios=
+        seleccion = "*"
+        columnas_bin = []
+        if modo_binarios != MODO_INCLUIR:
+            tipos_columnas = obtener_tipos_columnas(control_conexion, nombre_tabla)
+            seleccion = construir_seleccion(tipos_columnas, modo_binarios)
+            columnas_bin = columnas_binarias(tipos_columnas)
+        
+        # Convertir el valor según el tipo de dato detectado
+        valor_convertido = None
+        comando_sql = None
+        
+        tipo_dato = tipo_dato.lower()
+        # Manejar diferentes tipos de datos
+        if tipo_dato in ['int', 'bigint', 'smallint', 'tinyint']:
+            # Para tipos enteros
+            try:
+                valor_convertido = int(valor)
+                comando_sql = f"SELECT {seleccion} FROM {nombre_tabla} WHERE {nombre_clave} = @Valor"
+            except ValueError:
+                return jsonify({"error": "El valor proporcionado no es válido para el tipo de datos entero"}), 400
+                
+        elif tipo_dato in ['decimal', 'numeric', 'money', 'smallmoney']:
+            # Para tipos decimales/monetarios
+            try:
+                valor_convertido = float(valor)
+                comando_sql = f"SELECT {seleccion} FROM {nombre_tabla} WHERE {nombre_clave} = @Valor"
+            except ValueError:
+                return jsonify({"error": "El valor proporcionado no es válido para el tipo de datos decimal"}), 400
+                
+        elif tipo_dato == 'bit':
+            # Para tipos booleanos
+            valor_lower = valor.lower()
+            if valor_lower in ['true', '1', 'yes', 'y']:
+                valor_convertido = True
+                comando_sql = f"SELECT {seleccion} FROM {nombre_tabla} WHERE {nombre_clave} = @Valor"
+            elif valor_lower in ['false', '0', 'no', 'n']:
+                valor_convertido = False
+                comando_sql = f"SELECT {seleccion} FROM {nombre_tabla} WHERE {nombre_clave} = @Valor"
+            else:
+                return jsonify({"error": "El valor proporcionado no es válido para el tipo de datos booleano"}), 400
+                
+        elif tipo_dato in ['float', 'real']:
+            # Para tipos de punto flotante
+            try:
+                valor_convertido = float(valor)
+                comando_sql = f"SELECT {seleccion} FROM {nombre_tabla} WHERE {nombre_clave} = @Valor"
+            except ValueError:
+                return jsonify({"error": "El valor proporcionado no es válido para el tipo de datos flotante"}), 400
+                
+        elif tipo_dato in ['nvarchar', 'varchar', 'nchar', 'char', 'text']:
+            # Para tipos de texto
+            valor_convertido = valor
+            comando_sql = f"SELECT {seleccion} FROM {nombre_tabla} WHERE {nombre_clave} = @Valor"
+            
+        elif tipo_dato in ['date', 'datetime', 'datetime2', 'smalldatetime']:
+            # Para tipos de fecha
+            try:
+                valor_convertido = datetime.datetime.fromisoformat(valor.replace('Z', '+00:00')).date()
+                comando_sql = f"SELECT {seleccion} FROM {nombre_tabla} WHERE CAST({nombre_clave} AS DATE) = @Valor"
+            except ValueError:
+                return jsonify({"error": "El valor proporcionado no es válido para el tipo de datos fecha"}), 400
+                
+        else:
+            # Para tipos no soportados
+            return jsonify({"error": f"Tipo de dato no soportado: {tipo_dato}"}), 400
+        
+        # Crear el parámetro para la consulta
+        parametro = control_conexion.crear_parametro("@Valor", valor_convertido)
+        
+        print(f"Ejecutando consulta SQL: {comando_sql} con parámetro: Valor = {valor_convertido}")
+        
+        # Ejecutar la consulta para obtener el registro
+        resultado = control_conexion.ejecutar_consulta_sql(comando_sql, [parametro])
+        
+        # Verificar si hay resultados
+        if not resultado.empty:
+            # Devolver el registro en el formato negociado (con los enlaces de las columnas binarias)
+            resultado = aplicar_modo_binarios(resultado, modo_binarios, ruta_tabla, nombre_clave, columnas_bin)
+            return responder_lectura(resultado, nombre_proyecto, nombre_tabla)
+        else:
+            return jsonify({"error": "No se encontraron registros"}), 404
+            
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except Exception as ex:
+        print(f"Ocurrió una excepción: {str(ex)}")
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+        
+    finally:
+        # Siempre cerrar la conexión, incluso si hay errores
+        control_conexion.cerrar_bd()
+
+# Descargar el contenido de una columna binaria, por bloques y con soporte de Range
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/<string:nombre_clave>/<string:valor>/binario/<string:nombre_columna>', methods=['GET'])
+def obtener_binario(nombre_proyecto, nombre_tabla, nombre_clave, valor, nombre_columna):
+    """
+    Envía el contenido de una columna binaria (varbinary, binary, image) de un registro.
+    Se lee de la base de datos en bloques de Binarios.TamanoBloqueKB y se envía a medida
+    que se lee, por lo que el archivo nunca se carga completo en memoria.
+    Atiende la cabecera Range con un solo rango (206 Partial Content).
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla en la base de datos.
+        nombre_clave (str): Nombre de la columna clave utilizada para la búsqueda.
+        valor (str): Valor de la clave para filtrar el registro.
+        nombre_columna (str): Columna binaria que se descarga.
+        
+    Returns:
+        Response: Flujo con el contenido (o el rango pedido), o un código de error en caso de fallo.
+    """
+    tamano_bloque = int(datos_config.get("Binarios", {}).get("TamanoBloqueKB", 256)) * 1024
+    
+    # La descarga usa su propia conexión, que permanece abierta mientras dure el flujo
+    conexion_binario = crear_control_conexion(nombre_proyecto)
+    try:
+        conexion_binario.abrir_bd()
+        
+        # Validar la columna binaria y la clave contra el esquema de la tabla
+        tipos_columnas = obtener_tipos_columnas(conexion_binario, nombre_tabla)
+        if not tipos_columnas:
+            conexion_binario.cerrar_bd()
+            return jsonify({"error": f"La tabla '{nombre_tabla}' no existe"}), 404
+        columna = resolver_columna(nombre_columna, tipos_columnas)
+        if tipos_columnas[columna] not in TIPOS_BINARIOS:
+            conexion_binario.cerrar_bd()
+            return jsonify({"error": f"La columna '{columna}' no es binaria"}), 400
+        columna_clave = resolver_columna(nombre_clave, tipos_columnas)
+        try:
+            valor_clave = obtener_convertidor(tipos_columnas[columna_clave])(valor)
+        except (TypeError, ValueError, OverflowError) as ex:
+            conexion_binario.cerrar_bd()
+            return jsonify({"error": f"El valor de la clave no es válido: {str(ex)}"}), 400
+        
+        # Longitud total (sin leer el contenido) y rango pedido
+        existe, longitud = leer_longitud(conexion_binario, nombre_tabla, columna, columna_clave, valor_clave)
+        if not existe:
+            conexion_binario.cerrar_bd()
+            return jsonify({"error": "No se encontraron registros"}), 404
+        if longitud is None:
+            conexion_binario.cerrar_bd()
+            return jsonify({"error": f"La columna '{columna}' no tiene contenido en este registro"}), 404
+        rango = analizar_rango(request.headers.get('Range'), longitud)
+    except ErrorApi:
+        # Errores con código HTTP propio (400, 416, 503, 504...): los atiende el manejador de app.py
+        conexion_binario.cerrar_bd()
+        raise
+    except Exception as ex:
+        conexion_binario.cerrar_bd()
+        print(f"Ocurrió una excepción: {str(ex)}")
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+    
+    inicio, fin = rango if rango is not None else (0, longitud - 1)
+    
+    # El plazo de la solicitud cubre la validación; la descarga dura lo que tarde el cliente
+    # en leerla, así que sus bloques se leen sin límite (como en exportar)
+    conexion_binario.establecer_limite(None)
+    
+    def generar_bloques():
+        """
+        Genera el contenido bloque a bloque; el siguiente bloque solo se lee cuando el
+        servidor WSGI ya escribió el anterior en el socket.
+        """
+        try:
+            yield from leer_bloques(conexion_binario, nombre_tabla, columna, columna_clave, valor_clave,
+                                    inicio, fin, tamano_bloque)
+        except Exception as ex:
+            # Ya se enviaron las cabeceras: el cliente detecta el corte por Content-Length
+            print(f"Ocurrió una excepción durante la descarga de {nombre_tabla}.{columna}: {str(ex)}")
+        finally:
+            # Cerrar la conexión al terminar o si el cliente se desconecta
+            conexion_binario.cerrar_bd()
+    
+    # El generador no usa la solicitud: sin stream_with_context, el cupo de admisión y la
+    # conexión de la solicitud se liberan en cuanto empieza el flujo (como en eventos)
+    respuesta = Response(generar_bloques(), status=206 if rango is not None else 200,
+                         mimetype='application/octet-stream')
+    respuesta.headers['Content-Length'] = str(fin - inicio + 1)
+    respuesta.headers['Accept-Ranges'] = 'bytes'
+    if rango is not None:
+        respuesta.headers['Content-Range'] = f"bytes {inicio}-{fin}/{longitud}"
+    return respuesta
+
+# Varias lecturas en paralelo en una sola solicitud
+@entidades_bp.route('/api/<string:nombre_proyecto>/multi', methods=['POST'])
+def leer_multiple(nombre_proyecto):
+    """
+    Ejecuta varias lecturas de tablas (por clave, por filtros o completas) en paralelo,
+    cada una con su propia conexión del pool, y devuelve un único documento.
+    El fallo de una lectura se informa en su parte sin afectar a las demás
+    (ver servicios/lectura_multiple.py).
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenecen las tablas.
+        
+    Returns:
+        JSON: {nombre: {"estado": 200, "datos": [...]} o {"estado": código, "error": mensaje}}.
+    """
+    lector = obtener_lector_multiple()
+    if lector is None:
+        return jsonify({"error": "Las lecturas múltiples están deshabilitadas"}), 404
+    
+    lecturas = validar_lecturas(request.get_json(silent=True), lector.max_lecturas)
+    
+    # Las lecturas se ejecutan en otros hilos: se les pasan los servicios de la solicitud
+    resultados = lector.leer(
+        nombre_proyecto,
+        lecturas,
+        limite=obtener_limite_solicitud(),
+        instantaneas=current_app.extensions.get("instantaneas"),
+        control_admision=current_app.extensions.get("control_admision"),
+        consultas_lentas=current_app.extensions.get("consultas_lentas"),
+    )
+    return jsonify(resultados), 200
+
+# Crear un nuevo registro
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>', methods=['POST'])
+def crear(nombre_proyecto, nombre_tabla):
+    """
+    Crea un nuevo registro en la tabla especificada con los datos proporcionados.
+    Es equivalente al método Crear() en EntidadesController.cs.
+    
+    Parámetros de consulta opcionales:
+        async=1: Encola la fila en la escritura diferida y responde 202 con su id
+                 (ver servicios/escritura_diferida.py).
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla en la base de datos.
+        
+    Returns:
+        JSON: Mensaje de éxito si la inserción es correcta, o un código de error en caso de fallo.
+    """
+    # Obtener datos del cuerpo de la solicitud JSON
+    datos_entidad = request.get_json()
+    
+    # Verificar si los parámetros están vacíos
+    if not nombre_tabla or not datos_entidad:
+        return jsonify({"error": "El nombre de la tabla y los datos de la entidad no pueden estar vacíos"}), 400
+    
+    try:
+        # Plan compilado para estas columnas: SQL, conversión por tipo de columna y contraseña resueltos una vez
+        proyecto = obtener_registro_proyectos().obtener_configuracion_proyecto(nombre_proyecto).nombre
+        plan = planes_escritura.obtener(control_conexion, proyecto, nombre_tabla, OPERACION_INSERTAR, datos_entidad)
+        
+        # Convertir los datos recibidos al tipo de cada columna (400 si alguno no es válido)
+        valores = plan.preparar(datos_entidad)
+        
+        # Escritura diferida (?async=1 o tabla configurada): encolar y responder sin esperar a la base de datos
+        cola_escritura = obtener_cola_escritura()
+        if cola_escritura is not None and cola_escritura.aplica(nombre_proyecto, nombre_tabla, request.args.get('async') == '1'):
+            identificador = cola_escritura.encolar(nombre_proyecto, nombre_tabla, dict(zip(plan.columnas, valores)),
+                                                   plan.clave_insertada(valores))
+            return jsonify({"mensaje": "Entidad encolada para escritura diferida", "id": identificador}), 202
+        
+        # Crear los parámetros para la consulta SQL
+        parametros = [control_conexion.crear_parametro(columna, valor) for columna, valor in zip(plan.columnas, valores)]
+        
+        # Mostrar la consulta y parámetros (para depuración)
+        print(f"Ejecutando consulta SQL: {plan.sql}")
+        for param in parametros:
+            print(f"Parámetro: {param[0]} = {param[1]}")
+        
+        # Ejecutar la consulta
+        control_conexion.abrir_bd()
+        try:
+            if plan.devuelve_clave:
+                # La base de datos genera la clave (IDENTITY, valores por defecto): el comando la devuelve
+                fila_salida = control_conexion.ejecutar_consulta_fila_sql(plan.sql, parametros)
+            else:
+                fila_salida = None
+                control_conexion.ejecutar_comando_sql(plan.sql, parametros)
+        except Exception:
+            # Puede haber cambiado el esquema: el próximo intento vuelve a leerlo
+            planes_escritura.invalidar(proyecto, nombre_tabla)
+            raise
+        control_conexion.cerrar_bd()
+        
+        # Clave de la fila insertada, para el registro de cambios y el índice de búsqueda (after_request)
+        g.clave_creada = plan.clave_insertada(valores, fila_salida)
+        
+        return jsonify({"mensaje": "Entidad creada exitosamente"})
+        
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except Exception as ex:
+        print(f"Ocurrió una excepción: {str(ex)}")
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+
+# Actualizar un registro existente
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/<string:nombre_clave>/<string:valor_clave>', methods=['PUT'])
+def actualizar(nombre_proyecto, nombre_tabla, nombre_clave, valor_clave):
+    """
+    Actualiza un registro específico en la tabla de la base de datos basado en una clave y su valor.
+    Es equivalente al método Actualizar() en EntidadesController.cs.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla en la base de datos.
+        nombre_clave (str): Nombre de la columna clave utilizada para la búsqueda.
+        valor_clave (str): Valor de la clave para identificar el registro a actualizar.
+        
+    Returns:
+        JSON: Mensaje de éxito si la actualización es correcta, o un código de error en caso de fallo.
+    """
+    # Obtener datos del cuerpo de la solicitud JSON
+    datos_entidad = request.get_json()
+    
+    # Verificar si los parámetros están vacíos
+    if not nombre_tabla or not nombre_clave or not datos_entidad:
+        return jsonify({"error": "El nombre de la tabla, el nombre de la clave y los datos de la entidad no pueden estar vacíos"}), 400
+    
+    try:
+        # Plan compilado para estas columnas y esta clave (SQL, conversiones y contraseña resueltos una vez)
+        proyecto = obtener_registro_proyectos().obtener_configuracion_proyecto(nombre_proyecto).nombre
+        plan = planes_escritura.obtener(control_conexion, proyecto, nombre_tabla, OPERACION_ACTUALIZAR, datos_entidad, nombre_clave)
+        
+        # Convertir los datos recibidos y la clave al tipo de cada columna (400 si alguno no es válido)
+        valores = plan.preparar(datos_entidad)
+        valores.append(plan.convertir_clave(valor_clave))
+        
+        # Crear los parámetros para la consulta SQL (la clave va al final, como en el WHERE)
+        parametros = [control_conexion.crear_parametro(columna, valor) for columna, valor in zip(plan.columnas + (nombre_clave,), valores)]
+        
+        # Mostrar la consulta y parámetros (para depuración)
+        print(f"Ejecutando consulta SQL: {plan.sql}")
+        for param in parametros:
+            print(f"Parámetro: {param[0]} = {param[1]}")
+        
+        # Ejecutar la consulta
+        control_conexion.abrir_bd()
+        try:
+            control_conexion.ejecutar_comando_sql(plan.sql, parametros)
+        except Exception:
+            # Puede haber cambiado el esquema: el próximo intento vuelve a leerlo
+            planes_escritura.invalidar(proyecto, nombre_tabla)
+            raise
+        control_conexion.cerrar_bd()
+        
+        return jsonify({"mensaje": "Entidad actualizada exitosamente"})
+        
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except Exception as ex:
+        print(f"Ocurrió una excepción: {str(ex)}")
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+
+# Insertar o actualizar registros según exista su clave (upsert)
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/combinar/<string:columna_clave>', methods=['POST'])
+def combinar(nombre_proyecto, nombre_tabla, columna_clave):
+    """
+    Inserta las filas cuya clave no existe y actualiza las que ya existen, con un solo
+    MERGE por lote en lugar de consultar y luego crear o actualizar cada fila.
+    El cuerpo puede ser una fila (objeto) o varias (lista de objetos con las mismas columnas);
+    todas se combinan en una sola transacción.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla en la base de datos.
+        columna_clave (str): Columna que decide si la fila existe (debe venir en cada fila).
+        
+    Returns:
+        JSON: Filas insertadas y actualizadas, y la acción de cada fila en el orden recibido
+              ("insertado", "actualizado" o "sin_cambios" si solo se envió la clave).
+    """
+    # Obtener datos del cuerpo de la solicitud JSON (una fila o una lista de filas)
+    cuerpo = request.get_json(silent=True)
+    filas = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+    
+    # Verificar si los parámetros están vacíos
+    if not nombre_tabla or not filas or not all(isinstance(fila, dict) and fila for fila in filas):
+        return jsonify({"error": "El cuerpo debe ser una fila o una lista de filas no vacías"}), 400
+    
+    config_combinacion = datos_config.get("Combinacion", {})
+    max_filas = int(config_combinacion.get("MaxFilas", 10000))
+    if len(filas) > max_filas:
+        return jsonify({"error": f"Se pueden combinar como máximo {max_filas} filas por solicitud"}), 400
+    
+    # Todas las filas comparten un plan: deben traer las mismas columnas (se ordenan como la primera)
+    columnas = list(filas[0])
+    if any(set(fila) != set(columnas) for fila in filas):
+        return jsonify({"error": "Todas las filas deben tener las mismas columnas"}), 400
+    filas = [fila if list(fila) == columnas else {columna: fila[columna] for columna in columnas} for fila in filas]
+    
+    try:
+        # Plan compilado para estas columnas y esta clave (conversiones y contraseña resueltas una vez)
+        proyecto = obtener_registro_proyectos().obtener_configuracion_proyecto(nombre_proyecto).nombre
+        plan = planes_escritura.obtener(control_conexion, proyecto, nombre_tabla, OPERACION_COMBINAR, filas[0], columna_clave)
+        
+        # bcrypt tarda del orden de 0,1 a 0,3 s por fila: se limitan las combinaciones que cifran contraseñas
+        max_filas_contrasena = int(config_combinacion.get("MaxFilasConContrasena", 100))
+        if plan.columna_contrasena is not None and len(filas) > max_filas_contrasena:
+            return jsonify({"error": f"Se pueden combinar como máximo {max_filas_contrasena} filas por solicitud "
+                                     f"cuando incluyen la columna de contraseña '{plan.columnas[plan.columna_contrasena]}'"}), 400
+        
+        # Convertir los datos recibidos al tipo de cada columna (400 si alguno no es válido)
+        valores = [plan.preparar(fila) for fila in filas]
+        
+        # MERGE no admite dos filas de origen con la misma clave
+        claves = []
+        for fila in valores:
+            if fila[plan.posicion_clave] is None:
+                return jsonify({"error": f"La columna clave '{columna_clave}' no puede ser nula"}), 400
+            claves.append(normalizar_clave(fila[plan.posicion_clave]))
+        if len(set(claves)) != len(claves):
+            return jsonify({"error": f"Hay filas repetidas para la misma clave '{columna_clave}'"}), 400
+        
+        # Un comando por lote; SQL Server admite como máximo 2100 parámetros por comando
+        filas_por_comando = max(1, min(int(config_combinacion.get("FilasPorComando", 200)), 2000 // len(plan.columnas)))
+        comandos = []
+        posicion = 0
+        for tamano in tamanos_lote(len(valores), filas_por_comando):
+            plan_lote = planes_escritura.obtener(control_conexion, proyecto, nombre_tabla, OPERACION_COMBINAR,
+                                                 filas[0], columna_clave, tamano)
+            comandos.append((plan_lote.sql, [valor for fila in valores[posicion:posicion + tamano] for valor in fila]))
+            posicion += tamano
+        
+        # Ejecutar todos los lotes en una sola transacción
+        control_conexion.abrir_bd()
+        try:
+            resultados = control_conexion.ejecutar_consultas_sql_transaccion(comandos)
+        except Exception:
+            # Puede haber cambiado el esquema: el próximo intento vuelve a leerlo
+            planes_escritura.invalidar(proyecto, nombre_tabla)
+            raise
+        control_conexion.cerrar_bd()
+        
+        # OUTPUT $action devuelve la acción de cada fila con su clave (sin orden garantizado)
+        acciones = {
+            normalizar_clave(clave): "insertado" if accion == "INSERT" else "actualizado"
+            for filas_salida in resultados for accion, clave in filas_salida
+        }
+        acciones_filas = [acciones.get(clave, "sin_cambios") for clave in claves]
+        resumen = {
+            "insertados": acciones_filas.count("insertado"),
+            "actualizados": acciones_filas.count("actualizado"),
+            "sin_cambios": acciones_filas.count("sin_cambios"),
+        }
+        if isinstance(cuerpo, list):
+            return jsonify({**resumen, "filas": acciones_filas})
+        return jsonify({"mensaje": "Entidad combinada exitosamente", "accion": acciones_filas[0], **resumen})
+        
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except Exception as ex:
+        print(f"Ocurrió una excepción: {str(ex)}")
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+
+# Eliminar un registro
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/<string:nombre_clave>/<string:valor_clave>', methods=['DELETE'])
+def eliminar(nombre_proyecto, nombre_tabla, nombre_clave, valor_clave):
+    """
+    Elimina un registro específico de la tabla de la base de datos basado en una clave y su valor.
+    Es equivalente al método Eliminar() en EntidadesController.cs.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla en la base de datos.
+        nombre_clave (str): Nombre de la columna clave utilizada para identificar el registro.
+        valor_clave (str): Valor de la clave que identifica el registro a eliminar.
+        
+    Returns:
+        JSON: Mensaje de éxito si la eliminación es correcta, o un código de error en caso de fallo.
+    """
+    # Verificar si los parámetros están vacíos
+    if not nombre_tabla or not nombre_clave:
+        return jsonify({"error": "El nombre de la tabla o el nombre de la clave no pueden estar vacíos"}), 400
+    
+    try:
+        # Obtener el proveedor de base de datos
+        proveedor = datos_config.get("DatabaseProvider")
+        if not proveedor:
+            raise ValueError("Proveedor de base de datos no configurado")
+        
+        # Construir la consulta SQL de eliminación
+        consulta_sql = f"DELETE FROM {nombre_tabla} WHERE {nombre_clave}=@ValorClave"
+        
+        # Crear el parámetro para la clave
+        parametro = control_conexion.crear_parametro("@ValorClave", valor_clave)
+        
+        # Ejecutar la consulta
+        control_conexion.abrir_bd()
+        control_conexion.ejecutar_comando_sql(consulta_sql, [parametro])
+        control_conexion.cerrar_bd()
+        
+        return jsonify({"mensaje": "Entidad eliminada exitosamente"})
+        
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except Exception as ex:
+        print(f"Ocurrió una excepción: {str(ex)}")
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+
+# Verificar contraseña
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/verificar-contrasena', methods=['POST'])
+def verificar_contrasena(nombre_proyecto, nombre_tabla):
+    """
+    Verifica si la contraseña proporcionada coincide con la contraseña almacenada en la base de datos para un usuario específico.
+    Es equivalente al método VerificarContrasena() en EntidadesController.cs.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla en la base de datos que almacena los usuarios.
+        
+    Returns:
+        JSON: Mensaje indicando el resultado de la verificación.
+    """
+    # Obtener datos del cuerpo de la solicitud
+    datos = request.get_json()
+    
+    # Verificar si los parámetros están vacíos o faltan campos requeridos
+    if not nombre_tabla or not datos or \
+       'campoUsuario' not in datos or 'campoContrasena' not in datos or \
+       'valorUsuario' not in datos or 'valorContrasena' not in datos:
+        return jsonify({
+            "error": "El nombre de la tabla, el campo de usuario, el campo de contraseña, el valor de usuario y el valor de contraseña no pueden estar vacíos"
+        }), 400
+    
+    try:
+        # Extraer los valores necesarios del request
+        campo_usuario = datos['campoUsuario']  # Nombre de la columna que contiene el usuario
+        campo_contrasena = datos['campoContrasena']  # Nombre de la columna que contiene la contraseña
+        valor_usuario = datos['valorUsuario']  # Valor del usuario a buscar
+        valor_contrasena = datos['valorContrasena']  # Contraseña a verificar
+        
+        # Obtener el proveedor de base de datos
+        proveedor = datos_config.get("DatabaseProvider")
+        if not proveedor:
+            raise ValueError("Proveedor de base de datos no configurado")
+        
+        # Construir la consulta SQL para obtener la contraseña almacenada
+        consulta_sql = f"SELECT {campo_contrasena} FROM {nombre_tabla} WHERE {campo_usuario} = @ValorUsuario"
+        
+        # Crear el parámetro para el usuario
+        parametro = control_conexion.crear_parametro("@ValorUsuario", valor_usuario)
+        
+        # Ejecutar la consulta
+        control_conexion.abrir_bd()
+        resultado = control_conexion.ejecutar_consulta_sql(consulta_sql, [parametro])
+        control_conexion.cerrar_bd()
+        
+        # Verificar si se encontró el usuario
+        if resultado.empty:
+            return jsonify({"error": "Usuario no encontrado"}), 404
+        
+        # Obtener la contraseña almacenada (hash bcrypt)
+        contrasena_hasheada = resultado.iloc[0][campo_contrasena]
+        
+        # Verificar que sea un hash bcrypt válido (debe empezar con $2)
+        if not contrasena_hasheada or not str(contrasena_hasheada).startswith('$2'):
+            raise ValueError("El hash de la contraseña almacenada no es un hash válido de BCrypt")
+        
+        # Verificar la contraseña utilizando bcrypt
+        import bcrypt  # Importación diferida: solo se carga al verificar contraseñas
+        es_contrasena_valida = bcrypt.checkpw(
+            valor_contrasena.encode('utf-8'),  # Convertir a bytes la contraseña proporcionada
+            str(contrasena_hasheada).encode('utf-8')  # Convertir a bytes el hash almacenado
+        )
+        
+        if es_contrasena_valida:
+            return jsonify({"mensaje": "Contraseña verificada exitosamente"})
+        else:
+            return jsonify({"error": "Contraseña incorrecta"}), 401
+            
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except Exception as ex:
+        print(f"Ocurrió una excepción: {str(ex)}")
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+
+# Ejecutar consulta parametrizada
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/ejecutar-consulta-parametrizada', methods=['POST'])
+def ejecutar_consulta_parametrizada(nombre_proyecto, nombre_tabla):
+    """
+    Ejecuta una consulta SQL parametrizada recibida en el cuerpo de la solicitud.
+    Es equivalente al método EjecutarConsultaParametrizada() en EntidadesController.cs.
+    
+    En lugar de "consulta" se puede enviar "nombre" con una consulta registrada en
+    ConsultasNombradas (config.json); el SQL queda en el servidor y el cliente solo
+    envía los parámetros:
+        {"nombre": "pedidos_por_cliente", "parametros": {"cliente": 7}}
+    Las registradas que modifican datos se declaran con "Escritura": true para que el
+    registro de cambios, las instantáneas y el índice de búsqueda se actualicen.
+    
+    Parámetros de consulta opcionales:
+        async=1: Ejecuta la consulta como trabajo en segundo plano y responde 202 con su id
+                 (ver servicios/trabajos_consulta.py).
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla en la base de datos.
+        
+    Returns:
+        JSON: Resultados de la consulta en formato JSON o un mensaje de error en caso de fallo.
+    """
+    # Obtener datos del cuerpo de la solicitud
+    cuerpo_solicitud = request.get_json()
+    
+    # Consulta registrada en el servidor, si se pidió por nombre
+    consulta_nombrada = None
+    if cuerpo_solicitud and cuerpo_solicitud.get('nombre'):
+        consultas_nombradas = datos_config.get("ConsultasNombradas", {})
+        consulta_nombrada = consultas_nombradas.get(cuerpo_solicitud['nombre'])
+        if consulta_nombrada is None:
+            return jsonify({"error": f"No existe la consulta registrada '{cuerpo_solicitud['nombre']}'"}), 404
+    
+    # Verificar si se proporcionó la consulta
+    elif not cuerpo_solicitud or 'consulta' not in cuerpo_solicitud or not cuerpo_solicitud['consulta']:
+        return jsonify({"error": "Debe proporcionar una consulta SQL válida en el cuerpo de la solicitud"}), 400
+    
+    try:
+        # Extraer la consulta SQL
+        consulta_sql = consulta_nombrada["Consulta"] if consulta_nombrada else cuerpo_solicitud['consulta']
+        
+        # Verificar si hay parámetros y procesarlos
+        parametros = []
+        if 'parametros' in cuerpo_solicitud and isinstance(cuerpo_solicitud['parametros'], dict):
+            for nombre, valor in cuerpo_solicitud['parametros'].items():
+                # Asegurar que el nombre del parámetro comience con @
+                nombre_param = nombre if nombre.startswith('@') else '@' + nombre
+                parametros.append(control_conexion.crear_parametro(nombre_param, valor))
+        
+        # Las consultas registradas declaran sus parámetros: deben llegar todos
+        if consulta_nombrada:
+            recibidos = {normalizar_nombre(nombre) for nombre, _ in parametros}
+            faltantes = [nombre for nombre in consulta_nombrada.get("Parametros", [])
+                         if normalizar_nombre(nombre) not in recibidos]
+            if faltantes:
+                return jsonify({"error": f"Faltan parámetros para la consulta registrada: {', '.join(faltantes)}"}), 400
+        
+        # Trabajo en segundo plano (?async=1): se responde con el id sin esperar el resultado
+        if request.args.get('async') == '1':
+            gestor = obtener_gestor_trabajos()
+            if gestor is None:
+                return jsonify({"error": "Los trabajos de consulta están deshabilitados"}), 404
+            estado, duplicado = gestor.enviar(nombre_proyecto, consulta_sql, parametros,
+                                              current_app.extensions.get("consultas_lentas"))
+            return jsonify({
+                "id": estado["id"],
+                "estado": estado["estado"],
+                "duplicado": duplicado,
+                "url": f"/api/{nombre_proyecto}/trabajos/{estado['id']}",
+            }), 202
+        
+        # Ejecutar la consulta
+        control_conexion.abrir_bd()
+        resultado = control_conexion.ejecutar_consulta_sql(consulta_sql, parametros)
+        control_conexion.cerrar_bd()
+        
+        # Verificar si hay resultados
+        if resultado.empty:
+            return jsonify({"error": "No se encontraron resultados para la consulta proporcionada"}), 404
+        
+        # Devolver los resultados en el formato negociado
+        return construir_respuesta(resultado, request)
+        
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except pyodbc.Error as ex:
+        # Cerrar la conexión en caso de error
+        control_conexion.cerrar_bd()
+        print(f"SQL Error: {str(ex)}")
+        return jsonify({"error": f"Error en la base de datos: {str(ex)}"}), 500
+        
+    except Exception as ex:
+        # Cerrar la conexión en caso de error
+        control_conexion.cerrar_bd()
+        print(f"Error: {str(ex)}")
+        return jsonify({"error": f"Se presentó un error: {str(ex)}"}), 500
+
+# Consultar el estado de un trabajo de consulta
+@entidades_bp.route('/api/<string:nombre_proyecto>/trabajos/<string:id_trabajo>', methods=['GET'])
+def obtener_trabajo(nombre_proyecto, id_trabajo):
+    """
+    Devuelve el estado de un trabajo enviado con ejecutar-consulta-parametrizada?async=1
+    (pendiente, ejecutando, terminado, error o cancelado) y su progreso.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto del trabajo.
+        id_trabajo (str): Id devuelto al enviar el trabajo.
+        
+    Returns:
+        JSON: Estado del trabajo, o 404 si no existe.
+    """
+    gestor = obtener_gestor_trabajos()
+    if gestor is None:
+        return jsonify({"error": "Los trabajos de consulta están deshabilitados"}), 404
+    
+    estado = gestor.obtener(nombre_proyecto, id_trabajo)
+    if estado["estado"] == ESTADO_TERMINADO:
+        estado["url_resultado"] = f"/api/{nombre_proyecto}/trabajos/{id_trabajo}/resultado"
+    return jsonify(estado), 200
+
+# Descargar el resultado de un trabajo de consulta
+@entidades_bp.route('/api/<string:nombre_proyecto>/trabajos/<string:id_trabajo>/resultado', methods=['GET'])
+def obtener_resultado_trabajo(nombre_proyecto, id_trabajo):
+    """
+    Devuelve el resultado de un trabajo terminado. Sin parámetros se envía completo como
+    NDJSON, leyendo del disco un lote a la vez; con ?pagina=N se devuelve solo ese lote.
+    
+    Parámetros de consulta opcionales:
+        pagina: Número de página (un lote de TrabajosConsulta.TamanoLote filas), desde 1.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto del trabajo.
+        id_trabajo (str): Id devuelto al enviar el trabajo.
+        
+    Returns:
+        Response: Flujo NDJSON, o JSON {"columns", "rows", "pagina", "paginas", "filas"} con ?pagina=;
+                  409 si el trabajo no ha terminado.
+    """
+    gestor = obtener_gestor_trabajos()
+    if gestor is None:
+        return jsonify({"error": "Los trabajos de consulta están deshabilitados"}), 404
+    
+    estado = gestor.obtener(nombre_proyecto, id_trabajo)
+    if estado["estado"] != ESTADO_TERMINADO:
+        return jsonify({"error": f"El trabajo está en estado '{estado['estado']}'", "estado": estado["estado"]}), 409
+    columnas = estado["columnas"] or []
+    
+    # Una página: se lee solo su trama gracias al índice
+    if request.args.get('pagina') is not None:
+        try:
+            pagina = int(request.args['pagina'])
+        except ValueError:
+            return jsonify({"error": "El parámetro pagina debe ser un número entero"}), 400
+        filas = gestor.leer_pagina(estado, pagina)
+        return jsonify({
+            "columns": columnas,
+            "rows": [[convertir_valor_json(valor) for valor in fila] for fila in filas],
+            "pagina": pagina,
+            "paginas": estado["paginas"],
+            "filas": estado["filas"],
+        }), 200
+    
+    def generar_lineas():
+        """
+        Genera el cuerpo NDJSON lote a lote desde el archivo del trabajo.
+        """
+        try:
+            for filas in gestor.iterar_resultado(estado):
+                lineas = [
+                    json.dumps(dict(zip(columnas, [convertir_valor_json(valor) for valor in fila])), ensure_ascii=False)
+                    for fila in filas
+                ]
+                yield "\n".join(lineas) + "\n"
+        except Exception as ex:
+            # El resultado se borró (cancelación, vencimiento) mientras se enviaba
+            print(f"Ocurrió una excepción al enviar el trabajo {id_trabajo}: {str(ex)}")
+            yield json.dumps({"error": f"Resultado interrumpido: {str(ex)}"}, ensure_ascii=False) + "\n"
+    
+    respuesta = Response(generar_lineas(), mimetype='application/x-ndjson')
+    respuesta.headers['X-Total-Count'] = str(estado["filas"])
+    return respuesta
+
+# Cancelar un trabajo de consulta o borrar su resultado
+@entidades_bp.route('/api/<string:nombre_proyecto>/trabajos/<string:id_trabajo>', methods=['DELETE'])
+def cancelar_trabajo(nombre_proyecto, id_trabajo):
+    """
+    Cancela un trabajo pendiente o en ejecución (este último se detiene al terminar el lote
+    en curso), o borra el resultado de un trabajo que ya terminó.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto del trabajo.
+        id_trabajo (str): Id devuelto al enviar el trabajo.
+        
+    Returns:
+        JSON: {"id", "estado"} con "cancelando", "cancelado" o "eliminado".
+    """
+    gestor = obtener_gestor_trabajos()
+    if gestor is None:
+        return jsonify({"error": "Los trabajos de consulta están deshabilitados"}), 404
+    
+    estado = gestor.obtener(nombre_proyecto, id_trabajo)
+    return jsonify(gestor.cancelar(estado)), 200
+
+# Exportar una tabla completa en formato NDJSON
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/exportar', methods=['GET'])
+def exportar(nombre_proyecto, nombre_tabla):
+    """
+    Exporta todos los registros de una tabla como JSON delimitado por líneas (NDJSON).
+    Las filas se leen por lotes desde un cursor de solo avance y se envían a medida
+    que se leen, por lo que la tabla nunca se carga completa en memoria.
+    
+    Parámetros de consulta opcionales:
+        clave: Columna por la que se ordena la exportación (por defecto, la clave primaria).
+        desde: Último valor de clave recibido; la exportación continúa a partir de él.
+        lote: Número de filas por lote (por defecto Exportacion.TamanoLote); no puede superar
+            Exportacion.MaxTamanoLote.
+        filas_por_segundo: Límite de ritmo; no puede superar Exportacion.MaxFilasPorSegundo.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla a exportar.
+        
+    Returns:
+        Response: Flujo NDJSON con una fila por línea, o un código de error en caso de fallo.
+    """
+    # Verificar si el nombre de la tabla está vacío
+    if not nombre_tabla or nombre_tabla.strip() == "":
+        return jsonify({"error": "El nombre de la tabla no puede estar vacío"}), 400
+    
+    # Leer la configuración de exportación (0 = sin límite de ritmo)
+    config_exportacion = datos_config.get("Exportacion", {})
+    max_filas_por_segundo = int(config_exportacion.get("MaxFilasPorSegundo", 0))
+    max_tamano_lote = int(config_exportacion.get("MaxTamanoLote", 10000))
+    try:
+        tamano_lote = int(request.args.get('lote', config_exportacion.get("TamanoLote", 1000)))
+        filas_por_segundo = int(request.args.get('filas_por_segundo', max_filas_por_segundo))
+    except ValueError:
+        return jsonify({"error": "Los parámetros lote y filas_por_segundo deben ser enteros"}), 400
+    
+    if tamano_lote <= 0:
+        return jsonify({"error": "El tamaño de lote debe ser mayor que cero"}), 400
+    
+    # Un lote enorme convertiría fetchmany en fetchall y cargaría la tabla en memoria
+    tamano_lote = min(tamano_lote, max_tamano_lote)
+    
+    # El cliente solo puede reducir el límite configurado, nunca ampliarlo
+    if max_filas_por_segundo > 0:
+        if filas_por_segundo <= 0 or filas_por_segundo > max_filas_por_segundo:
+            filas_por_segundo = max_filas_por_segundo
+    
+    nombre_clave = request.args.get('clave')
+    valor_desde = request.args.get('desde')
+    
+    # La exportación usa su propia conexión, que permanece abierta mientras dure el flujo
+    conexion_exportacion = crear_control_conexion(nombre_proyecto)
+    try:
+        conexion_exportacion.abrir_bd()
+        
+        # Determinar la columna de ordenación (necesaria para poder reanudar)
+        if not nombre_clave:
+            claves_primarias = obtener_clave_primaria(conexion_exportacion, nombre_tabla)
+            if len(claves_primarias) != 1:
+                conexion_exportacion.cerrar_bd()
+                return jsonify({"error": "La tabla no tiene una clave primaria simple; indique la columna con ?clave="}), 400
+            nombre_clave = claves_primarias[0]
+        elif not existe_columna(conexion_exportacion, nombre_tabla, nombre_clave):
+            conexion_exportacion.cerrar_bd()
+            return jsonify({"error": f"La columna {nombre_clave} no existe en la tabla {nombre_tabla}"}), 404
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        conexion_exportacion.cerrar_bd()
+        raise
+    except Exception as ex:
+        conexion_exportacion.cerrar_bd()
+        print(f"Ocurrió una excepción: {str(ex)}")
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        return jsonify({"error": f"Error interno del servidor: {str(ex)}"}), 500
+    
+    # Consulta ordenada por la clave; si hay punto de control, continuar a partir de él
+    comando_sql = f"SELECT * FROM {nombre_tabla}"
+    parametros = []
+    if valor_desde is not None:
+        comando_sql += f" WHERE {nombre_clave} > @Desde"
+        parametros.append(conexion_exportacion.crear_parametro("@Desde", valor_desde))
+    comando_sql += f" ORDER BY {nombre_clave}"
+    
+    def generar_lineas():
+        """
+        Genera el cuerpo NDJSON lote a lote.
+        El servidor WSGI solo pide el siguiente lote cuando ha escrito el anterior en el
+        socket, así que un cliente lento frena la lectura del cursor (contrapresión).
+        """
+        filas_enviadas = 0
+        inicio = time.monotonic()
+        try:
+            for columnas, filas in conexion_exportacion.iterar_consulta_sql(comando_sql, parametros, tamano_lote):
+                lineas = [
+                    json.dumps(dict(zip(columnas, [convertir_valor_json(valor) for valor in fila])), ensure_ascii=False)
+                    for fila in filas
+                ]
+                yield "\n".join(lineas) + "\n"
+                filas_enviadas += len(filas)
+                
+                # Limitar el ritmo para no acaparar la base de datos
+                if filas_por_segundo > 0:
+                    espera = filas_enviadas / filas_por_segundo - (time.monotonic() - inicio)
+                    if espera > 0:
+                        time.sleep(espera)
+        except Exception as ex:
+            # Ya se enviaron las cabeceras: se informa el error en una última línea
+            print(f"Ocurrió una excepción durante la exportación: {str(ex)}")
+            yield json.dumps({"error": f"Exportación interrumpida: {str(ex)}"}, ensure_ascii=False) + "\n"
+        finally:
+            # Cerrar la conexión al terminar o si el cliente se desconecta
+            conexion_exportacion.cerrar_bd()
+            print(f"Exportación de {nombre_tabla} finalizada: {filas_enviadas} filas")
+    
+    # El generador no usa la solicitud: sin stream_with_context, el cupo de admisión se libera
+    # en cuanto empieza el flujo y no queda ocupado mientras el cliente descarga
+    respuesta = Response(generar_lineas(), mimetype='application/x-ndjson')
+    # Informar la columna de control para que el cliente pueda reanudar con ?desde=
+    respuesta.headers['X-Export-Key'] = nombre_clave
+    return respuesta
+
+# Importar registros desde un archivo CSV
+@entidades_bp.route('/api/<string:nombre_proyecto>/<string:nombre_tabla>/importar-csv', methods=['POST'])
+def importar_csv(nombre_proyecto, nombre_tabla):
+    """
+    Importa registros en una tabla a partir de un archivo CSV enviado en el cuerpo de la solicitud.
+    El CSV se lee de forma incremental desde el flujo de la solicitud (también comprimido con gzip),
+    los valores se convierten según el tipo de cada columna y las filas se insertan por lotes
+    con una confirmación por lote. El archivo nunca se carga completo en memoria.
+    
+    La primera línea del CSV debe contener los nombres de las columnas. Las columnas de
+    contraseña se cifran con bcrypt, igual que en crear.
+    Parámetros de consulta opcionales:
+        delimitador: Carácter separador de campos (por defecto ",").
+        lote: Número de filas por lote (por defecto Importacion.TamanoLote); no puede superar
+            Importacion.MaxTamanoLote.
+    
+    Args:
+        nombre_proyecto (str): Nombre del proyecto al que pertenece la tabla.
+        nombre_tabla (str): Nombre de la tabla donde se insertan los registros.
+        
+    Returns:
+        JSON: Resumen de la importación con el detalle de las líneas con error.
+    """
+    # Verificar si el nombre de la tabla está vacío
+    if not nombre_tabla or nombre_tabla.strip() == "":
+        return jsonify({"error": "El nombre de la tabla no puede estar vacío"}), 400
+    
+    # Leer la configuración de importación
+    config_importacion = datos_config.get("Importacion", {})
+    max_errores_reportados = int(config_importacion.get("MaxErroresReportados", 100))
+    max_tamano_lote = int(config_importacion.get("MaxTamanoLote", 10000))
+    try:
+        tamano_lote = int(request.args.get('lote', config_importacion.get("TamanoLote", 5000)))
+    except ValueError:
+        return jsonify({"error": "El parámetro lote debe ser un entero"}), 400
+    
+    delimitador = request.args.get('delimitador', ',')
+    if tamano_lote <= 0 or len(delimitador) != 1:
+        return jsonify({"error": "El tamaño de lote debe ser mayor que cero y el delimitador un único carácter"}), 400
+    
+    # Cada lote se guarda en memoria y se confirma en una sola transacción: se acota su tamaño
+    tamano_lote = min(tamano_lote, max_tamano_lote)
+    
+    # Preparar la lectura incremental del cuerpo, descomprimiendo gzip al vuelo si corresponde
+    flujo_binario = request.stream
+    es_gzip = (request.headers.get('Content-Encoding', '').lower() == 'gzip'
+               or request.mimetype in ('application/gzip', 'application/x-gzip'))
+    if es_gzip:
+        flujo_binario = gzip.GzipFile(fileobj=flujo_binario, mode='rb')
+    lector = csv.reader(io.TextIOWrapper(flujo_binario, encoding='utf-8-sig', newline=''), delimiter=delimitador)
+    
+    # Resumen que se devuelve al cliente
+    resumen = {
+        "filas_leidas": 0,
+        "filas_insertadas": 0,
+        "filas_con_error": 0,
+        "lotes": 0,
+        "duracion_segundos": 0.0,
+        "errores": []
+    }
+    inicio_importacion = time.monotonic()
+    
+    def registrar_error(numero_linea, mensaje):
+        """Registra una línea con error, guardando el detalle solo de las primeras."""
+        resumen["filas_con_error"] += 1
+        if len(resumen["errores"]) < max_errores_reportados:
+            resumen["errores"].append({"linea": numero_linea, "error": mensaje})
+    
+    # La importación usa su propia conexión
+    conexion_importacion = crear_control_conexion(nombre_proyecto)
+    
+    def insertar_lote(consulta_sql, columnas, lote, lineas_lote):
+        """Inserta un lote; si falla, reintenta fila a fila para localizar las líneas con error."""
+        nombres_parametros = [f"@{columna}" for columna in columnas]
+        try:
+            resumen["filas_insertadas"] += conexion_importacion.ejecutar_comando_sql_lote(consulta_sql, lote, nombres_parametros)
+        except ErrorApi:
+            raise
+        except Exception as ex:
+            print(f"Falló el lote de {len(lote)} filas (líneas {lineas_lote[0]} a {lineas_lote[-1]}), "
+                  f"se reintenta fila a fila: {str(ex)}")
+            for valores, numero_linea in zip(lote, lineas_lote):
+                parametros = [conexion_importacion.crear_parametro(nombre, valor) for nombre, valor in zip(nombres_parametros, valores)]
+                try:
+                    conexion_importacion.ejecutar_comando_sql(consulta_sql, parametros)
+                    resumen["filas_insertadas"] += 1
+                except Exception as ex:
+                    registrar_error(numero_linea, str(ex))
+        resumen["lotes"] += 1
+        resumen["duracion_segundos"] = round(time.monotonic() - inicio_importacion, 3)
+        # Progreso como línea JSON (mismo formato que los tiempos de solicitud) para seguirlo en los logs
+        print(json.dumps({
+            "evento": "importacion_csv",
+            "proyecto": nombre_proyecto,
+            "tabla": nombre_tabla,
+            "lotes": resumen["lotes"],
+            "filas_leidas": resumen["filas_leidas"],
+            "filas_insertadas": resumen["filas_insertadas"],
+            "filas_con_error": resumen["filas_con_error"],
+            "duracion_segundos": resumen["duracion_segundos"],
+        }, ensure_ascii=False))
+    
+    try:
+        # Leer el encabezado con los nombres de las columnas
+        encabezado = next(lector, None)
+        if not encabezado:
+            return jsonify({"error": "El archivo CSV está vacío o no tiene encabezado"}), 400
+        
+        conexion_importacion.abrir_bd()
+        
+        # Obtener los tipos de las columnas de la tabla (sin distinguir mayúsculas)
+        tipos_columnas = obtener_tipos_columnas(conexion_importacion, nombre_tabla)
+        if not tipos_columnas:
+            return jsonify({"error": f"No se encontró la tabla {nombre_tabla}"}), 404
+        columnas_tabla = {columna.lower(): columna for columna in tipos_columnas}
+        
+        columnas_desconocidas = [columna for columna in encabezado if columna.strip().lower() not in columnas_tabla]
+        if columnas_desconocidas:
+            return jsonify({"error": f"Columnas que no existen en la tabla {nombre_tabla}: {', '.join(columnas_desconocidas)}"}), 400
+        
+        # Resolver una sola vez las columnas y sus convertidores
+        columnas = [columnas_tabla[columna.strip().lower()] for columna in encabezado]
+        convertidores = [obtener_convertidor(tipos_columnas[columna]) for columna in columnas]
+        
+        # Columna de contraseña (la misma regla que los planes de escritura de crear)
+        columna_contrasena = buscar_columna_contrasena(columnas)
+        
+        # Construir la consulta SQL de inserción
+        valores_sql = ", ".join([f"@{columna}" for columna in columnas])
+        consulta_sql = f"INSERT INTO {nombre_tabla} ({', '.join(columnas)}) VALUES ({valores_sql})"
+        print(f"Ejecutando importación con la consulta SQL: {consulta_sql}")
+        
+        lote = []
+        lineas_lote = []
+        for fila in lector:
+            numero_linea = lector.line_num
+            
+            # Ignorar líneas vacías
+            if not fila:
+                continue
+            resumen["filas_leidas"] += 1
+            
+            if len(fila) != len(columnas):
+                registrar_error(numero_linea, f"Se esperaban {len(columnas)} campos y se encontraron {len(fila)}")
+                continue
+            
+            # Convertir los valores; los campos vacíos se insertan como NULL
+            try:
+                valores = [None if valor == '' else convertir(valor) for convertir, valor in zip(convertidores, fila)]
+            except ValueError as ex:
+                registrar_error(numero_linea, f"Valor no válido: {str(ex)}")
+                continue
+            
+            # Nunca guardar contraseñas en texto plano
+            if columna_contrasena is not None and valores[columna_contrasena]:
+                valores[columna_contrasena] = cifrar_contrasena(valores[columna_contrasena])
+            
+            lote.append(valores)
+            lineas_lote.append(numero_linea)
+            if len(lote) >= tamano_lote:
+                insertar_lote(consulta_sql, columnas, lote, lineas_lote)
+                lote = []
+                lineas_lote = []
+        
+        # Insertar las filas restantes
+        if lote:
+            insertar_lote(consulta_sql, columnas, lote, lineas_lote)
+        
+        resumen["duracion_segundos"] = round(time.monotonic() - inicio_importacion, 3)
+        return jsonify(resumen)
+        
+    except ErrorApi:
+        # Errores con código HTTP propio (503, 504...): los atiende el manejador de app.py
+        raise
+        
+    except (csv.Error, UnicodeDecodeError, gzip.BadGzipFile, EOFError) as ex:
+        # Archivo mal formado: se informa lo importado hasta el momento
+        resumen["error"] = f"No se pudo leer el archivo CSV: {str(ex)}"
+        return jsonify(resumen), 400
+        
+    except Exception as ex:
+        print(f"Ocurrió una excepción: {str(ex)}")
+        traceback.print_exc()  # Imprimir traza completa para depuración
+        resumen["error"] = f"Error interno del servidor: {str(ex)}"
+        return jsonify(resumen), 500
+        
+    finally:
+        # Siempre cerrar la conexión, incluso si hay errores
+        conexion_importacion.cerrar_bd()
+
@@ -0,0 +1,75 @@
+# controladores/inicio_controller.py
+# Rutas básicas de la API (equivalente a un controlador sencillo en C#)
+
+from flask import Blueprint, jsonify  # Blueprint agrupa rutas, como un Controller en C#
+import datetime  # Para manejo de fechas y tiempos
+
+# Crear el blueprint del controlador (se registra en la aplicación desde app.py)
+inicio_bp = Blueprint('inicio', __name__)
+
+# Definir rutas básicas (equivalente a los controladores en C#)
+# El decorador @inicio_bp.route define qué URL atenderá esta función
+@inicio_bp.route('/')  # Ruta principal de la API (raíz)
+def inicio():
+    """
+    Endpoint de la raíz de la API.
+    Muestra un mensaje de bienvenida con información básica sobre la API.
+    
+    Returns:
+        JSON: Mensaje de bienvenida con información de la API.
+    """
+    # Creamos un diccionario con los datos que queremos devolver
+    mensaje = {
+        "mensaje": "Bienvenido a la API Genérica en Flask!",
+        "documentacion": "Para más detalles, visita /swagger",
+        "fecha_servidor": datetime.datetime.utcnow().isoformat()
+    }
+    
+    # Convertimos el diccionario a formato JSON y lo devolvemos
+    return jsonify(mensaje)
+
+@inicio_bp.route('/weatherforecast')  # Ruta de ejemplo con datos de clima
+def pronostico_clima():
+    """
+    Devuelve datos ficticios de pronóstico del clima como prueba
+    Similar al endpoint por defecto en una API de C#
+    ---
+    responses:
+      200:
+        description: Pronóstico del clima para los próximos días
+    """
+    # Datos de ejemplo del pronóstico del clima
+    datos_clima = [
+        {
+            "date": "2025-02-27",
+            "temperatureC": 12,
+            "summary": "Chilly",
+            "temperatureF": 53
+        },
+        {
+            "date": "2025-02-28",
+            "temperatureC": 4,
+            "summary": "Cool",
+            "temperatureF": 39
+        },
+        {
+            "date": "2025-03-01",
+            "temperatureC": 13,
+            "summary": "Mild",
+            "temperatureF": 55
+        },
+        {
+            "date": "2025-03-02",
+            "temperatureC": -8,
+            "summary": "Mild",
+            "temperatureF": 18
+        },
+        {
+            "date": "2025-03-03",
+            "temperatureC": 44,
+            "summary": "Hot",
+            "temperatureF": 111
+        }
+    ]
+    # Convertimos la lista a formato JSON y la devolvemos
+    return jsonify(datos_clima)
@@ -0,0 +1,89 @@
+# gunicorn.conf.py - Configuración del servidor de producción
+# Equivalente a publicar la API de C# detrás de Kestrel con varios procesos
+#
+# Uso (Linux/macOS; gunicorn no funciona en Windows):
+#     gunicorn -c gunicorn.conf.py app:app
+#
+# Modelo: un proceso maestro carga la aplicación una vez (preload_app) y crea N
+# trabajadores con fork; cada trabajador atiende varias solicitudes con hilos.
+# Los recursos con conexiones pyodbc, cachés o hilos se crean en cada trabajador
+# después del fork (post_fork), nunca en el maestro, para no compartir handles ODBC.
+# Recargar sin cortar solicitudes: kill -HUP <pid del maestro>
+
+import gc
+import json
+import multiprocessing
+import os
+
+# La aplicación debe diferir la creación de recursos hasta después del fork
+os.environ["API_INICIALIZACION_DIFERIDA"] = "1"
+
+# Leer la sección "Servidor" de configuracion/config.json
+_ruta_config = os.path.join(os.path.dirname(os.path.abspath(__file__)), "configuracion", "config.json")
+with open(_ruta_config) as _archivo_config:
+    _config_api = json.load(_archivo_config)
+_config_servidor = _config_api.get("Servidor", {})
+
+# Dirección y puerto (equivalente a ASPNETCORE_URLS)
+bind = f"0.0.0.0:{int(os.environ.get('PORT', _config_servidor.get('Puerto', 5000)))}"
+
+# Trabajadores (procesos) e hilos por trabajador; 0 trabajadores = 2 * núcleos + 1
+_trabajadores = int(os.environ.get("WEB_CONCURRENCY", _config_servidor.get("Trabajadores", 0)))
+workers = _trabajadores if _trabajadores > 0 else multiprocessing.cpu_count() * 2 + 1
+
+# Cada flujo de eventos (SSE) ocupa un hilo mientras está abierto: a los hilos de las
+# solicitudes se suman Eventos.MaxSuscriptores hilos para los suscriptores, así los
+# flujos nunca dejan sin hilos al resto de la API
+_hilos_solicitudes = int(_config_servidor.get("HilosPorTrabajador", 4))
+_hilos_suscriptores = int(_config_api.get("Eventos", {}).get("MaxSuscriptores", 50))
+threads = _hilos_solicitudes + _hilos_suscriptores
+worker_class = "gthread"
+
+# Cargar la aplicación en el maestro antes del fork: las importaciones y objetos de
+# arranque se comparten entre trabajadores mediante copy-on-write
+preload_app = True
+
+# Tiempos: timeout mata trabajadores bloqueados; graceful_timeout es el plazo para
+# terminar las solicitudes en curso al recargar (HUP) o detener (TERM) el servidor
+timeout = int(_config_servidor.get("TiempoMaximoSolicitud", 120))
+graceful_timeout = int(_config_servidor.get("TiempoGracia", 30))
+keepalive = 5
+
+# Reciclar trabajadores periódicamente para acotar el crecimiento de memoria
+max_requests = int(_config_servidor.get("MaxSolicitudesPorTrabajador", 10000))
+max_requests_jitter = max(1, max_requests // 10) if max_requests > 0 else 0
+
+
+def when_ready(server):
+    """
+    Se ejecuta en el maestro con la aplicación ya cargada, antes de crear los trabajadores.
+    gc.freeze() mueve todos los objetos de arranque a una generación permanente: el
+    recolector de basura de los hijos no los recorre ni escribe en ellos, lo que evita
+    copiar esas páginas de memoria en cada trabajador.
+    """
+    gc.freeze()
+    server.log.info(f"Objetos de arranque congelados: {gc.get_freeze_count()}")
+    server.log.info(f"Hilos por trabajador: {threads} ({_hilos_solicitudes} para solicitudes, "
+                    f"{_hilos_suscriptores} para suscriptores de eventos)")
+
+
+def post_fork(server, worker):
+    """
+    Se ejecuta en cada trabajador recién creado: inicializa sus propios pools y cachés.
+    """
+    from app import app
+    from servicios.ciclo_vida import inicializar_proceso
+
+    inicializar_proceso(app)
+    server.log.info(f"Trabajador {worker.pid} inicializado")
+
+
+def worker_exit(server, worker):
+    """
+    Se ejecuta cuando un trabajador termina (recarga, reciclado o parada), después
+    de atender las solicitudes en curso: vacía colas y cierra conexiones.
+    """
+    from app import app
+    from servicios.ciclo_vida import finalizar_proceso
+
+    finalizar_proceso(app)
@@ -0,0 +1,136 @@
+# servicios/agregados.py
+# Construcción de consultas de agregación (COUNT, SUM, AVG, MIN, MAX con GROUP BY)
+# (equivalente a GroupBy(...).Select(g => new { g.Key, Total = g.Sum(...) }) en LINQ)
+#
+# Parámetros de la URL:
+#     funciones=count(*),sum(monto),max(fecha)   (por defecto count(*))
+#     group_by=cliente,fecha:mes                 (columna o columna:dia / columna:mes para fechas)
+#     filtro=...                                 (misma gramática que servicios/filtros.py)
+# La agregación se hace en SQL: la respuesta trae una fila por grupo, no la tabla completa.
+
+import re
+
+from servicios.conversion_tipos import (
+    TIPOS_ENTEROS, TIPOS_DECIMALES, TIPOS_FLOTANTES, TIPOS_BINARIOS, TIPOS_FECHA, TIPOS_FECHA_HORA,
+)
+from servicios.errores import ErrorApi
+from servicios.filtros import resolver_columna
+
+FUNCIONES_AGREGADO = {"count", "sum", "avg", "min", "max"}
+
+# Funciones que solo tienen sentido sobre columnas numéricas
+FUNCIONES_NUMERICAS = {"sum", "avg"}
+TIPOS_NUMERICOS = TIPOS_ENTEROS | TIPOS_DECIMALES | TIPOS_FLOTANTES
+
+# Agrupaciones por intervalo de fecha (expresiones de SQL Server)
+INTERVALOS_FECHA = {
+    "dia": "CAST([{columna}] AS date)",
+    "mes": "DATEFROMPARTS(YEAR([{columna}]), MONTH([{columna}]), 1)",
+}
+
+# funcion(columna) o funcion(*)
+PATRON_FUNCION = re.compile(r"^\s*(\w+)\s*\(\s*([^()]*?)\s*\)\s*$")
+
+
+def _separar_lista(texto):
+    """Divide una lista separada por comas descartando los elementos vacíos."""
+    return [elemento.strip() for elemento in (texto or "").split(",") if elemento.strip()]
+
+
+def construir_funciones(texto_funciones, tipos_columnas):
+    """
+    Traduce la lista de funciones de agregado a expresiones SQL.
+
+    Args:
+        texto_funciones (str): Lista separada por comas, por ejemplo "count(*),sum(monto)".
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+
+    Returns:
+        list: Expresiones "FUNCION([columna]) AS [alias]".
+
+    Raises:
+        ErrorApi: Si una función no existe o no es aplicable a la columna (400).
+    """
+    expresiones = []
+    for texto in _separar_lista(texto_funciones) or ["count(*)"]:
+        coincidencia = PATRON_FUNCION.match(texto)
+        if not coincidencia:
+            raise ErrorApi(f"Función de agregado no válida '{texto}': use funcion(columna)", 400)
+        funcion, argumento = coincidencia.group(1).lower(), coincidencia.group(2)
+        if funcion not in FUNCIONES_AGREGADO:
+            raise ErrorApi(f"Función de agregado '{funcion}' no soportada", 400)
+
+        if argumento == "*":
+            if funcion != "count":
+                raise ErrorApi("Solo count admite '*' como argumento", 400)
+            expresiones.append("COUNT(*) AS [count]")
+            continue
+
+        columna = resolver_columna(argumento, tipos_columnas)
+        tipo_dato = tipos_columnas[columna]
+        if funcion in FUNCIONES_NUMERICAS and tipo_dato not in TIPOS_NUMERICOS:
+            raise ErrorApi(f"La función {funcion} requiere una columna numérica ('{columna}' es {tipo_dato})", 400)
+        if tipo_dato in TIPOS_BINARIOS:
+            raise ErrorApi(f"No se pueden agregar columnas binarias ('{columna}')", 400)
+
+        # AVG de enteros en SQL Server trunca el resultado: se promedia como float
+        valor = f"CAST([{columna}] AS float)" if funcion == "avg" and tipo_dato in TIPOS_ENTEROS else f"[{columna}]"
+        expresiones.append(f"{funcion.upper()}({valor}) AS [{funcion}_{columna}]")
+    return expresiones
+
+
+def construir_agrupacion(texto_agrupacion, tipos_columnas):
+    """
+    Traduce la lista de columnas de agrupación a expresiones SQL.
+
+    Args:
+        texto_agrupacion (str): Lista separada por comas, por ejemplo "cliente,fecha:mes".
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+
+    Returns:
+        list: Tuplas (expresión SQL, alias) en el orden recibido.
+
+    Raises:
+        ErrorApi: Si la columna no existe o el intervalo no es aplicable (400).
+    """
+    agrupaciones = []
+    for texto in _separar_lista(texto_agrupacion):
+        nombre_columna, _, intervalo = texto.partition(":")
+        columna = resolver_columna(nombre_columna, tipos_columnas)
+        if not intervalo:
+            agrupaciones.append((f"[{columna}]", columna))
+            continue
+
+        intervalo = intervalo.strip().lower()
+        if intervalo not in INTERVALOS_FECHA:
+            raise ErrorApi(f"Intervalo '{intervalo}' no soportado: use {', '.join(INTERVALOS_FECHA)}", 400)
+        if tipos_columnas[columna] not in TIPOS_FECHA | TIPOS_FECHA_HORA:
+            raise ErrorApi(f"El intervalo '{intervalo}' requiere una columna de fecha ('{columna}')", 400)
+        agrupaciones.append((INTERVALOS_FECHA[intervalo].format(columna=columna), f"{columna}_{intervalo}"))
+    return agrupaciones
+
+
+def construir_consulta_agregado(nombre_tabla, tipos_columnas, texto_funciones, texto_agrupacion, clausula_where=""):
+    """
+    Construye la consulta de agregación completa.
+    El nombre de la tabla debe haberse validado antes contra el esquema.
+
+    Args:
+        nombre_tabla (str): Tabla a agregar.
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+        texto_funciones (str): Funciones de agregado (ver construir_funciones).
+        texto_agrupacion (str): Columnas de agrupación (ver construir_agrupacion).
+        clausula_where (str): Cláusula WHERE ya parametrizada (ver construir_filtros).
+
+    Returns:
+        str: Consulta SQL con una fila por grupo, ordenada por los grupos.
+    """
+    funciones = construir_funciones(texto_funciones, tipos_columnas)
+    agrupaciones = construir_agrupacion(texto_agrupacion, tipos_columnas)
+
+    columnas_select = [f"{expresion} AS [{alias}]" for expresion, alias in agrupaciones] + funciones
+    consulta_sql = f"SELECT {', '.join(columnas_select)} FROM {nombre_tabla} {clausula_where}".rstrip()
+    if agrupaciones:
+        expresiones = ", ".join(expresion for expresion, _ in agrupaciones)
+        consulta_sql += f" GROUP BY {expresiones} ORDER BY {expresiones}"
+    return consulta_sql
@@ -0,0 +1,235 @@
+# servicios/asesor_indices.py
+# Asesor de índices faltantes a partir de las columnas que los clientes usan como predicado
+# (equivalente a consultar sys.dm_db_missing_index_details, pero con el uso real de la API)
+#
+# obtener_por_clave, actualizar y eliminar filtran por la columna de la URL,
+# verificar_contrasena por campoUsuario y listar/agregado/exportar/cambios por los
+# ?filtro=columna:operador:valor. Tras cada solicitud atendida se anota el par
+# (tabla, columnas) y cuántas veces se usó.
+#
+# GET /admin/indices cruza esos pares con los índices existentes (sys.indexes) y con el
+# tamaño de cada tabla (sys.partitions) y devuelve recomendaciones ordenadas por impacto
+# estimado (usos x filas de la tabla: filas que se recorren por no tener índice).
+# Un par está cubierto si algún índice empieza por esas columnas.
+# Las recomendaciones incluyen el CREATE INDEX sugerido, pero nunca se aplica ningún DDL.
+#
+# Configuración (configuracion/config.json):
+#     "AsesorIndices": {"Habilitado": true, "MinUsos": 20, "MaxPares": 5000, "CatalogoSegundos": 300}
+
+import threading
+import time
+
+from flask import current_app, request
+
+from servicios.control_conexion import ControlConexion
+from servicios.esquema import obtener_indices, contar_filas
+
+# Rutas que filtran por la columna <nombre_clave> de la URL
+ENDPOINTS_CLAVE = {"obtener_por_clave", "obtener_binario", "actualizar", "eliminar"}
+
+# Rutas que filtran con ?filtro=columna:operador:valor
+ENDPOINTS_FILTRO = {"listar", "agregado", "exportar", "cambios"}
+
+
+def _columnas_predicado():
+    """
+    Obtiene las columnas usadas como predicado por la solicitud actual.
+
+    Returns:
+        tuple: Columnas en minúsculas y ordenadas, o vacía si la ruta no filtra.
+    """
+    endpoint = (request.endpoint or "").rsplit(".", 1)[-1]
+    argumentos = request.view_args or {}
+    if endpoint in ENDPOINTS_CLAVE:
+        return (argumentos["nombre_clave"].lower(),)
+    if endpoint == "combinar":
+        return (argumentos["columna_clave"].lower(),)
+    if endpoint == "verificar_contrasena":
+        datos = request.get_json(silent=True) or {}
+        campo_usuario = datos.get("campoUsuario") if isinstance(datos, dict) else None
+        return (campo_usuario.lower(),) if isinstance(campo_usuario, str) else ()
+    if endpoint in ENDPOINTS_FILTRO:
+        columnas = {filtro.split(":", 1)[0].strip().lower() for filtro in request.args.getlist("filtro")}
+        return tuple(sorted(columna for columna in columnas if columna))
+    return ()
+
+
+class _Uso:
+    """Veces que se usó un conjunto de columnas como predicado."""
+
+    __slots__ = ("usos", "ultima_vez", "rutas")
+
+    def __init__(self):
+        self.usos = 0
+        self.ultima_vez = None
+        self.rutas = set()
+
+
+class AsesorIndices:
+    """
+    Uso de columnas como predicado en el proceso actual y recomendaciones de índices.
+    """
+
+    def __init__(self, configuracion, registro_proyectos):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+            registro_proyectos (RegistroProyectos): Registro con los pools de cada proyecto.
+        """
+        config_asesor = configuracion.get("AsesorIndices", {})
+        self.configuracion = configuracion
+        self.registro_proyectos = registro_proyectos
+        self.min_usos = int(config_asesor.get("MinUsos", 20))
+        self.max_pares = int(config_asesor.get("MaxPares", 5000))
+        self.catalogo_segundos = float(config_asesor.get("CatalogoSegundos", 300))
+        self._candado = threading.Lock()
+        self._usos = {}  # {(proyecto, tabla, columnas): _Uso}
+        self._catalogo = {}  # {(proyecto, tabla): (instante, índices, filas)}
+        self.descartados = 0
+
+    def anotar(self, nombre_proyecto, nombre_tabla, columnas, ruta):
+        """
+        Anota un uso de columnas como predicado.
+
+        Args:
+            nombre_proyecto (str): Proyecto tomado de la ruta.
+            nombre_tabla (str): Tabla tomada de la ruta.
+            columnas (tuple): Columnas del predicado (minúsculas, ordenadas).
+            ruta (str): Endpoint que hizo la consulta.
+        """
+        proyecto = self.registro_proyectos.obtener_configuracion_proyecto(nombre_proyecto).nombre
+        clave = (proyecto, nombre_tabla.lower(), columnas)
+        with self._candado:
+            uso = self._usos.get(clave)
+            if uso is None:
+                if len(self._usos) >= self.max_pares:
+                    self.descartados += 1
+                    return
+                uso = self._usos[clave] = _Uso()
+            uso.usos += 1
+            uso.ultima_vez = time.strftime("%Y-%m-%dT%H:%M:%S")
+            uso.rutas.add(ruta)
+
+    def _leer_catalogo(self, proyecto, tabla):
+        """Obtiene los índices y filas de una tabla (en caché durante CatalogoSegundos)."""
+        clave = (proyecto, tabla)
+        guardado = self._catalogo.get(clave)
+        if guardado is not None and time.monotonic() - guardado[0] < self.catalogo_segundos:
+            return guardado[1], guardado[2]
+
+        control_conexion = ControlConexion(
+            configuracion=self.configuracion, pool=self.registro_proyectos.obtener_pool(proyecto)
+        )
+        try:
+            control_conexion.abrir_bd()
+            indices = obtener_indices(control_conexion, tabla)
+            filas = contar_filas(control_conexion, tabla)
+        finally:
+            control_conexion.cerrar_bd()
+        self._catalogo[clave] = (time.monotonic(), indices, filas)
+        return indices, filas
+
+    def recomendaciones(self, nombre_proyecto=None, cantidad=20):
+        """
+        Obtiene las recomendaciones de índices ordenadas por impacto estimado.
+
+        Args:
+            nombre_proyecto (str, optional): Limitar a un proyecto.
+            cantidad (int): Número máximo de recomendaciones.
+
+        Returns:
+            dict: {"recomendaciones": [...], "cubiertos": número de pares ya indexados,
+            "errores": tablas cuyo catálogo no se pudo leer}.
+        """
+        proyecto_filtro = None
+        if nombre_proyecto:
+            proyecto_filtro = self.registro_proyectos.obtener_configuracion_proyecto(nombre_proyecto).nombre
+        with self._candado:
+            usos = [(clave, uso.usos, uso.ultima_vez, sorted(uso.rutas)) for clave, uso in self._usos.items()
+                    if uso.usos >= self.min_usos and (proyecto_filtro is None or clave[0] == proyecto_filtro)]
+
+        recomendaciones = []
+        cubiertos = 0
+        errores = {}
+        for (proyecto, tabla, columnas), veces, ultima_vez, rutas in usos:
+            try:
+                indices, filas = self._leer_catalogo(proyecto, tabla)
+            except Exception as ex:
+                errores[f"{proyecto}/{tabla}"] = str(ex)
+                continue
+            if filas is None and not indices:
+                continue  # La tabla no existe (solicitudes que terminaron en 404)
+
+            # Cubierto si algún índice empieza exactamente por las columnas del predicado (en cualquier orden)
+            conjunto = set(columnas)
+            if any({columna.lower() for columna in indice["columnas"][:len(columnas)]} == conjunto
+                   for indice in indices):
+                cubiertos += 1
+                continue
+
+            texto_columnas = ", ".join(f"[{columna}]" for columna in columnas)
+            recomendaciones.append({
+                "proyecto": proyecto,
+                "tabla": tabla,
+                "columnas": list(columnas),
+                "usos": veces,
+                "filas_tabla": filas,
+                "impacto_estimado": veces * (filas if filas is not None else 1),
+                "ultima_vez": ultima_vez,
+                "rutas": rutas,
+                "indices_existentes": [
+                    {"nombre": indice["nombre"], "columnas": indice["columnas"]} for indice in indices
+                ],
+                "sugerencia": f"CREATE INDEX [IX_{tabla}_{'_'.join(columnas)}] ON {tabla} ({texto_columnas})",
+            })
+
+        recomendaciones.sort(key=lambda recomendacion: recomendacion["impacto_estimado"], reverse=True)
+        return {"recomendaciones": recomendaciones[:cantidad], "cubiertos": cubiertos, "errores": errores}
+
+    def estadisticas(self):
+        """
+        Obtiene el volumen de datos del asesor.
+
+        Returns:
+            dict: Pares anotados y descartados por superar MaxPares.
+        """
+        with self._candado:
+            return {"pares": len(self._usos), "descartados": self.descartados, "min_usos": self.min_usos}
+
+
+def inicializar_asesor_indices(app):
+    """
+    Crea el asesor de índices del proceso (se ejecuta después del fork,
+    a continuación del registro de proyectos).
+
+    Args:
+        app (Flask): Aplicación donde se guarda el asesor.
+    """
+    configuracion = app.config["DATOS_CONFIG"]
+    if not configuracion.get("AsesorIndices", {}).get("Habilitado", False):
+        return
+    app.extensions["asesor_indices"] = AsesorIndices(configuracion, app.extensions["registro_proyectos"])
+
+
+def anotar_predicados(respuesta):
+    """
+    Anota las columnas usadas como predicado por la solicitud (after_request).
+    Solo cuenta las solicitudes que llegaron a consultar la tabla (2xx o 404).
+
+    Args:
+        respuesta (Response): Respuesta de la solicitud.
+
+    Returns:
+        Response: La misma respuesta.
+    """
+    asesor = current_app.extensions.get("asesor_indices")
+    argumentos = request.view_args or {}
+    if asesor is None or "nombre_tabla" not in argumentos:
+        return respuesta
+    if not (200 <= respuesta.status_code < 300 or respuesta.status_code == 404):
+        return respuesta
+    columnas = _columnas_predicado()
+    if columnas:
+        asesor.anotar(argumentos.get("nombre_proyecto"), argumentos["nombre_tabla"], columnas,
+                      (request.endpoint or "").rsplit(".", 1)[-1])
+    return respuesta
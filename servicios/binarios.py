@@ -0,0 +1,249 @@
+# servicios/binarios.py
+# Columnas binarias grandes (varbinary, binary, image): descarga por bloques con Range
+# y exclusión o enlace en las respuestas genéricas
+# (equivalente a devolver un FileStreamResult con EnableRangeProcessing en C#)
+#
+# GET /api/<proyecto>/<tabla>/<clave>/<valor>/binario/<columna> envía el contenido de una
+# columna binaria de una fila. Se lee con SUBSTRING en bloques de TamanoBloqueKB, así que el
+# archivo nunca está completo en memoria, y se atiende la cabecera Range (un solo rango):
+#     Range: bytes=0-1023   ->  206 con Content-Range: bytes 0-1023/48213
+# La longitud se obtiene antes con DATALENGTH para enviar Content-Length.
+#
+# En listar y obtener_por_clave, ?binarios= (o Binarios.ModoEnListados) decide qué se hace
+# con esas columnas:
+#     incluir  se envían completas (base64 en JSON), como hasta ahora
+#     excluir  no se leen de la base de datos
+#     enlace   se reemplazan por {"bytes": longitud, "url": ruta de descarga}
+#              (la longitud se lee con DATALENGTH, no el contenido)
+#
+# Configuración (configuracion/config.json):
+#     "Binarios": {"TamanoBloqueKB": 256, "ModoEnListados": "incluir"}
+
+import re
+from urllib.parse import quote
+
+from servicios.errores import ErrorApi
+from servicios.formateador_respuesta import convertir_valor
+
+# Tipos de SQL Server que se tratan como binarios grandes
+TIPOS_BINARIOS = {"varbinary", "binary", "image"}
+
+# Modos de ?binarios=
+MODO_INCLUIR = "incluir"
+MODO_EXCLUIR = "excluir"
+MODO_ENLACE = "enlace"
+MODOS = (MODO_INCLUIR, MODO_EXCLUIR, MODO_ENLACE)
+
+# Rango de bytes de la cabecera Range (solo se admite uno)
+PATRON_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def obtener_modo_binarios(solicitud, configuracion):
+    """
+    Obtiene el tratamiento de las columnas binarias en las respuestas genéricas.
+
+    Args:
+        solicitud: Objeto request de Flask.
+        configuracion (dict): Configuración de la aplicación.
+
+    Returns:
+        str: Uno de MODOS.
+
+    Raises:
+        ErrorApi: Si ?binarios= no es un modo válido (400).
+    """
+    modo = solicitud.args.get("binarios") or configuracion.get("Binarios", {}).get("ModoEnListados", MODO_INCLUIR)
+    modo = modo.strip().lower()
+    if modo not in MODOS:
+        raise ErrorApi(f"El parámetro binarios debe ser uno de: {', '.join(MODOS)}", 400)
+    return modo
+
+
+def columnas_binarias(tipos_columnas):
+    """
+    Obtiene las columnas binarias de una tabla.
+
+    Args:
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+
+    Returns:
+        list: Nombres de las columnas binarias.
+    """
+    return [columna for columna, tipo in tipos_columnas.items() if tipo in TIPOS_BINARIOS]
+
+
+def construir_seleccion(tipos_columnas, modo):
+    """
+    Construye la lista de columnas del SELECT según el modo.
+
+    Args:
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla, o None si no se leyó.
+        modo (str): Uno de MODOS.
+
+    Returns:
+        str: "*" o la lista de columnas (sin las binarias, o con su DATALENGTH).
+    """
+    if modo == MODO_INCLUIR or not tipos_columnas or not columnas_binarias(tipos_columnas):
+        return "*"
+    seleccion = []
+    for columna, tipo in tipos_columnas.items():
+        if tipo not in TIPOS_BINARIOS:
+            seleccion.append(f"[{columna}]")
+        elif modo == MODO_ENLACE:
+            seleccion.append(f"DATALENGTH([{columna}]) AS [{columna}]")
+    return ", ".join(seleccion)
+
+
+def _texto_clave(valor):
+    """Representa un valor de clave como segmento de URL."""
+    valor = convertir_valor(valor)
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return quote(str(valor), safe="")
+
+
+def aplicar_modo_binarios(df, modo, url_base, columna_clave, columnas=None):
+    """
+    Excluye o reemplaza por enlaces las columnas binarias de un resultado.
+
+    Args:
+        df (pandas.DataFrame): Resultado leído.
+        modo (str): Uno de MODOS.
+        url_base (str): Ruta de la tabla ("/api/<proyecto>/<tabla>").
+        columna_clave (str): Columna que identifica la fila en los enlaces, o None.
+        columnas (list, optional): Columnas binarias ya leídas como DATALENGTH. Si es None,
+            se detectan por el tipo de sus valores (instantáneas, que guardan el contenido).
+
+    Returns:
+        pandas.DataFrame: El mismo DataFrame, o una copia con las columnas cambiadas.
+    """
+    if modo == MODO_INCLUIR:
+        return df
+    longitudes_leidas = columnas is not None
+    if columnas is None:
+        columnas = [
+            columna for columna in df.columns
+            if any(isinstance(valor, (bytes, bytearray, memoryview)) for valor in df[columna].tolist())
+        ]
+    columnas = [columna for columna in columnas if columna in df.columns]
+    if not columnas:
+        return df
+    if modo == MODO_EXCLUIR:
+        return df.drop(columns=columnas)
+
+    # Copia: las instantáneas se comparten entre solicitudes y no se modifican
+    df = df.copy()
+    columna_clave = next((columna for columna in df.columns
+                          if columna_clave is not None and str(columna).lower() == columna_clave.lower()), None)
+    claves = [None] * len(df) if columna_clave is None else df[columna_clave].tolist()
+    for columna in columnas:
+        enlaces = []
+        for valor, clave in zip(df[columna].tolist(), claves):
+            if valor is None or valor != valor:
+                enlaces.append(None)
+                continue
+            longitud = int(valor) if longitudes_leidas else len(valor)
+            url = None
+            if clave is not None and clave == clave:
+                url = f"{url_base}/{quote(columna_clave, safe='')}/{_texto_clave(clave)}/binario/{quote(columna, safe='')}"
+            enlaces.append({"bytes": longitud, "url": url})
+        df[columna] = enlaces
+    return df
+
+
+def analizar_rango(cabecera, longitud):
+    """
+    Interpreta la cabecera Range de una descarga.
+
+    Args:
+        cabecera (str): Valor de la cabecera Range, o None.
+        longitud (int): Tamaño total del contenido en bytes.
+
+    Returns:
+        tuple: (primer byte, último byte) incluidos, o None para enviar el contenido completo.
+
+    Raises:
+        ErrorApi: Si el rango no se puede satisfacer (416, con Content-Range: bytes */longitud).
+    """
+    if not cabecera:
+        return None
+    coincidencia = PATRON_RANGO.match(cabecera.strip())
+    if coincidencia is None:
+        # Varios rangos u otras unidades: se envía el contenido completo (lo permite RFC 9110)
+        return None
+    desde, hasta = coincidencia.groups()
+    if not desde and not hasta:
+        return None
+    if desde:
+        inicio = int(desde)
+        if hasta and int(hasta) < inicio:
+            return None  # Rango mal formado: se ignora
+        fin = min(int(hasta), longitud - 1) if hasta else longitud - 1
+    else:
+        # bytes=-N: los últimos N bytes
+        sufijo = int(hasta)
+        inicio = max(longitud - sufijo, 0) if sufijo > 0 else longitud
+        fin = longitud - 1
+    if inicio >= longitud:
+        raise ErrorApi("El rango solicitado no se puede satisfacer", 416,
+                       cabeceras={"Content-Range": f"bytes */{longitud}"})
+    return inicio, fin
+
+
+def leer_longitud(conexion, nombre_tabla, columna, columna_clave, valor_clave):
+    """
+    Obtiene el tamaño del contenido binario de una fila.
+
+    Args:
+        conexion (ControlConexion): Conexión abierta.
+        nombre_tabla (str): Tabla.
+        columna (str): Columna binaria.
+        columna_clave (str): Columna que identifica la fila.
+        valor_clave: Valor de la clave ya convertido a su tipo.
+
+    Returns:
+        tuple: (la fila existe, longitud en bytes o None si el valor es NULL).
+    """
+    fila = conexion.ejecutar_consulta_fila_sql(
+        f"SELECT DATALENGTH([{columna}]) FROM {nombre_tabla} WHERE [{columna_clave}] = @Valor",
+        [conexion.crear_parametro("@Valor", valor_clave)],
+    )
+    if fila is None:
+        return False, None
+    return True, None if fila[0] is None else int(fila[0])
+
+
+def leer_bloques(conexion, nombre_tabla, columna, columna_clave, valor_clave, inicio, fin, tamano_bloque):
+    """
+    Lee el contenido binario entre dos posiciones, bloque a bloque.
+    Todas las lecturas usan el mismo texto SQL, así que reutilizan la sentencia preparada.
+
+    Args:
+        conexion (ControlConexion): Conexión abierta.
+        nombre_tabla (str): Tabla.
+        columna (str): Columna binaria.
+        columna_clave (str): Columna que identifica la fila.
+        valor_clave: Valor de la clave ya convertido a su tipo.
+        inicio (int): Primer byte (desde 0).
+        fin (int): Último byte, incluido.
+        tamano_bloque (int): Bytes por lectura.
+
+    Yields:
+        bytes: Bloques del contenido.
+    """
+    consulta_sql = (f"SELECT SUBSTRING([{columna}], @Desde, @Cantidad) FROM {nombre_tabla} "
+                    f"WHERE [{columna_clave}] = @Valor")
+    posicion = inicio
+    while posicion <= fin:
+        cantidad = min(tamano_bloque, fin - posicion + 1)
+        fila = conexion.ejecutar_consulta_fila_sql(consulta_sql, [
+            conexion.crear_parametro("@Desde", posicion + 1),  # SUBSTRING empieza en 1
+            conexion.crear_parametro("@Cantidad", cantidad),
+            conexion.crear_parametro("@Valor", valor_clave),
+        ])
+        bloque = None if fila is None else fila[0]
+        if not bloque:
+            # La fila cambió o se borró durante la descarga
+            raise ValueError("El contenido cambió durante la descarga")
+        yield bytes(bloque)
+        posicion += len(bloque)
@@ -0,0 +1,688 @@
+# servicios/busqueda_texto.py
+# Búsqueda de texto en memoria sobre columnas configuradas (clientes, productos...)
+# (equivalente a mantener un índice invertido de Lucene.NET junto a la API en C#)
+#
+# GET /api/<proyecto>/<tabla>/buscar?q=jose gar  busca en las columnas de texto configuradas
+# sin LIKE '%x%' (que recorre la tabla) ni descargar la tabla completa con listar.
+# Para cada tabla se mantiene un índice invertido {término: {documento: frecuencia}}:
+#   - el texto se pliega (minúsculas, sin tildes ni diéresis: "José Núñez" -> "jose nunez")
+#     y se parte en palabras,
+#   - cada palabra de la consulta coincide con los términos que empiezan por ella
+#     (a partir de LongitudMinimaPrefijo letras; las más cortas deben coincidir completas),
+#   - una fila aparece si coinciden todas las palabras de la consulta, y se ordena por
+#     frecuencia * idf del término (las coincidencias completas pesan más que los prefijos).
+# La página de resultados se lee de la base de datos por clave (una consulta IN), así que
+# en memoria solo están los términos y las claves, no las filas.
+#
+# El índice se construye al iniciar el proceso (CargarAlIniciar) o en la primera búsqueda,
+# y se actualiza después de cada escritura hecha a través de esta API sobre la tabla:
+#   - crear, actualizar, combinar: se vuelven a leer e indexar las filas escritas (por su clave;
+#     si la genera la base de datos, la que devuelve crear),
+#   - eliminar: se quita la fila del índice,
+#   - escrituras que no identifican las filas (importar-csv, consultas registradas con
+#     "Escritura": true): se reconstruye en segundo plano.
+# Mientras se reconstruye, las escrituras se aplican al índice anterior y se anotan sus
+# claves; tras reemplazarlo se vuelven a leer esas filas en el nuevo, que así no pierde
+# los cambios confirmados después de que la carga leyera su parte de la tabla.
+# Igual que las instantáneas, solo lo actualiza el proceso que atiende la escritura; los
+# demás trabajadores (y las escrituras hechas fuera de la API) se ven en la reconstrucción
+# periódica (IntervaloReconstruccionSegundos). Cada índice consume el presupuesto de caché
+# de su proyecto: si no cabe, la búsqueda responde 503 en lugar de cargarlo.
+#
+# Configuración (configuracion/config.json):
+#     "BusquedaTexto": {
+#         "IntervaloReconstruccionSegundos": 3600, "LongitudMinimaPrefijo": 2,
+#         "MaxTerminosPrefijo": 500, "PorPagina": 20, "MaxPorPagina": 100,
+#         "Tablas": [
+#             {"Proyecto": "facturas", "Tabla": "cliente", "Clave": "id",
+#              "Columnas": ["nombre", "email"], "CargarAlIniciar": true}
+#         ]
+#     }
+
+import bisect
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from flask import current_app, g, request
+
+from servicios.control_conexion import ControlConexion
+from servicios.errores import ErrorApi, ErrorServicioNoDisponible
+from servicios.formateador_respuesta import dataframe_a_columnas, convertir_valor_json
+from servicios.instantaneas import es_solicitud_escritura, normalizar_clave
+from servicios.plazos import obtener_limite_solicitud
+from servicios.registro_proyectos import PROYECTO_POR_DEFECTO
+
+# Palabras del texto ya plegado (letras y dígitos)
+PATRON_PALABRA = re.compile(r"\w+")
+
+# Peso de un término que solo coincide por prefijo frente a una coincidencia completa
+PESO_PREFIJO = 0.5
+
+# Valores por consulta IN al releer filas (SQL Server admite como máximo 2100 parámetros)
+VALORES_POR_CONSULTA = 1000
+
+# Lotes del cursor al construir un índice
+TAMANO_LOTE_CARGA = 5000
+
+
+def plegar_texto(texto):
+    """
+    Pasa un texto a minúsculas y le quita las marcas diacríticas (tildes, diéresis, virgulilla).
+
+    Args:
+        texto (str): Texto original.
+
+    Returns:
+        str: Texto plegado ("Peña Ñandú" -> "pena nandu").
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+
+
+def tokenizar(texto):
+    """
+    Parte un texto en términos plegados.
+
+    Args:
+        texto: Valor de una columna o texto de la consulta (None o no texto se convierte con str).
+
+    Returns:
+        list: Términos en el orden en que aparecen.
+    """
+    if texto is None or texto != texto:  # NULL o NaN
+        return []
+    return PATRON_PALABRA.findall(plegar_texto(str(texto)))
+
+
+class IndiceTexto:
+    """
+    Índice invertido de las columnas configuradas de una tabla.
+    Las búsquedas y las actualizaciones se serializan con un candado propio del índice.
+    """
+
+    def __init__(self, proyecto, tabla, columna_clave, columnas):
+        """
+        Args:
+            proyecto (str): Proyecto al que pertenece la tabla.
+            tabla (str): Nombre de la tabla.
+            columna_clave (str): Columna que identifica cada fila.
+            columnas (list): Columnas de texto indexadas.
+        """
+        self.proyecto = proyecto
+        self.tabla = tabla
+        self.columna_clave = columna_clave
+        self.columnas = columnas
+        self.construido_en = time.time()
+        self._candado = threading.Lock()
+        self._terminos = {}  # {término: {documento: frecuencia}}
+        self._ordenados = []  # Términos en orden, para buscar por prefijo con bisect
+        self._documentos = {}  # {documento: (valor de la clave, Counter de términos)}
+
+    def indexar(self, valor_clave, textos):
+        """
+        Indexa (o vuelve a indexar) una fila.
+
+        Args:
+            valor_clave: Valor de la columna clave.
+            textos (list): Valores de las columnas indexadas.
+        """
+        with self._candado:
+            self._agregar(valor_clave, textos, ordenar=True)
+
+    def indexar_filas(self, filas):
+        """
+        Indexa muchas filas (al construir el índice); los términos se ordenan una sola vez al final.
+
+        Args:
+            filas (list): Filas con el valor de la clave seguido de las columnas indexadas.
+        """
+        with self._candado:
+            for fila in filas:
+                self._agregar(fila[0], fila[1:], ordenar=False)
+            self._ordenados = sorted(self._terminos)
+
+    def _agregar(self, valor_clave, textos, ordenar):
+        """Agrega o reemplaza un documento (el candado debe estar tomado)."""
+        terminos = Counter(termino for texto in textos for termino in tokenizar(texto))
+        documento = normalizar_clave(valor_clave)
+        self._quitar(documento, ordenar)
+        self._documentos[documento] = (valor_clave, terminos)
+        for termino, frecuencia in terminos.items():
+            publicaciones = self._terminos.get(termino)
+            if publicaciones is None:
+                publicaciones = self._terminos[termino] = {}
+                if ordenar:
+                    bisect.insort(self._ordenados, termino)
+            publicaciones[documento] = frecuencia
+
+    def quitar(self, valor_clave):
+        """
+        Quita una fila del índice (no hace nada si no estaba).
+
+        Args:
+            valor_clave: Valor de la columna clave.
+        """
+        with self._candado:
+            self._quitar(normalizar_clave(valor_clave), ordenar=True)
+
+    def _quitar(self, documento, ordenar):
+        """Quita un documento (el candado debe estar tomado)."""
+        anterior = self._documentos.pop(documento, None)
+        if anterior is None:
+            return
+        for termino in anterior[1]:
+            publicaciones = self._terminos[termino]
+            del publicaciones[documento]
+            if not publicaciones:
+                del self._terminos[termino]
+                if ordenar:
+                    del self._ordenados[bisect.bisect_left(self._ordenados, termino)]
+
+    def _terminos_prefijo(self, prefijo, maximo):
+        """Términos que empiezan por el prefijo (como máximo `maximo`)."""
+        posicion = bisect.bisect_left(self._ordenados, prefijo)
+        terminos = []
+        while (posicion < len(self._ordenados) and len(terminos) < maximo
+               and self._ordenados[posicion].startswith(prefijo)):
+            terminos.append(self._ordenados[posicion])
+            posicion += 1
+        return terminos
+
+    def buscar(self, consulta, longitud_minima_prefijo=2, max_terminos_prefijo=500):
+        """
+        Busca las filas que contienen todas las palabras de la consulta.
+
+        Args:
+            consulta (str): Texto de la búsqueda.
+            longitud_minima_prefijo (int): Palabras más cortas solo coinciden completas.
+            max_terminos_prefijo (int): Términos que se expanden como máximo por palabra.
+
+        Returns:
+            list: Tuplas (valor de la clave, puntuación), de mayor a menor puntuación.
+        """
+        palabras = list(dict.fromkeys(tokenizar(consulta)))
+        if not palabras:
+            return []
+        with self._candado:
+            total_documentos = len(self._documentos) or 1
+            puntuaciones = None
+            for palabra in palabras:
+                if len(palabra) >= longitud_minima_prefijo:
+                    terminos = self._terminos_prefijo(palabra, max_terminos_prefijo)
+                else:
+                    terminos = [palabra] if palabra in self._terminos else []
+
+                # Puntuación de la palabra en cada documento: su mejor término
+                parciales = {}
+                for termino in terminos:
+                    publicaciones = self._terminos[termino]
+                    peso = math.log(1 + total_documentos / len(publicaciones))
+                    if termino != palabra:
+                        peso *= PESO_PREFIJO
+                    for documento, frecuencia in publicaciones.items():
+                        valor = frecuencia * peso
+                        if valor > parciales.get(documento, 0.0):
+                            parciales[documento] = valor
+
+                # Todas las palabras deben coincidir
+                if puntuaciones is None:
+                    puntuaciones = parciales
+                else:
+                    puntuaciones = {documento: puntuacion + parciales[documento]
+                                    for documento, puntuacion in puntuaciones.items() if documento in parciales}
+                if not puntuaciones:
+                    return []
+
+            # Los documentos largos coinciden por azar con más facilidad
+            resultados = [
+                (self._documentos[documento][0],
+                 round(puntuacion / math.sqrt(sum(self._documentos[documento][1].values()) or 1), 4))
+                for documento, puntuacion in puntuaciones.items()
+            ]
+        resultados.sort(key=lambda resultado: (-resultado[1], normalizar_clave(resultado[0])))
+        return resultados
+
+    def estimar_memoria(self):
+        """
+        Estima la memoria del índice (diccionarios de Python: aproximado).
+
+        Returns:
+            int: Bytes estimados.
+        """
+        with self._candado:
+            publicaciones = sum(len(documentos) for documentos in self._terminos.values())
+            return (sum(len(termino) + 150 for termino in self._terminos)
+                    + publicaciones * 100
+                    + sum(100 + len(terminos) * 100 for _, terminos in self._documentos.values()))
+
+    def estadisticas(self):
+        """
+        Obtiene el tamaño del índice.
+
+        Returns:
+            dict: Filas, términos e instante de construcción.
+        """
+        with self._candado:
+            return {
+                "filas": len(self._documentos),
+                "terminos": len(self._terminos),
+                "columnas": self.columnas,
+                "construido_en": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.construido_en)),
+            }
+
+
+class BuscadorTexto:
+    """
+    Índices de búsqueda de las tablas configuradas para el proceso actual.
+    """
+
+    def __init__(self, configuracion, registro_proyectos):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+            registro_proyectos (RegistroProyectos): Registro con los pools y presupuestos de cada proyecto.
+        """
+        config_busqueda = configuracion.get("BusquedaTexto", {})
+        self.configuracion = configuracion
+        self.registro_proyectos = registro_proyectos
+        self.intervalo_reconstruccion = float(config_busqueda.get("IntervaloReconstruccionSegundos", 3600))
+        self.longitud_minima_prefijo = int(config_busqueda.get("LongitudMinimaPrefijo", 2))
+        self.max_terminos_prefijo = int(config_busqueda.get("MaxTerminosPrefijo", 500))
+        self.por_pagina = int(config_busqueda.get("PorPagina", 20))
+        self.max_por_pagina = int(config_busqueda.get("MaxPorPagina", 100))
+
+        # {(proyecto, tabla): configuración de la tabla}
+        self.tablas = {}
+        for datos in config_busqueda.get("Tablas", []):
+            proyecto = registro_proyectos.obtener_configuracion_proyecto(datos.get("Proyecto", PROYECTO_POR_DEFECTO)).nombre
+            self.tablas[(proyecto, datos["Tabla"].lower())] = datos
+
+        self._indices = {}
+        self._candados_carga = {clave: threading.Lock() for clave in self.tablas}
+        self._pendientes = set()  # Tablas que hay que reconstruir en segundo plano
+        self._escritas_en_carga = {}  # {(proyecto, tabla): claves escritas durante su construcción}
+        self._candado_escritas = threading.Lock()
+        self._avisar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def _clave(self, nombre_proyecto, nombre_tabla):
+        """Obtiene la clave (proyecto, tabla) con el nombre de proyecto ya resuelto."""
+        proyecto = self.registro_proyectos.obtener_configuracion_proyecto(nombre_proyecto).nombre
+        return (proyecto, (nombre_tabla or "").lower())
+
+    def _crear_conexion(self, proyecto):
+        """Crea una ControlConexion del pool del proyecto (sin el plazo de la solicitud)."""
+        return ControlConexion(configuracion=self.configuracion, pool=self.registro_proyectos.obtener_pool(proyecto))
+
+    def _seleccion(self, datos_tabla):
+        """Lista de columnas del SELECT: la clave y las columnas indexadas."""
+        return ", ".join(f"[{columna}]" for columna in [datos_tabla["Clave"]] + list(datos_tabla["Columnas"]))
+
+    def construir(self, clave):
+        """
+        Lee la tabla por lotes y reemplaza su índice.
+        Si la carga falla o no cabe en el presupuesto se conserva el índice anterior.
+
+        Args:
+            clave (tuple): (proyecto, tabla) configurada.
+
+        Returns:
+            IndiceTexto: Índice vigente después de la construcción, o None si no hay.
+        """
+        proyecto, tabla = clave
+        datos_tabla = self.tablas[clave]
+        with self._candados_carga[clave]:
+            self._pendientes.discard(clave)
+            with self._candado_escritas:
+                self._escritas_en_carga[clave] = set()
+            indice = IndiceTexto(proyecto, tabla, datos_tabla["Clave"], list(datos_tabla["Columnas"]))
+            control_conexion = self._crear_conexion(proyecto)
+            try:
+                control_conexion.abrir_bd()
+                for _, filas in control_conexion.iterar_consulta_sql(
+                        f"SELECT {self._seleccion(datos_tabla)} FROM {tabla}", None, TAMANO_LOTE_CARGA):
+                    indice.indexar_filas(filas)
+            except Exception as ex:
+                print(f"No se pudo construir el índice de búsqueda de {proyecto}/{tabla}: {str(ex)}")
+                with self._candado_escritas:
+                    self._escritas_en_carga.pop(clave, None)
+                return self._indices.get(clave)
+            finally:
+                control_conexion.cerrar_bd()
+
+            clave_memoria = f"busqueda:{tabla}"
+            if not self.registro_proyectos.reservar_memoria_cache(proyecto, clave_memoria, indice.estimar_memoria()):
+                self._indices.pop(clave, None)
+                self.registro_proyectos.liberar_memoria_cache(proyecto, clave_memoria)
+                print(f"El índice de búsqueda de {proyecto}/{tabla} supera el presupuesto de caché del proyecto")
+                with self._candado_escritas:
+                    self._escritas_en_carga.pop(clave, None)
+                return None
+            self._indices[clave] = indice
+
+            # Las escrituras posteriores ya van al nuevo índice; las hechas durante la carga
+            # pueden faltar en él: se vuelven a leer esas filas
+            with self._candado_escritas:
+                escritas = self._escritas_en_carga.pop(clave, set())
+            if escritas:
+                self._actualizar_indice(indice, datos_tabla, list(escritas))
+            return indice
+
+    def obtener_indice(self, nombre_proyecto, nombre_tabla):
+        """
+        Obtiene el índice de una tabla, construyéndolo en la primera búsqueda.
+
+        Args:
+            nombre_proyecto (str): Proyecto tomado de la ruta.
+            nombre_tabla (str): Tabla tomada de la ruta.
+
+        Returns:
+            IndiceTexto: Índice de la tabla.
+
+        Raises:
+            ErrorApi: Si la tabla no tiene búsqueda configurada (404).
+            ErrorServicioNoDisponible: Si el índice no se pudo construir (503).
+        """
+        clave = self._clave(nombre_proyecto, nombre_tabla)
+        if clave not in self.tablas:
+            raise ErrorApi(f"La tabla '{nombre_tabla}' no tiene búsqueda de texto configurada", 404)
+        indice = self._indices.get(clave)
+        if indice is None:
+            indice = self.construir(clave)
+        if indice is None:
+            raise ErrorServicioNoDisponible("El índice de búsqueda no está disponible; intente más tarde",
+                                            segundos_reintento=30)
+        return indice
+
+    def buscar(self, nombre_proyecto, nombre_tabla, consulta, pagina, por_pagina):
+        """
+        Busca en el índice de la tabla y lee las filas de la página pedida.
+
+        Args:
+            nombre_proyecto (str): Proyecto tomado de la ruta.
+            nombre_tabla (str): Tabla tomada de la ruta.
+            consulta (str): Texto de la búsqueda.
+            pagina (int): Página, desde 1.
+            por_pagina (int): Resultados por página.
+
+        Returns:
+            tuple: (total de coincidencias, filas de la página como objetos JSON con "_puntuacion").
+        """
+        indice = self.obtener_indice(nombre_proyecto, nombre_tabla)
+        coincidencias = indice.buscar(consulta, self.longitud_minima_prefijo, self.max_terminos_prefijo)
+        pagina_actual = coincidencias[(pagina - 1) * por_pagina:pagina * por_pagina]
+        if not pagina_actual:
+            return len(coincidencias), []
+
+        control_conexion = self._crear_conexion(indice.proyecto)
+        control_conexion.establecer_limite(obtener_limite_solicitud())
+        try:
+            control_conexion.abrir_bd()
+            filas = self._leer_filas(control_conexion, indice.tabla, indice.columna_clave,
+                                     [valor for valor, _ in pagina_actual], "*")
+        finally:
+            control_conexion.cerrar_bd()
+
+        # Devolver en el orden del ranking; las filas borradas fuera de la API se omiten
+        columnas, valores_filas = dataframe_a_columnas(filas)
+        posicion_clave = next(posicion for posicion, columna in enumerate(columnas)
+                              if str(columna).lower() == indice.columna_clave.lower())
+        por_clave = {normalizar_clave(fila[posicion_clave]): fila for fila in valores_filas}
+        objetos = []
+        for valor, puntuacion in pagina_actual:
+            fila = por_clave.get(normalizar_clave(valor))
+            if fila is not None:
+                objeto = dict(zip(columnas, [convertir_valor_json(dato) for dato in fila]))
+                objeto["_puntuacion"] = puntuacion
+                objetos.append(objeto)
+        return len(coincidencias), objetos
+
+    @staticmethod
+    def _leer_filas(control_conexion, tabla, columna_clave, valores, seleccion):
+        """Lee las filas con esas claves, en bloques de VALORES_POR_CONSULTA (un DataFrame)."""
+        partes = []
+        for inicio in range(0, len(valores), VALORES_POR_CONSULTA):
+            bloque = valores[inicio:inicio + VALORES_POR_CONSULTA]
+            marcadores = ", ".join(f"@v{posicion}" for posicion in range(len(bloque)))
+            parametros = [control_conexion.crear_parametro(f"@v{posicion}", valor) for posicion, valor in enumerate(bloque)]
+            partes.append(control_conexion.ejecutar_consulta_sql(
+                f"SELECT {seleccion} FROM {tabla} WHERE [{columna_clave}] IN ({marcadores})", parametros
+            ))
+        if len(partes) == 1:
+            return partes[0]
+        import pandas as pd
+        return pd.concat(partes, ignore_index=True)
+
+    def actualizar_filas(self, nombre_proyecto, nombre_tabla, valores_clave):
+        """
+        Vuelve a leer e indexar las filas escritas; las que ya no existen se quitan del índice.
+
+        Args:
+            nombre_proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla escrita.
+            valores_clave (list): Valores de la columna clave de las filas escritas.
+        """
+        clave = self._clave(nombre_proyecto, nombre_tabla)
+        self._anotar_escritas(clave, valores_clave)
+        indice = self._indices.get(clave)
+        if indice is None or not valores_clave:
+            return  # Sin índice todavía: se construirá completo en la primera búsqueda
+        self._actualizar_indice(indice, self.tablas[clave], valores_clave)
+
+    def _anotar_escritas(self, clave, valores_clave):
+        """Anota las claves escritas si la tabla se está construyendo (se reaplican al terminar)."""
+        with self._candado_escritas:
+            escritas = self._escritas_en_carga.get(clave)
+            if escritas is not None:
+                escritas.update(valores_clave)
+
+    def _actualizar_indice(self, indice, datos_tabla, valores_clave):
+        """Vuelve a leer las filas con esas claves y las indexa; las que no existen se quitan."""
+        control_conexion = self._crear_conexion(indice.proyecto)
+        try:
+            control_conexion.abrir_bd()
+            filas = self._leer_filas(control_conexion, indice.tabla, indice.columna_clave,
+                                     list(valores_clave), self._seleccion(datos_tabla))
+        except Exception as ex:
+            print(f"No se pudo actualizar el índice de búsqueda de {indice.proyecto}/{indice.tabla}: {str(ex)}")
+            self.reconstruir(indice.proyecto, indice.tabla)
+            return
+        finally:
+            control_conexion.cerrar_bd()
+
+        encontradas = set()
+        for fila in filas.itertuples(index=False, name=None):
+            indice.indexar(fila[0], fila[1:])
+            encontradas.add(normalizar_clave(fila[0]))
+        for valor in valores_clave:
+            if normalizar_clave(valor) not in encontradas:
+                indice.quitar(valor)
+
+    def quitar_filas(self, nombre_proyecto, nombre_tabla, valores_clave):
+        """
+        Quita filas eliminadas del índice.
+
+        Args:
+            nombre_proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla escrita.
+            valores_clave (list): Valores de la columna clave de las filas eliminadas.
+        """
+        clave = self._clave(nombre_proyecto, nombre_tabla)
+        self._anotar_escritas(clave, valores_clave)
+        indice = self._indices.get(clave)
+        if indice is not None:
+            for valor in valores_clave:
+                indice.quitar(valor)
+
+    def reconstruir(self, nombre_proyecto, nombre_tabla):
+        """
+        Pide reconstruir el índice de una tabla en segundo plano.
+
+        Args:
+            nombre_proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla escrita.
+        """
+        clave = self._clave(nombre_proyecto, nombre_tabla)
+        if clave in self._indices:
+            self._pendientes.add(clave)
+            self._avisar.set()
+
+    def columna_clave(self, nombre_proyecto, nombre_tabla):
+        """
+        Obtiene la columna clave de una tabla con búsqueda configurada.
+
+        Returns:
+            str: Columna clave, o None si la tabla no tiene búsqueda.
+        """
+        datos_tabla = self.tablas.get(self._clave(nombre_proyecto, nombre_tabla))
+        return None if datos_tabla is None else datos_tabla["Clave"]
+
+    def construir_iniciales(self):
+        """Construye los índices configurados con CargarAlIniciar."""
+        for clave, datos_tabla in self.tablas.items():
+            if datos_tabla.get("CargarAlIniciar", False):
+                self.construir(clave)
+
+    def iniciar(self):
+        """Inicia el hilo que reconstruye los índices (pendientes y periódicamente)."""
+        def ciclo():
+            ultima = time.monotonic()
+            while not self._detener.is_set():
+                self._avisar.wait(max(self.intervalo_reconstruccion - (time.monotonic() - ultima), 1))
+                self._avisar.clear()
+                if self._detener.is_set():
+                    break
+                if time.monotonic() - ultima >= self.intervalo_reconstruccion:
+                    pendientes = set(self._indices)  # Reconstrucción periódica de los índices cargados
+                    ultima = time.monotonic()
+                else:
+                    pendientes = set(self._pendientes)
+                for clave in pendientes:
+                    self.construir(clave)
+
+        self._hilo = threading.Thread(target=ciclo, name="indices-busqueda", daemon=True)
+        self._hilo.start()
+
+    def cerrar(self):
+        """Detiene la reconstrucción y libera los índices."""
+        self._detener.set()
+        self._avisar.set()
+        for proyecto, tabla in list(self._indices):
+            self.registro_proyectos.liberar_memoria_cache(proyecto, f"busqueda:{tabla}")
+        self._indices.clear()
+
+    def estadisticas(self):
+        """
+        Obtiene el estado de los índices.
+
+        Returns:
+            dict: {"proyecto/tabla": filas, términos, memoria e instante de construcción}.
+        """
+        resultado = {}
+        for (proyecto, tabla), indice in list(self._indices.items()):
+            resultado[f"{proyecto}/{tabla}"] = {
+                **indice.estadisticas(),
+                "memoria_mb": round(indice.estimar_memoria() / (1024 * 1024), 3),
+                "reconstruccion_pendiente": (proyecto, tabla) in self._pendientes,
+            }
+        return resultado
+
+
+def inicializar_busqueda_texto(app):
+    """
+    Crea los índices de búsqueda configurados con CargarAlIniciar e inicia su reconstrucción
+    (se ejecuta después del fork, a continuación del registro de proyectos).
+
+    Args:
+        app (Flask): Aplicación donde se guarda el buscador.
+    """
+    configuracion = app.config["DATOS_CONFIG"]
+    if not configuracion.get("BusquedaTexto", {}).get("Tablas"):
+        return
+    buscador = BuscadorTexto(configuracion, app.extensions["registro_proyectos"])
+    buscador.construir_iniciales()
+    buscador.iniciar()
+    app.extensions["busqueda_texto"] = buscador
+
+
+def finalizar_busqueda_texto(app):
+    """
+    Detiene la reconstrucción de los índices de búsqueda.
+
+    Args:
+        app (Flask): Aplicación donde se guardó el buscador.
+    """
+    buscador = app.extensions.pop("busqueda_texto", None)
+    if buscador is not None:
+        buscador.cerrar()
+
+
+def obtener_buscador_texto():
+    """
+    Obtiene el buscador de texto del proceso actual.
+
+    Returns:
+        BuscadorTexto: Buscador creado por inicializar_busqueda_texto, o None si no hay tablas configuradas.
+    """
+    return current_app.extensions.get("busqueda_texto")
+
+
+def _valor_columna(datos, columna):
+    """Obtiene el valor de una columna de un cuerpo JSON sin distinguir mayúsculas (None si no está)."""
+    if not isinstance(datos, dict):
+        return None
+    return next((valor for nombre, valor in datos.items() if nombre.lower() == columna.lower()), None)
+
+
+def actualizar_indice_tras_escritura(respuesta):
+    """
+    Aplica al índice de búsqueda de la tabla las escrituras correctas (after_request).
+
+    Args:
+        respuesta (Response): Respuesta de la solicitud.
+
+    Returns:
+        Response: La misma respuesta.
+    """
+    buscador = current_app.extensions.get("busqueda_texto")
+    argumentos = request.view_args or {}
+    endpoint = (request.endpoint or "").rsplit(".", 1)[-1]
+    # 202: escritura diferida o trabajo en segundo plano, la fila aún no está en la base de datos
+    if (buscador is None or respuesta.status_code >= 300 or respuesta.status_code == 202
+            or "nombre_tabla" not in argumentos or not es_solicitud_escritura(current_app.config["DATOS_CONFIG"])):
+        return respuesta
+    nombre_proyecto, nombre_tabla = argumentos.get("nombre_proyecto"), argumentos["nombre_tabla"]
+    columna_clave = buscador.columna_clave(nombre_proyecto, nombre_tabla)
+    if columna_clave is None:
+        return respuesta
+
+    try:
+        cuerpo = request.get_json(silent=True)
+        filas = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+        clave_url = argumentos.get("nombre_clave", "").lower() == columna_clave.lower()
+
+        if endpoint == "eliminar" and clave_url:
+            buscador.quitar_filas(nombre_proyecto, nombre_tabla, [argumentos["valor_clave"]])
+        elif endpoint == "crear" and _valor_columna(g.get("clave_creada"), columna_clave) is not None:
+            # Clave de la fila insertada, también si la generó la base de datos (IDENTITY)
+            buscador.actualizar_filas(nombre_proyecto, nombre_tabla, [_valor_columna(g.clave_creada, columna_clave)])
+        elif endpoint in ("crear", "combinar") and all(_valor_columna(fila, columna_clave) is not None for fila in filas):
+            buscador.actualizar_filas(nombre_proyecto, nombre_tabla, [_valor_columna(fila, columna_clave) for fila in filas])
+        elif endpoint == "actualizar" and clave_url:
+            # La actualización puede cambiar la clave: se releen la anterior y la nueva
+            valores = [argumentos["valor_clave"]]
+            if _valor_columna(cuerpo, columna_clave) is not None:
+                valores.append(_valor_columna(cuerpo, columna_clave))
+            buscador.actualizar_filas(nombre_proyecto, nombre_tabla, valores)
+        else:
+            # No se sabe qué filas cambiaron (importaciones, consultas registradas de escritura)
+            buscador.reconstruir(nombre_proyecto, nombre_tabla)
+    except Exception as ex:
+        print(f"No se pudo actualizar el índice de búsqueda de {nombre_tabla}: {str(ex)}")
+    return respuesta
+
@@ -0,0 +1,409 @@
+# servicios/cambios.py
+# Consulta de cambios incrementales de una tabla para sincronización (delta sync)
+# (equivalente a usar CHANGETABLE / rowversion desde un repositorio en C#)
+#
+# El cliente guarda la marca de agua (watermark) de la última respuesta y la envía en
+# ?since=; solo recibe las filas que cambiaron desde entonces. Sin ?since= recibe la
+# tabla completa y la marca inicial. Según la tabla se usa una de estas estrategias:
+#
+#   seguimiento  Change Tracking de SQL Server (ALTER TABLE ... ENABLE CHANGE_TRACKING).
+#                Informa inserciones, actualizaciones y eliminaciones. Marca "ct:<versión>".
+#   rowversion   Columna rowversion/timestamp. Informa inserciones y actualizaciones
+#                (las eliminaciones no dejan rastro). Marca "rv:<hex>".
+#   registro     Registro de cambios que mantiene esta API en cada crear/actualizar/eliminar
+#                (para bases sin Change Tracking, por ejemplo LocalDb). Marca "rc:<id>".
+#                La clave se anota como JSON con todas las columnas de la clave primaria
+#                (las generadas por la base de datos se leen con OUTPUT al crear).
+#                Requiere la tabla:
+#                    CREATE TABLE api_registro_cambios (
+#                        id BIGINT IDENTITY PRIMARY KEY, tabla NVARCHAR(128) NOT NULL,
+#                        operacion CHAR(1) NOT NULL, clave NVARCHAR(400) NULL,
+#                        fecha DATETIME2 DEFAULT SYSUTCDATETIME());
+#                    CREATE INDEX ix_api_registro_cambios_tabla ON api_registro_cambios (tabla, id);
+#
+# Cada fila de la respuesta lleva la columna _operacion: I (insertada), U (actualizada),
+# D (eliminada; solo trae la clave, el resto de columnas llega en null).
+#
+# Las consultas registradas (ConsultasNombradas) solo se anotan si se declaran con
+# "Escritura": true; como no se sabe qué filas tocan, obligan a resincronizar la tabla.
+#
+# Configuración (configuracion/config.json):
+#     "Cambios": {"RegistroHabilitado": false, "TablaRegistro": "api_registro_cambios"}
+
+import json
+
+from flask import current_app, g, request
+
+from servicios.control_conexion import ControlConexion
+from servicios.conversion_tipos import obtener_convertidor
+from servicios.errores import ErrorApi
+from servicios.instantaneas import ENDPOINT_CONSULTA_PARAMETRIZADA, es_consulta_escritura
+
+ESTRATEGIA_SEGUIMIENTO = "seguimiento"
+ESTRATEGIA_ROWVERSION = "rowversion"
+ESTRATEGIA_REGISTRO = "registro"
+
+PREFIJOS_MARCA = {
+    ESTRATEGIA_SEGUIMIENTO: "ct",
+    ESTRATEGIA_ROWVERSION: "rv",
+    ESTRATEGIA_REGISTRO: "rc",
+}
+
+COLUMNA_OPERACION = "_operacion"
+
+# Operación del registro cuando no se conoce la fila afectada (importaciones, SQL libre):
+# obliga al cliente a resincronizar la tabla completa
+OPERACION_RESINCRONIZAR = "R"
+
+# Rutas cuyas escrituras se anotan en el registro de cambios, con la operación que representan
+OPERACIONES_ENDPOINT = {
+    "crear": "I",
+    "actualizar": "U",
+    "combinar": OPERACION_RESINCRONIZAR,
+    "eliminar": "D",
+    "importar_csv": OPERACION_RESINCRONIZAR,
+}
+
+
+def obtener_config_cambios(configuracion):
+    """
+    Obtiene la configuración del registro de cambios.
+
+    Args:
+        configuracion (dict): Configuración de la aplicación.
+
+    Returns:
+        tuple: (registro habilitado, nombre de la tabla del registro).
+    """
+    config_cambios = configuracion.get("Cambios", {})
+    return (
+        bool(config_cambios.get("RegistroHabilitado", False)),
+        config_cambios.get("TablaRegistro", "api_registro_cambios"),
+    )
+
+
+def tiene_seguimiento_cambios(conexion, nombre_tabla):
+    """
+    Indica si la tabla tiene habilitado Change Tracking de SQL Server.
+
+    Args:
+        conexion (ControlConexion): Conexión abierta.
+        nombre_tabla (str): Nombre de la tabla.
+
+    Returns:
+        bool: True si la tabla está en sys.change_tracking_tables.
+    """
+    consulta_sql = "SELECT 1 AS habilitado FROM sys.change_tracking_tables WHERE object_id = OBJECT_ID(@nombreTabla)"
+    try:
+        resultado = conexion.ejecutar_consulta_sql(consulta_sql, [conexion.crear_parametro("@nombreTabla", nombre_tabla)])
+    except ErrorApi:
+        raise
+    except Exception as ex:
+        # Motores sin catálogo de Change Tracking: se usan las otras estrategias
+        print(f"No se pudo consultar Change Tracking para {nombre_tabla}: {str(ex)}")
+        return False
+    return not resultado.empty
+
+
+def detectar_estrategia(conexion, nombre_tabla, tipos_columnas, configuracion):
+    """
+    Elige la estrategia de cambios de la tabla (en orden de preferencia).
+
+    Args:
+        conexion (ControlConexion): Conexión abierta.
+        nombre_tabla (str): Nombre de la tabla.
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+        configuracion (dict): Configuración de la aplicación.
+
+    Returns:
+        tuple: (estrategia, columna rowversion o None), o (None, None) si la tabla no admite cambios.
+    """
+    if tiene_seguimiento_cambios(conexion, nombre_tabla):
+        return ESTRATEGIA_SEGUIMIENTO, None
+    for columna, tipo_dato in tipos_columnas.items():
+        if tipo_dato in ("timestamp", "rowversion"):
+            return ESTRATEGIA_ROWVERSION, columna
+    registro_habilitado, _ = obtener_config_cambios(configuracion)
+    if registro_habilitado:
+        return ESTRATEGIA_REGISTRO, None
+    return None, None
+
+
+def leer_marca(marca, estrategia):
+    """
+    Valida la marca recibida en ?since= y extrae su valor.
+
+    Args:
+        marca (str): Marca enviada por el cliente (None en la sincronización inicial).
+        estrategia (str): Estrategia de la tabla.
+
+    Returns:
+        object: int (seguimiento/registro), bytes (rowversion) o None.
+
+    Raises:
+        ErrorApi: Si la marca no es válida o es de otra estrategia (400).
+    """
+    if not marca:
+        return None
+    prefijo, _, valor = marca.partition(":")
+    if prefijo != PREFIJOS_MARCA[estrategia]:
+        raise ErrorApi(f"La marca '{marca}' no corresponde a la estrategia de la tabla ({estrategia}); sincronice sin since", 400)
+    try:
+        if estrategia == ESTRATEGIA_ROWVERSION:
+            return bytes.fromhex(valor[2:] if valor.lower().startswith("0x") else valor)
+        return int(valor)
+    except ValueError:
+        raise ErrorApi(f"Marca de cambios no válida: '{marca}'", 400)
+
+
+def formatear_marca(estrategia, valor):
+    """
+    Construye la marca que se devuelve al cliente.
+
+    Args:
+        estrategia (str): Estrategia de la tabla.
+        valor: Versión, rowversion o id del registro.
+
+    Returns:
+        str: Marca opaca con el prefijo de la estrategia.
+    """
+    if estrategia == ESTRATEGIA_ROWVERSION:
+        valor = "0x" + bytes(valor).hex().upper()
+    return f"{PREFIJOS_MARCA[estrategia]}:{valor}"
+
+
+def _marcar_operacion(df, operacion):
+    """Añade la columna _operacion como primera columna del resultado."""
+    df.insert(0, COLUMNA_OPERACION, operacion)
+    return df
+
+
+def consultar_cambios_seguimiento(conexion, nombre_tabla, tipos_columnas, claves_primarias, desde):
+    """
+    Obtiene los cambios con Change Tracking de SQL Server.
+
+    Args:
+        conexion (ControlConexion): Conexión abierta.
+        nombre_tabla (str): Nombre de la tabla.
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+        claves_primarias (list): Columnas de la clave primaria.
+        desde (int): Versión recibida, o None para la sincronización inicial.
+
+    Returns:
+        tuple: (DataFrame de cambios, nueva versión).
+    """
+    parametro_tabla = [conexion.crear_parametro("@nombreTabla", nombre_tabla)]
+    versiones = conexion.ejecutar_consulta_sql(
+        "SELECT CHANGE_TRACKING_CURRENT_VERSION() AS actual, "
+        "CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(@nombreTabla)) AS minima",
+        parametro_tabla,
+    )
+    version_actual = int(versiones.iloc[0, 0] or 0)
+    version_minima = int(versiones.iloc[0, 1] or 0)
+
+    # La versión se lee antes que los datos: un cambio simultáneo puede repetirse en la
+    # siguiente sincronización, pero nunca perderse
+    if desde is None:
+        return _marcar_operacion(conexion.ejecutar_consulta_sql(f"SELECT * FROM {nombre_tabla}"), "I"), version_actual
+    if desde < version_minima:
+        raise ErrorApi("La marca es anterior a la retención de Change Tracking; sincronice sin since", 410)
+
+    union = " AND ".join(f"t.[{columna}] = ct.[{columna}]" for columna in claves_primarias)
+    columnas = [f"ct.[{columna}] AS [{columna}]" for columna in claves_primarias]
+    columnas += [f"t.[{columna}]" for columna in tipos_columnas if columna not in claves_primarias]
+    consulta_sql = (
+        f"SELECT ct.SYS_CHANGE_OPERATION AS {COLUMNA_OPERACION}, {', '.join(columnas)} "
+        f"FROM CHANGETABLE(CHANGES {nombre_tabla}, @desde) AS ct "
+        f"LEFT JOIN {nombre_tabla} AS t ON {union} "
+        f"ORDER BY ct.SYS_CHANGE_VERSION"
+    )
+    cambios = conexion.ejecutar_consulta_sql(consulta_sql, [conexion.crear_parametro("@desde", desde)])
+    return cambios, version_actual
+
+
+def consultar_cambios_rowversion(conexion, nombre_tabla, columna_version, desde):
+    """
+    Obtiene las filas insertadas o actualizadas según su columna rowversion.
+    Se excluyen las versiones de transacciones aún abiertas (MIN_ACTIVE_ROWVERSION)
+    para no saltarse filas que se confirmen después de leer.
+
+    Args:
+        conexion (ControlConexion): Conexión abierta.
+        nombre_tabla (str): Nombre de la tabla.
+        columna_version (str): Columna rowversion de la tabla.
+        desde (bytes): Rowversion recibida, o None para la sincronización inicial.
+
+    Returns:
+        tuple: (DataFrame de cambios, nueva rowversion).
+    """
+    consulta_sql = f"SELECT * FROM {nombre_tabla} WHERE [{columna_version}] < MIN_ACTIVE_ROWVERSION()"
+    parametros = []
+    if desde is not None:
+        consulta_sql += f" AND [{columna_version}] > @desde"
+        parametros.append(conexion.crear_parametro("@desde", desde))
+    consulta_sql += f" ORDER BY [{columna_version}]"
+
+    cambios = conexion.ejecutar_consulta_sql(consulta_sql, parametros or None)
+    nueva_marca = cambios[columna_version].iloc[-1] if not cambios.empty else (desde or bytes(8))
+    return _marcar_operacion(cambios, "U"), nueva_marca
+
+
+def consultar_cambios_registro(conexion, nombre_tabla, tipos_columnas, tabla_registro, desde):
+    """
+    Obtiene los cambios anotados por la API en el registro de cambios.
+    Varios cambios de la misma fila se reducen al último; las filas insertadas o
+    actualizadas se leen en su estado actual.
+
+    Args:
+        conexion (ControlConexion): Conexión abierta.
+        nombre_tabla (str): Nombre de la tabla.
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+        tabla_registro (str): Tabla del registro de cambios.
+        desde (int): Id del registro recibido, o None para la sincronización inicial.
+
+    Returns:
+        tuple: (DataFrame de cambios, nuevo id del registro).
+    """
+    import pandas as pd  # Importación diferida (igual que en ControlConexion)
+
+    parametro_tabla = conexion.crear_parametro("@nombreTabla", nombre_tabla.lower())
+    ultimo = conexion.ejecutar_consulta_sql(
+        f"SELECT MAX(id) AS ultimo FROM {tabla_registro} WHERE tabla = @nombreTabla", [parametro_tabla]
+    )
+    ultimo_id = ultimo.iloc[0, 0]
+    ultimo_id = int(ultimo_id) if ultimo_id is not None and ultimo_id == ultimo_id else 0
+
+    if desde is None:
+        return _marcar_operacion(conexion.ejecutar_consulta_sql(f"SELECT * FROM {nombre_tabla}"), "I"), ultimo_id
+
+    entradas = conexion.ejecutar_consulta_sql(
+        f"SELECT id, operacion, clave FROM {tabla_registro} "
+        f"WHERE tabla = @nombreTabla AND id > @desde AND id <= @hasta ORDER BY id",
+        [parametro_tabla, conexion.crear_parametro("@desde", desde), conexion.crear_parametro("@hasta", ultimo_id)],
+    )
+
+    # Último cambio de cada fila: {((columna, valor), ...): operación}
+    ultimas = {}
+    for _, operacion, clave in entradas.itertuples(index=False, name=None):
+        if operacion == OPERACION_RESINCRONIZAR or not clave:
+            # Cambio sin fila identificable: el cliente recibe la tabla completa
+            return _marcar_operacion(conexion.ejecutar_consulta_sql(f"SELECT * FROM {nombre_tabla}"), OPERACION_RESINCRONIZAR), ultimo_id
+        ultimas[tuple((columna, str(valor)) for columna, valor in json.loads(clave).items())] = operacion
+
+    resultados = []
+    eliminadas = []
+    for clave_fila, operacion in ultimas.items():
+        if any(columna not in tipos_columnas for columna, _ in clave_fila):
+            continue
+        valores_clave = {columna: obtener_convertidor(tipos_columnas[columna])(valor) for columna, valor in clave_fila}
+        if operacion == "D":
+            eliminadas.append({COLUMNA_OPERACION: "D", **valores_clave})
+            continue
+        condiciones = " AND ".join(f"[{columna}] = @valor{posicion}" for posicion, columna in enumerate(valores_clave))
+        fila = conexion.ejecutar_consulta_sql(
+            f"SELECT * FROM {nombre_tabla} WHERE {condiciones}",
+            [conexion.crear_parametro(f"@valor{posicion}", valor) for posicion, valor in enumerate(valores_clave.values())],
+        )
+        if fila.empty:
+            eliminadas.append({COLUMNA_OPERACION: "D", **valores_clave})
+        else:
+            resultados.append(_marcar_operacion(fila, operacion))
+
+    if eliminadas:
+        resultados.append(pd.DataFrame(eliminadas))
+    if not resultados:
+        return pd.DataFrame(columns=[COLUMNA_OPERACION] + list(tipos_columnas)), ultimo_id
+    return pd.concat(resultados, ignore_index=True), ultimo_id
+
+
+def anotar_cambios(conexion, tabla_registro, nombre_tabla, operacion, claves):
+    """
+    Inserta en el registro de cambios una entrada por fila afectada, en un solo lote.
+
+    Args:
+        conexion (ControlConexion): Conexión abierta.
+        tabla_registro (str): Tabla del registro de cambios.
+        nombre_tabla (str): Tabla modificada.
+        operacion (str): I, U, D o R.
+        claves (list): {columna: valor} de la clave primaria de cada fila; None anota
+            una resincronización de la tabla.
+    """
+    conexion.ejecutar_comando_sql_lote(
+        f"INSERT INTO {tabla_registro} (tabla, operacion, clave) VALUES (?, ?, ?)",
+        [
+            [nombre_tabla.lower(), OPERACION_RESINCRONIZAR, None] if clave is None
+            else [nombre_tabla.lower(), operacion, json.dumps(clave, default=str)]
+            for clave in claves
+        ],
+    )
+
+
+def registrar_cambio(respuesta):
+    """
+    Anota en el registro de cambios las escrituras correctas hechas por la API (after_request).
+    Solo actúa si Cambios.RegistroHabilitado es true.
+
+    Args:
+        respuesta (Response): Respuesta de la solicitud.
+
+    Returns:
+        Response: La misma respuesta.
+    """
+    configuracion = current_app.config["DATOS_CONFIG"]
+    registro_habilitado, tabla_registro = obtener_config_cambios(configuracion)
+    endpoint = (request.endpoint or "").rsplit(".", 1)[-1]
+    operacion = OPERACIONES_ENDPOINT.get(endpoint)
+    argumentos = request.view_args or {}
+    # 202: escritura diferida, la fila aún no está en la base de datos
+    if (not registro_habilitado or respuesta.status_code >= 300 or respuesta.status_code == 202
+            or "nombre_tabla" not in argumentos):
+        return respuesta
+    if endpoint == ENDPOINT_CONSULTA_PARAMETRIZADA and es_consulta_escritura(configuracion):
+        operacion = OPERACION_RESINCRONIZAR
+    if operacion is None:
+        return respuesta
+
+    conexion = crear_conexion_registro(argumentos.get("nombre_proyecto"))
+    try:
+        conexion.abrir_bd()
+
+        # Filas afectadas: la clave de la URL (actualizar/eliminar) o la clave primaria insertada (crear)
+        claves = []
+        if operacion == OPERACION_RESINCRONIZAR:
+            claves.append(None)
+        elif "nombre_clave" in argumentos:
+            claves.append({argumentos["nombre_clave"]: argumentos["valor_clave"]})
+            # Si el cuerpo cambia la clave, la fila pasa a la clave nueva: se anotan las dos
+            # (la antigua ya no existe y el cliente la recibe como eliminada)
+            datos_entidad = request.get_json(silent=True) if operacion == "U" else None
+            nombre_clave = argumentos["nombre_clave"].lower()
+            clave_nueva = next((valor for columna, valor in (datos_entidad or {}).items()
+                                if columna.lower() == nombre_clave), None)
+            if clave_nueva is not None and str(clave_nueva) != argumentos["valor_clave"]:
+                claves.append({argumentos["nombre_clave"]: clave_nueva})
+        elif operacion == "I":
+            # La anota crear en flask.g (de la fila recibida o la generada por la base de datos);
+            # sin clave primaria la fila no se puede identificar
+            claves.append(g.get("clave_creada"))
+
+        anotar_cambios(conexion, tabla_registro, argumentos["nombre_tabla"], operacion, claves)
+    except Exception as ex:
+        print(f"No se pudo anotar el cambio de {argumentos['nombre_tabla']}: {str(ex)}")
+    finally:
+        conexion.cerrar_bd()
+    return respuesta
+
+
+def crear_conexion_registro(nombre_proyecto):
+    """
+    Crea una ControlConexion para escribir en el registro de cambios, sin el plazo
+    de la solicitud (la escritura de datos ya se confirmó y la anotación no debe perderse).
+
+    Args:
+        nombre_proyecto (str): Proyecto de la solicitud.
+
+    Returns:
+        ControlConexion: Conexión del pool del proyecto.
+    """
+    registro = current_app.extensions["registro_proyectos"]
+    return ControlConexion(configuracion=current_app.config["DATOS_CONFIG"], pool=registro.obtener_pool(nombre_proyecto))
@@ -0,0 +1,104 @@
+# servicios/ciclo_vida.py
+# Inicialización y finalización de los recursos propios de cada proceso trabajador
+# (equivalente a IHostedService.StartAsync/StopAsync en C#)
+#
+# Los recursos que contienen conexiones, hilos o cachés (pools de pyodbc, cachés en
+# memoria, colas en segundo plano) no deben crearse en el proceso maestro antes de
+# hacer fork: cada trabajador los crea después del fork mediante inicializar_proceso().
+
+import os
+import threading
+
+# Candado global: la inicialización es rara y debe ocurrir una sola vez por proceso
+_candado = threading.Lock()
+
+
+def _estado(app):
+    """
+    Obtiene el estado del ciclo de vida guardado en la aplicación.
+
+    Args:
+        app (Flask): Aplicación.
+
+    Returns:
+        dict: Inicializadores, finalizadores y pid del proceso ya inicializado.
+    """
+    return app.extensions.setdefault('ciclo_vida', {
+        "inicializadores": [],
+        "finalizadores": [],
+        "pid_inicializado": None,
+    })
+
+
+def registrar_inicializador(app, funcion):
+    """
+    Registra una función que crea recursos propios del proceso.
+
+    Args:
+        app (Flask): Aplicación a la que pertenecen los recursos.
+        funcion: Función que recibe la aplicación Flask.
+    """
+    _estado(app)["inicializadores"].append(funcion)
+
+
+def registrar_finalizador(app, funcion):
+    """
+    Registra una función que libera recursos al terminar el proceso
+    (vaciar colas, cerrar pools).
+
+    Args:
+        app (Flask): Aplicación a la que pertenecen los recursos.
+        funcion: Función que recibe la aplicación Flask.
+    """
+    _estado(app)["finalizadores"].append(funcion)
+
+
+def inicializar_proceso(app):
+    """
+    Ejecuta los inicializadores registrados una sola vez por proceso.
+    Si el proceso es un hijo creado con fork, se vuelven a ejecutar en el hijo.
+
+    Args:
+        app (Flask): Aplicación cuyos recursos se inicializan.
+    """
+    estado = _estado(app)
+    with _candado:
+        if estado["pid_inicializado"] == os.getpid():
+            return
+        for inicializador in estado["inicializadores"]:
+            inicializador(app)
+        estado["pid_inicializado"] = os.getpid()
+        print(f"Recursos del proceso {os.getpid()} inicializados")
+
+
+def asegurar_proceso_inicializado(app):
+    """
+    Inicializa los recursos del proceso si aún no se hizo (verificación barata por solicitud).
+    Cubre servidores que hacen fork sin avisar a la aplicación.
+
+    Args:
+        app (Flask): Aplicación cuyos recursos se inicializan.
+    """
+    if _estado(app)["pid_inicializado"] != os.getpid():
+        inicializar_proceso(app)
+
+
+def finalizar_proceso(app):
+    """
+    Ejecuta los finalizadores registrados, en orden inverso al de registro.
+    Un finalizador que falla no impide que se ejecuten los demás.
+
+    Args:
+        app (Flask): Aplicación cuyos recursos se liberan.
+    """
+    estado = _estado(app)
+    with _candado:
+        if estado["pid_inicializado"] != os.getpid():
+            return
+        for finalizador in reversed(estado["finalizadores"]):
+            try:
+                finalizador(app)
+            except Exception as ex:
+                print(f"Error al finalizar recursos del proceso: {str(ex)}")
+        estado["pid_inicializado"] = None
+        print(f"Recursos del proceso {os.getpid()} liberados")
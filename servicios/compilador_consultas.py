@@ -0,0 +1,138 @@
+# servicios/compilador_consultas.py
+# Traducción de parámetros con nombre (@nombre) a marcadores posicionales (?) de ODBC
+# (equivalente a lo que hace SqlCommand con sus SqlParameter en C#)
+#
+# pyodbc solo entiende parámetros posicionales: "WHERE id = @id" no se puede enviar tal cual.
+# El compilador recorre el SQL una sola vez, sustituye cada @nombre conocido por "?" y anota
+# el orden en que aparecen; al ejecutar, los valores se colocan en ese orden aunque el
+# cliente los envíe en otro, y un mismo nombre puede aparecer varias veces.
+# No se tocan los @nombre dentro de cadenas, identificadores entre corchetes o comillas,
+# comentarios, las variables del sistema (@@ROWCOUNT) ni las variables que no son
+# parámetros recibidos (DECLARE @total ...).
+# El resultado se guarda en una caché LRU por texto SQL, así las consultas repetidas
+# no se vuelven a analizar.
+
+import functools
+import re
+
+# Tamaño de la caché LRU de consultas compiladas
+TAMANO_CACHE = 512
+
+# Elementos del SQL que se copian sin analizar, y los nombres de parámetro
+_PATRON_SQL = re.compile(
+    r"""
+      (?P<cadena>N?'(?:[^']|'')*')           # 'texto' o N'texto' ('' escapa la comilla)
+    | (?P<corchetes>\[(?:[^\]]|\]\])*\])     # [identificador]
+    | (?P<comillas>"(?:[^"]|"")*")            # "identificador"
+    | (?P<comentario>--[^\n]*|/\*.*?\*/)      # comentarios de línea y de bloque
+    | (?P<sistema>@@\w+)                      # variables del sistema
+    | (?P<parametro>@\w+)                     # @nombre
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class ConsultaCompilada:
+    """
+    SQL con marcadores posicionales y el orden de los parámetros.
+    """
+
+    __slots__ = ("sql", "nombres")
+
+    def __init__(self, sql, nombres):
+        """
+        Args:
+            sql (str): Consulta con "?" en lugar de los parámetros.
+            nombres (tuple): Nombres de parámetro (en minúsculas, con @) en orden de aparición.
+        """
+        self.sql = sql
+        self.nombres = nombres
+
+    def vincular(self, parametros):
+        """
+        Ordena los valores de los parámetros según los marcadores de la consulta.
+
+        Args:
+            parametros (list): Tuplas (nombre, valor) creadas con crear_parametro.
+
+        Returns:
+            list: Valores en el orden de los "?".
+        """
+        valores = {normalizar_nombre(nombre): valor for nombre, valor in parametros}
+        return [valores[nombre] for nombre in self.nombres]
+
+
+def normalizar_nombre(nombre):
+    """
+    Normaliza un nombre de parámetro (@ inicial y minúsculas, como las variables de SQL Server).
+
+    Args:
+        nombre (str): Nombre con o sin @.
+
+    Returns:
+        str: Nombre normalizado.
+    """
+    nombre = nombre.strip().lower()
+    return nombre if nombre.startswith("@") else "@" + nombre
+
+
+@functools.lru_cache(maxsize=TAMANO_CACHE)
+def compilar_consulta(consulta_sql, nombres_parametros):
+    """
+    Compila una consulta con parámetros @nombre (resultado en caché LRU).
+
+    Args:
+        consulta_sql (str): Consulta original.
+        nombres_parametros (frozenset): Nombres normalizados de los parámetros recibidos.
+
+    Returns:
+        ConsultaCompilada: Consulta con "?" y el orden de los parámetros.
+    """
+    orden = []
+
+    def reemplazar(coincidencia):
+        nombre = coincidencia.group("parametro")
+        if nombre is None or nombre.lower() not in nombres_parametros:
+            return coincidencia.group(0)
+        orden.append(nombre.lower())
+        return "?"
+
+    sql = _PATRON_SQL.sub(reemplazar, consulta_sql)
+    return ConsultaCompilada(sql, tuple(orden))
+
+
+def preparar_consulta(consulta_sql, parametros):
+    """
+    Obtiene el SQL y los valores listos para pyodbc.
+    Si ningún parámetro aparece como @nombre en la consulta (SQL ya escrito con "?"),
+    los valores se envían en el orden recibido, como hasta ahora.
+
+    Args:
+        consulta_sql (str): Consulta original.
+        parametros (list): Tuplas (nombre, valor), o None.
+
+    Returns:
+        tuple: (SQL para pyodbc, lista de valores).
+    """
+    if not parametros:
+        return consulta_sql, []
+    compilada = compilar_consulta(consulta_sql, frozenset(normalizar_nombre(nombre) for nombre, _ in parametros))
+    if not compilada.nombres:
+        return consulta_sql, [valor for _, valor in parametros]
+    return compilada.sql, compilada.vincular(parametros)
+
+
+def estadisticas_cache():
+    """
+    Obtiene el uso de la caché de consultas compiladas del proceso.
+
+    Returns:
+        dict: Aciertos, fallos, tamaño actual y máximo.
+    """
+    informacion = compilar_consulta.cache_info()
+    return {
+        "aciertos": informacion.hits,
+        "fallos": informacion.misses,
+        "tamano": informacion.currsize,
+        "maximo": informacion.maxsize,
+    }
@@ -0,0 +1,391 @@
+# servicios/consultas_lentas.py
+# Registro de consultas lentas con captura muestreada del plan de ejecución
+# (equivalente al "slow query log" de un interceptor de comandos de EF Core en C#)
+#
+# ControlConexion mide cada consulta; las que superan UmbralMs se anotan con la forma del
+# SQL (sin valores literales), la duración, las filas, la ruta que la lanzó y los tipos de
+# sus parámetros. Las consultas con la misma forma se acumulan para el endpoint
+# GET /admin/consultas-lentas, que muestra las formas con más tiempo total.
+#
+# A una muestra de las consultas lentas (MuestreoPlan, y como mucho una vez por forma cada
+# IntervaloPlanSegundos) se le captura el plan estimado con SET SHOWPLAN_XML ON (LocalDb y
+# SqlServer). La captura no se hace en la conexión de la solicitud (que puede estar a mitad
+# de una lectura por lotes o de una transacción) ni la retrasa: se encola y un hilo del
+# proceso la hace con otra conexión del pool del mismo proyecto, anotando el plan en una
+# línea aparte del archivo. Capturarlo obliga a compilar la consulta otra vez, por eso es
+# muestreado; si la cola de capturas está llena, la muestra se descarta.
+#
+# Cada entrada se escribe como una línea JSON en un archivo rotativo por proceso
+# ({pid} en el nombre evita que los trabajadores de gunicorn roten el mismo archivo).
+#
+# Configuración (configuracion/config.json):
+#     "ConsultasLentas": {
+#         "Habilitado": true,
+#         "UmbralMs": 500,
+#         "MuestreoPlan": 0.1,
+#         "IntervaloPlanSegundos": 300,
+#         "Archivo": "logs/consultas_lentas-{pid}.log",
+#         "MaxBytesArchivo": 10485760,
+#         "ArchivosRespaldo": 5,
+#         "MaxFormas": 1000
+#     }
+
+import functools
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+from flask import has_request_context, request
+
+from servicios.control_conexion import ControlConexion
+
+# Tamaño máximo del plan que se guarda (el XML de SHOWPLAN puede ser muy grande)
+MAX_CARACTERES_PLAN = 65536
+
+# Capturas de plan esperando al hilo que las hace (las que no caben se descartan)
+MAX_CAPTURAS_PENDIENTES = 16
+
+# Elementos del SQL: los literales se reemplazan por "?", el resto se copia
+_PATRON_LITERALES = re.compile(
+    r"""
+      (?P<cadena>N?'(?:[^']|'')*')               # 'texto' o N'texto'
+    | (?P<corchetes>\[(?:[^\]]|\]\])*\])         # [identificador]
+    | (?P<comillas>"(?:[^"]|"")*")                # "identificador"
+    | (?P<comentario>--[^\n]*|/\*.*?\*/)          # comentarios
+    | (?P<sistema>@@\w+)                          # variables del sistema
+    | (?P<parametro>@\w+)                         # @nombre
+    | (?P<numero>(?<![\w.])(?:0x[0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][-+]?\d+)?))
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Listas de marcadores: IN (?, ?, ?) y VALUES (?, ?), (?, ?) se reducen a una sola aparición
+_PATRON_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_PATRON_FILAS = re.compile(r"(\(\?(?:, \?)*(?:, \.\.\.)?\))(?:\s*,\s*\1)+")
+_PATRON_ESPACIOS = re.compile(r"\s+")
+
+
+def _reemplazar_literal(coincidencia):
+    """Reemplaza un literal o parámetro por "?" y elimina los comentarios."""
+    tipo = coincidencia.lastgroup
+    if tipo in ("cadena", "parametro", "numero"):
+        return "?"
+    if tipo == "comentario":
+        return " "
+    return coincidencia.group(0)
+
+
+@functools.lru_cache(maxsize=1024)
+def normalizar_sql(consulta_sql):
+    """
+    Obtiene la forma de una consulta: sin literales ni comentarios, con los espacios
+    reducidos y las listas de marcadores abreviadas (resultado en caché LRU).
+
+    Args:
+        consulta_sql (str): Consulta tal como se envió a la base de datos.
+
+    Returns:
+        tuple: (forma normalizada, identificador corto de la forma).
+    """
+    forma = _PATRON_LITERALES.sub(_reemplazar_literal, consulta_sql)
+    forma = _PATRON_ESPACIOS.sub(" ", forma).strip()
+    forma = _PATRON_LISTA.sub("(?, ...)", forma)
+    forma = _PATRON_FILAS.sub(r"\1, ...", forma)
+    identificador = hashlib.sha1(forma.encode("utf-8")).hexdigest()[:12]
+    return forma, identificador
+
+
+def _describir_parametros(valores):
+    """Tipos de los valores de los parámetros (los valores no se registran)."""
+    return [type(valor).__name__ for valor in valores or []]
+
+
+def _ruta_actual():
+    """Método y regla de la ruta que atiende la solicitud actual, si la hay."""
+    if not has_request_context():
+        return None
+    regla = request.url_rule.rule if request.url_rule is not None else request.path
+    return f"{request.method} {regla}"
+
+
+class _EstadisticasForma:
+    """Acumulado de las ejecuciones lentas de una misma forma de consulta."""
+
+    __slots__ = ("forma", "ejecuciones", "total_ms", "max_ms", "max_filas", "ultima_ruta",
+                 "ultima_vez", "plan", "plan_capturado_en")
+
+    def __init__(self, forma):
+        self.forma = forma
+        self.ejecuciones = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.max_filas = 0
+        self.ultima_ruta = None
+        self.ultima_vez = None
+        self.plan = None
+        self.plan_capturado_en = 0.0
+
+    def resumen(self, identificador):
+        """Resumen de la forma para el endpoint de administración."""
+        return {
+            "id": identificador,
+            "forma": self.forma,
+            "ejecuciones": self.ejecuciones,
+            "total_ms": round(self.total_ms, 1),
+            "promedio_ms": round(self.total_ms / self.ejecuciones, 1) if self.ejecuciones else 0,
+            "max_ms": round(self.max_ms, 1),
+            "max_filas": self.max_filas,
+            "ultima_ruta": self.ultima_ruta,
+            "ultima_vez": self.ultima_vez,
+            "tiene_plan": self.plan is not None,
+        }
+
+
+class RegistroConsultasLentas:
+    """
+    Consultas lentas del proceso actual: archivo rotativo y acumulado por forma.
+    """
+
+    def __init__(self, configuracion):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+        """
+        config_lentas = configuracion.get("ConsultasLentas", {})
+        self.configuracion = configuracion
+        self.umbral_segundos = float(config_lentas.get("UmbralMs", 500)) / 1000
+        self.muestreo_plan = float(config_lentas.get("MuestreoPlan", 0.1))
+        self.intervalo_plan = float(config_lentas.get("IntervaloPlanSegundos", 300))
+        self.max_formas = int(config_lentas.get("MaxFormas", 1000))
+        self._candado = threading.Lock()
+        self._formas = {}  # {identificador: _EstadisticasForma}
+        self._capturas = queue.Queue(maxsize=MAX_CAPTURAS_PENDIENTES)  # (id, SQL, valores, pool) o None para terminar
+        self._hilo_capturas = None
+
+        # Archivo rotativo propio del proceso (JSON por línea)
+        archivo = config_lentas.get("Archivo", "logs/consultas_lentas-{pid}.log").format(pid=os.getpid())
+        if not os.path.isabs(archivo):
+            archivo = os.path.join(os.path.dirname(os.path.dirname(__file__)), archivo)
+        os.makedirs(os.path.dirname(archivo), exist_ok=True)
+        self.archivo = archivo
+        self._manejador = logging.handlers.RotatingFileHandler(
+            archivo,
+            maxBytes=int(config_lentas.get("MaxBytesArchivo", 10 * 1024 * 1024)),
+            backupCount=int(config_lentas.get("ArchivosRespaldo", 5)),
+            encoding="utf-8",
+        )
+        self._manejador.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.getLogger(f"consultas_lentas.{os.getpid()}")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._logger.addHandler(self._manejador)
+
+    def registrar(self, consulta_sql, valores, duracion, filas, control_conexion):
+        """
+        Anota una consulta si superó el umbral (ControlConexion la llama tras cada ejecución).
+
+        Args:
+            consulta_sql (str): SQL ejecutado (con marcadores "?").
+            valores (list): Valores de los parámetros.
+            duracion (float): Segundos que tardó la ejecución.
+            filas (int): Filas devueltas o afectadas (-1 si no se conocen).
+            control_conexion (ControlConexion): Conexión en la que se ejecutó (su pool se usa
+                para capturar el plan en otra conexión).
+        """
+        if duracion < self.umbral_segundos:
+            return
+        forma, identificador = normalizar_sql(consulta_sql)
+        duracion_ms = duracion * 1000
+        ruta = _ruta_actual()
+        ahora = time.time()
+
+        with self._candado:
+            estadisticas = self._formas.get(identificador)
+            if estadisticas is None:
+                if len(self._formas) >= self.max_formas:
+                    # Se descarta la forma con menos tiempo acumulado
+                    menor = min(self._formas, key=lambda clave: self._formas[clave].total_ms)
+                    del self._formas[menor]
+                estadisticas = self._formas[identificador] = _EstadisticasForma(forma)
+            estadisticas.ejecuciones += 1
+            estadisticas.total_ms += duracion_ms
+            estadisticas.max_ms = max(estadisticas.max_ms, duracion_ms)
+            estadisticas.max_filas = max(estadisticas.max_filas, filas or 0)
+            estadisticas.ultima_ruta = ruta
+            estadisticas.ultima_vez = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ahora))
+            capturar = (control_conexion.pool is not None and self._hilo_capturas is not None
+                        and random.random() < self.muestreo_plan
+                        and ahora - estadisticas.plan_capturado_en >= self.intervalo_plan)
+            if capturar:
+                estadisticas.plan_capturado_en = ahora
+
+        if capturar:
+            try:
+                self._capturas.put_nowait((identificador, consulta_sql, list(valores or []), control_conexion.pool))
+            except queue.Full:
+                pass  # Ya hay bastantes capturas pendientes: se espera a la siguiente muestra
+
+        entrada = {
+            "instante": estadisticas.ultima_vez,
+            "id": identificador,
+            "forma": forma,
+            "duracion_ms": round(duracion_ms, 1),
+            "filas": filas,
+            "ruta": ruta,
+            "parametros": _describir_parametros(valores),
+        }
+        self._logger.info(json.dumps(entrada, ensure_ascii=False))
+
+    def iniciar(self):
+        """Inicia el hilo que captura los planes encolados."""
+        def ciclo():
+            while True:
+                captura = self._capturas.get()
+                if captura is None:
+                    return
+                try:
+                    self._capturar(*captura)
+                except Exception as ex:
+                    print(f"No se pudo capturar el plan de ejecución: {str(ex)}")
+
+        self._hilo_capturas = threading.Thread(target=ciclo, name="planes-consultas-lentas", daemon=True)
+        self._hilo_capturas.start()
+
+    def _capturar(self, identificador, consulta_sql, valores, pool):
+        """Captura el plan en una conexión propia del pool y lo anota en la forma y en el archivo."""
+        control_conexion = ControlConexion(configuracion=self.configuracion, pool=pool)
+        try:
+            control_conexion.abrir_bd()
+            plan = self.capturar_plan(control_conexion, consulta_sql, valores)
+        finally:
+            control_conexion.cerrar_bd()
+        if plan is None:
+            return
+
+        with self._candado:
+            estadisticas = self._formas.get(identificador)
+            if estadisticas is not None:
+                estadisticas.plan = plan
+        self._logger.info(json.dumps({
+            "instante": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "id": identificador,
+            "plan": plan,
+        }, ensure_ascii=False))
+
+    @staticmethod
+    def capturar_plan(control_conexion, consulta_sql, valores):
+        """
+        Obtiene el plan estimado de una consulta con SET SHOWPLAN_XML ON (no la ejecuta).
+        Si no se puede volver a desactivar SHOWPLAN, la conexión se marca para descartarla.
+
+        Args:
+            control_conexion (ControlConexion): Conexión abierta y libre (no la de la solicitud).
+            consulta_sql (str): SQL con marcadores "?".
+            valores (list): Valores de los parámetros.
+
+        Returns:
+            str: XML del plan (recortado a MAX_CARACTERES_PLAN), o None si no se pudo obtener.
+        """
+        cursor = control_conexion.conexion_bd.cursor()
+        try:
+            cursor.execute("SET SHOWPLAN_XML ON")
+        except Exception as ex:
+            cursor.close()
+            print(f"No se pudo capturar el plan de ejecución: {str(ex)}")
+            return None
+
+        plan = None
+        try:
+            if valores:
+                cursor.execute(consulta_sql, list(valores))
+            else:
+                cursor.execute(consulta_sql)
+            fila = cursor.fetchone()
+            plan = None if fila is None else str(fila[0])[:MAX_CARACTERES_PLAN]
+        except Exception as ex:
+            print(f"No se pudo capturar el plan de ejecución: {str(ex)}")
+        try:
+            cursor.execute("SET SHOWPLAN_XML OFF")
+        except Exception as ex:
+            # La sesión seguiría devolviendo planes en lugar de resultados: no debe volver al pool
+            print(f"No se pudo desactivar SHOWPLAN_XML; se descarta la conexión: {str(ex)}")
+            control_conexion.descartar_conexion = True
+        finally:
+            cursor.close()
+        return plan
+
+    def principales(self, cantidad):
+        """
+        Obtiene las formas con más tiempo total acumulado.
+
+        Args:
+            cantidad (int): Número de formas a devolver.
+
+        Returns:
+            list: Resúmenes ordenados de mayor a menor tiempo total.
+        """
+        with self._candado:
+            resumenes = [estadisticas.resumen(identificador) for identificador, estadisticas in self._formas.items()]
+        return sorted(resumenes, key=lambda resumen: resumen["total_ms"], reverse=True)[:cantidad]
+
+    def detalle(self, identificador):
+        """
+        Obtiene el acumulado de una forma junto con su último plan capturado.
+
+        Args:
+            identificador (str): Identificador de la forma.
+
+        Returns:
+            dict: Resumen con el plan, o None si la forma no está registrada.
+        """
+        with self._candado:
+            estadisticas = self._formas.get(identificador)
+            if estadisticas is None:
+                return None
+            return {**estadisticas.resumen(identificador), "plan": estadisticas.plan}
+
+    def cerrar(self):
+        """Detiene el hilo de capturas y cierra el archivo de registro."""
+        if self._hilo_capturas is not None:
+            try:
+                self._capturas.put_nowait(None)
+            except queue.Full:
+                pass  # El hilo es daemon: termina con el proceso
+            self._hilo_capturas.join(timeout=5)
+            self._hilo_capturas = None
+        self._logger.removeHandler(self._manejador)
+        self._manejador.close()
+
+
+def inicializar_consultas_lentas(app):
+    """
+    Crea el registro de consultas lentas del proceso (se ejecuta después del fork).
+
+    Args:
+        app (Flask): Aplicación donde se guarda el registro.
+    """
+    configuracion = app.config["DATOS_CONFIG"]
+    if not configuracion.get("ConsultasLentas", {}).get("Habilitado", False):
+        return
+    registro = RegistroConsultasLentas(configuracion)
+    registro.iniciar()
+    app.extensions["consultas_lentas"] = registro
+
+
+def finalizar_consultas_lentas(app):
+    """
+    Cierra el archivo del registro de consultas lentas.
+
+    Args:
+        app (Flask): Aplicación donde se guardó el registro.
+    """
+    registro = app.extensions.pop("consultas_lentas", None)
+    if registro is not None:
+        registro.cerrar()
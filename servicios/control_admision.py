@@ -0,0 +1,302 @@
+# servicios/control_admision.py
+# Control de admisión: limita las solicitudes simultáneas contra la base de datos
+# (equivalente al middleware ConcurrencyLimiter de ASP.NET Core)
+#
+# Cada solicitud que toca una tabla ocupa un cupo del límite de su tabla (si tiene)
+# y otro del límite global. Si no hay cupo, espera en una cola acotada; si la cola
+# está llena o la espera supera el máximo, se rechaza de inmediato con 503 y Retry-After.
+# En modo adaptativo, el límite global se ajusta con el tiempo que la solicitud pasó
+# ejecutando sentencias en la base de datos (etapa execute de tiempos_solicitud), no con
+# su duración total: serializar o enviar a un cliente lento no indica saturación.
+#
+# Configuración (configuracion/config.json):
+#     "Admision": {
+#         "Habilitado": true,
+#         "LimiteGlobal": 32, "MaxCola": 64, "MaxEsperaMs": 2000,
+#         "LimitesPorTabla": {"factura": 8},
+#         "Adaptativo": {"Habilitado": true, "LimiteMinimo": 4, "LimiteMaximo": 128, "Tolerancia": 2.0}
+#     }
+
+import math
+import threading
+import time
+
+from flask import current_app, g, request
+
+from servicios.errores import ErrorServicioNoDisponible
+from servicios.tiempos_solicitud import iniciar_tiempo_ejecucion, terminar_tiempo_ejecucion
+
+
+class AjusteAdaptativo:
+    """
+    Ajusta el límite de concurrencia según la latencia observada en la base de datos.
+    Si la latencia media se aleja de la latencia base (la de la base de datos sin
+    carga), el límite baja un 10 %; si la latencia es buena y el límite está casi
+    lleno, sube de uno en uno (aumento aditivo, disminución multiplicativa).
+    """
+
+    def __init__(self, limite_minimo, limite_maximo, tolerancia=2.0, muestras_por_ajuste=20):
+        """
+        Args:
+            limite_minimo (int): Límite por debajo del cual nunca se baja.
+            limite_maximo (int): Límite por encima del cual nunca se sube.
+            tolerancia (float): Cuántas veces la latencia base se considera saturación.
+            muestras_por_ajuste (int): Solicitudes observadas entre dos ajustes.
+        """
+        self.limite_minimo = limite_minimo
+        self.limite_maximo = limite_maximo
+        self.tolerancia = tolerancia
+        self.muestras_por_ajuste = muestras_por_ajuste
+        self.latencia_media = None
+        self.latencia_base = None
+        self._muestras = 0
+
+    def calcular_limite(self, limite_actual, en_curso, latencia):
+        """
+        Registra una latencia y devuelve el nuevo límite.
+
+        Args:
+            limite_actual (int): Límite vigente.
+            en_curso (int): Solicitudes admitidas en este momento.
+            latencia (float): Segundos que la solicitud pasó ejecutando sentencias.
+
+        Returns:
+            int: Límite ajustado (igual al actual si aún no toca ajustar).
+        """
+        # Media móvil exponencial de la latencia
+        self.latencia_media = latencia if self.latencia_media is None else 0.9 * self.latencia_media + 0.1 * latencia
+        # La latencia base sigue a los mínimos y sube muy despacio (por si cambia el servidor)
+        if self.latencia_base is None or latencia < self.latencia_base:
+            self.latencia_base = latencia
+        else:
+            self.latencia_base += (self.latencia_media - self.latencia_base) * 0.01
+
+        self._muestras += 1
+        if self._muestras < self.muestras_por_ajuste:
+            return limite_actual
+        self._muestras = 0
+
+        if self.latencia_media > self.latencia_base * self.tolerancia:
+            return max(self.limite_minimo, int(limite_actual * 0.9))
+        if en_curso >= limite_actual * 0.8:
+            return min(self.limite_maximo, limite_actual + 1)
+        return limite_actual
+
+
+class LimitadorConcurrencia:
+    """
+    Semáforo con cola de espera acotada y métricas.
+    """
+
+    def __init__(self, nombre, limite, max_cola, max_espera, ajuste=None):
+        """
+        Args:
+            nombre (str): Nombre del limitador ("global" o el nombre de la tabla).
+            limite (int): Solicitudes simultáneas permitidas.
+            max_cola (int): Solicitudes que pueden esperar cupo a la vez.
+            max_espera (float): Segundos máximos de espera en la cola.
+            ajuste (AjusteAdaptativo, optional): Ajuste automático del límite.
+        """
+        self.nombre = nombre
+        self.limite = limite
+        self.max_cola = max_cola
+        self.max_espera = max_espera
+        self.ajuste = ajuste
+
+        self.en_curso = 0
+        self.en_cola = 0
+        self.admitidas = 0
+        self.encoladas = 0
+        self.rechazadas = 0
+        self._condicion = threading.Condition()
+
+    def adquirir(self):
+        """
+        Ocupa un cupo, esperando en la cola si es necesario.
+        Lanza ErrorServicioNoDisponible (503) si la cola está llena o la espera vence.
+        """
+        with self._condicion:
+            if self.en_curso >= self.limite or self.en_cola > 0:
+                if self.en_cola >= self.max_cola:
+                    self.rechazadas += 1
+                    raise self._error_rechazo("la cola de espera está llena")
+
+                self.encoladas += 1
+                self.en_cola += 1
+                limite_espera = time.monotonic() + self.max_espera
+                try:
+                    while self.en_curso >= self.limite:
+                        restante = limite_espera - time.monotonic()
+                        if restante <= 0:
+                            self.rechazadas += 1
+                            raise self._error_rechazo("se superó el tiempo máximo de espera")
+                        self._condicion.wait(restante)
+                finally:
+                    self.en_cola -= 1
+
+            self.en_curso += 1
+            self.admitidas += 1
+
+    def liberar(self, duracion=None):
+        """
+        Libera un cupo y, en modo adaptativo, ajusta el límite con la duración observada.
+
+        Args:
+            duracion (float, optional): Segundos de ejecución en la base de datos (None: sin muestra).
+        """
+        with self._condicion:
+            self.en_curso -= 1
+            if self.ajuste is not None and duracion is not None:
+                limite_anterior = self.limite
+                self.limite = self.ajuste.calcular_limite(self.limite, self.en_curso + 1, duracion)
+                if self.limite > limite_anterior:
+                    self._condicion.notify(self.limite - limite_anterior)
+            self._condicion.notify()
+
+    def metricas(self):
+        """
+        Obtiene las métricas del limitador.
+
+        Returns:
+            dict: Límite, solicitudes en curso, en cola y contadores acumulados.
+        """
+        with self._condicion:
+            metricas = {
+                "limite": self.limite,
+                "en_curso": self.en_curso,
+                "en_cola": self.en_cola,
+                "admitidas": self.admitidas,
+                "encoladas": self.encoladas,
+                "rechazadas": self.rechazadas,
+            }
+            if self.ajuste is not None and self.ajuste.latencia_media is not None:
+                metricas["latencia_media_ms"] = round(self.ajuste.latencia_media * 1000, 2)
+                metricas["latencia_base_ms"] = round(self.ajuste.latencia_base * 1000, 2)
+            return metricas
+
+    def _error_rechazo(self, motivo):
+        """Construye el error 503 con un Retry-After acorde a la espera máxima."""
+        return ErrorServicioNoDisponible(
+            f"Servidor saturado ({self.nombre}): {motivo}",
+            segundos_reintento=math.ceil(self.max_espera) or 1,
+        )
+
+
+class ControlAdmision:
+    """
+    Agrupa el limitador global y los limitadores por tabla.
+    """
+
+    def __init__(self, configuracion):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+        """
+        config_admision = configuracion.get("Admision", {})
+        self.max_cola = int(config_admision.get("MaxCola", 64))
+        self.max_espera = float(config_admision.get("MaxEsperaMs", 2000)) / 1000
+        limite_global = int(config_admision.get("LimiteGlobal", 32))
+
+        ajuste = None
+        config_adaptativo = config_admision.get("Adaptativo", {})
+        if config_adaptativo.get("Habilitado", False):
+            ajuste = AjusteAdaptativo(
+                int(config_adaptativo.get("LimiteMinimo", 4)),
+                int(config_adaptativo.get("LimiteMaximo", limite_global * 4)),
+                float(config_adaptativo.get("Tolerancia", 2.0)),
+            )
+
+        self.limitador_global = LimitadorConcurrencia("global", limite_global, self.max_cola, self.max_espera, ajuste)
+        self.limitadores_tabla = {
+            tabla.lower(): LimitadorConcurrencia(tabla.lower(), int(limite), self.max_cola, self.max_espera)
+            for tabla, limite in config_admision.get("LimitesPorTabla", {}).items()
+        }
+
+    def admitir(self, nombre_tabla):
+        """
+        Ocupa los cupos de la tabla y global para una solicitud.
+
+        Args:
+            nombre_tabla (str): Tabla de la solicitud.
+
+        Returns:
+            list: Limitadores ocupados, que deben liberarse con liberar().
+        """
+        ocupados = []
+        # Primero el de la tabla (más restrictivo) para no retener un cupo global mientras se espera
+        limitador_tabla = self.limitadores_tabla.get((nombre_tabla or "").lower())
+        if limitador_tabla is not None:
+            limitador_tabla.adquirir()
+            ocupados.append(limitador_tabla)
+        try:
+            self.limitador_global.adquirir()
+        except Exception:
+            self.liberar(ocupados)
+            raise
+        ocupados.append(self.limitador_global)
+        return ocupados
+
+    @staticmethod
+    def liberar(ocupados, duracion=None):
+        """
+        Libera los cupos ocupados por una solicitud.
+
+        Args:
+            ocupados (list): Limitadores devueltos por admitir().
+            duracion (float, optional): Segundos de ejecución en la base de datos (None: sin muestra).
+        """
+        for limitador in reversed(ocupados):
+            limitador.liberar(duracion)
+
+    def metricas(self):
+        """
+        Obtiene las métricas de todos los limitadores.
+
+        Returns:
+            dict: Métricas globales y por tabla.
+        """
+        return {
+            "global": self.limitador_global.metricas(),
+            "tablas": {nombre: limitador.metricas() for nombre, limitador in self.limitadores_tabla.items()},
+        }
+
+
+def inicializar_control_admision(app):
+    """
+    Crea el control de admisión del proceso (se ejecuta después del fork).
+    Si Admision.Habilitado es false no se crea y ninguna solicitud se limita.
+
+    Args:
+        app (Flask): Aplicación donde se guarda el control.
+    """
+    configuracion = app.config["DATOS_CONFIG"]
+    if configuracion.get("Admision", {}).get("Habilitado", True):
+        app.extensions["control_admision"] = ControlAdmision(configuracion)
+
+
+def admitir_solicitud():
+    """
+    Admite la solicitud actual si accede a una tabla (before_request).
+    Las rutas que no reciben <nombre_tabla> no pasan por el control.
+    """
+    control = current_app.extensions.get("control_admision")
+    nombre_tabla = (request.view_args or {}).get("nombre_tabla")
+    if control is None or nombre_tabla is None:
+        return
+    g.cupos_admision = control.admitir(nombre_tabla)
+    iniciar_tiempo_ejecucion()
+
+
+def liberar_solicitud(excepcion=None):
+    """
+    Libera los cupos de la solicitud al terminar (teardown_request).
+
+    Args:
+        excepcion: Excepción que terminó la solicitud, si la hubo.
+    """
+    # Las respuestas en flujo (exportar, binarios) llegan aquí antes de enviar el cuerpo.
+    # Sin ninguna sentencia ejecutada (p. ej. servida desde una instantánea) no hay muestra.
+    ocupados = g.pop("cupos_admision", None)
+    segundos_ejecucion = terminar_tiempo_ejecucion()
+    if ocupados:
+        ControlAdmision.liberar(ocupados, segundos_ejecucion or None)
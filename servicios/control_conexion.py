@@ -3,9 +3,54 @@
 
 import os
 import json
+import math
+import time
 import pyodbc  # Equivalente a Microsoft.Data.SqlClient
-import pandas as pd  # Para manejar datos de manera similar a DataTable
-from sqlalchemy import create_engine  # Para conexiones a través de SQLAlchemy
+from servicios.errores import ErrorTiempoAgotado
+from servicios.compilador_consultas import preparar_consulta
+from servicios.tiempos_solicitud import medir
+# pandas (equivalente a DataTable) se importa de forma diferida en los métodos que
+# construyen DataFrames, porque su carga domina el tiempo de arranque de la API
+
+def crear_conexion(cadena_conexion):
+    """
+    Abre una conexión nueva a SQL Server/LocalDB con autocommit activado.
+    La usan los pools de conexiones (ver servicios/pool_conexiones.py).
+    
+    Args:
+        cadena_conexion (str): Cadena de conexión.
+        
+    Returns:
+        Connection: Conexión pyodbc abierta.
+    """
+    print("Abriendo nueva conexión a la base de datos para el pool")
+    return pyodbc.connect(cadena_conexion, autocommit=True)
+
+def es_error_de_comunicacion(ex):
+    """
+    Indica si un error de pyodbc se debe a una conexión rota (SQLSTATE 08xxx),
+    en cuyo caso la conexión no debe volver al pool.
+    
+    Args:
+        ex (Exception): Excepción capturada.
+        
+    Returns:
+        bool: True si la conexión debe descartarse.
+    """
+    return isinstance(ex, pyodbc.Error) and len(ex.args) > 0 and str(ex.args[0]).startswith('08')
+
+def es_error_tiempo_agotado(ex):
+    """
+    Indica si un error de pyodbc se debe a que la consulta superó su tiempo de espera
+    (SQLSTATE HYT00) o fue cancelada (HY008).
+    
+    Args:
+        ex (Exception): Excepción capturada.
+        
+    Returns:
+        bool: True si la consulta se canceló por tiempo.
+    """
+    return isinstance(ex, pyodbc.Error) and len(ex.args) > 0 and str(ex.args[0]) in ('HYT00', 'HY008')
 
 class ControlConexion:
     """
@@ -13,7 +58,7 @@ class ControlConexion:
     Equivalente a la clase ControlConexion en C#.
     """
     
-    def __init__(self, entorno=None, configuracion=None):
+    def __init__(self, entorno=None, configuracion=None, pool=None):
         """
         Constructor de la clase.
         Inicializa el entorno y la configuración.
@@ -21,6 +66,8 @@ class ControlConexion:
         Args:
             entorno: Objeto que contiene información sobre el entorno de la aplicación.
             configuracion: Configuración de la aplicación.
+            pool (PoolConexiones, optional): Pool del que se toman las conexiones.
+                Si es None, cada abrir_bd abre una conexión nueva.
         """
         # En Python, verificamos si los argumentos son None en lugar de lanzar ArgumentNullException
         if entorno is None:
@@ -40,12 +87,23 @@ class ControlConexion:
         
         self.entorno = entorno
         self.conexion_bd = None  # Equivalente a _conexionBd
+        self.pool = pool
+        self.descartar_conexion = False  # True si la conexión quedó inutilizable
+        self.limite = None  # Plazo de la solicitud (reloj monotónico) o None si no tiene
+        self.consultas_lentas = None  # Registro de consultas lentas (ver servicios/consultas_lentas.py)
     
     def abrir_bd(self):
         """
         Método para abrir la base de datos, compatible con SQL Server.
         Equivalente a AbrirBd() en C#.
         """
+        # Con pool, tomar una conexión del pool del proyecto
+        if self.pool is not None:
+            if self.conexion_bd is None:
+                self.conexion_bd = self.pool.obtener()
+                self.descartar_conexion = False
+            return
+        
         try:
             # Obtener el proveedor desde la configuración
             proveedor = self.configuracion.get("DatabaseProvider")
@@ -121,10 +179,14 @@ class ControlConexion:
         Equivalente a CerrarBd() en C#.
         """
         try:
-            # Verificar si la conexión está abierta y cerrarla
+            # Verificar si la conexión está abierta y cerrarla (o devolverla al pool)
             if self.conexion_bd is not None:
-                self.conexion_bd.close()
+                conexion = self.conexion_bd
                 self.conexion_bd = None
+                if self.pool is not None:
+                    self.pool.devolver(conexion, descartar=self.descartar_conexion)
+                else:
+                    conexion.close()
         except Exception as ex:
             raise ValueError(f"Error al cerrar la conexión a la base de datos: {str(ex)}")
     
@@ -140,32 +202,188 @@ class ControlConexion:
         Returns:
             int: Número de filas afectadas.
         """
+        cursor = None
         try:
             # Verificar si la conexión está abierta
             if self.conexion_bd is None:
                 raise ValueError("La conexión a la base de datos no está abierta")
             
-            # Crear y ejecutar el comando
-            cursor = self.conexion_bd.cursor()
-            params_values = []
-            
             # Los parámetros en Python son simples tuplas (nombre, valor)
             for parametro in parametros:
                 print(f"Agregando parámetro: {parametro[0]} = {parametro[1]}")
-                params_values.append(parametro[1])
             
-            # Ejecutar la consulta con los parámetros
-            cursor.execute(consulta_sql, params_values)
+            # Traducir @nombre a "?" y ordenar los valores según aparecen en el SQL
+            sql, params_values = preparar_consulta(consulta_sql, parametros)
+            
+            # Ejecutar la consulta con los parámetros (cursor preparado de la conexión)
+            cursor = self._obtener_cursor(sql)
+            inicio = time.monotonic()
+            with medir("execute"):
+                cursor.execute(sql, params_values)
             
             # Obtener el número de filas afectadas
             filas_afectadas = cursor.rowcount
-            cursor.close()
+            self._liberar_cursor(cursor)
+            self._registrar_duracion(sql, params_values, inicio, filas_afectadas)
             
             return filas_afectadas
         except Exception as ex:
             print(f"Ocurrió una excepción: {str(ex)}")
+            self._descartar_cursor(cursor)
+            self._procesar_error(ex)
             raise ValueError(f"Error al ejecutar el comando SQL: {str(ex)}")
     
+    def ejecutar_comando_sql_lote(self, consulta_sql, lista_valores, nombres_parametros=None):
+        """
+        Método para ejecutar un mismo comando SQL con muchos juegos de valores
+        en una sola transacción (executemany con confirmación al final del lote).
+        
+        Args:
+            consulta_sql (str): Comando SQL a ejecutar (con @nombre o con marcadores "?").
+            lista_valores (list): Lista de filas; cada fila es una lista de valores
+                en el orden de nombres_parametros (o de los "?" del comando).
+            nombres_parametros (list, optional): Nombres de los parámetros @nombre del comando.
+            
+        Returns:
+            int: Número de filas procesadas en el lote.
+        """
+        # Verificar si la conexión está abierta
+        if self.conexion_bd is None:
+            raise ValueError("La conexión a la base de datos no está abierta")
+        
+        if not lista_valores:
+            return 0
+        
+        # Traducir @nombre a "?" y ordenar los valores de cada fila según aparecen en el SQL
+        sql = consulta_sql
+        if nombres_parametros:
+            filas = []
+            for valores in lista_valores:
+                sql, valores_fila = preparar_consulta(consulta_sql, list(zip(nombres_parametros, valores)))
+                filas.append(valores_fila)
+            lista_valores = filas
+        
+        # Cursor preparado de la conexión, con el plazo de la solicitud
+        cursor = self._obtener_cursor(sql)
+        # Desactivar temporalmente autocommit para confirmar el lote completo de una vez
+        autocommit_original = self.conexion_bd.autocommit
+        self.conexion_bd.autocommit = False
+        try:
+            # fast_executemany envía todos los parámetros en un solo viaje (SQL Server)
+            cursor.fast_executemany = True
+            inicio = time.monotonic()
+            with medir("execute"):
+                cursor.executemany(sql, lista_valores)
+                self.conexion_bd.commit()
+            self._liberar_cursor(cursor)
+            self._registrar_duracion(sql, lista_valores[0], inicio, len(lista_valores))
+            return len(lista_valores)
+        except Exception as ex:
+            # Deshacer el lote completo si alguna fila falla
+            self.conexion_bd.rollback()
+            print(f"Ocurrió una excepción: {str(ex)}")
+            self._descartar_cursor(cursor)
+            self._procesar_error(ex)
+            raise ValueError(f"Error al ejecutar el lote SQL: {str(ex)}")
+        finally:
+            self.conexion_bd.autocommit = autocommit_original
+    
+    def ejecutar_comandos_sql_transaccion(self, comandos):
+        """
+        Método para ejecutar varios comandos SQL en una sola transacción
+        (una única confirmación para todo el grupo).
+        
+        Args:
+            comandos (list): Tuplas (comando SQL con marcadores "?", lista de valores).
+        
+        Returns:
+            int: Número total de filas afectadas.
+        """
+        # Verificar si la conexión está abierta
+        if self.conexion_bd is None:
+            raise ValueError("La conexión a la base de datos no está abierta")
+        
+        if not comandos:
+            return 0
+        
+        # Desactivar temporalmente autocommit para confirmar el grupo completo de una vez
+        autocommit_original = self.conexion_bd.autocommit
+        self.conexion_bd.autocommit = False
+        cursor = None
+        try:
+            filas_afectadas = 0
+            for consulta_sql, valores in comandos:
+                # Los comandos con el mismo texto reutilizan la sentencia preparada
+                cursor = self._obtener_cursor(consulta_sql)
+                inicio = time.monotonic()
+                with medir("execute"):
+                    cursor.execute(consulta_sql, valores)
+                filas_afectadas += cursor.rowcount
+                self._liberar_cursor(cursor)
+                self._registrar_duracion(consulta_sql, valores, inicio, cursor.rowcount)
+                cursor = None
+            with medir("execute"):
+                self.conexion_bd.commit()
+            return filas_afectadas
+        except Exception as ex:
+            # Deshacer el grupo completo si algún comando falla
+            self.conexion_bd.rollback()
+            print(f"Ocurrió una excepción: {str(ex)}")
+            self._descartar_cursor(cursor)
+            self._procesar_error(ex)
+            raise ValueError(f"Error al ejecutar la transacción SQL: {str(ex)}")
+        finally:
+            self.conexion_bd.autocommit = autocommit_original
+
+    def ejecutar_consultas_sql_transaccion(self, comandos):
+        """
+        Método para ejecutar varios comandos SQL que devuelven filas (por ejemplo, MERGE
+        con OUTPUT) en una sola transacción, leyendo las filas de cada uno.
+
+        Args:
+            comandos (list): Tuplas (comando SQL con marcadores "?", lista de valores).
+
+        Returns:
+            list: Filas devueltas por cada comando (lista de tuplas), en el mismo orden.
+        """
+        # Verificar si la conexión está abierta
+        if self.conexion_bd is None:
+            raise ValueError("La conexión a la base de datos no está abierta")
+
+        if not comandos:
+            return []
+
+        # Desactivar temporalmente autocommit para confirmar el grupo completo de una vez
+        autocommit_original = self.conexion_bd.autocommit
+        self.conexion_bd.autocommit = False
+        cursor = None
+        try:
+            resultados = []
+            for consulta_sql, valores in comandos:
+                # Los comandos con el mismo texto reutilizan la sentencia preparada
+                cursor = self._obtener_cursor(consulta_sql)
+                inicio = time.monotonic()
+                with medir("execute"):
+                    cursor.execute(consulta_sql, valores)
+                with medir("fetch"):
+                    filas = [tuple(fila) for fila in cursor.fetchall()]
+                self._liberar_cursor(cursor)
+                self._registrar_duracion(consulta_sql, valores, inicio, len(filas))
+                cursor = None
+                resultados.append(filas)
+            with medir("execute"):
+                self.conexion_bd.commit()
+            return resultados
+        except Exception as ex:
+            # Deshacer el grupo completo si algún comando falla
+            self.conexion_bd.rollback()
+            print(f"Ocurrió una excepción: {str(ex)}")
+            self._descartar_cursor(cursor)
+            self._procesar_error(ex)
+            raise ValueError(f"Error al ejecutar la transacción SQL: {str(ex)}")
+        finally:
+            self.conexion_bd.autocommit = autocommit_original
+
     def ejecutar_consulta_sql(self, consulta_sql, parametros=None):
         """
         Método para ejecutar una consulta SQL y devolver un DataFrame con los resultados.
@@ -182,28 +400,35 @@ class ControlConexion:
         if self.conexion_bd is None:
             raise ValueError("La conexión a la base de datos no está abierta")
         
+        cursor = None
         try:
-            # Crear y ejecutar el comando
-            cursor = self.conexion_bd.cursor()
-            params_values = []
-            
             # Procesar parámetros si los hay
             if parametros is not None:
                 for param in parametros:
                     print(f"Agregando parámetro: {param[0]} = {param[1]}")
-                    params_values.append(param[1])
-                
-                # Ejecutar la consulta con los parámetros
-                cursor.execute(consulta_sql, params_values)
-            else:
-                # Ejecutar la consulta sin parámetros
-                cursor.execute(consulta_sql)
+            
+            # Traducir @nombre a "?" y ordenar los valores según aparecen en el SQL
+            sql, params_values = preparar_consulta(consulta_sql, parametros)
+            
+            # Ejecutar la consulta (con o sin parámetros) en el cursor preparado de la conexión
+            cursor = self._obtener_cursor(sql)
+            inicio = time.monotonic()
+            with medir("execute"):
+                if params_values:
+                    cursor.execute(sql, params_values)
+                else:
+                    cursor.execute(sql)
             
             # Obtener los nombres de las columnas
             columnas = [column[0] for column in cursor.description]
             
             # Obtener todas las filas
-            filas = cursor.fetchall()
+            with medir("fetch"):
+                filas = cursor.fetchall()
+            self._liberar_cursor(cursor)
+            self._registrar_duracion(sql, params_values, inicio, len(filas))
+            
+            import pandas as pd  # Importación diferida (ver comentario al inicio del archivo)
             
             # Verificar si hay resultados
             if not filas:
@@ -211,15 +436,226 @@ class ControlConexion:
                 return pd.DataFrame(columns=columnas)
             
             # Crear un DataFrame con los resultados
-            df = pd.DataFrame.from_records(filas, columns=columnas)
+            with medir("transform"):
+                df = pd.DataFrame.from_records(filas, columns=columnas)
             
             print(f"Número de filas en el resultado: {len(df)}")
             
             return df
         except Exception as ex:
             print(f"Ocurrió una excepción: {str(ex)}")
+            self._descartar_cursor(cursor)
+            self._procesar_error(ex)
+            raise Exception(f"Error al ejecutar la consulta SQL. Error: {str(ex)}")
+    
+    def ejecutar_consulta_fila_sql(self, consulta_sql, parametros=None):
+        """
+        Método para ejecutar una consulta SQL y devolver solo su primera fila, sin DataFrame.
+        Útil para valores sueltos (longitudes, bloques de un binario) que no conviene
+        copiar a pandas.
+        
+        Args:
+            consulta_sql (str): Consulta SQL a ejecutar.
+            parametros (list, optional): Lista de parámetros para la consulta.
+            
+        Returns:
+            tuple: Valores de la primera fila, o None si la consulta no devolvió filas.
+        """
+        # Verificar si la conexión está abierta
+        if self.conexion_bd is None:
+            raise ValueError("La conexión a la base de datos no está abierta")
+        
+        cursor = None
+        try:
+            # Traducir @nombre a "?" y ordenar los valores según aparecen en el SQL
+            sql, params_values = preparar_consulta(consulta_sql, parametros)
+            
+            # Ejecutar la consulta en el cursor preparado de la conexión
+            cursor = self._obtener_cursor(sql)
+            inicio = time.monotonic()
+            with medir("execute"):
+                cursor.execute(sql, params_values)
+            with medir("fetch"):
+                fila = cursor.fetchone()
+                # Descartar el resto para dejar el cursor listo para la siguiente ejecución
+                if fila is not None:
+                    cursor.fetchall()
+            self._liberar_cursor(cursor)
+            self._registrar_duracion(sql, params_values, inicio, 0 if fila is None else 1)
+            
+            return None if fila is None else tuple(fila)
+        except Exception as ex:
+            print(f"Ocurrió una excepción: {str(ex)}")
+            self._descartar_cursor(cursor)
+            self._procesar_error(ex)
             raise Exception(f"Error al ejecutar la consulta SQL. Error: {str(ex)}")
     
+    def iterar_consulta_sql(self, consulta_sql, parametros=None, tamano_lote=1000):
+        """
+        Método para ejecutar una consulta SQL y recorrer sus resultados por lotes,
+        sin cargar todas las filas en memoria.
+        Usa el cursor de solo avance (forward-only) de pyodbc con fetchmany.
+        
+        Args:
+            consulta_sql (str): Consulta SQL a ejecutar.
+            parametros (list, optional): Lista de parámetros para la consulta.
+            tamano_lote (int): Número de filas que se leen en cada lote.
+            
+        Yields:
+            tuple: (lista de nombres de columna, lista de filas del lote).
+        """
+        # Verificar si la conexión está abierta
+        if self.conexion_bd is None:
+            raise ValueError("La conexión a la base de datos no está abierta")
+        
+        self._aplicar_limite()  # Plazo de la solicitud como tiempo de espera de la consulta
+        cursor = self.conexion_bd.cursor()
+        try:
+            # Traducir @nombre a "?" y ordenar los valores según aparecen en el SQL
+            sql, params_values = preparar_consulta(consulta_sql, parametros)
+            
+            # Ejecutar la consulta (con o sin parámetros)
+            inicio = time.monotonic()
+            with medir("execute"):
+                if params_values:
+                    cursor.execute(sql, params_values)
+                else:
+                    cursor.execute(sql)
+            
+            # Se mide hasta que el servidor empieza a devolver filas (el resto depende del consumidor)
+            self._registrar_duracion(sql, params_values, inicio, -1)
+            
+            # Obtener los nombres de las columnas
+            columnas = [column[0] for column in cursor.description]
+            
+            # Leer los resultados lote a lote hasta agotar el cursor
+            while True:
+                with medir("fetch"):
+                    filas = cursor.fetchmany(tamano_lote)
+                if not filas:
+                    break
+                yield columnas, filas
+        except Exception as ex:
+            print(f"Ocurrió una excepción: {str(ex)}")
+            self._procesar_error(ex)
+            raise Exception(f"Error al recorrer la consulta SQL. Error: {str(ex)}")
+        finally:
+            # Cerrar el cursor aunque el consumidor abandone el recorrido
+            cursor.close()
+    
+    def _procesar_error(self, ex):
+        """
+        Marca la conexión para descartarla (no devolverla al pool) si el error
+        indica que la comunicación con el servidor se perdió, y convierte las
+        cancelaciones por tiempo en ErrorTiempoAgotado (504).
+        
+        Args:
+            ex (Exception): Excepción capturada.
+        """
+        if isinstance(ex, ErrorTiempoAgotado):
+            raise ex
+        if es_error_de_comunicacion(ex):
+            self.descartar_conexion = True
+        if es_error_tiempo_agotado(ex):
+            raise ErrorTiempoAgotado("La consulta superó el tiempo de espera de la solicitud y fue cancelada") from ex
+    
+    def establecer_limite(self, limite):
+        """
+        Establece el plazo de la solicitud para las consultas siguientes.
+        
+        Args:
+            limite (float): Instante límite en el reloj monotónico, o None para no limitar.
+        """
+        self.limite = limite
+    
+    def establecer_consultas_lentas(self, registro):
+        """
+        Establece el registro donde se anotan las consultas que superan el umbral.
+        
+        Args:
+            registro (RegistroConsultasLentas): Registro del proceso, o None para no medir.
+        """
+        self.consultas_lentas = registro
+    
+    def _registrar_duracion(self, sql, valores, inicio, filas):
+        """
+        Entrega la duración de una ejecución al registro de consultas lentas.
+        Un fallo del registro nunca afecta a la consulta.
+        
+        Args:
+            sql (str): SQL ejecutado.
+            valores (list): Valores de los parámetros.
+            inicio (float): Instante (reloj monotónico) en que empezó la ejecución.
+            filas (int): Filas devueltas o afectadas.
+        """
+        if self.consultas_lentas is None:
+            return
+        try:
+            self.consultas_lentas.registrar(sql, valores, time.monotonic() - inicio, filas, self)
+        except Exception as ex:
+            print(f"No se pudo registrar la consulta lenta: {str(ex)}")
+    
+    def _aplicar_limite(self):
+        """
+        Aplica el tiempo restante del plazo como tiempo de espera de la conexión
+        (SQL_ATTR_QUERY_TIMEOUT): el controlador ODBC cancela la sentencia al vencer.
+        Si el plazo ya venció, no se envía la consulta.
+        """
+        if self.limite is None:
+            self.conexion_bd.timeout = 0  # Sin límite (las conexiones del pool se reutilizan)
+            return 0
+        restante = self.limite - time.monotonic()
+        if restante <= 0:
+            raise ErrorTiempoAgotado("El plazo de la solicitud venció antes de ejecutar la consulta")
+        # pyodbc solo admite segundos enteros
+        self.conexion_bd.timeout = max(1, math.ceil(restante))
+        return self.conexion_bd.timeout
+    
+    def _obtener_cursor(self, sql):
+        """
+        Obtiene un cursor para ejecutar el SQL con el plazo de la solicitud.
+        pyodbc fija el tiempo de espera al crear el cursor, por eso el plazo se aplica antes.
+        Con pool, el cursor sale de la caché de sentencias preparadas de la conexión.
+        
+        Args:
+            sql (str): SQL (ya con marcadores "?") que se va a ejecutar.
+            
+        Returns:
+            Cursor: Cursor listo para ejecutar.
+        """
+        tiempo_espera = self._aplicar_limite()  # Plazo de la solicitud como tiempo de espera de la consulta
+        if self.pool is None:
+            return self.conexion_bd.cursor()
+        return self.pool.obtener_sentencias(self.conexion_bd).obtener(self.conexion_bd, sql, tiempo_espera)
+    
+    def _liberar_cursor(self, cursor):
+        """
+        Termina de usar un cursor de _obtener_cursor: se cierra, o se conserva
+        en la caché de sentencias si la conexión es del pool.
+        
+        Args:
+            cursor: Cursor obtenido con _obtener_cursor.
+        """
+        if self.pool is None:
+            cursor.close()
+    
+    def _descartar_cursor(self, cursor):
+        """
+        Cierra un cursor que falló y lo quita de la caché de sentencias.
+        
+        Args:
+            cursor: Cursor obtenido con _obtener_cursor, o None si no se llegó a crear.
+        """
+        if cursor is None or self.conexion_bd is None:
+            return
+        if self.pool is None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        else:
+            self.pool.obtener_sentencias(self.conexion_bd).descartar(cursor)
+    
     def crear_parametro(self, nombre, valor):
         """
         Método para crear un parámetro de consulta SQL.
@@ -270,7 +706,8 @@ class ControlConexion:
             raise ValueError("La conexión no está abierta")
         
         try:
-            # Crear cursor
+            # El tiempo de espera se fija al crear el cursor: aplicar antes el plazo de la solicitud
+            self._aplicar_limite()
             cursor = self.conexion_bd.cursor()
             
             # Preparar los parámetros
@@ -293,11 +730,14 @@ class ControlConexion:
             # Obtener todas las filas
             filas = cursor.fetchall()
             
+            import pandas as pd  # Importación diferida (ver comentario al inicio del archivo)
+            
             # Crear un DataFrame con los resultados
             df = pd.DataFrame.from_records(filas, columns=columnas)
             
             return df
         except Exception as ex:
+            self._procesar_error(ex)
             raise Exception(f"Error al ejecutar el procedimiento almacenado: {str(ex)}")
     
     def ejecutar_funcion(self, nombre_funcion, parametros=None):
@@ -316,7 +756,8 @@ class ControlConexion:
             raise ValueError("La conexión no está abierta")
         
         try:
-            # Crear cursor
+            # El tiempo de espera se fija al crear el cursor: aplicar antes el plazo de la solicitud
+            self._aplicar_limite()
             cursor = self.conexion_bd.cursor()
             
             # Preparar los parámetros
@@ -338,4 +779,5 @@ class ControlConexion:
             
             return resultado
         except Exception as ex:
+            self._procesar_error(ex)
             raise Exception(f"Error al ejecutar la función SQL: {str(ex)}")
\ No newline at end of file
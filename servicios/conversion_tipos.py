@@ -0,0 +1,213 @@
+# servicios/conversion_tipos.py
+# Conversión de valores de texto a los tipos de columna de SQL Server
+# (equivalente a Convert.ChangeType según el tipo de la columna en C#)
+
+import datetime
+import decimal
+import json
+
+# Agrupación de los tipos de dato de SQL Server (INFORMATION_SCHEMA.COLUMNS.DATA_TYPE)
+TIPOS_ENTEROS = {'int', 'bigint', 'smallint', 'tinyint'}
+TIPOS_DECIMALES = {'decimal', 'numeric', 'money', 'smallmoney'}
+TIPOS_FLOTANTES = {'float', 'real'}
+TIPOS_BOOLEANOS = {'bit'}
+TIPOS_TEXTO = {'nvarchar', 'varchar', 'nchar', 'char', 'text', 'ntext', 'uniqueidentifier', 'xml'}
+TIPOS_FECHA = {'date'}
+TIPOS_FECHA_HORA = {'datetime', 'datetime2', 'smalldatetime', 'datetimeoffset'}
+TIPOS_HORA = {'time'}
+TIPOS_BINARIOS = {'binary', 'varbinary', 'image'}
+
+# Valores de texto aceptados para columnas bit
+VALORES_VERDADEROS = {'true', '1', 'yes', 'y', 'si', 'sí', 's'}
+VALORES_FALSOS = {'false', '0', 'no', 'n'}
+
+
+def _a_entero(valor):
+    """Convierte un texto a entero."""
+    return int(valor)
+
+
+def _a_decimal(valor):
+    """Convierte un texto a Decimal sin pérdida de precisión."""
+    try:
+        return decimal.Decimal(valor)
+    except decimal.InvalidOperation:
+        raise ValueError(f"'{valor}' no es un número decimal válido")
+
+
+def _a_flotante(valor):
+    """Convierte un texto a número de punto flotante."""
+    return float(valor)
+
+
+def _a_booleano(valor):
+    """Convierte un texto a booleano."""
+    valor_lower = valor.lower()
+    if valor_lower in VALORES_VERDADEROS:
+        return True
+    if valor_lower in VALORES_FALSOS:
+        return False
+    raise ValueError(f"'{valor}' no es un valor booleano válido")
+
+
+def _a_fecha(valor):
+    """Convierte un texto ISO a fecha."""
+    return datetime.datetime.fromisoformat(valor.replace('Z', '+00:00')).date()
+
+
+def _a_fecha_hora(valor):
+    """Convierte un texto ISO a fecha y hora."""
+    return datetime.datetime.fromisoformat(valor.replace('Z', '+00:00'))
+
+
+def _a_hora(valor):
+    """Convierte un texto ISO a hora."""
+    return datetime.time.fromisoformat(valor)
+
+
+def _a_binario(valor):
+    """Convierte un texto hexadecimal (con o sin prefijo 0x) a bytes."""
+    return bytes.fromhex(valor[2:] if valor.lower().startswith('0x') else valor)
+
+
+def _sin_conversion(valor):
+    """Devuelve el texto sin cambios."""
+    return valor
+
+
+def obtener_convertidor(tipo_dato):
+    """
+    Obtiene la función que convierte un texto al tipo de una columna.
+
+    Args:
+        tipo_dato (str): Tipo de dato de la columna según INFORMATION_SCHEMA.
+
+    Returns:
+        function: Función que recibe un texto y devuelve el valor convertido.
+        Lanza ValueError si el texto no es válido para el tipo.
+    """
+    tipo_dato = (tipo_dato or '').lower()
+    if tipo_dato in TIPOS_ENTEROS:
+        return _a_entero
+    if tipo_dato in TIPOS_DECIMALES:
+        return _a_decimal
+    if tipo_dato in TIPOS_FLOTANTES:
+        return _a_flotante
+    if tipo_dato in TIPOS_BOOLEANOS:
+        return _a_booleano
+    if tipo_dato in TIPOS_FECHA:
+        return _a_fecha
+    if tipo_dato in TIPOS_FECHA_HORA:
+        return _a_fecha_hora
+    if tipo_dato in TIPOS_HORA:
+        return _a_hora
+    if tipo_dato in TIPOS_BINARIOS:
+        return _a_binario
+    # Texto y tipos no reconocidos se envían tal cual; SQL Server hará la conversión
+    return _sin_conversion
+
+
+def _json_a_entero(valor):
+    """Convierte un valor JSON a entero (acepta 5, 5.0 y "5")."""
+    if isinstance(valor, bool):
+        raise ValueError(f"{valor} no es un número entero")
+    if isinstance(valor, float):
+        if not valor.is_integer():
+            raise ValueError(f"{valor} no es un número entero")
+        return int(valor)
+    return int(valor)
+
+
+def _json_a_decimal(valor):
+    """Convierte un valor JSON a Decimal (los flotantes pasan por texto para no arrastrar error binario)."""
+    if isinstance(valor, bool):
+        raise ValueError(f"{valor} no es un número decimal válido")
+    return _a_decimal(str(valor))
+
+
+def _json_a_flotante(valor):
+    """Convierte un valor JSON a número de punto flotante."""
+    if isinstance(valor, bool):
+        raise ValueError(f"{valor} no es un número")
+    return float(valor)
+
+
+def _json_a_booleano(valor):
+    """Convierte un valor JSON a booleano (true/false, 0/1 o los textos aceptados)."""
+    if isinstance(valor, bool):
+        return valor
+    if isinstance(valor, int) and valor in (0, 1):
+        return bool(valor)
+    return _a_booleano(str(valor))
+
+
+def _json_a_texto(valor):
+    """Convierte un valor JSON a texto (objetos y arreglos se guardan como JSON)."""
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor)
+    return valor if isinstance(valor, str) else str(valor)
+
+
+def _json_desde_texto(convertidor):
+    """Crea un convertidor que solo acepta texto (fechas, horas y binarios llegan como texto en JSON)."""
+    def convertir(valor):
+        if not isinstance(valor, str):
+            raise ValueError(f"se esperaba un texto y se recibió {valor!r}")
+        return convertidor(valor)
+    return convertir
+
+
+def _json_sin_conversion(valor):
+    """Devuelve el valor sin cambios (objetos y arreglos como JSON)."""
+    return json.dumps(valor) if isinstance(valor, (dict, list)) else valor
+
+
+def obtener_convertidor_json(tipo_dato):
+    """
+    Obtiene la función que convierte un valor recibido en un cuerpo JSON al tipo de una columna.
+    A diferencia de obtener_convertidor, el valor puede ser número, booleano, texto u objeto.
+
+    Args:
+        tipo_dato (str): Tipo de dato de la columna según INFORMATION_SCHEMA.
+
+    Returns:
+        function: Función que recibe el valor JSON (nunca None) y devuelve el valor convertido.
+        Lanza ValueError si el valor no es válido para el tipo.
+    """
+    tipo_dato = (tipo_dato or '').lower()
+    if tipo_dato in TIPOS_ENTEROS:
+        return _json_a_entero
+    if tipo_dato in TIPOS_DECIMALES:
+        return _json_a_decimal
+    if tipo_dato in TIPOS_FLOTANTES:
+        return _json_a_flotante
+    if tipo_dato in TIPOS_BOOLEANOS:
+        return _json_a_booleano
+    if tipo_dato in TIPOS_TEXTO:
+        return _json_a_texto
+    if tipo_dato in TIPOS_FECHA | TIPOS_FECHA_HORA | TIPOS_HORA | TIPOS_BINARIOS:
+        return _json_desde_texto(obtener_convertidor(tipo_dato))
+    # Tipos no reconocidos se envían tal cual; SQL Server hará la conversión
+    return _json_sin_conversion
+
+
+def obtener_tipos_columnas(conexion, nombre_tabla):
+    """
+    Obtiene los tipos de dato de todas las columnas de una tabla.
+
+    Args:
+        conexion (ControlConexion): Conexión abierta a la base de datos.
+        nombre_tabla (str): Nombre de la tabla.
+
+    Returns:
+        dict: Diccionario {nombre_columna: tipo_dato} en el orden de la tabla.
+    """
+    consulta_sql = """
+        SELECT column_name, data_type
+        FROM information_schema.columns
+        WHERE table_name = @nombreTabla
+        ORDER BY ordinal_position
+    """
+    parametros = [conexion.crear_parametro("@nombreTabla", nombre_tabla)]
+    resultado = conexion.ejecutar_consulta_sql(consulta_sql, parametros)
+    return {fila[0]: str(fila[1]).lower() for fila in resultado.itertuples(index=False, name=None)}
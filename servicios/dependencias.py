@@ -0,0 +1,81 @@
+# servicios/dependencias.py
+# Acceso a los servicios de la aplicación desde los controladores
+# (equivalente a la inyección de dependencias de builder.Services en C#)
+
+from flask import current_app, g, request
+
+from servicios.control_conexion import ControlConexion
+from servicios.plazos import obtener_limite_solicitud
+
+
+def obtener_configuracion():
+    """
+    Obtiene la configuración cargada por la fábrica de la aplicación.
+    Equivalente a inyectar IConfiguration en C#.
+
+    Returns:
+        dict: Contenido de configuracion/config.json (o la configuración recibida por crear_app).
+    """
+    return current_app.config["DATOS_CONFIG"]
+
+
+def obtener_registro_proyectos():
+    """
+    Obtiene el registro de proyectos del proceso actual.
+
+    Returns:
+        RegistroProyectos: Registro con los pools de conexiones de cada proyecto.
+    """
+    return current_app.extensions["registro_proyectos"]
+
+
+def crear_control_conexion(nombre_proyecto=None):
+    """
+    Crea una ControlConexion que toma sus conexiones del pool del proyecto.
+
+    Args:
+        nombre_proyecto (str, optional): Proyecto cuya base de datos se usa.
+            Si es None, se toma del segmento <nombre_proyecto> de la ruta actual.
+
+    Returns:
+        ControlConexion: Instancia nueva (la conexión se obtiene al llamar abrir_bd),
+        con el plazo de la solicitud actual aplicado a sus consultas y el registro
+        de consultas lentas del proceso.
+    """
+    if nombre_proyecto is None:
+        nombre_proyecto = (request.view_args or {}).get("nombre_proyecto")
+    pool = obtener_registro_proyectos().obtener_pool(nombre_proyecto)
+    control_conexion = ControlConexion(configuracion=obtener_configuracion(), pool=pool)
+    control_conexion.establecer_limite(obtener_limite_solicitud())
+    control_conexion.establecer_consultas_lentas(current_app.extensions.get("consultas_lentas"))
+    return control_conexion
+
+
+def obtener_control_conexion():
+    """
+    Obtiene la ControlConexion de la solicitud actual, creándola la primera vez.
+    Equivalente a builder.Services.AddScoped<ControlConexion>() en C#:
+    cada solicitud tiene su propia instancia y los hilos no comparten conexión.
+
+    Returns:
+        ControlConexion: Instancia asociada a la solicitud actual.
+    """
+    if "control_conexion" not in g:
+        g.control_conexion = crear_control_conexion()
+    return g.control_conexion
+
+
+def liberar_control_conexion(excepcion=None):
+    """
+    Cierra la conexión de la solicitud si quedó abierta.
+    Se registra con teardown_appcontext para que se ejecute al terminar cada solicitud.
+
+    Args:
+        excepcion: Excepción que terminó la solicitud, si la hubo.
+    """
+    control_conexion = g.pop("control_conexion", None)
+    if control_conexion is not None:
+        try:
+            control_conexion.cerrar_bd()
+        except Exception as ex:
+            print(f"Error al liberar la conexión de la solicitud: {str(ex)}")
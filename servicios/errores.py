@@ -0,0 +1,55 @@
+# servicios/errores.py
+# Excepciones de la API que se traducen directamente a una respuesta HTTP
+# (equivalente a devolver StatusCode(...) desde un filtro de excepciones en C#)
+
+
+class ErrorApi(Exception):
+    """
+    Error con un código HTTP asociado. Los controladores lo dejan propagar y el
+    manejador registrado en app.py lo convierte en {"error": mensaje} con su código.
+    """
+
+    codigo_estado = 500
+
+    def __init__(self, mensaje, codigo_estado=None, cabeceras=None):
+        """
+        Args:
+            mensaje (str): Descripción del error que se devuelve al cliente.
+            codigo_estado (int, optional): Código HTTP; por defecto el de la clase.
+            cabeceras (dict, optional): Cabeceras HTTP adicionales de la respuesta.
+        """
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        if codigo_estado is not None:
+            self.codigo_estado = codigo_estado
+        self.cabeceras = cabeceras or {}
+
+
+class ErrorServicioNoDisponible(ErrorApi):
+    """Recurso saturado temporalmente (503); el cliente puede reintentar."""
+
+    codigo_estado = 503
+
+    def __init__(self, mensaje, segundos_reintento=1):
+        """
+        Args:
+            mensaje (str): Descripción del error.
+            segundos_reintento (int): Valor de la cabecera Retry-After.
+        """
+        super().__init__(mensaje, cabeceras={"Retry-After": str(max(1, int(segundos_reintento)))})
+
+
+class ErrorPoolAgotado(ErrorServicioNoDisponible):
+    """No hay conexiones libres en el pool del proyecto dentro del tiempo de espera."""
+
+
+class ErrorTiempoAgotado(ErrorApi):
+    """La consulta superó el plazo de la solicitud y fue cancelada (504)."""
+
+    codigo_estado = 504
+
+
+class ErrorLimiteTasa(ErrorApi):
+    """El cliente superó su tasa de solicitudes (429); debe esperar Retry-After segundos."""
+
+    codigo_estado = 429
@@ -0,0 +1,384 @@
+# servicios/escritura_diferida.py
+# Cola de escritura diferida (write-behind) para inserciones pequeñas y frecuentes
+# (equivalente a un Channel<T> consumido por un BackgroundService que hace SqlBulkCopy en C#)
+#
+# Pensada para tablas de telemetría que reciben muchos crear por segundo: en lugar de
+# abrir conexión y confirmar una fila por solicitud, crear valida la fila con el plan de
+# escritura de la tabla, la encola y responde 202 con un identificador. Un hilo escritor
+# vacía la cola cada IntervaloVaciadoMs (o antes, si se juntan FilasPorLote filas) con
+# INSERT de varias filas y una sola confirmación por grupo.
+#
+# Se activa por solicitud con ?async=1 o para todas las inserciones de las tablas
+# listadas en Tablas. La cola está acotada en filas y memoria: si se llena, crear
+# responde 503 con Retry-After. Al terminar el proceso se vacía lo pendiente.
+# Las filas encoladas no están en la base de datos hasta el siguiente vaciado; si un
+# grupo falla, sus filas se reintentan de una en una y las que fallan se anotan en
+# los errores recientes (GET /admin/escritura-diferida).
+# Tras confirmar cada grupo se hace con sus filas lo mismo que los after_request de crear:
+# se anotan en el registro de cambios, se publican como eventos y se actualizan la
+# instantánea y el índice de búsqueda de la tabla.
+#
+# Configuración (configuracion/config.json):
+#     "EscrituraDiferida": {
+#         "Habilitado": true,
+#         "MaxFilasEnCola": 50000,
+#         "MaxMemoriaMB": 32,
+#         "FilasPorLote": 1000,
+#         "IntervaloVaciadoMs": 200,
+#         "Tablas": [{"Proyecto": "telemetria", "Tabla": "lecturas"}]
+#     }
+
+import collections
+import sys
+import threading
+import time
+import uuid
+
+from flask import current_app
+
+from servicios.cambios import anotar_cambios, obtener_config_cambios
+from servicios.control_conexion import ControlConexion
+from servicios.errores import ErrorServicioNoDisponible
+from servicios.eventos import quitar_contrasenas
+from servicios.registro_proyectos import PROYECTO_POR_DEFECTO
+
+# SQL Server admite hasta 2100 parámetros por comando y 1000 filas por VALUES
+MAX_PARAMETROS_COMANDO = 2000
+MAX_FILAS_COMANDO = 1000
+
+# Errores recientes que se conservan para el endpoint de estado
+MAX_ERRORES_RECIENTES = 100
+
+
+def _tamano_fila(valores):
+    """Estimación de la memoria que ocupa una fila encolada (en bytes)."""
+    return 64 + sum(sys.getsizeof(valor) for valor in valores)
+
+
+class ColaEscrituraDiferida:
+    """
+    Filas pendientes de insertar del proceso actual, agrupadas por
+    (proyecto, tabla, columnas) para poder escribirlas con un mismo INSERT.
+    """
+
+    def __init__(self, configuracion, registro_proyectos, extensiones=None):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+            registro_proyectos (RegistroProyectos): Registro con los pools de cada proyecto.
+            extensiones (dict): Servicios del proceso (app.extensions) que se actualizan
+                tras cada grupo escrito (eventos, instantáneas, búsqueda de texto).
+        """
+        config_escritura = configuracion.get("EscrituraDiferida", {})
+        self.configuracion = configuracion
+        self.registro_proyectos = registro_proyectos
+        self.extensiones = extensiones if extensiones is not None else {}
+        self.max_filas = int(config_escritura.get("MaxFilasEnCola", 50000))
+        self.max_bytes = int(float(config_escritura.get("MaxMemoriaMB", 32)) * 1024 * 1024)
+        self.filas_por_lote = int(config_escritura.get("FilasPorLote", 1000))
+        self.intervalo = float(config_escritura.get("IntervaloVaciadoMs", 200)) / 1000
+
+        # Tablas que siempre se escriben en diferido: {(proyecto, tabla)}
+        self.tablas = {
+            (registro_proyectos.obtener_configuracion_proyecto(datos.get("Proyecto", PROYECTO_POR_DEFECTO)).nombre,
+             datos["Tabla"].lower())
+            for datos in config_escritura.get("Tablas", [])
+        }
+
+        # {(proyecto, tabla, columnas): [(id, valores, bytes, clave primaria)]}
+        self._pendientes = {}
+        self._filas = 0  # Filas encoladas o en escritura
+        self._bytes = 0
+        self._condicion = threading.Condition()
+        self._candado_escritura = threading.Lock()  # Un solo vaciado a la vez
+        self._detener = False
+        self._hilo = None
+
+        self.encoladas = 0
+        self.escritas = 0
+        self.fallidas = 0
+        self.rechazadas = 0
+        self.grupos = 0
+        self.errores = collections.deque(maxlen=MAX_ERRORES_RECIENTES)
+
+    def _proyecto(self, nombre_proyecto):
+        """Obtiene el nombre del proyecto ya resuelto (alias y proyecto por defecto)."""
+        return self.registro_proyectos.obtener_configuracion_proyecto(nombre_proyecto).nombre
+
+    def aplica(self, nombre_proyecto, nombre_tabla, solicitado):
+        """
+        Indica si una inserción se escribe en diferido.
+
+        Args:
+            nombre_proyecto (str): Proyecto tomado de la ruta.
+            nombre_tabla (str): Tabla tomada de la ruta.
+            solicitado (bool): True si el cliente pidió ?async=1.
+
+        Returns:
+            bool: True si la fila debe encolarse.
+        """
+        return solicitado or (self._proyecto(nombre_proyecto), nombre_tabla.lower()) in self.tablas
+
+    def encolar(self, nombre_proyecto, nombre_tabla, propiedades, clave=None):
+        """
+        Deja una fila en la cola. La fila ya debe venir validada y convertida
+        con el plan de escritura de la tabla (ver servicios/planes_escritura.py).
+
+        Args:
+            nombre_proyecto (str): Proyecto tomado de la ruta.
+            nombre_tabla (str): Tabla tomada de la ruta.
+            propiedades (dict): {columna real: valor convertido} (con la contraseña cifrada).
+            clave (dict, optional): {columna: valor} de la clave primaria de la fila, o None si
+                la genera la base de datos (el registro de cambios anota una resincronización).
+
+        Returns:
+            str: Identificador de la fila encolada.
+
+        Raises:
+            ErrorServicioNoDisponible: Si la cola está llena (503).
+        """
+        proyecto = self._proyecto(nombre_proyecto)
+        columnas = tuple(propiedades)
+        valores = tuple(propiedades.values())
+        tamano = _tamano_fila(valores)
+        identificador = uuid.uuid4().hex
+
+        with self._condicion:
+            if self._detener:
+                raise ErrorServicioNoDisponible("La cola de escritura diferida se está cerrando")
+            if self._filas >= self.max_filas or self._bytes + tamano > self.max_bytes:
+                self.rechazadas += 1
+                raise ErrorServicioNoDisponible("La cola de escritura diferida está llena", max(1, self.intervalo * 2))
+            self._pendientes.setdefault((proyecto, nombre_tabla.lower(), columnas), []).append((identificador, valores, tamano, clave))
+            self._filas += 1
+            self._bytes += tamano
+            self.encoladas += 1
+            if self._filas >= self.filas_por_lote:
+                self._condicion.notify()
+        return identificador
+
+    def vaciar(self):
+        """
+        Escribe todas las filas pendientes, un grupo (proyecto, tabla, columnas) por transacción.
+        Si no se puede conectar con la base de datos, el grupo vuelve a la cola.
+        """
+        with self._candado_escritura:
+            with self._condicion:
+                pendientes, self._pendientes = self._pendientes, {}
+
+            for (proyecto, tabla, columnas), filas in pendientes.items():
+                try:
+                    escritas = self._escribir_grupo(proyecto, tabla, columnas, filas)
+                except ErrorServicioNoDisponible as ex:
+                    # Pool agotado o base de datos caída: se reintenta en el siguiente vaciado
+                    print(f"No se pudo escribir el grupo diferido de {proyecto}/{tabla}: {str(ex)}")
+                    with self._condicion:
+                        self._pendientes.setdefault((proyecto, tabla, columnas), [])[:0] = filas
+                    continue
+                with self._condicion:
+                    self._filas -= len(filas)
+                    self._bytes -= sum(tamano for _, _, tamano, _ in filas)
+                try:
+                    self._notificar_escritura(proyecto, tabla, columnas, escritas)
+                except Exception as ex:
+                    print(f"No se pudo notificar el grupo diferido de {proyecto}/{tabla}: {str(ex)}")
+
+    def _escribir_grupo(self, proyecto, tabla, columnas, filas):
+        """
+        Inserta un grupo de filas con INSERT de varias filas y una sola confirmación.
+        Si el grupo falla, las filas se insertan de una en una para aislar las erróneas.
+
+        Returns:
+            list: Filas que quedaron escritas.
+        """
+        texto_columnas = ", ".join(f"[{columna}]" for columna in columnas)
+        marcadores = "(" + ", ".join("?" for _ in columnas) + ")"
+        filas_por_comando = max(1, min(MAX_FILAS_COMANDO, MAX_PARAMETROS_COMANDO // len(columnas)))
+
+        comandos = []
+        for inicio in range(0, len(filas), filas_por_comando):
+            tramo = filas[inicio:inicio + filas_por_comando]
+            consulta_sql = f"INSERT INTO {tabla} ({texto_columnas}) VALUES {', '.join([marcadores] * len(tramo))}"
+            comandos.append((consulta_sql, [valor for _, valores, _, _ in tramo for valor in valores]))
+
+        control_conexion = ControlConexion(
+            configuracion=self.configuracion, pool=self.registro_proyectos.obtener_pool(proyecto)
+        )
+        try:
+            try:
+                control_conexion.abrir_bd()
+            except ErrorServicioNoDisponible:
+                raise
+            except Exception as ex:
+                raise ErrorServicioNoDisponible(f"No se pudo abrir la conexión: {str(ex)}")
+
+            try:
+                control_conexion.ejecutar_comandos_sql_transaccion(comandos)
+                self.escritas += len(filas)
+                self.grupos += 1
+                return filas
+            except Exception as ex:
+                if control_conexion.descartar_conexion:
+                    # Conexión rota: no es culpa de las filas, el grupo se reintenta entero
+                    raise ErrorServicioNoDisponible(f"Se perdió la conexión: {str(ex)}")
+                print(f"Falló el grupo diferido de {proyecto}/{tabla} ({len(filas)} filas); se reintenta fila a fila: {str(ex)}")
+
+            # Aislar las filas erróneas: cada una en su propia transacción
+            consulta_sql = f"INSERT INTO {tabla} ({texto_columnas}) VALUES {marcadores}"
+            escritas = []
+            for fila in filas:
+                identificador, valores, _, _ = fila
+                try:
+                    control_conexion.ejecutar_comandos_sql_transaccion([(consulta_sql, list(valores))])
+                    self.escritas += 1
+                    escritas.append(fila)
+                except Exception as ex:
+                    self.fallidas += 1
+                    self.errores.append({
+                        "id": identificador,
+                        "proyecto": proyecto,
+                        "tabla": tabla,
+                        "error": str(ex),
+                        "instante": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    })
+            return escritas
+        finally:
+            control_conexion.cerrar_bd()
+
+    def _notificar_escritura(self, proyecto, tabla, columnas, filas):
+        """
+        Aplica a los demás servicios las filas ya confirmadas, como los after_request de crear:
+        registro de cambios, eventos, instantánea e índice de búsqueda de la tabla.
+        """
+        if not filas:
+            return
+
+        registro_habilitado, tabla_registro = obtener_config_cambios(self.configuracion)
+        if registro_habilitado:
+            claves = [clave for _, _, _, clave in filas]
+            control_conexion = ControlConexion(
+                configuracion=self.configuracion, pool=self.registro_proyectos.obtener_pool(proyecto)
+            )
+            try:
+                control_conexion.abrir_bd()
+                # Si alguna clave la generó la base de datos, el cliente resincroniza la tabla
+                anotar_cambios(control_conexion, tabla_registro, tabla, "I",
+                               claves if all(clave is not None for clave in claves) else [None])
+            except Exception as ex:
+                print(f"No se pudieron anotar los cambios diferidos de {proyecto}/{tabla}: {str(ex)}")
+            finally:
+                control_conexion.cerrar_bd()
+
+        concentrador = self.extensiones.get("eventos")
+        if concentrador is not None:
+            for _, valores, _, _ in filas:
+                concentrador.publicar(proyecto, tabla, "I", quitar_contrasenas(dict(zip(columnas, valores))))
+
+        almacen = self.extensiones.get("instantaneas")
+        if almacen is not None:
+            almacen.refrescar(proyecto, tabla)
+
+        buscador = self.extensiones.get("busqueda_texto")
+        columna_clave = buscador.columna_clave(proyecto, tabla) if buscador is not None else None
+        if columna_clave is not None:
+            posicion = next((posicion for posicion, columna in enumerate(columnas)
+                             if columna.lower() == columna_clave.lower()), None)
+            valores_clave = [] if posicion is None else [valores[posicion] for _, valores, _, _ in filas]
+            if valores_clave and all(valor is not None for valor in valores_clave):
+                buscador.actualizar_filas(proyecto, tabla, valores_clave)
+            else:
+                buscador.reconstruir(proyecto, tabla)
+
+    def iniciar(self):
+        """Inicia el hilo escritor."""
+        def ciclo():
+            while True:
+                with self._condicion:
+                    self._condicion.wait_for(lambda: self._detener or self._filas >= self.filas_por_lote, self.intervalo)
+                    if self._detener:
+                        return
+                try:
+                    self.vaciar()
+                except Exception as ex:
+                    print(f"Error en el vaciado de la escritura diferida: {str(ex)}")
+
+        self._hilo = threading.Thread(target=ciclo, name="escritura-diferida", daemon=True)
+        self._hilo.start()
+
+    def cerrar(self):
+        """Deja de aceptar filas, detiene el hilo escritor y escribe lo pendiente."""
+        with self._condicion:
+            self._detener = True
+            self._condicion.notify_all()
+        if self._hilo is not None:
+            self._hilo.join()
+        self.vaciar()
+        if self._filas:
+            print(f"Quedaron {self._filas} filas de escritura diferida sin escribir al cerrar el proceso")
+
+    def estadisticas(self):
+        """
+        Obtiene el estado de la cola.
+
+        Returns:
+            dict: Filas y memoria en cola, contadores y errores recientes.
+        """
+        with self._condicion:
+            por_tabla = collections.Counter()
+            for (proyecto, tabla, _), filas in self._pendientes.items():
+                por_tabla[f"{proyecto}/{tabla}"] += len(filas)
+            estadisticas = {
+                "en_cola": self._filas,
+                "memoria_mb": round(self._bytes / (1024 * 1024), 3),
+                "max_filas": self.max_filas,
+                "max_memoria_mb": round(self.max_bytes / (1024 * 1024), 3),
+                "pendientes_por_tabla": dict(por_tabla),
+            }
+        estadisticas.update({
+            "encoladas": self.encoladas,
+            "escritas": self.escritas,
+            "fallidas": self.fallidas,
+            "rechazadas": self.rechazadas,
+            "grupos": self.grupos,
+            "errores_recientes": list(self.errores),
+        })
+        return estadisticas
+
+
+def inicializar_escritura_diferida(app):
+    """
+    Crea la cola de escritura diferida del proceso e inicia su hilo escritor
+    (se ejecuta después del fork, a continuación del registro de proyectos).
+
+    Args:
+        app (Flask): Aplicación donde se guarda la cola.
+    """
+    configuracion = app.config["DATOS_CONFIG"]
+    if not configuracion.get("EscrituraDiferida", {}).get("Habilitado", False):
+        return
+    cola = ColaEscrituraDiferida(configuracion, app.extensions["registro_proyectos"], app.extensions)
+    cola.iniciar()
+    app.extensions["escritura_diferida"] = cola
+
+
+def finalizar_escritura_diferida(app):
+    """
+    Escribe las filas pendientes y detiene el hilo escritor
+    (se registra después del registro de proyectos para ejecutarse antes de cerrar los pools).
+
+    Args:
+        app (Flask): Aplicación donde se guardó la cola.
+    """
+    cola = app.extensions.pop("escritura_diferida", None)
+    if cola is not None:
+        cola.cerrar()
+
+
+def obtener_cola_escritura():
+    """
+    Obtiene la cola de escritura diferida del proceso actual.
+
+    Returns:
+        ColaEscrituraDiferida: Cola creada por inicializar_escritura_diferida, o None si está deshabilitada.
+    """
+    return current_app.extensions.get("escritura_diferida")
@@ -0,0 +1,113 @@
+# servicios/esquema.py
+# Consultas al catálogo de la base de datos (INFORMATION_SCHEMA)
+# (equivalente a los métodos de metadatos de un repositorio genérico en C#)
+
+
+def obtener_clave_primaria(conexion, nombre_tabla):
+    """
+    Obtiene las columnas de la clave primaria de una tabla consultando INFORMATION_SCHEMA.
+    
+    Args:
+        conexion (ControlConexion): Conexión abierta a la base de datos.
+        nombre_tabla (str): Nombre de la tabla.
+        
+    Returns:
+        list: Nombres de las columnas de la clave primaria, en orden (vacía si no tiene).
+    """
+    consulta_sql = """
+        SELECT kcu.COLUMN_NAME
+        FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+        JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
+            ON tc.CONSTRAINT_NAME = kcu.CONSTRAINT_NAME AND tc.TABLE_NAME = kcu.TABLE_NAME
+        WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY' AND tc.TABLE_NAME = @nombreTabla
+        ORDER BY kcu.ORDINAL_POSITION
+    """
+    parametros = [conexion.crear_parametro("@nombreTabla", nombre_tabla)]
+    resultado = conexion.ejecutar_consulta_sql(consulta_sql, parametros)
+    return [] if resultado.empty else resultado.iloc[:, 0].tolist()
+
+
+def obtener_indices(conexion, nombre_tabla):
+    """
+    Obtiene los índices de una tabla con sus columnas clave en orden, consultando el catálogo.
+    
+    Args:
+        conexion (ControlConexion): Conexión abierta a la base de datos.
+        nombre_tabla (str): Nombre de la tabla.
+        
+    Returns:
+        list: Diccionarios {"nombre", "tipo", "unico", "columnas"} (las columnas INCLUDE no se listan).
+    """
+    consulta_sql = """
+        SELECT i.name AS indice, i.type_desc AS tipo, i.is_unique AS unico, c.name AS columna
+        FROM sys.indexes i
+        JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+        JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+        WHERE i.object_id = OBJECT_ID(@nombreTabla) AND ic.key_ordinal > 0
+        ORDER BY i.index_id, ic.key_ordinal
+    """
+    parametros = [conexion.crear_parametro("@nombreTabla", nombre_tabla)]
+    resultado = conexion.ejecutar_consulta_sql(consulta_sql, parametros)
+    indices = {}
+    for nombre, tipo, unico, columna in resultado.itertuples(index=False, name=None):
+        indice = indices.setdefault(nombre, {"nombre": nombre, "tipo": tipo, "unico": bool(unico), "columnas": []})
+        indice["columnas"].append(columna)
+    return list(indices.values())
+
+
+def contar_filas(conexion, nombre_tabla):
+    """
+    Obtiene el número aproximado de filas de una tabla desde el catálogo (sin recorrerla).
+    
+    Args:
+        conexion (ControlConexion): Conexión abierta a la base de datos.
+        nombre_tabla (str): Nombre de la tabla.
+        
+    Returns:
+        int: Filas según sys.partitions, o None si la tabla no existe.
+    """
+    consulta_sql = """
+        SELECT SUM(p.rows) AS filas
+        FROM sys.partitions p
+        WHERE p.object_id = OBJECT_ID(@nombreTabla) AND p.index_id IN (0, 1)
+    """
+    parametros = [conexion.crear_parametro("@nombreTabla", nombre_tabla)]
+    resultado = conexion.ejecutar_consulta_sql(consulta_sql, parametros)
+    if resultado.empty:
+        return None
+    filas = resultado.iloc[0, 0]
+    # SUM sin filas devuelve NULL (None o NaN en el DataFrame)
+    if filas is None or filas != filas:
+        return None
+    return int(filas)
+
+
+def obtener_claves_foraneas(conexion, nombre_tabla):
+    """
+    Obtiene las claves foráneas de una tabla y la tabla y columna a las que apunta cada una.
+    
+    Args:
+        conexion (ControlConexion): Conexión abierta a la base de datos.
+        nombre_tabla (str): Nombre de la tabla.
+        
+    Returns:
+        dict: {nombre_restriccion: [(columna, tabla_referida, columna_referida), ...]}
+        con las columnas de cada restricción en orden.
+    """
+    consulta_sql = """
+        SELECT rc.CONSTRAINT_NAME, kcu.COLUMN_NAME, ref.TABLE_NAME, ref.COLUMN_NAME
+        FROM INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS rc
+        JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
+            ON kcu.CONSTRAINT_NAME = rc.CONSTRAINT_NAME AND kcu.CONSTRAINT_SCHEMA = rc.CONSTRAINT_SCHEMA
+        JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE ref
+            ON ref.CONSTRAINT_NAME = rc.UNIQUE_CONSTRAINT_NAME AND ref.CONSTRAINT_SCHEMA = rc.UNIQUE_CONSTRAINT_SCHEMA
+            AND ref.ORDINAL_POSITION = kcu.ORDINAL_POSITION
+        WHERE kcu.TABLE_NAME = @nombreTabla
+        ORDER BY rc.CONSTRAINT_NAME, kcu.ORDINAL_POSITION
+    """
+    parametros = [conexion.crear_parametro("@nombreTabla", nombre_tabla)]
+    resultado = conexion.ejecutar_consulta_sql(consulta_sql, parametros)
+    claves = {}
+    for restriccion, columna, tabla_referida, columna_referida in resultado.itertuples(index=False, name=None):
+        claves.setdefault(restriccion, []).append((columna, tabla_referida, columna_referida))
+    return claves
@@ -0,0 +1,430 @@
+# servicios/eventos.py
+# Publicación/suscripción en proceso de los cambios hechos a través de la API,
+# entregados a los clientes como Server-Sent Events (SSE)
+# (equivalente a un Hub de SignalR alimentado por el controlador en C#)
+#
+# crear, actualizar y eliminar publican un evento al terminar bien; cada suscriptor
+# de GET /api/<proyecto>/<tabla>/eventos lo recibe si pasa sus filtros:
+#     ?operaciones=I,U                 (I = crear, U = actualizar, D = eliminar,
+#                                       R = resincronizar)
+#     ?filtro=estado:eq:pagada         (misma gramática que servicios/filtros.py,
+#                                       evaluada sobre los datos del evento)
+# Si una actualización cambia la clave, los datos llevan la clave nueva y el evento
+# incluye "clave_anterior" con la de la URL, para que el cliente mueva la fila.
+# combinar, importar-csv y las consultas registradas con "Escritura": true no
+# identifican una fila: publican un evento R sin datos (que no pasa por los filtros)
+# para que el cliente vuelva a leer la tabla.
+# Cada suscriptor tiene un búfer acotado: si no consume a tiempo y el búfer se llena,
+# se le desconecta (el cliente SSE se reconecta solo) en lugar de frenar a los demás.
+# Si no hay eventos, se envía un comentario de latido para mantener viva la conexión.
+#
+# El concentrador es del proceso: con varios trabajadores de gunicorn, un suscriptor solo
+# recibe los cambios atendidos por su mismo trabajador. Cada flujo ocupa además un hilo
+# del trabajador gthread mientras está abierto: gunicorn.conf.py crea MaxSuscriptores
+# hilos por trabajador además de Servidor.HilosPorTrabajador, y los suscriptores por
+# trabajador se limitan a MaxSuscriptores, así los flujos nunca ocupan los hilos de las
+# demás solicitudes. Para más suscriptores, subir MaxSuscriptores (cada uno es un hilo
+# casi siempre dormido) o el número de trabajadores.
+#
+# Configuración (configuracion/config.json):
+#     "Eventos": {"TamanoBufer": 100, "LatidoSegundos": 15, "MaxSuscriptores": 50}
+
+import itertools
+import json
+import queue
+import threading
+
+from flask import current_app, g, request
+
+from servicios.errores import ErrorApi, ErrorServicioNoDisponible
+from servicios.filtros import OPERADORES_COMPARACION, OPERADORES_NULOS
+from servicios.instantaneas import ENDPOINT_CONSULTA_PARAMETRIZADA, es_consulta_escritura
+from servicios.planes_escritura import CLAVES_CONTRASENA
+
+# Evento de cambios sin fila identificable: el cliente vuelve a leer la tabla
+OPERACION_RESINCRONIZAR = "R"
+
+# Operaciones a las que se puede suscribir un cliente
+OPERACIONES_EVENTOS = ("I", "U", "D", OPERACION_RESINCRONIZAR)
+
+# Rutas que publican eventos y la operación que representan
+OPERACIONES_ENDPOINT = {
+    "crear": "I",
+    "actualizar": "U",
+    "eliminar": "D",
+    "combinar": OPERACION_RESINCRONIZAR,
+    "importar_csv": OPERACION_RESINCRONIZAR,
+}
+
+# Marca que se deja en el búfer para terminar un flujo
+_FIN = object()
+
+
+def _comparar(valor_evento, operador, valor_filtro):
+    """Compara un valor del evento con el del filtro, como números si ambos lo son."""
+    try:
+        izquierda, derecha = float(valor_evento), float(valor_filtro)
+    except (TypeError, ValueError):
+        izquierda, derecha = str(valor_evento).lower(), str(valor_filtro).lower()
+    if operador == "eq":
+        return izquierda == derecha
+    if operador == "ne":
+        return izquierda != derecha
+    if operador == "gt":
+        return izquierda > derecha
+    if operador == "ge":
+        return izquierda >= derecha
+    if operador == "lt":
+        return izquierda < derecha
+    return izquierda <= derecha
+
+
+def crear_predicado(filtros):
+    """
+    Convierte los filtros columna:operador:valor en una función que evalúa los datos de un evento.
+    Una columna que no viene en el evento no cumple ningún filtro salvo "null".
+
+    Args:
+        filtros (list): Textos "columna:operador:valor".
+
+    Returns:
+        function: Función (datos del evento) -> bool.
+
+    Raises:
+        ErrorApi: Si un filtro está mal formado (400).
+    """
+    condiciones = []
+    for filtro in filtros:
+        partes = filtro.split(":", 2)
+        if len(partes) < 2:
+            raise ErrorApi(f"Filtro no válido '{filtro}': use columna:operador:valor", 400)
+        columna, operador = partes[0].strip().lower(), partes[1].strip().lower()
+        valor = partes[2] if len(partes) > 2 else None
+        if operador not in OPERADORES_NULOS and valor is None:
+            raise ErrorApi(f"El filtro '{filtro}' necesita un valor", 400)
+        if operador not in OPERADORES_COMPARACION and operador not in OPERADORES_NULOS and operador != "in":
+            raise ErrorApi(f"Operador '{operador}' no soportado en el filtro '{filtro}'", 400)
+        condiciones.append((columna, operador, valor))
+
+    def predicado(datos):
+        datos = {clave.lower(): valor for clave, valor in datos.items()}
+        for columna, operador, valor in condiciones:
+            actual = datos.get(columna)
+            if operador == "null":
+                cumple = actual is None
+            elif operador == "notnull":
+                cumple = actual is not None
+            elif actual is None:
+                cumple = False
+            elif operador == "in":
+                cumple = any(_comparar(actual, "eq", elemento) for elemento in valor.split(","))
+            elif operador == "like":
+                cumple = valor.strip("%").lower() in str(actual).lower()
+            else:
+                cumple = _comparar(actual, operador, valor)
+            if not cumple:
+                return False
+        return True
+
+    return predicado
+
+
+class Suscripcion:
+    """
+    Suscriptor de los eventos de una tabla, con su búfer acotado.
+    """
+
+    def __init__(self, operaciones, predicado, tamano_bufer):
+        """
+        Args:
+            operaciones (set): Operaciones que interesan (I, U, D).
+            predicado (function): Filtro sobre los datos del evento.
+            tamano_bufer (int): Eventos pendientes máximos antes de desconectar.
+        """
+        self.operaciones = operaciones
+        self.predicado = predicado
+        self.bufer = queue.Queue(maxsize=tamano_bufer)
+        self.desconectada = False
+
+    def entregar(self, evento):
+        """
+        Deja el evento en el búfer si pasa los filtros.
+
+        Args:
+            evento (dict): Evento publicado.
+
+        Returns:
+            bool: False si el búfer estaba lleno y la suscripción debe desconectarse.
+        """
+        if evento["operacion"] not in self.operaciones:
+            return True
+        if evento["operacion"] != OPERACION_RESINCRONIZAR and not self.predicado(evento["datos"]):
+            return True
+        try:
+            self.bufer.put_nowait(evento)
+            return True
+        except queue.Full:
+            return False
+
+    def cerrar(self):
+        """Termina el flujo del suscriptor aunque su búfer esté lleno."""
+        self.desconectada = True
+        while True:
+            try:
+                self.bufer.put_nowait(_FIN)
+                return
+            except queue.Full:
+                try:
+                    self.bufer.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class ConcentradorEventos:
+    """
+    Reparte los eventos publicados entre las suscripciones de cada (proyecto, tabla).
+    """
+
+    def __init__(self, configuracion):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+        """
+        config_eventos = configuracion.get("Eventos", {})
+        self.tamano_bufer = int(config_eventos.get("TamanoBufer", 100))
+        self.latido = float(config_eventos.get("LatidoSegundos", 15))
+
+        # Cada flujo ocupa uno de los hilos que gunicorn.conf.py reserva para suscriptores
+        self.max_suscriptores = int(config_eventos.get("MaxSuscriptores", 50))
+        print(f"Suscriptores de eventos: hasta {self.max_suscriptores} por trabajador")
+
+        self._suscripciones = {}  # (proyecto, tabla) -> set de Suscripcion
+        self._candado = threading.Lock()
+        self._secuencia = itertools.count(1)
+        self.publicados = 0
+        self.desconectados = 0
+
+    def suscribir(self, nombre_proyecto, nombre_tabla, operaciones, predicado):
+        """
+        Crea una suscripción a los eventos de una tabla.
+
+        Args:
+            nombre_proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla observada.
+            operaciones (set): Operaciones que interesan.
+            predicado (function): Filtro sobre los datos del evento.
+
+        Returns:
+            Suscripcion: Suscripción registrada.
+
+        Raises:
+            ErrorServicioNoDisponible: Si se alcanzó MaxSuscriptores (503).
+        """
+        clave = (nombre_proyecto.lower(), nombre_tabla.lower())
+        with self._candado:
+            if sum(len(grupo) for grupo in self._suscripciones.values()) >= self.max_suscriptores:
+                raise ErrorServicioNoDisponible("Se alcanzó el máximo de suscriptores de eventos", segundos_reintento=30)
+            suscripcion = Suscripcion(operaciones, predicado, self.tamano_bufer)
+            self._suscripciones.setdefault(clave, set()).add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, nombre_proyecto, nombre_tabla, suscripcion):
+        """
+        Elimina una suscripción (el cliente cerró la conexión o fue desconectado).
+
+        Args:
+            nombre_proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla observada.
+            suscripcion (Suscripcion): Suscripción a eliminar.
+        """
+        clave = (nombre_proyecto.lower(), nombre_tabla.lower())
+        with self._candado:
+            grupo = self._suscripciones.get(clave)
+            if grupo is not None:
+                grupo.discard(suscripcion)
+                if not grupo:
+                    del self._suscripciones[clave]
+
+    def publicar(self, nombre_proyecto, nombre_tabla, operacion, datos, clave_anterior=None):
+        """
+        Publica un cambio a los suscriptores de la tabla.
+        Los suscriptores con el búfer lleno se desconectan.
+
+        Args:
+            nombre_proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla modificada.
+            operacion (str): I, U, D o R.
+            datos (dict): Columnas del cambio (sin contraseñas).
+            clave_anterior (dict, optional): {columna: valor} de la clave antes de una
+                actualización que la cambió; los datos llevan la clave nueva.
+        """
+        clave = (nombre_proyecto.lower(), nombre_tabla.lower())
+        with self._candado:
+            grupo = list(self._suscripciones.get(clave, ()))
+        if not grupo:
+            return
+
+        evento = {
+            "id": next(self._secuencia),
+            "proyecto": nombre_proyecto,
+            "tabla": nombre_tabla,
+            "operacion": operacion,
+            "datos": datos,
+        }
+        if clave_anterior is not None:
+            evento["clave_anterior"] = clave_anterior
+        self.publicados += 1
+        for suscripcion in grupo:
+            if not suscripcion.entregar(evento):
+                self.desconectados += 1
+                suscripcion.cerrar()
+                self.cancelar(nombre_proyecto, nombre_tabla, suscripcion)
+
+    def generar_flujo(self, nombre_proyecto, nombre_tabla, suscripcion):
+        """
+        Genera el cuerpo text/event-stream de una suscripción.
+
+        Args:
+            nombre_proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla observada.
+            suscripcion (Suscripcion): Suscripción del cliente.
+
+        Yields:
+            str: Eventos SSE y comentarios de latido.
+        """
+        try:
+            yield f"retry: {int(self.latido * 1000)}\n\n"
+            while True:
+                try:
+                    evento = suscripcion.bufer.get(timeout=self.latido)
+                except queue.Empty:
+                    yield ": latido\n\n"
+                    continue
+                if evento is _FIN:
+                    if suscripcion.desconectada:
+                        yield "event: desconectado\ndata: {}\n\n"
+                    return
+                datos = json.dumps(evento, ensure_ascii=False, default=str)
+                yield f"id: {evento['id']}\nevent: {nombre_tabla}\ndata: {datos}\n\n"
+        finally:
+            # El cliente cerró la conexión (GeneratorExit) o el flujo terminó
+            self.cancelar(nombre_proyecto, nombre_tabla, suscripcion)
+
+    def cerrar(self):
+        """Termina todos los flujos abiertos (al apagar el proceso)."""
+        with self._candado:
+            grupos = list(self._suscripciones.values())
+            self._suscripciones.clear()
+        for grupo in grupos:
+            for suscripcion in grupo:
+                suscripcion.cerrar()
+
+    def estadisticas(self):
+        """
+        Obtiene el estado del concentrador.
+
+        Returns:
+            dict: Suscriptores por tabla y contadores de eventos.
+        """
+        with self._candado:
+            suscriptores = {f"{proyecto}/{tabla}": len(grupo) for (proyecto, tabla), grupo in self._suscripciones.items()}
+        return {"suscriptores": suscriptores, "publicados": self.publicados, "desconectados": self.desconectados}
+
+
+def inicializar_eventos(app):
+    """
+    Crea el concentrador de eventos del proceso.
+
+    Args:
+        app (Flask): Aplicación donde se guarda el concentrador.
+    """
+    app.extensions["eventos"] = ConcentradorEventos(app.config["DATOS_CONFIG"])
+
+
+def finalizar_eventos(app):
+    """
+    Cierra los flujos de eventos abiertos.
+
+    Args:
+        app (Flask): Aplicación donde se guardó el concentrador.
+    """
+    concentrador = app.extensions.pop("eventos", None)
+    if concentrador is not None:
+        concentrador.cerrar()
+
+
+def obtener_concentrador():
+    """
+    Obtiene el concentrador de eventos del proceso actual.
+
+    Returns:
+        ConcentradorEventos: Concentrador creado por inicializar_eventos.
+    """
+    return current_app.extensions["eventos"]
+
+
+def quitar_contrasenas(datos, columna_clave=None):
+    """
+    Quita de los datos de un evento los campos de contraseña.
+
+    Args:
+        datos (dict): Columnas del cambio.
+        columna_clave (str, optional): Columna clave de la URL; se conserva aunque su nombre
+            coincida con CLAVES_CONTRASENA.
+
+    Returns:
+        dict: Datos que se pueden publicar.
+    """
+    return {clave: valor for clave, valor in datos.items()
+            if not any(palabra in clave.lower() for palabra in CLAVES_CONTRASENA) or clave == columna_clave}
+
+
+def publicar_cambio(respuesta):
+    """
+    Publica las escrituras correctas de crear, actualizar y eliminar, y un evento R tras
+    las que no identifican filas (after_request).
+
+    Args:
+        respuesta (Response): Respuesta de la solicitud.
+
+    Returns:
+        Response: La misma respuesta.
+    """
+    concentrador = current_app.extensions.get("eventos")
+    endpoint = (request.endpoint or "").rsplit(".", 1)[-1]
+    operacion = OPERACIONES_ENDPOINT.get(endpoint)
+    argumentos = request.view_args or {}
+    # 202: escritura diferida, la fila aún no está en la base de datos
+    if (concentrador is None or respuesta.status_code >= 300 or respuesta.status_code == 202
+            or "nombre_tabla" not in argumentos):
+        return respuesta
+    if endpoint == ENDPOINT_CONSULTA_PARAMETRIZADA and es_consulta_escritura(current_app.config["DATOS_CONFIG"]):
+        operacion = OPERACION_RESINCRONIZAR
+    if operacion is None:
+        return respuesta
+    if operacion == OPERACION_RESINCRONIZAR:
+        concentrador.publicar(argumentos["nombre_proyecto"], argumentos["nombre_tabla"], operacion, {})
+        return respuesta
+
+    datos = {}
+    if operacion != "D":
+        cuerpo = request.get_json(silent=True)
+        if isinstance(cuerpo, dict):
+            datos.update(cuerpo)
+    if operacion == "I" and g.get("clave_creada"):
+        # Clave generada por la base de datos (IDENTITY): el cuerpo no la traía
+        datos.update(g.clave_creada)
+    clave_anterior = None
+    if "nombre_clave" in argumentos:
+        # La clave de la URL solo completa los datos si el cuerpo no la trae; si el cuerpo
+        # la cambia, la fila queda con la clave nueva y se informa también la anterior
+        nombre_clave = argumentos["nombre_clave"]
+        columna_cuerpo = next((columna for columna in datos if columna.lower() == nombre_clave.lower()), None)
+        if columna_cuerpo is None:
+            datos[nombre_clave] = argumentos["valor_clave"]
+        elif str(datos[columna_cuerpo]) != argumentos["valor_clave"]:
+            clave_anterior = {nombre_clave: argumentos["valor_clave"]}
+    datos = quitar_contrasenas(datos, argumentos.get("nombre_clave"))
+
+    concentrador.publicar(argumentos["nombre_proyecto"], argumentos["nombre_tabla"], operacion, datos, clave_anterior)
+    return respuesta
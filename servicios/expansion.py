@@ -0,0 +1,210 @@
+# servicios/expansion.py
+# Expansión de claves foráneas (?expand=) en las lecturas
+# (equivalente a Include() de Entity Framework en C#)
+#
+# Con ?expand=cliente_id,producto_id (o ?expand= repetido) cada fila devuelta incluye
+# la fila referida por esas columnas de clave foránea:
+#     {"id": 7, "cliente_id": 3, ..., "_expand": {"cliente_id": {"id": 3, "nombre": ...}}}
+# Las relaciones se leen del catálogo (INFORMATION_SCHEMA) y cada relación se resuelve con
+# una consulta WHERE columna IN (...) sobre los valores distintos de todas las filas,
+# no con una consulta por fila. Se puede anidar con puntos: ?expand=cliente_id.pais_id
+# Si el valor es NULL o la fila referida no existe, la relación se devuelve como null.
+# Solo se admiten claves foráneas de una columna y el formato JSON.
+#
+# Configuración (configuracion/config.json):
+#     "Expansion": {"MaxProfundidad": 2, "MaxRelaciones": 5, "MaxFilas": 5000,
+#                   "MaxFilasRelacion": 10000, "ValoresPorConsulta": 1000}
+
+import threading
+import time
+
+from flask import jsonify
+
+from servicios.errores import ErrorApi
+from servicios.esquema import obtener_claves_foraneas
+from servicios.formateador_respuesta import FORMATO_JSON, negociar_formato, dataframe_a_columnas, convertir_valor_json
+from servicios.instantaneas import normalizar_clave
+from servicios.tiempos_solicitud import medir
+
+# Campo de cada fila donde se incluyen las filas referidas
+CAMPO_EXPANSION = "_expand"
+
+# Cada cuánto se vuelven a leer las claves foráneas de una tabla
+CATALOGO_SEGUNDOS = 300
+
+
+class _Limites:
+    """Límites de una expansión, tomados de la configuración."""
+
+    __slots__ = ("max_profundidad", "max_relaciones", "max_filas", "max_filas_relacion", "valores_por_consulta")
+
+    def __init__(self, configuracion):
+        config_expansion = configuracion.get("Expansion", {})
+        self.max_profundidad = int(config_expansion.get("MaxProfundidad", 2))
+        self.max_relaciones = int(config_expansion.get("MaxRelaciones", 5))
+        self.max_filas = int(config_expansion.get("MaxFilas", 5000))
+        self.max_filas_relacion = int(config_expansion.get("MaxFilasRelacion", 10000))
+        # SQL Server admite como máximo 2100 parámetros por comando
+        self.valores_por_consulta = min(int(config_expansion.get("ValoresPorConsulta", 1000)), 2000)
+
+
+def analizar_expansiones(valores, limites):
+    """
+    Convierte los valores de ?expand= en un árbol de relaciones.
+
+    Args:
+        valores (list): Textos recibidos (request.args.getlist("expand")).
+        limites (_Limites): Límites configurados.
+
+    Returns:
+        dict: {columna: {subcolumna: {...}}}.
+
+    Raises:
+        ErrorApi: Si se supera la profundidad o el número de relaciones (400).
+    """
+    arbol = {}
+    relaciones = 0
+    for valor in valores:
+        for ruta in valor.split(","):
+            partes = [parte.strip() for parte in ruta.split(".")]
+            if not all(partes):
+                raise ErrorApi(f"Expansión no válida '{ruta}': use columna o columna.subcolumna", 400)
+            if len(partes) > limites.max_profundidad:
+                raise ErrorApi(f"La expansión '{ruta}' supera la profundidad máxima ({limites.max_profundidad})", 400)
+            nodo = arbol
+            for parte in partes:
+                if parte.lower() not in nodo:
+                    relaciones += 1
+                    nodo[parte.lower()] = {}
+                nodo = nodo[parte.lower()]
+    if relaciones > limites.max_relaciones:
+        raise ErrorApi(f"Se permiten como máximo {limites.max_relaciones} relaciones por expansión", 400)
+    return arbol
+
+
+class _CatalogoRelaciones:
+    """Claves foráneas de una columna de cada tabla, en caché durante CATALOGO_SEGUNDOS."""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self._tablas = {}  # {(proyecto, tabla): (instante, {columna_minúsculas: (columna, tabla_referida, columna_referida)})}
+
+    def obtener(self, conexion, proyecto, nombre_tabla):
+        clave = (proyecto, nombre_tabla.lower())
+        with self._candado:
+            guardado = self._tablas.get(clave)
+        if guardado is not None and time.monotonic() - guardado[0] < CATALOGO_SEGUNDOS:
+            return guardado[1]
+
+        relaciones = {}
+        for columnas in obtener_claves_foraneas(conexion, nombre_tabla).values():
+            if len(columnas) == 1:  # Las claves compuestas no se expanden
+                relaciones[columnas[0][0].lower()] = columnas[0]
+        with self._candado:
+            self._tablas[clave] = (time.monotonic(), relaciones)
+        return relaciones
+
+
+# Catálogo del proceso (solo contiene nombres: se puede heredar tras el fork)
+catalogo_relaciones = _CatalogoRelaciones()
+
+
+def _buscar_columna(df, nombre_columna):
+    """Obtiene el nombre real de una columna del DataFrame sin distinguir mayúsculas."""
+    for columna in df.columns:
+        if str(columna).lower() == nombre_columna.lower():
+            return columna
+    return None
+
+
+def _expandir(conexion, proyecto, nombre_tabla, df, arbol, limites):
+    """
+    Convierte las filas a objetos JSON e incluye las filas referidas de cada relación del árbol.
+
+    Returns:
+        list: Filas como diccionarios, con CAMPO_EXPANSION si se expandió alguna relación.
+    """
+    with medir("transform"):
+        columnas, filas = dataframe_a_columnas(df)
+        objetos = [dict(zip(columnas, [convertir_valor_json(valor) for valor in fila])) for fila in filas]
+    if not arbol or not objetos:
+        return objetos
+
+    relaciones = catalogo_relaciones.obtener(conexion, proyecto, nombre_tabla)
+    for nombre, subarbol in arbol.items():
+        relacion = relaciones.get(nombre)
+        if relacion is None:
+            raise ErrorApi(f"'{nombre}' no es una clave foránea de una columna de la tabla '{nombre_tabla}'", 400)
+        columna, tabla_referida, columna_referida = relacion
+        columna_df = _buscar_columna(df, columna)
+        if columna_df is None:
+            raise ErrorApi(f"La columna '{columna}' no está en el resultado y no se puede expandir", 400)
+
+        # Valores distintos de la clave (sin NULL; pandas los entrega como None o NaN)
+        crudos = df[columna_df].tolist()
+        distintos = {}
+        for valor in crudos:
+            if valor is not None and valor == valor:
+                distintos.setdefault(normalizar_clave(valor), int(valor) if isinstance(valor, float) and valor.is_integer() else valor)
+        valores = list(distintos.values())
+
+        # Una consulta por bloque de valores (no por fila)
+        referidas = {}
+        leidas = 0
+        for inicio in range(0, len(valores), limites.valores_por_consulta):
+            bloque = valores[inicio:inicio + limites.valores_por_consulta]
+            # Rellenar hasta la siguiente potencia de dos repitiendo el último valor: así solo hay
+            # unas pocas formas de la consulta y se reutilizan sus sentencias preparadas
+            tamano = 1
+            while tamano < len(bloque):
+                tamano *= 2
+            bloque += [bloque[-1]] * (min(tamano, limites.valores_por_consulta) - len(bloque))
+            marcadores = ", ".join(f"@v{posicion}" for posicion in range(len(bloque)))
+            parametros = [conexion.crear_parametro(f"@v{posicion}", valor) for posicion, valor in enumerate(bloque)]
+            resultado = conexion.ejecutar_consulta_sql(
+                f"SELECT * FROM {tabla_referida} WHERE [{columna_referida}] IN ({marcadores})", parametros
+            )
+            leidas += len(resultado)
+            if leidas > limites.max_filas_relacion:
+                raise ErrorApi(f"La relación '{nombre}' supera el máximo de {limites.max_filas_relacion} filas", 400)
+
+            columna_referida_df = _buscar_columna(resultado, columna_referida)
+            objetos_referidos = _expandir(conexion, proyecto, tabla_referida, resultado, subarbol, limites)
+            for valor, objeto in zip(resultado[columna_referida_df].tolist(), objetos_referidos):
+                referidas[normalizar_clave(valor)] = objeto
+
+        for objeto, valor in zip(objetos, crudos):
+            referida = referidas.get(normalizar_clave(valor)) if valor is not None and valor == valor else None
+            objeto.setdefault(CAMPO_EXPANSION, {})[columna] = referida
+    return objetos
+
+
+def construir_respuesta_expandida(conexion, proyecto, nombre_tabla, df, solicitud, configuracion):
+    """
+    Construye la respuesta JSON de una lectura con las relaciones pedidas en ?expand=.
+
+    Args:
+        conexion (ControlConexion): Conexión de la solicitud (se abre si hace falta).
+        proyecto (str): Proyecto de la tabla (nombre resuelto).
+        nombre_tabla (str): Tabla leída.
+        df (pandas.DataFrame): Filas leídas.
+        solicitud: Objeto request de Flask.
+        configuracion (dict): Configuración de la aplicación.
+
+    Returns:
+        Response: Lista de objetos JSON con CAMPO_EXPANSION en cada fila.
+
+    Raises:
+        ErrorApi: Si la expansión no es válida o supera los límites (400) o se pidió otro formato (406).
+    """
+    if negociar_formato(solicitud) != FORMATO_JSON:
+        raise ErrorApi("La expansión (?expand=) solo se admite con el formato JSON", 406)
+    limites = _Limites(configuracion)
+    arbol = analizar_expansiones(solicitud.args.getlist("expand"), limites)
+    if len(df) > limites.max_filas:
+        raise ErrorApi(f"Se pueden expandir como máximo {limites.max_filas} filas: use filtros para reducir el resultado", 400)
+
+    conexion.abrir_bd()
+    objetos = _expandir(conexion, proyecto, nombre_tabla, df, arbol, limites)
+    with medir("serialize"):
+        return jsonify(objetos)
@@ -0,0 +1,254 @@
+# servicios/filtros.py
+# Gramática segura de filtros para las consultas de lectura
+# (equivalente a construir un Where con SqlParameter a partir de la query string en C#)
+#
+# Cada filtro se recibe como parámetro de la URL con la forma columna:operador:valor
+# y todos se combinan con AND:
+#     ?filtro=monto:gt:100&filtro=estado:in:A,B&filtro=fecha:ge:2025-01-01
+# Operadores: eq, ne, gt, ge, lt, le, like, in, null, notnull
+# Las columnas se validan contra el esquema de la tabla y los valores viajan siempre
+# como parámetros (nunca se concatenan al SQL), convertidos al tipo de la columna.
+# Las tablas con instantánea en memoria evalúan la misma gramática sobre sus filas
+# (filtrar_dataframe) sin consultar la base de datos.
+
+import datetime
+import math
+import re
+
+from servicios.conversion_tipos import obtener_convertidor
+from servicios.errores import ErrorApi
+
+# Operadores de comparación con un único valor
+OPERADORES_COMPARACION = {
+    "eq": "=",
+    "ne": "<>",
+    "gt": ">",
+    "ge": ">=",
+    "lt": "<",
+    "le": "<=",
+    "like": "LIKE",
+}
+
+# Operadores sin valor
+OPERADORES_NULOS = {
+    "null": "IS NULL",
+    "notnull": "IS NOT NULL",
+}
+
+# Máximo de valores aceptados por un filtro "in"
+MAX_VALORES_IN = 500
+
+
+def resolver_columna(nombre_columna, tipos_columnas):
+    """
+    Busca una columna en el esquema sin distinguir mayúsculas.
+
+    Args:
+        nombre_columna (str): Nombre recibido del cliente.
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+
+    Returns:
+        str: Nombre real de la columna en la tabla.
+
+    Raises:
+        ErrorApi: Si la columna no existe (400).
+    """
+    nombre_lower = (nombre_columna or "").strip().lower()
+    for columna in tipos_columnas:
+        if columna.lower() == nombre_lower:
+            return columna
+    raise ErrorApi(f"La columna '{nombre_columna}' no existe en la tabla", 400)
+
+
+def analizar_filtros(filtros, tipos_columnas):
+    """
+    Valida los filtros recibidos y convierte sus valores al tipo de cada columna.
+
+    Args:
+        filtros (list): Textos "columna:operador:valor" (por ejemplo request.args.getlist("filtro")).
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+
+    Returns:
+        list: Tuplas (columna real, operador, valor): None para null/notnull, el patrón sin
+        convertir para like y una lista de valores para in.
+
+    Raises:
+        ErrorApi: Si un filtro está mal formado, la columna no existe o el valor no es válido (400).
+    """
+    condiciones = []
+
+    for filtro in filtros:
+        partes = filtro.split(":", 2)
+        if len(partes) < 2:
+            raise ErrorApi(f"Filtro no válido '{filtro}': use columna:operador:valor", 400)
+        columna = resolver_columna(partes[0], tipos_columnas)
+        operador = partes[1].strip().lower()
+        convertidor = obtener_convertidor(tipos_columnas[columna])
+
+        if operador in OPERADORES_NULOS:
+            condiciones.append((columna, operador, None))
+            continue
+
+        if len(partes) < 3:
+            raise ErrorApi(f"El filtro '{filtro}' necesita un valor", 400)
+        valor = partes[2]
+
+        try:
+            if operador in OPERADORES_COMPARACION:
+                # LIKE compara texto: el patrón no se convierte al tipo de la columna
+                condiciones.append((columna, operador, valor if operador == "like" else convertidor(valor)))
+            elif operador == "in":
+                valores = valor.split(",")
+                if len(valores) > MAX_VALORES_IN:
+                    raise ErrorApi(f"El filtro 'in' admite como máximo {MAX_VALORES_IN} valores", 400)
+                condiciones.append((columna, operador, [convertidor(elemento) for elemento in valores]))
+            else:
+                raise ErrorApi(f"Operador '{operador}' no soportado en el filtro '{filtro}'", 400)
+        except ValueError as ex:
+            raise ErrorApi(f"Valor no válido para la columna '{columna}' en el filtro '{filtro}': {str(ex)}", 400)
+
+    return condiciones
+
+
+def construir_filtros(filtros, tipos_columnas, crear_parametro, prefijo_parametro="@"):
+    """
+    Traduce los filtros recibidos a una cláusula WHERE parametrizada.
+
+    Args:
+        filtros (list): Textos "columna:operador:valor" (por ejemplo request.args.getlist("filtro")).
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+        crear_parametro (function): Función (nombre, valor) -> parámetro de ControlConexion.
+        prefijo_parametro (str): Prefijo de los parámetros SQL.
+
+    Returns:
+        tuple: (cláusula WHERE con la palabra WHERE, o "" si no hay filtros; lista de parámetros).
+
+    Raises:
+        ErrorApi: Si un filtro está mal formado, la columna no existe o el valor no es válido (400).
+    """
+    condiciones = []
+    parametros = []
+
+    for columna, operador, valor in analizar_filtros(filtros, tipos_columnas):
+        if operador in OPERADORES_NULOS:
+            condiciones.append(f"[{columna}] {OPERADORES_NULOS[operador]}")
+        elif operador in OPERADORES_COMPARACION:
+            nombre_parametro = f"{prefijo_parametro}f{len(parametros)}"
+            parametros.append(crear_parametro(nombre_parametro, valor))
+            condiciones.append(f"[{columna}] {OPERADORES_COMPARACION[operador]} {nombre_parametro}")
+        else:
+            nombres = []
+            for elemento in valor:
+                nombre_parametro = f"{prefijo_parametro}f{len(parametros)}"
+                parametros.append(crear_parametro(nombre_parametro, elemento))
+                nombres.append(nombre_parametro)
+            condiciones.append(f"[{columna}] IN ({', '.join(nombres)})")
+
+    if not condiciones:
+        return "", parametros
+    return "WHERE " + " AND ".join(condiciones), parametros
+
+
+def _valor_comparable(valor):
+    """
+    Prepara un valor para compararlo como lo haría SQL Server: None para NULL, texto sin
+    mayúsculas ni espacios finales, y tipos de Python en lugar de los de pandas/numpy.
+    """
+    if valor is None:
+        return None
+    if hasattr(valor, "to_pydatetime"):
+        valor = valor.to_pydatetime()  # pandas.Timestamp
+    elif hasattr(valor, "item") and not isinstance(valor, (str, bytes)):
+        valor = valor.item()  # Escalares de numpy
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if isinstance(valor, str):
+        return valor.rstrip().lower()
+    return valor
+
+
+def _cumple_comparacion(actual, operador, valor):
+    """Compara un valor de la fila con el del filtro; NULL no cumple ninguna comparación."""
+    if actual is None or valor is None:
+        return False
+    # Una fecha se compara con una columna de fecha y hora como la medianoche de ese día
+    if isinstance(actual, datetime.datetime) and not isinstance(valor, datetime.datetime) \
+            and isinstance(valor, datetime.date):
+        valor = datetime.datetime.combine(valor, datetime.time())
+    try:
+        if operador == "eq":
+            return actual == valor
+        if operador == "ne":
+            return actual != valor
+        if operador == "gt":
+            return actual > valor
+        if operador == "ge":
+            return actual >= valor
+        if operador == "lt":
+            return actual < valor
+        return actual <= valor
+    except TypeError:
+        # Tipos que no se pueden comparar (p. ej. fecha con y sin zona horaria)
+        return False
+
+
+def _expresion_like(patron):
+    """Traduce un patrón LIKE (%, _ y [...]) a una expresión regular sin distinguir mayúsculas."""
+    partes = []
+    posicion = 0
+    while posicion < len(patron):
+        caracter = patron[posicion]
+        if caracter == "%":
+            partes.append(".*")
+        elif caracter == "_":
+            partes.append(".")
+        elif caracter == "[" and "]" in patron[posicion + 1:]:
+            fin = patron.index("]", posicion + 1)
+            contenido = patron[posicion + 1:fin]
+            negado = contenido.startswith("^")
+            contenido = re.escape(contenido[1:] if negado else contenido).replace("\\-", "-")
+            partes.append(f"[{'^' if negado else ''}{contenido}]")
+            posicion = fin
+        else:
+            partes.append(re.escape(caracter))
+        posicion += 1
+    return re.compile("".join(partes), re.IGNORECASE | re.DOTALL)
+
+
+def filtrar_dataframe(datos, filtros, tipos_columnas):
+    """
+    Aplica los filtros a filas ya cargadas en memoria (instantáneas), con la misma gramática
+    y validación que construir_filtros y la semántica de SQL Server con la intercalación por
+    defecto: NULL no cumple ninguna comparación y el texto se compara sin distinguir
+    mayúsculas ni espacios finales.
+
+    Args:
+        datos (pandas.DataFrame): Filas de la tabla.
+        filtros (list): Textos "columna:operador:valor".
+        tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla.
+
+    Returns:
+        pandas.DataFrame: Filas que cumplen todos los filtros.
+
+    Raises:
+        ErrorApi: Si un filtro está mal formado, la columna no existe o el valor no es válido (400).
+    """
+    cumplen = [True] * len(datos)
+    columnas = {columna.lower(): columna for columna in datos.columns}
+    for columna, operador, valor in analizar_filtros(filtros, tipos_columnas):
+        valores_fila = [_valor_comparable(actual) for actual in datos[columnas[columna.lower()]].tolist()]
+        if operador == "null":
+            cumple = [actual is None for actual in valores_fila]
+        elif operador == "notnull":
+            cumple = [actual is not None for actual in valores_fila]
+        elif operador == "like":
+            expresion = _expresion_like(valor)
+            cumple = [actual is not None and expresion.fullmatch(str(actual)) is not None for actual in valores_fila]
+        elif operador == "in":
+            elementos = [_valor_comparable(elemento) for elemento in valor]
+            cumple = [any(_cumple_comparacion(actual, "eq", elemento) for elemento in elementos) for actual in valores_fila]
+        else:
+            valor = _valor_comparable(valor)
+            cumple = [_cumple_comparacion(actual, operador, valor) for actual in valores_fila]
+        cumplen = [anterior and actual for anterior, actual in zip(cumplen, cumple)]
+    return datos.loc[cumplen]
@@ -0,0 +1,181 @@
+# servicios/formateador_respuesta.py
+# Negociación de contenido para las respuestas tabulares de la API
+# (equivalente a los OutputFormatters de ASP.NET Core)
+
+import base64
+import datetime
+import decimal
+import json
+
+from flask import Response, jsonify
+
+from servicios.tiempos_solicitud import medir
+
+# Formatos soportados y sus tipos MIME
+FORMATO_JSON = "json"  # Lista de objetos: [{"columna": valor, ...}, ...]
+FORMATO_COLUMNAR = "columnar"  # {"columns": [...], "rows": [[...], ...]}
+FORMATO_MSGPACK = "msgpack"  # Forma columnar codificada en MessagePack
+
+TIPOS_MIME = {
+    FORMATO_JSON: "application/json",
+    FORMATO_COLUMNAR: "application/vnd.columnar+json",
+    FORMATO_MSGPACK: "application/msgpack",
+}
+
+# Tipos MIME aceptados en la cabecera Accept para cada formato
+ALIAS_ACCEPT = {
+    "application/json": FORMATO_JSON,
+    "application/vnd.columnar+json": FORMATO_COLUMNAR,
+    "application/msgpack": FORMATO_MSGPACK,
+    "application/x-msgpack": FORMATO_MSGPACK,
+    "application/vnd.msgpack": FORMATO_MSGPACK,
+}
+
+# Codificador MessagePack reutilizable; se crea la primera vez que se pide ese formato
+_codificador_msgpack = None
+
+
+def _obtener_codificador_msgpack():
+    """
+    Obtiene el codificador MessagePack, importando msgspec solo cuando se necesita.
+
+    Returns:
+        msgspec.msgpack.Encoder: Codificador compartido.
+    """
+    global _codificador_msgpack
+    if _codificador_msgpack is None:
+        import msgspec  # Serialización MessagePack (ya incluido en requirements.txt)
+        _codificador_msgpack = msgspec.msgpack.Encoder()
+    return _codificador_msgpack
+
+
+def convertir_valor(valor):
+    """
+    Convierte un valor devuelto por la base de datos a un tipo serializable.
+    Es la conversión común a todos los formatos de salida.
+
+    Args:
+        valor: Valor de una celda del resultado.
+
+    Returns:
+        object: None para NULL/NaN, cadena ISO para fechas, cadena para decimales
+        o el valor original en el resto de casos.
+    """
+    # NULL de la base de datos o NaN/NaT de pandas (los únicos valores distintos de sí mismos)
+    if valor is None:
+        return None
+    if isinstance(valor, (float, datetime.datetime)) and valor != valor:
+        return None
+
+    # Fechas y horas (pd.Timestamp hereda de datetime.datetime)
+    if isinstance(valor, (datetime.datetime, datetime.date, datetime.time)):
+        return valor.isoformat()
+
+    # Decimales como cadena para no perder precisión (igual que hacía jsonify)
+    if isinstance(valor, decimal.Decimal):
+        return str(valor)
+
+    return valor
+
+
+def convertir_valor_json(valor):
+    """
+    Convierte un valor como convertir_valor y además codifica en base64
+    los valores binarios, que JSON no puede representar.
+
+    Args:
+        valor: Valor de una celda del resultado.
+
+    Returns:
+        object: Valor serializable en JSON.
+    """
+    valor = convertir_valor(valor)
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(valor)).decode("ascii")
+    return valor
+
+
+def dataframe_a_columnas(df):
+    """
+    Convierte un DataFrame a la forma columnar: nombres de columna y filas como listas.
+
+    Args:
+        df (pandas.DataFrame): Resultado de la consulta.
+
+    Returns:
+        tuple: (lista de nombres de columna, lista de filas, cada fila una lista de valores).
+    """
+    columnas = [str(columna) for columna in df.columns]
+
+    # Convertir columna por columna (Series.tolist() ya entrega tipos nativos de Python)
+    valores_por_columna = [
+        [convertir_valor(valor) for valor in df.iloc[:, posicion].tolist()]
+        for posicion in range(len(columnas))
+    ]
+
+    # Transponer a filas
+    filas = [list(fila) for fila in zip(*valores_por_columna)]
+    return columnas, filas
+
+
+def negociar_formato(solicitud):
+    """
+    Determina el formato de salida a partir de ?format= o de la cabecera Accept.
+
+    Args:
+        solicitud: Objeto request de Flask.
+
+    Returns:
+        str: Uno de FORMATO_JSON, FORMATO_COLUMNAR o FORMATO_MSGPACK.
+        None: Si se pidió explícitamente un formato no soportado.
+    """
+    # El parámetro de consulta tiene prioridad sobre la cabecera
+    formato = solicitud.args.get("format")
+    if formato:
+        formato = formato.strip().lower()
+        return formato if formato in TIPOS_MIME else None
+
+    # Elegir el tipo MIME aceptado con mayor calidad
+    mejor = solicitud.accept_mimetypes.best_match(list(ALIAS_ACCEPT.keys()), default="application/json")
+    return ALIAS_ACCEPT.get(mejor, FORMATO_JSON)
+
+
+def construir_respuesta(df, solicitud, codigo_estado=200):
+    """
+    Construye la respuesta HTTP de un resultado tabular en el formato negociado.
+
+    Args:
+        df (pandas.DataFrame): Resultado de la consulta.
+        solicitud: Objeto request de Flask.
+        codigo_estado (int): Código HTTP de la respuesta.
+
+    Returns:
+        Response: Respuesta de Flask con el cuerpo serializado.
+    """
+    formato = negociar_formato(solicitud)
+    if formato is None:
+        formatos = ", ".join(TIPOS_MIME.keys())
+        return jsonify({"error": f"Formato no soportado. Formatos válidos: {formatos}"}), 406
+
+    with medir("transform"):
+        columnas, filas = dataframe_a_columnas(df)
+
+    if formato == FORMATO_MSGPACK:
+        # MessagePack admite binarios de forma nativa
+        with medir("serialize"):
+            cuerpo = _obtener_codificador_msgpack().encode({"columns": columnas, "rows": filas})
+        return Response(cuerpo, status=codigo_estado, mimetype=TIPOS_MIME[FORMATO_MSGPACK])
+
+    # Para JSON, los binarios se envían en base64
+    with medir("transform"):
+        filas = [[convertir_valor_json(valor) for valor in fila] for fila in filas]
+
+    if formato == FORMATO_COLUMNAR:
+        with medir("serialize"):
+            cuerpo = json.dumps({"columns": columnas, "rows": filas}, ensure_ascii=False)
+        return Response(cuerpo, status=codigo_estado, mimetype=TIPOS_MIME[FORMATO_COLUMNAR])
+
+    with medir("serialize"):
+        respuesta = jsonify([dict(zip(columnas, fila)) for fila in filas])
+    respuesta.status_code = codigo_estado
+    return respuesta
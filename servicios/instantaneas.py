@@ -0,0 +1,354 @@
+# servicios/instantaneas.py
+# Instantáneas en memoria de tablas de referencia pequeñas (países, categorías, tasas...)
+# (equivalente a cargar una tabla en IMemoryCache al arrancar y leer siempre de ahí en C#)
+#
+# Las tablas configuradas se leen completas al iniciar el proceso y se indexan por sus
+# columnas clave. listar y obtener_por_clave responden desde memoria sin tocar la base
+# de datos, también con ?filtro= (la gramática de servicios/filtros.py se evalúa sobre
+# las filas en memoria) y al buscar por columnas sin índice (recorriendo las filas).
+# La instantánea se refresca:
+#   - cada IntervaloRefrescoSegundos, en un hilo en segundo plano, y
+#   - justo después de cada escritura hecha a través de esta API sobre la tabla
+#     (en el proceso que la atiende; los demás trabajadores la verán en el siguiente refresco).
+#     Las consultas registradas solo cuentan como escritura si se declaran con "Escritura": true.
+# Cada instantánea consume el presupuesto de caché de su proyecto (PresupuestoCacheMB):
+# si no cabe, no se carga y las lecturas siguen yendo a la base de datos.
+#
+# Configuración (configuracion/config.json):
+#     "Instantaneas": {
+#         "IntervaloRefrescoSegundos": 300,
+#         "Tablas": [
+#             {"Proyecto": "facturas", "Tabla": "pais", "Claves": ["id", "codigo"]}
+#         ]
+#     }
+
+import threading
+import time
+
+from flask import current_app, request
+
+from servicios.control_conexion import ControlConexion
+from servicios.conversion_tipos import obtener_tipos_columnas
+from servicios.filtros import filtrar_dataframe
+from servicios.formateador_respuesta import convertir_valor
+from servicios.registro_proyectos import PROYECTO_POR_DEFECTO
+
+# Rutas cuyas escrituras correctas refrescan la instantánea de su tabla
+ENDPOINTS_ESCRITURA = {"crear", "actualizar", "combinar", "eliminar", "importar_csv"}
+
+# Ruta de consultas SQL: solo escribe si ejecuta una consulta registrada declarada como escritura
+ENDPOINT_CONSULTA_PARAMETRIZADA = "ejecutar_consulta_parametrizada"
+
+
+def es_consulta_escritura(configuracion):
+    """
+    Indica si la solicitud actual pide una consulta registrada declarada como escritura
+    ("Escritura": true en su entrada de ConsultasNombradas). Las consultas libres y las
+    registradas sin esa marca se tratan como lecturas.
+
+    Args:
+        configuracion (dict): Configuración de la aplicación.
+
+    Returns:
+        bool: True si la consulta registrada modifica datos.
+    """
+    cuerpo = request.get_json(silent=True)
+    nombre = cuerpo.get("nombre") if isinstance(cuerpo, dict) else None
+    consulta_nombrada = configuracion.get("ConsultasNombradas", {}).get(nombre) if nombre else None
+    return bool(consulta_nombrada and consulta_nombrada.get("Escritura"))
+
+
+def es_solicitud_escritura(configuracion):
+    """
+    Indica si la solicitud actual escribe en su tabla: una de ENDPOINTS_ESCRITURA o una
+    consulta registrada declarada como escritura.
+
+    Args:
+        configuracion (dict): Configuración de la aplicación.
+
+    Returns:
+        bool: True si la solicitud modifica datos de la tabla.
+    """
+    endpoint = (request.endpoint or "").rsplit(".", 1)[-1]
+    if endpoint in ENDPOINTS_ESCRITURA:
+        return True
+    return endpoint == ENDPOINT_CONSULTA_PARAMETRIZADA and es_consulta_escritura(configuracion)
+
+
+def normalizar_clave(valor):
+    """
+    Normaliza un valor de clave para buscarlo en los índices.
+    Los textos se comparan sin distinguir mayúsculas, como la intercalación por defecto de SQL Server.
+
+    Args:
+        valor: Valor de la columna o texto recibido en la URL.
+
+    Returns:
+        str: Representación usada como clave del índice.
+    """
+    valor = convertir_valor(valor)
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip().lower()
+
+
+class InstantaneaTabla:
+    """
+    Contenido completo de una tabla con un índice por cada columna clave.
+    Es inmutable: al refrescar se crea una nueva y se reemplaza la anterior.
+    """
+
+    def __init__(self, proyecto, tabla, datos, claves, tipos_columnas):
+        """
+        Args:
+            proyecto (str): Proyecto al que pertenece la tabla.
+            tabla (str): Nombre de la tabla.
+            datos (pandas.DataFrame): Filas de la tabla.
+            claves (list): Columnas por las que se indexa.
+            tipos_columnas (dict): {nombre_columna: tipo_dato} de la tabla, para los filtros.
+        """
+        self.proyecto = proyecto
+        self.tabla = tabla
+        self.datos = datos
+        self.tipos_columnas = tipos_columnas
+        self.cargada_en = time.time()
+        self.memoria_bytes = int(datos.memory_usage(deep=True).sum())
+
+        # {columna en minúsculas: {valor normalizado: [posiciones de fila]}}
+        self.indices = {}
+        columnas = {columna.lower(): columna for columna in datos.columns}
+        for clave in claves:
+            columna = columnas.get(clave.lower())
+            if columna is None:
+                print(f"La columna clave {clave} no existe en la tabla {tabla}; no se indexa")
+                continue
+            indice = {}
+            for posicion, valor in enumerate(datos[columna].tolist()):
+                indice.setdefault(normalizar_clave(valor), []).append(posicion)
+            self.indices[clave.lower()] = indice
+            self.memoria_bytes += len(indice) * 100  # Estimación del tamaño del diccionario
+
+    def buscar(self, columna, valor):
+        """
+        Busca las filas cuya columna tiene el valor indicado: con el índice si la columna
+        es clave de la instantánea y, si no, recorriendo las filas como un filtro "eq".
+
+        Args:
+            columna (str): Columna de la búsqueda.
+            valor (str): Valor recibido en la URL.
+
+        Returns:
+            pandas.DataFrame: Filas encontradas (vacío si no hay), o None si la columna
+            no existe y la consulta debe ir a la base de datos (que informa el error).
+
+        Raises:
+            ErrorApi: Si el valor no es válido para el tipo de la columna (400).
+        """
+        indice = self.indices.get(columna.lower())
+        if indice is not None:
+            return self.datos.iloc[indice.get(normalizar_clave(valor), [])]
+        if not any(nombre.lower() == columna.lower() for nombre in self.tipos_columnas):
+            return None
+        return self.filtrar([f"{columna}:eq:{valor}"])
+
+    def filtrar(self, filtros):
+        """
+        Aplica filtros columna:operador:valor a las filas en memoria.
+
+        Args:
+            filtros (list): Textos "columna:operador:valor".
+
+        Returns:
+            pandas.DataFrame: Filas que cumplen todos los filtros.
+
+        Raises:
+            ErrorApi: Si un filtro no es válido (400), igual que en la base de datos.
+        """
+        return filtrar_dataframe(self.datos, filtros, self.tipos_columnas)
+
+
+class AlmacenInstantaneas:
+    """
+    Instantáneas de las tablas configuradas para el proceso actual.
+    """
+
+    def __init__(self, configuracion, registro_proyectos):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+            registro_proyectos (RegistroProyectos): Registro con los pools y presupuestos de cada proyecto.
+        """
+        config_instantaneas = configuracion.get("Instantaneas", {})
+        self.configuracion = configuracion
+        self.registro_proyectos = registro_proyectos
+        self.intervalo_refresco = float(config_instantaneas.get("IntervaloRefrescoSegundos", 300))
+
+        # {(proyecto, tabla): columnas clave}
+        self.tablas = {}
+        for datos in config_instantaneas.get("Tablas", []):
+            proyecto = registro_proyectos.obtener_configuracion_proyecto(datos.get("Proyecto", PROYECTO_POR_DEFECTO)).nombre
+            self.tablas[(proyecto, datos["Tabla"].lower())] = datos.get("Claves", [])
+
+        self._instantaneas = {}
+        self._candados_carga = {clave: threading.Lock() for clave in self.tablas}
+        self._detener = threading.Event()
+        self._hilo_refresco = None
+
+    def _clave(self, nombre_proyecto, nombre_tabla):
+        """Obtiene la clave (proyecto, tabla) con el nombre de proyecto ya resuelto."""
+        proyecto = self.registro_proyectos.obtener_configuracion_proyecto(nombre_proyecto).nombre
+        return (proyecto, (nombre_tabla or "").lower())
+
+    def obtener(self, nombre_proyecto, nombre_tabla):
+        """
+        Obtiene la instantánea de una tabla.
+
+        Args:
+            nombre_proyecto (str): Proyecto tomado de la ruta.
+            nombre_tabla (str): Tabla tomada de la ruta.
+
+        Returns:
+            InstantaneaTabla: Instantánea cargada, o None si la tabla no tiene.
+        """
+        if not self._instantaneas:
+            return None
+        return self._instantaneas.get(self._clave(nombre_proyecto, nombre_tabla))
+
+    def refrescar(self, nombre_proyecto, nombre_tabla):
+        """
+        Vuelve a leer una tabla configurada y reemplaza su instantánea.
+        Si la carga falla se conserva la instantánea anterior.
+
+        Args:
+            nombre_proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla a refrescar.
+        """
+        clave = self._clave(nombre_proyecto, nombre_tabla)
+        if clave not in self.tablas:
+            return
+        proyecto, tabla = clave
+
+        with self._candados_carga[clave]:
+            control_conexion = ControlConexion(
+                configuracion=self.configuracion, pool=self.registro_proyectos.obtener_pool(proyecto)
+            )
+            try:
+                control_conexion.abrir_bd()
+                datos = control_conexion.ejecutar_consulta_sql(f"SELECT * FROM {tabla}")
+                tipos_columnas = obtener_tipos_columnas(control_conexion, tabla)
+            except Exception as ex:
+                print(f"No se pudo cargar la instantánea de {proyecto}/{tabla}: {str(ex)}")
+                return
+            finally:
+                control_conexion.cerrar_bd()
+
+            instantanea = InstantaneaTabla(proyecto, tabla, datos, self.tablas[clave], tipos_columnas)
+            clave_memoria = f"instantanea:{tabla}"
+            if not self.registro_proyectos.reservar_memoria_cache(proyecto, clave_memoria, instantanea.memoria_bytes):
+                # No cabe en el presupuesto: se descarta y las lecturas vuelven a la base de datos
+                self._instantaneas.pop(clave, None)
+                self.registro_proyectos.liberar_memoria_cache(proyecto, clave_memoria)
+                print(f"La instantánea de {proyecto}/{tabla} supera el presupuesto de caché del proyecto")
+                return
+            self._instantaneas[clave] = instantanea
+
+    def refrescar_todas(self):
+        """Refresca todas las tablas configuradas."""
+        for proyecto, tabla in self.tablas:
+            self.refrescar(proyecto, tabla)
+
+    def iniciar_refresco(self):
+        """Inicia el hilo que refresca las instantáneas periódicamente."""
+        def ciclo():
+            while not self._detener.wait(self.intervalo_refresco):
+                self.refrescar_todas()
+
+        self._hilo_refresco = threading.Thread(target=ciclo, name="refresco-instantaneas", daemon=True)
+        self._hilo_refresco.start()
+
+    def cerrar(self):
+        """Detiene el refresco y libera las instantáneas."""
+        self._detener.set()
+        for proyecto, tabla in list(self._instantaneas):
+            self.registro_proyectos.liberar_memoria_cache(proyecto, f"instantanea:{tabla}")
+        self._instantaneas.clear()
+
+    def estadisticas(self):
+        """
+        Obtiene el estado de las instantáneas.
+
+        Returns:
+            dict: {"proyecto/tabla": filas, memoria e instante de carga}.
+        """
+        return {
+            f"{proyecto}/{tabla}": {
+                "filas": len(instantanea.datos),
+                "memoria_mb": round(instantanea.memoria_bytes / (1024 * 1024), 3),
+                "indices": sorted(instantanea.indices),
+                "cargada_en": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(instantanea.cargada_en)),
+            }
+            for (proyecto, tabla), instantanea in list(self._instantaneas.items())
+        }
+
+
+def inicializar_instantaneas(app):
+    """
+    Carga las instantáneas configuradas e inicia su refresco (se ejecuta después del fork,
+    a continuación del registro de proyectos).
+
+    Args:
+        app (Flask): Aplicación donde se guarda el almacén.
+    """
+    configuracion = app.config["DATOS_CONFIG"]
+    if not configuracion.get("Instantaneas", {}).get("Tablas"):
+        return
+    almacen = AlmacenInstantaneas(configuracion, app.extensions["registro_proyectos"])
+    almacen.refrescar_todas()
+    almacen.iniciar_refresco()
+    app.extensions["instantaneas"] = almacen
+
+
+def finalizar_instantaneas(app):
+    """
+    Detiene el refresco de las instantáneas.
+
+    Args:
+        app (Flask): Aplicación donde se guardó el almacén.
+    """
+    almacen = app.extensions.pop("instantaneas", None)
+    if almacen is not None:
+        almacen.cerrar()
+
+
+def obtener_instantanea(nombre_proyecto, nombre_tabla):
+    """
+    Obtiene la instantánea de una tabla para la solicitud actual.
+
+    Args:
+        nombre_proyecto (str): Proyecto tomado de la ruta.
+        nombre_tabla (str): Tabla tomada de la ruta.
+
+    Returns:
+        InstantaneaTabla: Instantánea cargada, o None si la tabla se lee de la base de datos.
+    """
+    almacen = current_app.extensions.get("instantaneas")
+    return None if almacen is None else almacen.obtener(nombre_proyecto, nombre_tabla)
+
+
+def refrescar_tras_escritura(respuesta):
+    """
+    Refresca la instantánea de la tabla tras una escritura correcta (after_request).
+
+    Args:
+        respuesta (Response): Respuesta de la solicitud.
+
+    Returns:
+        Response: La misma respuesta.
+    """
+    almacen = current_app.extensions.get("instantaneas")
+    argumentos = request.view_args or {}
+    # 202: escritura diferida, la fila aún no está en la base de datos
+    if (almacen is not None and respuesta.status_code < 300 and respuesta.status_code != 202
+            and "nombre_tabla" in argumentos and es_solicitud_escritura(current_app.config["DATOS_CONFIG"])):
+        almacen.refrescar(argumentos.get("nombre_proyecto"), argumentos["nombre_tabla"])
+    return respuesta
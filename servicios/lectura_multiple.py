@@ -0,0 +1,222 @@
+# servicios/lectura_multiple.py
+# Varias lecturas de tablas en paralelo para armar una pantalla en una sola solicitud
+# (equivalente a lanzar varias consultas con Task.WhenAll en C#)
+#
+# POST /api/<proyecto>/multi recibe un documento con lecturas nombradas:
+#     {"lecturas": {
+#         "factura":   {"tabla": "facturas", "clave": "id", "valor": 10},
+#         "lineas":    {"tabla": "lineas_factura", "filtros": ["factura_id:eq:10"]},
+#         "productos": {"tabla": "productos"}
+#     }}
+# Cada lectura se ejecuta en un hilo de un pool acotado (MaxHilos), con su propia conexión
+# del pool del proyecto, el plazo de la solicitud y los cupos de admisión de su tabla.
+# La respuesta junta todas las partes y el fallo de una no afecta a las demás:
+#     {"factura": {"estado": 200, "datos": [...]}, "lineas": {"estado": 504, "error": "..."}, ...}
+# Así la latencia se acerca a la de la lectura más lenta en lugar de a la suma de todas.
+#
+# Configuración (configuracion/config.json):
+#     "LecturaMultiple": {"Habilitado": true, "MaxHilos": 8, "MaxLecturas": 20}
+
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import pyodbc
+from flask import current_app
+
+from servicios.control_admision import ControlAdmision
+from servicios.control_conexion import ControlConexion
+from servicios.conversion_tipos import obtener_tipos_columnas
+from servicios.errores import ErrorApi
+from servicios.filtros import construir_filtros
+from servicios.formateador_respuesta import dataframe_a_columnas, convertir_valor_json
+from servicios.tiempos_solicitud import iniciar_tiempo_ejecucion, terminar_tiempo_ejecucion
+
+
+def validar_lecturas(cuerpo, max_lecturas):
+    """
+    Valida el cuerpo de la solicitud.
+
+    Args:
+        cuerpo: JSON recibido.
+        max_lecturas (int): Lecturas permitidas por solicitud.
+
+    Returns:
+        dict: {nombre: lectura} con "tabla" y, opcionalmente, "clave"/"valor" y "filtros".
+
+    Raises:
+        ErrorApi: Si el cuerpo no tiene la forma esperada (400).
+    """
+    lecturas = cuerpo.get("lecturas") if isinstance(cuerpo, dict) else None
+    if not isinstance(lecturas, dict) or not lecturas:
+        raise ErrorApi("El cuerpo debe incluir 'lecturas': {nombre: {\"tabla\": ...}, ...}", 400)
+    if len(lecturas) > max_lecturas:
+        raise ErrorApi(f"Se permiten como máximo {max_lecturas} lecturas por solicitud", 400)
+
+    for nombre, lectura in lecturas.items():
+        if not isinstance(lectura, dict) or not isinstance(lectura.get("tabla"), str) or not lectura["tabla"].strip():
+            raise ErrorApi(f"La lectura '{nombre}' debe indicar 'tabla'", 400)
+        if ("clave" in lectura) != ("valor" in lectura):
+            raise ErrorApi(f"La lectura '{nombre}' debe indicar 'clave' y 'valor' juntos", 400)
+        if "clave" in lectura and (not isinstance(lectura["clave"], str) or ":" in lectura["clave"]
+                                   or lectura["valor"] is None):
+            raise ErrorApi(f"La lectura '{nombre}' tiene una clave o un valor no válidos", 400)
+        filtros = lectura.get("filtros", [])
+        if not isinstance(filtros, list) or not all(isinstance(filtro, str) for filtro in filtros):
+            raise ErrorApi(f"Los filtros de la lectura '{nombre}' deben ser textos columna:operador:valor", 400)
+    return lecturas
+
+
+def _filas_a_objetos(df):
+    """Convierte un DataFrame a una lista de objetos JSON."""
+    columnas, filas = dataframe_a_columnas(df)
+    return [dict(zip(columnas, [convertir_valor_json(valor) for valor in fila])) for fila in filas]
+
+
+class LectorMultiple:
+    """
+    Pool de hilos del proceso para las lecturas en paralelo.
+    """
+
+    def __init__(self, configuracion, registro_proyectos):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+            registro_proyectos (RegistroProyectos): Registro con los pools de cada proyecto.
+        """
+        config_lectura = configuracion.get("LecturaMultiple", {})
+        self.configuracion = configuracion
+        self.registro_proyectos = registro_proyectos
+        self.max_hilos = int(config_lectura.get("MaxHilos", 8))
+        self.max_lecturas = int(config_lectura.get("MaxLecturas", 20))
+        self._ejecutor = ThreadPoolExecutor(max_workers=self.max_hilos, thread_name_prefix="lectura-multiple")
+
+    def leer(self, nombre_proyecto, lecturas, limite=None, instantaneas=None, control_admision=None,
+             consultas_lentas=None):
+        """
+        Ejecuta las lecturas en paralelo y espera a que terminen todas.
+
+        Args:
+            nombre_proyecto (str): Proyecto tomado de la ruta.
+            lecturas (dict): Lecturas validadas con validar_lecturas.
+            limite (float, optional): Plazo de la solicitud (reloj monotónico).
+            instantaneas (AlmacenInstantaneas, optional): Tablas de referencia en memoria.
+            control_admision (ControlAdmision, optional): Cupos de concurrencia por tabla.
+            consultas_lentas (RegistroConsultasLentas, optional): Registro de consultas lentas.
+
+        Returns:
+            dict: {nombre: {"estado": código HTTP, "datos": [...]} o {"estado": código, "error": mensaje}}.
+        """
+        # Se resuelve antes de repartir: un proyecto desconocido falla la solicitud completa
+        pool = self.registro_proyectos.obtener_pool(nombre_proyecto)
+        futuros = {
+            nombre: self._ejecutor.submit(self._leer_parte, nombre_proyecto, pool, lectura, limite,
+                                          instantaneas, control_admision, consultas_lentas)
+            for nombre, lectura in lecturas.items()
+        }
+        return {nombre: futuro.result() for nombre, futuro in futuros.items()}
+
+    def _leer_parte(self, nombre_proyecto, pool, lectura, limite, instantaneas, control_admision, consultas_lentas):
+        """Ejecuta una lectura y traduce su resultado o su error a una parte de la respuesta."""
+        nombre_tabla = lectura["tabla"]
+        ocupados = []
+        try:
+            # Tablas de referencia cargadas en memoria: se responden sin tocar la base de datos
+            instantanea = None if instantaneas is None else instantaneas.obtener(nombre_proyecto, nombre_tabla)
+            if instantanea is not None:
+                filtros = list(lectura.get("filtros", []))
+                if "clave" in lectura and not filtros:
+                    resultado = instantanea.buscar(lectura["clave"], str(lectura["valor"]))
+                    if resultado is not None:
+                        return self._parte_datos(resultado, lectura)
+                else:
+                    # La clave se trata como un filtro "eq" más, igual que en la base de datos
+                    if "clave" in lectura:
+                        filtros.append(f"{lectura['clave']}:eq:{lectura['valor']}")
+                    return self._parte_datos(instantanea.filtrar(filtros) if filtros else instantanea.datos, lectura)
+
+            if control_admision is not None:
+                ocupados = control_admision.admitir(nombre_tabla)
+                iniciar_tiempo_ejecucion()
+
+            control_conexion = ControlConexion(configuracion=self.configuracion, pool=pool)
+            control_conexion.establecer_limite(limite)
+            control_conexion.establecer_consultas_lentas(consultas_lentas)
+            try:
+                control_conexion.abrir_bd()
+                comando_sql = f"SELECT * FROM {nombre_tabla}"
+                parametros = None
+
+                # La clave se trata como un filtro "eq" más: se valida y convierte al tipo de la columna
+                filtros = list(lectura.get("filtros", []))
+                if "clave" in lectura:
+                    filtros.append(f"{lectura['clave']}:eq:{lectura['valor']}")
+                if filtros:
+                    tipos_columnas = obtener_tipos_columnas(control_conexion, nombre_tabla)
+                    if not tipos_columnas:
+                        return {"estado": 404, "error": f"La tabla '{nombre_tabla}' no existe"}
+                    clausula_where, parametros = construir_filtros(filtros, tipos_columnas, control_conexion.crear_parametro)
+                    comando_sql = f"{comando_sql} {clausula_where}"
+
+                tabla_resultados = control_conexion.ejecutar_consulta_sql(comando_sql, parametros)
+            finally:
+                control_conexion.cerrar_bd()
+            return self._parte_datos(tabla_resultados, lectura)
+
+        except ErrorApi as ex:
+            return {"estado": ex.codigo_estado, "error": ex.mensaje}
+        except pyodbc.Error as ex:
+            codigo_error = 404 if ex.args and ex.args[0] == 208 else 500  # 208: tabla no encontrada
+            return {"estado": codigo_error, "error": f"Error ({codigo_error}): {str(ex)}"}
+        except Exception as ex:
+            traceback.print_exc()
+            return {"estado": 500, "error": f"Error interno del servidor: {str(ex)}"}
+        finally:
+            if ocupados:
+                ControlAdmision.liberar(ocupados, terminar_tiempo_ejecucion() or None)
+
+    @staticmethod
+    def _parte_datos(df, lectura):
+        """Arma la parte de una lectura correcta (404 si una lectura por clave no encontró nada)."""
+        if "clave" in lectura and df.empty:
+            return {"estado": 404, "error": "No se encontraron registros"}
+        return {"estado": 200, "datos": _filas_a_objetos(df)}
+
+    def cerrar(self):
+        """Detiene el pool de hilos (las lecturas pendientes se cancelan)."""
+        self._ejecutor.shutdown(wait=False, cancel_futures=True)
+
+
+def inicializar_lector_multiple(app):
+    """
+    Crea el pool de hilos de las lecturas en paralelo (se ejecuta después del fork,
+    a continuación del registro de proyectos).
+
+    Args:
+        app (Flask): Aplicación donde se guarda el lector.
+    """
+    configuracion = app.config["DATOS_CONFIG"]
+    if not configuracion.get("LecturaMultiple", {}).get("Habilitado", False):
+        return
+    app.extensions["lector_multiple"] = LectorMultiple(configuracion, app.extensions["registro_proyectos"])
+
+
+def finalizar_lector_multiple(app):
+    """
+    Detiene el pool de hilos de las lecturas en paralelo.
+
+    Args:
+        app (Flask): Aplicación donde se guardó el lector.
+    """
+    lector = app.extensions.pop("lector_multiple", None)
+    if lector is not None:
+        lector.cerrar()
+
+
+def obtener_lector_multiple():
+    """
+    Obtiene el lector de lecturas en paralelo del proceso actual.
+
+    Returns:
+        LectorMultiple: Lector creado por inicializar_lector_multiple, o None si está deshabilitado.
+    """
+    return current_app.extensions.get("lector_multiple")
@@ -0,0 +1,273 @@
+# servicios/limite_tasa.py
+# Limitación de tasa por cliente y por clase de ruta con cubetas de fichas (token bucket)
+# (equivalente a AddRateLimiter con TokenBucketRateLimiter en ASP.NET Core)
+#
+# Cada cliente (sujeto del JWT, API key o IP) tiene una cubeta por clase de ruta:
+#     lectura     GET de /api/... y las lecturas múltiples (POST /api/<proyecto>/multi)
+#     escritura   POST, PUT y DELETE de /api/...
+#     contrasena  verificar-contrasena (muy restrictiva contra fuerza bruta)
+# Se limitan todas las rutas de un proyecto (/api/<proyecto>/...), también las que no
+# llevan tabla como /multi y /trabajos. Cada solicitud consume una ficha, salvo /multi,
+# que consume una por lectura (hasta la capacidad de la cubeta); las fichas se recargan
+# a ritmo constante. Sin fichas suficientes, la solicitud recibe 429 con Retry-After.
+#
+# Las cubetas se reparten en fragmentos (shards), cada uno con su propio candado,
+# para que los hilos de clientes distintos casi nunca compitan por el mismo candado.
+#
+# Configuración (configuracion/config.json):
+#     "LimitesTasa": {
+#         "Habilitado": true,
+#         "Fragmentos": 16,
+#         "ApiKeys": ["clave-del-cliente-a"],   (claves reconocidas en la cabecera X-API-Key)
+#         "Clases": {
+#             "lectura":    {"Capacidad": 120, "RecargaPorSegundo": 20},
+#             "escritura":  {"Capacidad": 30,  "RecargaPorSegundo": 5},
+#             "contrasena": {"Capacidad": 5,   "RecargaPorSegundo": 0.05}
+#         }
+#     }
+
+import math
+import threading
+import time
+
+from flask import current_app, g, request
+
+from servicios.errores import ErrorLimiteTasa
+
+CLASE_LECTURA = "lectura"
+CLASE_ESCRITURA = "escritura"
+CLASE_CONTRASENA = "contrasena"
+
+CABECERA_API_KEY = "X-API-Key"
+
+# Ruta de lecturas en paralelo: es una lectura aunque llegue por POST
+ENDPOINT_LECTURA_MULTIPLE = "leer_multiple"
+
+# Cubetas máximas por fragmento antes de descartar las que ya están llenas
+MAX_CUBETAS_POR_FRAGMENTO = 10000
+
+
+class ClaseLimite:
+    """Parámetros de la cubeta de una clase de ruta."""
+
+    def __init__(self, nombre, capacidad, recarga_por_segundo):
+        """
+        Args:
+            nombre (str): Nombre de la clase ("lectura", "escritura", "contrasena").
+            capacidad (float): Fichas máximas (tamaño de la ráfaga permitida).
+            recarga_por_segundo (float): Fichas que se recuperan por segundo.
+        """
+        self.nombre = nombre
+        self.capacidad = float(capacidad)
+        self.recarga_por_segundo = float(recarga_por_segundo)
+
+
+class FragmentoCubetas:
+    """Grupo de cubetas protegido por un único candado."""
+
+    def __init__(self, clases):
+        """
+        Args:
+            clases (dict): Parámetros de cada clase de ruta ({nombre: ClaseLimite}).
+        """
+        self.clases = clases
+        self.cubetas = {}  # clave -> [fichas, instante de la última recarga]
+        self.candado = threading.Lock()
+
+    def consumir(self, clave, clase, ahora, fichas=1):
+        """
+        Recarga la cubeta de la clave e intenta consumir las fichas pedidas.
+
+        Args:
+            clave (tuple): (clase, cliente).
+            clase (ClaseLimite): Parámetros de la cubeta.
+            ahora (float): Instante actual (reloj monotónico).
+            fichas (float): Fichas que cuesta la solicitud.
+
+        Returns:
+            tuple: (admitida, fichas restantes).
+        """
+        with self.candado:
+            cubeta = self.cubetas.get(clave)
+            if cubeta is None:
+                if len(self.cubetas) >= MAX_CUBETAS_POR_FRAGMENTO:
+                    self._podar(ahora)
+                cubeta = self.cubetas[clave] = [clase.capacidad, ahora]
+            else:
+                cubeta[0] = min(clase.capacidad, cubeta[0] + (ahora - cubeta[1]) * clase.recarga_por_segundo)
+                cubeta[1] = ahora
+
+            if cubeta[0] >= fichas:
+                cubeta[0] -= fichas
+                return True, cubeta[0]
+            return False, cubeta[0]
+
+    def _podar(self, ahora):
+        """
+        Descarta las cubetas que ya se habrían recargado por completo (equivalen a una nueva).
+        Cada cubeta se mide con el tiempo de recarga de su propia clase: una cubeta de
+        contraseña vacía no se descarta al ritmo de las de lectura.
+        """
+        tiempos_recarga = {
+            nombre: clase.capacidad / clase.recarga_por_segundo if clase.recarga_por_segundo > 0 else math.inf
+            for nombre, clase in self.clases.items()
+        }
+        for clave in [c for c, (_, ultimo) in self.cubetas.items() if ahora - ultimo >= tiempos_recarga[c[0]]]:
+            del self.cubetas[clave]
+
+
+class LimitadorTasa:
+    """
+    Limitador de tasa en memoria del proceso (con gunicorn, cada trabajador lleva su cuenta).
+    """
+
+    def __init__(self, configuracion):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+        """
+        config_limites = configuracion.get("LimitesTasa", {})
+        clases = {
+            CLASE_LECTURA: {"Capacidad": 120, "RecargaPorSegundo": 20},
+            CLASE_ESCRITURA: {"Capacidad": 30, "RecargaPorSegundo": 5},
+            CLASE_CONTRASENA: {"Capacidad": 5, "RecargaPorSegundo": 0.05},
+        }
+        for nombre, valores in config_limites.get("Clases", {}).items():
+            clases[nombre] = {**clases.get(nombre, {}), **valores}
+        self.clases = {
+            nombre: ClaseLimite(nombre, valores["Capacidad"], valores["RecargaPorSegundo"])
+            for nombre, valores in clases.items()
+        }
+        self.fragmentos = [FragmentoCubetas(self.clases) for _ in range(max(1, int(config_limites.get("Fragmentos", 16))))]
+        self.api_keys = set(config_limites.get("ApiKeys", []))
+
+    def consumir(self, nombre_clase, cliente, fichas=1):
+        """
+        Consume fichas del cliente en la clase indicada.
+
+        Args:
+            nombre_clase (str): Clase de ruta.
+            cliente (str): Identificador del cliente.
+            fichas (int): Fichas que cuesta la solicitud (se limitan a la capacidad de la
+                cubeta para que siempre pueda admitirse al llenarse).
+
+        Returns:
+            dict: Cabeceras RateLimit-* para la respuesta.
+
+        Raises:
+            ErrorLimiteTasa: Si el cliente no tiene fichas (429).
+        """
+        clase = self.clases[nombre_clase]
+        clave = (nombre_clase, cliente)
+        fragmento = self.fragmentos[hash(clave) % len(self.fragmentos)]
+        costo = min(max(1, fichas), clase.capacidad)
+        admitida, fichas = fragmento.consumir(clave, clase, time.monotonic(), costo)
+
+        # Segundos hasta tener las fichas que faltan y hasta llenar la cubeta
+        if clase.recarga_por_segundo > 0:
+            segundos_ficha = math.ceil(max(0.0, costo - fichas) / clase.recarga_por_segundo)
+            segundos_llena = math.ceil((clase.capacidad - fichas) / clase.recarga_por_segundo)
+        else:
+            segundos_ficha = segundos_llena = 0
+        cabeceras = {
+            "RateLimit-Limit": str(int(clase.capacidad)),
+            "RateLimit-Remaining": str(int(fichas)),
+            "RateLimit-Reset": str(segundos_llena),
+            "RateLimit-Policy": f'{int(clase.capacidad)};w={math.ceil(clase.capacidad / clase.recarga_por_segundo) if clase.recarga_por_segundo > 0 else 0};name="{clase.nombre}"',
+        }
+        if not admitida:
+            cabeceras["Retry-After"] = str(max(1, segundos_ficha))
+            cabeceras["RateLimit-Reset"] = cabeceras["Retry-After"]
+            raise ErrorLimiteTasa(f"Demasiadas solicitudes ({clase.nombre}); reintente más tarde", cabeceras=cabeceras)
+        return cabeceras
+
+
+def identificar_cliente(limitador):
+    """
+    Identifica al cliente de la solicitud actual.
+    Orden: sujeto de un JWT válido, API key reconocida y, por último, la IP.
+    Los tokens inválidos y las claves desconocidas no cuentan (si no, bastaría con
+    inventar uno distinto en cada solicitud para saltarse el límite).
+
+    Args:
+        limitador (LimitadorTasa): Limitador con las API keys reconocidas.
+
+    Returns:
+        str: Identificador con prefijo ("sub:", "key:" o "ip:").
+    """
+    autorizacion = request.headers.get("Authorization", "")
+    if autorizacion.startswith("Bearer "):
+        carga = current_app.extensions["token_service"].validar_token(autorizacion[7:])
+        if carga and carga.get("sub"):
+            return f"sub:{carga['sub']}"
+    api_key = request.headers.get(CABECERA_API_KEY)
+    if api_key and api_key in limitador.api_keys:
+        return f"key:{api_key}"
+    return f"ip:{request.remote_addr}"
+
+
+def clasificar_ruta():
+    """
+    Obtiene la clase de la ruta actual.
+
+    Returns:
+        str: CLASE_CONTRASENA, CLASE_LECTURA o CLASE_ESCRITURA.
+    """
+    if (request.endpoint or "").endswith("verificar_contrasena"):
+        return CLASE_CONTRASENA
+    if request.method in ("GET", "HEAD", "OPTIONS") or (request.endpoint or "").endswith(ENDPOINT_LECTURA_MULTIPLE):
+        return CLASE_LECTURA
+    return CLASE_ESCRITURA
+
+
+def contar_fichas():
+    """
+    Obtiene las fichas que cuesta la solicitud actual: una por lectura en /multi
+    (cada lectura es una consulta), una en las demás rutas.
+
+    Returns:
+        int: Fichas a consumir.
+    """
+    if not (request.endpoint or "").endswith(ENDPOINT_LECTURA_MULTIPLE):
+        return 1
+    cuerpo = request.get_json(silent=True)
+    lecturas = cuerpo.get("lecturas") if isinstance(cuerpo, dict) else None
+    return max(1, len(lecturas)) if isinstance(lecturas, dict) else 1
+
+
+def inicializar_limitador_tasa(app):
+    """
+    Crea el limitador de tasa si LimitesTasa.Habilitado es true.
+
+    Args:
+        app (Flask): Aplicación donde se guarda el limitador.
+    """
+    configuracion = app.config["DATOS_CONFIG"]
+    if configuracion.get("LimitesTasa", {}).get("Habilitado", True):
+        app.extensions["limitador_tasa"] = LimitadorTasa(configuracion)
+
+
+def aplicar_limite_tasa():
+    """
+    Consume las fichas de la solicitud actual (before_request).
+    Se limitan las rutas de un proyecto /api/<proyecto>/..., tengan tabla o no.
+    """
+    limitador = current_app.extensions.get("limitador_tasa")
+    if limitador is None or "nombre_proyecto" not in (request.view_args or {}):
+        return
+    g.cabeceras_limite_tasa = limitador.consumir(clasificar_ruta(), identificar_cliente(limitador), contar_fichas())
+
+
+def agregar_cabeceras_limite_tasa(respuesta):
+    """
+    Añade las cabeceras RateLimit-* a la respuesta (after_request).
+
+    Args:
+        respuesta (Response): Respuesta de la solicitud.
+
+    Returns:
+        Response: La misma respuesta con las cabeceras añadidas.
+    """
+    for nombre, valor in g.get("cabeceras_limite_tasa", {}).items():
+        respuesta.headers.setdefault(nombre, valor)
+    return respuesta
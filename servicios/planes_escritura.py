@@ -0,0 +1,395 @@
+# servicios/planes_escritura.py
+# Planes de escritura compilados para crear y actualizar, a partir del esquema real de la tabla
+# (equivalente a los comandos e "mappers" que un ORM genera una vez por entidad en C#)
+#
+# Para cada tabla, operación y conjunto de columnas recibidas se arma una sola vez:
+#   - el texto SQL con marcadores "?" (INSERT, UPDATE ... WHERE clave = ? o MERGE por clave),
+#   - el convertidor de cada columna según su tipo en INFORMATION_SCHEMA,
+#   - la columna de contraseña que se cifra (si la hay),
+#   - en las inserciones sin la clave primaria completa (IDENTITY, valores por defecto),
+#     la cláusula OUTPUT que devuelve la clave generada.
+# Así cada escritura solo convierte los valores y ejecuta, y los cuerpos con columnas
+# inexistentes o valores de tipo incorrecto se rechazan con 400 sin llegar a la base de datos.
+#
+# Los tipos de columna de cada tabla se guardan en memoria y se vuelven a leer cada
+# VERIFICACION_ESQUEMA_SEGUNDOS: si cambiaron (ALTER TABLE), se descartan los planes de la
+# tabla. También se descartan si una escritura con el plan falla en la base de datos.
+
+import collections
+import threading
+import time
+
+from servicios.conversion_tipos import obtener_convertidor, obtener_convertidor_json, obtener_tipos_columnas
+from servicios.errores import ErrorApi
+from servicios.esquema import obtener_clave_primaria
+
+# Operaciones con plan
+OPERACION_INSERTAR = "I"
+OPERACION_ACTUALIZAR = "U"
+OPERACION_COMBINAR = "M"  # Insertar o actualizar según exista la clave (MERGE)
+
+# Cada cuánto se comprueba si cambió el esquema de una tabla con planes
+VERIFICACION_ESQUEMA_SEGUNDOS = 60
+
+# Planes que se conservan (los menos usados se descartan)
+MAX_PLANES = 1000
+
+# Palabras que identifican columnas de contraseña (se cifran con bcrypt antes de guardar)
+CLAVES_CONTRASENA = ['password', 'contrasena', 'passw', 'clave']
+
+# Tipo con el que se devuelven las claves generadas (OUTPUT ... INTO no admite sql_variant en pyodbc)
+TIPO_CLAVE_GENERADA = "NVARCHAR(400)"
+
+
+class PlanEscritura:
+    """
+    SQL y conversiones de una escritura para una tabla y un conjunto de columnas.
+    """
+
+    __slots__ = ("sql", "columnas", "convertidores", "columna_contrasena", "convertidor_clave", "posicion_clave",
+                 "clave_primaria", "devuelve_clave")
+
+    def __init__(self, sql, columnas, convertidores, columna_contrasena=None, convertidor_clave=None,
+                 posicion_clave=None, clave_primaria=(), devuelve_clave=False):
+        """
+        Args:
+            sql (str): Comando con marcadores "?" (los de la clave, si la hay, al final).
+            columnas (tuple): Nombres reales de las columnas, en el orden del cuerpo recibido.
+            convertidores (tuple): Función de conversión de cada columna.
+            columna_contrasena (int): Posición de la columna que se cifra, o None.
+            convertidor_clave: Conversión del valor de la clave de la URL (solo actualizar).
+            posicion_clave (int): Posición de la columna clave en el cuerpo (solo combinar).
+            clave_primaria (tuple): Columnas de la clave primaria de la tabla (solo insertar).
+            devuelve_clave (bool): El comando devuelve una fila con la clave primaria generada
+                (solo insertar, si el cuerpo no trae la clave completa).
+        """
+        self.sql = sql
+        self.columnas = columnas
+        self.convertidores = convertidores
+        self.columna_contrasena = columna_contrasena
+        self.convertidor_clave = convertidor_clave
+        self.posicion_clave = posicion_clave
+        self.clave_primaria = clave_primaria
+        self.devuelve_clave = devuelve_clave
+
+    def preparar(self, datos_entidad):
+        """
+        Convierte los valores del cuerpo al tipo de cada columna y cifra la contraseña.
+
+        Args:
+            datos_entidad (dict): Cuerpo JSON con las mismas claves (y orden) que el plan.
+
+        Returns:
+            list: Valores listos para el comando, en el orden de las columnas.
+
+        Raises:
+            ErrorApi: Si un valor no es válido para su columna (400).
+        """
+        valores = []
+        for columna, convertidor, valor in zip(self.columnas, self.convertidores, datos_entidad.values()):
+            if valor is None:
+                valores.append(None)
+                continue
+            try:
+                valores.append(convertidor(valor))
+            except (TypeError, ValueError, OverflowError) as ex:
+                raise ErrorApi(f"Valor no válido para la columna '{columna}': {str(ex)}", 400)
+
+        # Si hay un campo de contraseña, cifrarla con bcrypt
+        if self.columna_contrasena is not None and valores[self.columna_contrasena]:
+            valores[self.columna_contrasena] = cifrar_contrasena(valores[self.columna_contrasena])
+        return valores
+
+    def convertir_clave(self, valor_clave):
+        """
+        Convierte el valor de la clave recibido en la URL al tipo de su columna.
+
+        Args:
+            valor_clave (str): Valor tomado de la ruta.
+
+        Returns:
+            object: Valor convertido.
+
+        Raises:
+            ErrorApi: Si el valor no es válido para la columna clave (400).
+        """
+        try:
+            return self.convertidor_clave(valor_clave)
+        except (TypeError, ValueError, OverflowError) as ex:
+            raise ErrorApi(f"El valor de la clave no es válido: {str(ex)}", 400)
+
+    def clave_insertada(self, valores, fila_salida=None):
+        """
+        Obtiene la clave primaria de la fila insertada con el plan.
+
+        Args:
+            valores (list): Valores preparados con preparar().
+            fila_salida (tuple): Fila devuelta por el comando, si el plan devuelve la clave.
+
+        Returns:
+            dict: {columna: valor} de la clave primaria, o None si la tabla no tiene clave
+            o el comando no devolvió la fila.
+        """
+        if not self.clave_primaria:
+            return None
+        if self.devuelve_clave:
+            return None if fila_salida is None else dict(zip(self.clave_primaria, fila_salida))
+        valores_columnas = dict(zip(self.columnas, valores))
+        return {columna: valores_columnas[columna] for columna in self.clave_primaria}
+
+
+def buscar_columna_contrasena(columnas, columna_clave=None):
+    """
+    Busca la columna de contraseña entre las columnas recibidas.
+
+    Args:
+        columnas (list): Nombres de las columnas.
+        columna_clave (str, optional): Columna que identifica la fila; nunca se cifra
+            ("clave" está en CLAVES_CONTRASENA y cifrarla impediría encontrar la fila).
+
+    Returns:
+        int: Posición de la primera columna cuyo nombre contiene una de CLAVES_CONTRASENA, o None.
+    """
+    return next(
+        (posicion for posicion, columna in enumerate(columnas)
+         if columna != columna_clave and any(pk in columna.lower() for pk in CLAVES_CONTRASENA)),
+        None,
+    )
+
+
+def cifrar_contrasena(valor):
+    """
+    Cifra una contraseña con bcrypt antes de guardarla.
+
+    Args:
+        valor: Contraseña en texto plano (se convierte con str).
+
+    Returns:
+        str: Hash bcrypt.
+    """
+    import bcrypt  # Importación diferida: solo se carga al cifrar contraseñas
+    return bcrypt.hashpw(str(valor).encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def tamanos_lote(total, maximo):
+    """
+    Reparte filas en lotes de como máximo `maximo` filas; el resto se divide en potencias
+    de dos para que solo haya unas pocas formas del comando (y de sus planes).
+
+    Args:
+        total (int): Filas a repartir.
+        maximo (int): Filas por lote.
+
+    Returns:
+        list: Tamaño de cada lote, en orden.
+    """
+    tamanos = [maximo] * (total // maximo)
+    resto = total % maximo
+    potencia = 1
+    while potencia * 2 <= resto:
+        potencia *= 2
+    while resto:
+        if potencia <= resto:
+            tamanos.append(potencia)
+            resto -= potencia
+        potencia //= 2
+    return tamanos
+
+
+class _EsquemaTabla:
+    """Tipos de columna y clave primaria de una tabla e instante de su última verificación."""
+
+    __slots__ = ("tipos", "clave_primaria", "columnas", "verificado_en")
+
+    def __init__(self, tipos, clave_primaria):
+        self.tipos = tipos
+        self.clave_primaria = clave_primaria
+        self.columnas = {columna.lower(): columna for columna in tipos}
+        self.verificado_en = time.monotonic()
+
+
+class CachePlanes:
+    """
+    Planes de escritura compilados del proceso, con invalidación por cambio de esquema.
+    """
+
+    def __init__(self, max_planes=MAX_PLANES, verificacion_segundos=VERIFICACION_ESQUEMA_SEGUNDOS):
+        """
+        Args:
+            max_planes (int): Planes que se conservan.
+            verificacion_segundos (float): Cada cuánto se vuelve a leer el esquema de una tabla.
+        """
+        self.max_planes = max_planes
+        self.verificacion_segundos = verificacion_segundos
+        self._candado = threading.Lock()
+        self._esquemas = {}  # {(proyecto, tabla): _EsquemaTabla}
+        self._planes = collections.OrderedDict()  # {(proyecto, tabla, operación, claves, nombre_clave, filas): PlanEscritura}
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def _obtener_esquema(self, conexion, proyecto, nombre_tabla):
+        """
+        Obtiene los tipos de columna y la clave primaria de la tabla, leyéndolos de nuevo si
+        venció la verificación. Si cambiaron, descarta los planes de la tabla.
+        """
+        clave = (proyecto, nombre_tabla.lower())
+        esquema = self._esquemas.get(clave)
+        if esquema is not None and time.monotonic() - esquema.verificado_en < self.verificacion_segundos:
+            return esquema
+
+        conexion.abrir_bd()
+        tipos = obtener_tipos_columnas(conexion, nombre_tabla)
+        if not tipos:
+            raise ErrorApi(f"La tabla '{nombre_tabla}' no existe", 404)
+        clave_primaria = tuple(obtener_clave_primaria(conexion, nombre_tabla))
+
+        with self._candado:
+            if esquema is not None and esquema.tipos == tipos and esquema.clave_primaria == clave_primaria:
+                esquema.verificado_en = time.monotonic()
+                return esquema
+            if esquema is not None:
+                print(f"Cambió el esquema de {proyecto}/{nombre_tabla}: se descartan sus planes de escritura")
+                self._descartar_planes(clave)
+            esquema = _EsquemaTabla(tipos, clave_primaria)
+            self._esquemas[clave] = esquema
+        return esquema
+
+    def _descartar_planes(self, clave_tabla):
+        """Descarta los planes de una tabla (el candado debe estar tomado)."""
+        for clave in [clave for clave in self._planes if clave[:2] == clave_tabla]:
+            del self._planes[clave]
+        self.invalidaciones += 1
+
+    def obtener(self, conexion, proyecto, nombre_tabla, operacion, datos_entidad, nombre_clave=None, filas=1):
+        """
+        Obtiene (o compila) el plan para escribir el cuerpo recibido en la tabla.
+
+        Args:
+            conexion (ControlConexion): Conexión de la solicitud; solo se abre si hay que leer el esquema.
+            proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla tomada de la ruta.
+            operacion (str): OPERACION_INSERTAR, OPERACION_ACTUALIZAR u OPERACION_COMBINAR.
+            datos_entidad (dict): Cuerpo JSON de la solicitud (la primera fila, si son varias).
+            nombre_clave (str): Columna de la clave de la URL (actualizar y combinar).
+            filas (int): Filas que combina cada ejecución del comando (solo combinar).
+
+        Returns:
+            PlanEscritura: Plan para estas columnas.
+
+        Raises:
+            ErrorApi: Si la tabla no existe (404) o alguna columna no existe (400).
+        """
+        esquema = self._obtener_esquema(conexion, proyecto, nombre_tabla)
+        clave_plan = (proyecto, nombre_tabla.lower(), operacion, tuple(datos_entidad), nombre_clave, filas)
+        with self._candado:
+            plan = self._planes.get(clave_plan)
+            if plan is not None:
+                self._planes.move_to_end(clave_plan)
+                self.aciertos += 1
+                return plan
+            self.fallos += 1
+
+        plan = self._compilar(esquema, nombre_tabla, operacion, datos_entidad, nombre_clave, filas)
+        with self._candado:
+            # Solo se guarda si el esquema con el que se compiló sigue vigente
+            if self._esquemas.get(clave_plan[:2]) is esquema:
+                self._planes[clave_plan] = plan
+                while len(self._planes) > self.max_planes:
+                    self._planes.popitem(last=False)
+        return plan
+
+    @staticmethod
+    def _compilar(esquema, nombre_tabla, operacion, datos_entidad, nombre_clave, filas):
+        """Arma el SQL y los convertidores de un plan."""
+        desconocidas = [clave for clave in datos_entidad if clave.lower() not in esquema.columnas]
+        if desconocidas:
+            raise ErrorApi(f"Columnas inexistentes en la tabla '{nombre_tabla}': {', '.join(desconocidas)}", 400)
+
+        columnas = tuple(esquema.columnas[clave.lower()] for clave in datos_entidad)
+        convertidores = tuple(obtener_convertidor_json(esquema.tipos[columna]) for columna in columnas)
+
+        if operacion == OPERACION_INSERTAR:
+            # Buscar si alguna columna contiene palabras relacionadas con contraseñas
+            columna_contrasena = buscar_columna_contrasena(columnas)
+            texto_columnas = ", ".join(f"[{columna}]" for columna in columnas)
+            marcadores = ", ".join("?" for _ in columnas)
+            sql = f"INSERT INTO {nombre_tabla} ({texto_columnas}) VALUES ({marcadores})"
+            if all(columna in columnas for columna in esquema.clave_primaria):
+                return PlanEscritura(sql, columnas, convertidores, columna_contrasena,
+                                     clave_primaria=esquema.clave_primaria)
+
+            # La base de datos genera (parte de) la clave: se devuelve con OUTPUT. Pasa por una
+            # variable de tabla porque OUTPUT sin INTO falla si la tabla tiene triggers
+            definicion = ", ".join(f"[{columna}] {TIPO_CLAVE_GENERADA}" for columna in esquema.clave_primaria)
+            salida = ", ".join(f"CAST(inserted.[{columna}] AS {TIPO_CLAVE_GENERADA})" for columna in esquema.clave_primaria)
+            sql = (f"SET NOCOUNT ON; DECLARE @api_claves_generadas TABLE ({definicion}); "
+                   f"INSERT INTO {nombre_tabla} ({texto_columnas}) OUTPUT {salida} INTO @api_claves_generadas "
+                   f"VALUES ({marcadores}); SELECT * FROM @api_claves_generadas;")
+            return PlanEscritura(sql, columnas, convertidores, columna_contrasena,
+                                 clave_primaria=esquema.clave_primaria, devuelve_clave=True)
+
+        columna_clave = esquema.columnas.get(nombre_clave.lower())
+        if columna_clave is None:
+            raise ErrorApi(f"La columna clave '{nombre_clave}' no existe en la tabla '{nombre_tabla}'", 400)
+        columna_contrasena = buscar_columna_contrasena(columnas, columna_clave)
+
+        if operacion == OPERACION_COMBINAR:
+            if columna_clave not in columnas:
+                raise ErrorApi(f"Cada fila debe incluir la columna clave '{columna_clave}'", 400)
+            # Un solo MERGE para todas las filas del lote: la existencia se decide en el servidor
+            # y HOLDLOCK evita que dos combinaciones simultáneas inserten la misma clave
+            texto_columnas = ", ".join(f"[{columna}]" for columna in columnas)
+            marcadores = ", ".join("(" + ", ".join("?" for _ in columnas) + ")" for _ in range(filas))
+            actualizaciones = ", ".join(f"destino.[{columna}] = origen.[{columna}]"
+                                        for columna in columnas if columna != columna_clave)
+            insercion = ", ".join(f"origen.[{columna}]" for columna in columnas)
+            # Igual que en la inserción, OUTPUT pasa por una variable de tabla (sin INTO falla con triggers)
+            sql = (f"SET NOCOUNT ON; DECLARE @api_acciones TABLE (accion NVARCHAR(10), clave {TIPO_CLAVE_GENERADA}); "
+                   f"MERGE INTO {nombre_tabla} WITH (HOLDLOCK) AS destino "
+                   f"USING (VALUES {marcadores}) AS origen ({texto_columnas}) "
+                   f"ON destino.[{columna_clave}] = origen.[{columna_clave}] "
+                   + (f"WHEN MATCHED THEN UPDATE SET {actualizaciones} " if actualizaciones else "")
+                   + f"WHEN NOT MATCHED THEN INSERT ({texto_columnas}) VALUES ({insercion}) "
+                   f"OUTPUT $action, CAST(inserted.[{columna_clave}] AS {TIPO_CLAVE_GENERADA}) INTO @api_acciones; "
+                   f"SELECT accion, clave FROM @api_acciones;")
+            return PlanEscritura(sql, columnas, convertidores, columna_contrasena,
+                                 posicion_clave=columnas.index(columna_clave))
+
+        actualizaciones = ", ".join(f"[{columna}]=?" for columna in columnas)
+        sql = f"UPDATE {nombre_tabla} SET {actualizaciones} WHERE [{columna_clave}]=?"
+        return PlanEscritura(sql, columnas, convertidores, columna_contrasena,
+                             obtener_convertidor(esquema.tipos[columna_clave]))
+
+    def invalidar(self, proyecto, nombre_tabla):
+        """
+        Descarta el esquema y los planes de una tabla (la próxima escritura los vuelve a leer).
+
+        Args:
+            proyecto (str): Proyecto de la tabla.
+            nombre_tabla (str): Tabla.
+        """
+        clave = (proyecto, nombre_tabla.lower())
+        with self._candado:
+            if self._esquemas.pop(clave, None) is not None:
+                self._descartar_planes(clave)
+
+    def estadisticas(self):
+        """
+        Obtiene el uso de la caché de planes.
+
+        Returns:
+            dict: Planes y tablas en caché, aciertos, fallos e invalidaciones.
+        """
+        with self._candado:
+            return {
+                "planes": len(self._planes),
+                "tablas": len(self._esquemas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "invalidaciones": self.invalidaciones,
+            }
+
+
+# Caché del proceso (los planes no contienen conexiones: se puede heredar tras el fork)
+planes_escritura = CachePlanes()
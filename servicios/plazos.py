@@ -0,0 +1,112 @@
+# servicios/plazos.py
+# Plazo máximo (deadline) de cada solicitud para las consultas a la base de datos
+# (equivalente a CommandTimeout + CancellationToken de la solicitud en C#)
+#
+# Configuración (configuracion/config.json):
+#     "TiemposEspera": {
+#         "ConsultaSegundos": 30,                   (por defecto para todas las rutas)
+#         "Rutas": {"exportar": 0, "listar": 60}    (por ruta; 0 = sin límite)
+#     }
+# El cliente puede acortar el plazo con las cabeceras:
+#     X-Request-Timeout-Ms: 2500           (milisegundos desde que llega la solicitud)
+#     X-Request-Deadline: 1760000000000    (instante absoluto, milisegundos Unix)
+# El plazo del cliente nunca amplía el configurado en el servidor.
+
+import math
+import time
+
+from flask import current_app, g, request
+
+from servicios.errores import ErrorApi, ErrorTiempoAgotado
+
+CABECERA_TIEMPO_ESPERA = "X-Request-Timeout-Ms"
+CABECERA_LIMITE = "X-Request-Deadline"
+
+
+def obtener_tiempo_espera_ruta(configuracion, nombre_endpoint):
+    """
+    Obtiene el tiempo de espera configurado para una ruta.
+
+    Args:
+        configuracion (dict): Configuración de la aplicación.
+        nombre_endpoint (str): Endpoint de Flask (por ejemplo "entidades.listar").
+
+    Returns:
+        float: Segundos permitidos, o 0 si la ruta no tiene límite.
+    """
+    config_tiempos = configuracion.get("TiemposEspera", {})
+    por_ruta = config_tiempos.get("Rutas", {})
+    nombre_corto = (nombre_endpoint or "").rsplit(".", 1)[-1]
+    for clave in (nombre_endpoint, nombre_corto):
+        if clave in por_ruta:
+            return float(por_ruta[clave])
+    return float(config_tiempos.get("ConsultaSegundos", 30))
+
+
+def calcular_limite(tiempo_espera_ruta, cabeceras, ahora_monotonico=None, ahora_epoca=None):
+    """
+    Calcula el instante límite (reloj monotónico) combinando el plazo de la ruta
+    con el que envía el cliente. Gana siempre el más corto.
+
+    Args:
+        tiempo_espera_ruta (float): Segundos configurados para la ruta (0 = sin límite).
+        cabeceras: Cabeceras de la solicitud.
+        ahora_monotonico (float, optional): Instante actual del reloj monotónico.
+        ahora_epoca (float, optional): Instante actual en segundos Unix.
+
+    Returns:
+        float: Instante límite en el reloj monotónico, o None si no hay límite.
+    """
+    ahora_monotonico = time.monotonic() if ahora_monotonico is None else ahora_monotonico
+    ahora_epoca = time.time() if ahora_epoca is None else ahora_epoca
+
+    candidatos = []
+    if tiempo_espera_ruta > 0:
+        candidatos.append(tiempo_espera_ruta)
+
+    # Plazo relativo enviado por el cliente ("nan" o "inf" no son plazos válidos)
+    valor = cabeceras.get(CABECERA_TIEMPO_ESPERA)
+    if valor:
+        try:
+            milisegundos = float(valor)
+            if not math.isfinite(milisegundos):
+                raise ValueError(valor)
+            candidatos.append(milisegundos / 1000)
+        except ValueError:
+            raise ErrorApi(f"La cabecera {CABECERA_TIEMPO_ESPERA} debe ser un número de milisegundos", 400)
+
+    # Plazo absoluto propagado por un servicio anterior
+    valor = cabeceras.get(CABECERA_LIMITE)
+    if valor:
+        try:
+            milisegundos = float(valor)
+            if not math.isfinite(milisegundos):
+                raise ValueError(valor)
+            candidatos.append(milisegundos / 1000 - ahora_epoca)
+        except ValueError:
+            raise ErrorApi(f"La cabecera {CABECERA_LIMITE} debe ser un instante Unix en milisegundos", 400)
+
+    if not candidatos:
+        return None
+    return ahora_monotonico + min(candidatos)
+
+
+def establecer_limite_solicitud():
+    """
+    Calcula el plazo de la solicitud actual y lo guarda en flask.g.
+    Se registra con before_request en app.py.
+    """
+    tiempo_espera_ruta = obtener_tiempo_espera_ruta(current_app.config["DATOS_CONFIG"], request.endpoint)
+    g.limite_solicitud = calcular_limite(tiempo_espera_ruta, request.headers)
+    if g.limite_solicitud is not None and g.limite_solicitud <= time.monotonic():
+        raise ErrorTiempoAgotado("El plazo de la solicitud ya había vencido al recibirla")
+
+
+def obtener_limite_solicitud():
+    """
+    Obtiene el plazo de la solicitud actual.
+
+    Returns:
+        float: Instante límite en el reloj monotónico, o None si no hay límite.
+    """
+    return g.get("limite_solicitud")
@@ -0,0 +1,247 @@
+# servicios/pool_conexiones.py
+# Pool de conexiones pyodbc con tamaño máximo (equivalente al pooling de SqlConnection en C#)
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+from servicios.errores import ErrorPoolAgotado
+from servicios.tiempos_solicitud import medir, sumar_tiempo
+
+# Sentencias preparadas (cursores) que se conservan por conexión
+MAX_SENTENCIAS_POR_CONEXION = 32
+
+
+class CacheSentencias:
+    """
+    Cursores reutilizables de una conexión, uno por texto SQL (LRU).
+    pyodbc solo vuelve a preparar una sentencia si el cursor recibe un SQL distinto
+    al de su última ejecución: con un cursor por consulta, las repetidas se ejecutan
+    sin enviar ni analizar de nuevo el texto.
+    El tiempo de espera forma parte de la clave porque pyodbc lo fija al crear el cursor.
+    Solo la usa el hilo que tiene la conexión prestada, por eso no lleva candado.
+    """
+
+    def __init__(self, tamano_maximo=MAX_SENTENCIAS_POR_CONEXION):
+        """
+        Args:
+            tamano_maximo (int): Cursores que se conservan como máximo.
+        """
+        self.tamano_maximo = tamano_maximo
+        self._cursores = OrderedDict()  # (sql, tiempo de espera) -> cursor
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, conexion, sql, tiempo_espera):
+        """
+        Obtiene el cursor de una consulta, creándolo si no existe.
+
+        Args:
+            conexion: Conexión pyodbc a la que pertenece la caché.
+            sql (str): Texto SQL que se va a ejecutar.
+            tiempo_espera (int): Tiempo de espera aplicado a la conexión al crear el cursor.
+
+        Returns:
+            Cursor: Cursor listo para ejecutar el SQL.
+        """
+        clave = (sql, tiempo_espera)
+        cursor = self._cursores.get(clave)
+        if cursor is not None:
+            self._cursores.move_to_end(clave)
+            self.aciertos += 1
+            return cursor
+
+        self.fallos += 1
+        cursor = conexion.cursor()
+        self._cursores[clave] = cursor
+        if len(self._cursores) > self.tamano_maximo:
+            _, antiguo = self._cursores.popitem(last=False)
+            _cerrar_silencioso(antiguo)
+        return cursor
+
+    def descartar(self, cursor):
+        """
+        Quita un cursor de la caché (tras un error puede quedar en un estado no reutilizable).
+
+        Args:
+            cursor: Cursor a descartar.
+        """
+        for clave, existente in list(self._cursores.items()):
+            if existente is cursor:
+                del self._cursores[clave]
+        _cerrar_silencioso(cursor)
+
+    def cerrar(self):
+        """Cierra todos los cursores."""
+        for cursor in self._cursores.values():
+            _cerrar_silencioso(cursor)
+        self._cursores.clear()
+
+
+def _cerrar_silencioso(objeto):
+    """Cierra una conexión o cursor ignorando los errores (puede estar ya roto)."""
+    try:
+        objeto.close()
+    except Exception:
+        pass
+
+
+class PoolConexiones:
+    """
+    Pool de conexiones de un proyecto.
+    Limita el número de conexiones abiertas, reutiliza las libres (la más reciente
+    primero) y cierra las que llevan demasiado tiempo sin usarse.
+    """
+
+    def __init__(self, nombre, fabrica_conexion, tamano_maximo=10, tiempo_espera=5, tiempo_inactividad=300):
+        """
+        Constructor de la clase.
+
+        Args:
+            nombre (str): Nombre del pool (normalmente el proyecto), para los mensajes.
+            fabrica_conexion: Función sin argumentos que abre una conexión nueva.
+            tamano_maximo (int): Número máximo de conexiones abiertas a la vez.
+            tiempo_espera (float): Segundos que se espera una conexión libre antes de fallar.
+            tiempo_inactividad (float): Segundos tras los que se cierra una conexión libre.
+        """
+        self.nombre = nombre
+        self.fabrica_conexion = fabrica_conexion
+        self.tamano_maximo = tamano_maximo
+        self.tiempo_espera = tiempo_espera
+        self.tiempo_inactividad = tiempo_inactividad
+
+        self._libres = deque()  # Tuplas (conexion, momento en que se devolvió)
+        self._sentencias = {}  # id(conexion) -> CacheSentencias de las conexiones abiertas
+        self._en_uso = 0
+        self._cerrado = False
+        self._condicion = threading.Condition()
+        self.ultimo_uso = time.monotonic()
+
+    def obtener(self):
+        """
+        Obtiene una conexión libre o abre una nueva si no se alcanzó el máximo.
+        Si el pool está lleno, espera hasta tiempo_espera segundos.
+
+        Returns:
+            Connection: Conexión pyodbc lista para usar.
+        """
+        inicio = time.monotonic()
+        limite = inicio + self.tiempo_espera
+        with self._condicion:
+            while not self._libres and self._en_uso >= self.tamano_maximo:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise ErrorPoolAgotado(
+                        f"No hay conexiones disponibles para el proyecto {self.nombre} "
+                        f"({self.tamano_maximo} en uso)"
+                    )
+                self._condicion.wait(restante)
+
+            self._en_uso += 1
+            self.ultimo_uso = time.monotonic()
+            conexion = self._libres.pop()[0] if self._libres else None
+        sumar_tiempo("pool", time.monotonic() - inicio)
+
+        # Abrir la conexión fuera del candado para no bloquear a los demás hilos
+        if conexion is None:
+            try:
+                with medir("connect"):
+                    conexion = self.fabrica_conexion()
+            except Exception:
+                self._liberar_cupo()
+                raise
+        return conexion
+
+    def devolver(self, conexion, descartar=False):
+        """
+        Devuelve una conexión al pool.
+
+        Args:
+            conexion: Conexión obtenida con obtener().
+            descartar (bool): Si es True, la conexión se cierra en lugar de reutilizarse
+                (por ejemplo, tras un error de comunicación).
+        """
+        # Las conexiones de un pool cerrado (proyecto liberado) no se reutilizan
+        if descartar or self._cerrado:
+            self._cerrar(conexion)
+            self._liberar_cupo()
+            return
+        with self._condicion:
+            self._en_uso -= 1
+            self._libres.append((conexion, time.monotonic()))
+            self._condicion.notify()
+
+    def obtener_sentencias(self, conexion):
+        """
+        Obtiene la caché de sentencias preparadas de una conexión del pool.
+
+        Args:
+            conexion: Conexión obtenida con obtener().
+
+        Returns:
+            CacheSentencias: Caché propia de la conexión (vive mientras la conexión esté abierta).
+        """
+        sentencias = self._sentencias.get(id(conexion))
+        if sentencias is None:
+            with self._condicion:
+                sentencias = self._sentencias.setdefault(id(conexion), CacheSentencias())
+        return sentencias
+
+    def podar_inactivas(self):
+        """
+        Cierra las conexiones libres que superan el tiempo de inactividad.
+
+        Returns:
+            int: Número de conexiones cerradas.
+        """
+        limite = time.monotonic() - self.tiempo_inactividad
+        cerradas = []
+        with self._condicion:
+            # Las más antiguas están al principio de la cola
+            while self._libres and self._libres[0][1] < limite:
+                cerradas.append(self._libres.popleft()[0])
+        for conexion in cerradas:
+            self._cerrar(conexion)
+        return len(cerradas)
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres del pool."""
+        with self._condicion:
+            self._cerrado = True
+            conexiones = [conexion for conexion, _ in self._libres]
+            self._libres.clear()
+        for conexion in conexiones:
+            self._cerrar(conexion)
+
+    def estadisticas(self):
+        """
+        Obtiene el estado actual del pool.
+
+        Returns:
+            dict: Conexiones en uso, libres y máximo.
+        """
+        with self._condicion:
+            sentencias = list(self._sentencias.values())
+            estadisticas = {"en_uso": self._en_uso, "libres": len(self._libres), "maximo": self.tamano_maximo}
+        estadisticas["sentencias_aciertos"] = sum(cache.aciertos for cache in sentencias)
+        estadisticas["sentencias_fallos"] = sum(cache.fallos for cache in sentencias)
+        return estadisticas
+
+    @property
+    def en_uso(self):
+        """Número de conexiones prestadas en este momento."""
+        return self._en_uso
+
+    def _liberar_cupo(self):
+        """Libera el cupo de una conexión que no vuelve al pool."""
+        with self._condicion:
+            self._en_uso -= 1
+            self._condicion.notify()
+
+    def _cerrar(self, conexion):
+        """Cierra una conexión y sus sentencias preparadas ignorando los errores (puede estar ya rota)."""
+        with self._condicion:
+            sentencias = self._sentencias.pop(id(conexion), None)
+        if sentencias is not None:
+            sentencias.cerrar()
+        _cerrar_silencioso(conexion)
@@ -0,0 +1,241 @@
+# servicios/registro_proyectos.py
+# Registro de proyectos (inquilinos): cada proyecto de la ruta /api/<nombre_proyecto>/...
+# tiene su propia base de datos, su propio pool de conexiones y su presupuesto de caché
+#
+# Configuración (configuracion/config.json):
+#     "Proyectos": {
+#         "facturas": {"CadenaConexion": "...", "TamanoPool": 20, "PresupuestoCacheMB": 64}
+#     },
+#     "Pools": {"TamanoPorDefecto": 10, "TiempoEsperaSegundos": 5, ...}
+# Los proyectos no registrados comparten el pool de la conexión por defecto (DatabaseProvider).
+
+import threading
+import time
+
+from servicios.control_conexion import crear_conexion
+from servicios.pool_conexiones import PoolConexiones
+
+# Clave del pool compartido por los proyectos no registrados
+PROYECTO_POR_DEFECTO = "*"
+
+
+class ConfiguracionProyecto:
+    """
+    Configuración de un proyecto: conexión, tamaño de pool y presupuesto de caché.
+    """
+
+    def __init__(self, nombre, cadena_conexion, tamano_pool, presupuesto_cache_mb):
+        """
+        Args:
+            nombre (str): Nombre del proyecto (en minúsculas).
+            cadena_conexion (str): Cadena de conexión a su base de datos.
+            tamano_pool (int): Máximo de conexiones simultáneas del proyecto.
+            presupuesto_cache_mb (int): Memoria máxima que pueden usar sus cachés.
+        """
+        self.nombre = nombre
+        self.cadena_conexion = cadena_conexion
+        self.tamano_pool = tamano_pool
+        self.presupuesto_cache_mb = presupuesto_cache_mb
+
+
+class RegistroProyectos:
+    """
+    Crea los pools de conexiones de cada proyecto la primera vez que se usan y
+    libera los de los proyectos que llevan tiempo sin actividad.
+    Un proyecto con mucha carga solo puede agotar su propio pool.
+    """
+
+    def __init__(self, configuracion):
+        """
+        Constructor de la clase.
+
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+        """
+        config_pools = configuracion.get("Pools", {})
+        self.tamano_por_defecto = int(config_pools.get("TamanoPorDefecto", 10))
+        self.tiempo_espera = float(config_pools.get("TiempoEsperaSegundos", 5))
+        self.inactividad_conexion = float(config_pools.get("InactividadConexionSegundos", 300))
+        self.inactividad_proyecto = float(config_pools.get("InactividadProyectoSegundos", 900))
+        self.intervalo_mantenimiento = float(config_pools.get("IntervaloMantenimientoSegundos", 60))
+        presupuesto_por_defecto = int(config_pools.get("PresupuestoCacheMBPorDefecto", 64))
+
+        # Conexión por defecto (la misma que usaba ControlConexion.abrir_bd)
+        proveedor = configuracion.get("DatabaseProvider")
+        cadena_por_defecto = configuracion.get("ConnectionStrings", {}).get(proveedor)
+
+        self.proyectos = {
+            PROYECTO_POR_DEFECTO: ConfiguracionProyecto(
+                PROYECTO_POR_DEFECTO, cadena_por_defecto, self.tamano_por_defecto, presupuesto_por_defecto
+            )
+        }
+        for nombre, datos in configuracion.get("Proyectos", {}).items():
+            self.proyectos[nombre.lower()] = ConfiguracionProyecto(
+                nombre.lower(),
+                datos.get("CadenaConexion", cadena_por_defecto),
+                int(datos.get("TamanoPool", self.tamano_por_defecto)),
+                int(datos.get("PresupuestoCacheMB", presupuesto_por_defecto)),
+            )
+
+        self._pools = {}
+        self._memoria_cache = {}  # proyecto -> {clave de la caché: bytes reservados}
+        self._candado = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo_mantenimiento = None
+
+    def obtener_configuracion_proyecto(self, nombre_proyecto):
+        """
+        Obtiene la configuración de un proyecto (la de por defecto si no está registrado).
+
+        Args:
+            nombre_proyecto (str): Nombre del proyecto tomado de la ruta.
+
+        Returns:
+            ConfiguracionProyecto: Configuración aplicable.
+        """
+        clave = (nombre_proyecto or "").lower()
+        return self.proyectos.get(clave, self.proyectos[PROYECTO_POR_DEFECTO])
+
+    def obtener_pool(self, nombre_proyecto):
+        """
+        Obtiene el pool de conexiones de un proyecto, creándolo si no existe.
+
+        Args:
+            nombre_proyecto (str): Nombre del proyecto tomado de la ruta.
+
+        Returns:
+            PoolConexiones: Pool del proyecto.
+        """
+        proyecto = self.obtener_configuracion_proyecto(nombre_proyecto)
+        pool = self._pools.get(proyecto.nombre)
+        if pool is not None:
+            return pool
+
+        with self._candado:
+            pool = self._pools.get(proyecto.nombre)
+            if pool is None:
+                if not proyecto.cadena_conexion:
+                    raise ValueError(f"La cadena de conexión del proyecto {proyecto.nombre} es nula o vacía")
+                pool = PoolConexiones(
+                    proyecto.nombre,
+                    lambda: crear_conexion(proyecto.cadena_conexion),
+                    tamano_maximo=proyecto.tamano_pool,
+                    tiempo_espera=self.tiempo_espera,
+                    tiempo_inactividad=self.inactividad_conexion,
+                )
+                self._pools[proyecto.nombre] = pool
+                print(f"Pool de conexiones creado para el proyecto {proyecto.nombre} (máximo {proyecto.tamano_pool})")
+            return pool
+
+    def reservar_memoria_cache(self, nombre_proyecto, clave, cantidad_bytes):
+        """
+        Reserva memoria del presupuesto de caché del proyecto.
+        Una nueva reserva con la misma clave reemplaza a la anterior (al refrescar una caché).
+
+        Args:
+            nombre_proyecto (str): Nombre del proyecto.
+            clave (str): Identificador de la caché dentro del proyecto.
+            cantidad_bytes (int): Memoria que ocupará la caché.
+
+        Returns:
+            bool: True si cabe en el presupuesto; si no, no se reserva nada.
+        """
+        proyecto = self.obtener_configuracion_proyecto(nombre_proyecto)
+        with self._candado:
+            reservas = self._memoria_cache.setdefault(proyecto.nombre, {})
+            en_uso = sum(reservas.values()) - reservas.get(clave, 0)
+            if en_uso + cantidad_bytes > proyecto.presupuesto_cache_mb * 1024 * 1024:
+                return False
+            reservas[clave] = cantidad_bytes
+            return True
+
+    def liberar_memoria_cache(self, nombre_proyecto, clave):
+        """
+        Libera la reserva de memoria de una caché del proyecto.
+
+        Args:
+            nombre_proyecto (str): Nombre del proyecto.
+            clave (str): Identificador de la caché dentro del proyecto.
+        """
+        proyecto = self.obtener_configuracion_proyecto(nombre_proyecto)
+        with self._candado:
+            self._memoria_cache.get(proyecto.nombre, {}).pop(clave, None)
+
+    def mantener(self):
+        """
+        Cierra las conexiones inactivas y elimina los pools de los proyectos sin actividad.
+        """
+        ahora = time.monotonic()
+        with self._candado:
+            pools = list(self._pools.items())
+        for nombre, pool in pools:
+            pool.podar_inactivas()
+            if pool.en_uso == 0 and ahora - pool.ultimo_uso > self.inactividad_proyecto:
+                with self._candado:
+                    # Volver a comprobar: otro hilo pudo usarlo mientras tanto
+                    if pool.en_uso == 0 and self._pools.get(nombre) is pool:
+                        del self._pools[nombre]
+                    else:
+                        continue
+                pool.cerrar()
+                print(f"Pool del proyecto {nombre} liberado por inactividad")
+
+    def iniciar_mantenimiento(self):
+        """Inicia el hilo que ejecuta mantener() periódicamente."""
+        def ciclo():
+            while not self._detener.wait(self.intervalo_mantenimiento):
+                try:
+                    self.mantener()
+                except Exception as ex:
+                    print(f"Error en el mantenimiento de pools: {str(ex)}")
+
+        self._hilo_mantenimiento = threading.Thread(target=ciclo, name="mantenimiento-pools", daemon=True)
+        self._hilo_mantenimiento.start()
+
+    def cerrar(self):
+        """Detiene el mantenimiento y cierra todos los pools."""
+        self._detener.set()
+        with self._candado:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.cerrar()
+
+    def estadisticas(self):
+        """
+        Obtiene el estado de los pools activos.
+
+        Returns:
+            dict: {proyecto: estadísticas del pool y memoria de caché usada}.
+        """
+        with self._candado:
+            pools = dict(self._pools)
+            memoria = {nombre: sum(reservas.values()) for nombre, reservas in self._memoria_cache.items()}
+        estadisticas = {nombre: pool.estadisticas() for nombre, pool in pools.items()}
+        for nombre, cantidad_bytes in memoria.items():
+            estadisticas.setdefault(nombre, {})["memoria_cache_mb"] = round(cantidad_bytes / (1024 * 1024), 2)
+        return estadisticas
+
+
+def inicializar_registro_proyectos(app):
+    """
+    Crea el registro de proyectos del proceso (se ejecuta después del fork).
+
+    Args:
+        app (Flask): Aplicación donde se guarda el registro.
+    """
+    registro = RegistroProyectos(app.config["DATOS_CONFIG"])
+    registro.iniciar_mantenimiento()
+    app.extensions["registro_proyectos"] = registro
+
+
+def finalizar_registro_proyectos(app):
+    """
+    Cierra los pools del proceso.
+
+    Args:
+        app (Flask): Aplicación donde se guardó el registro.
+    """
+    registro = app.extensions.pop("registro_proyectos", None)
+    if registro is not None:
+        registro.cerrar()
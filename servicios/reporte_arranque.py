@@ -0,0 +1,85 @@
+# servicios/reporte_arranque.py
+# Informe del tiempo de arranque de la API: coste de importación por módulo
+#
+# Uso:
+#     python -m servicios.reporte_arranque            (muestra los 25 paquetes más costosos)
+#     python -m servicios.reporte_arranque --top 50
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+def medir_importaciones(modulo="app"):
+    """
+    Importa un módulo en un proceso nuevo con "python -X importtime" y recoge el
+    coste de importación de cada módulo cargado.
+
+    Args:
+        modulo (str): Módulo a importar (por defecto app, que crea la aplicación).
+
+    Returns:
+        list: Lista de tuplas (nombre_modulo, tiempo_propio_us, tiempo_acumulado_us).
+    """
+    raiz_proyecto = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=raiz_proyecto,
+        capture_output=True,
+        text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr}")
+
+    # Cada línea tiene el formato: "import time:   propio |   acumulado | nombre"
+    mediciones = []
+    for linea in proceso.stderr.splitlines():
+        if not linea.startswith("import time:"):
+            continue
+        partes = linea[len("import time:"):].split("|")
+        if len(partes) != 3 or not partes[0].strip().isdigit():
+            continue  # Línea de encabezado
+        mediciones.append((partes[2].strip(), int(partes[0]), int(partes[1])))
+    return mediciones
+
+
+def agrupar_por_paquete(mediciones):
+    """
+    Suma el tiempo propio de importación de los módulos de cada paquete de primer nivel.
+
+    Args:
+        mediciones (list): Resultado de medir_importaciones.
+
+    Returns:
+        list: Lista de tuplas (paquete, tiempo_us, numero_modulos) ordenada de mayor a menor tiempo.
+    """
+    paquetes = {}
+    for nombre, propio, _ in mediciones:
+        paquete = nombre.split(".")[0]
+        tiempo, cantidad = paquetes.get(paquete, (0, 0))
+        paquetes[paquete] = (tiempo + propio, cantidad + 1)
+    return sorted(((p, t, c) for p, (t, c) in paquetes.items()), key=lambda item: item[1], reverse=True)
+
+
+def main():
+    """Punto de entrada del informe por línea de comandos."""
+    parser = argparse.ArgumentParser(description="Coste de importación por módulo al arrancar la API")
+    parser.add_argument("--modulo", default="app", help="Módulo a importar (por defecto: app)")
+    parser.add_argument("--top", type=int, default=25, help="Número de paquetes a mostrar")
+    argumentos = parser.parse_args()
+
+    mediciones = medir_importaciones(argumentos.modulo)
+    total_us = sum(propio for _, propio, _ in mediciones)
+
+    print(f"Tiempo total de importación de '{argumentos.modulo}': {total_us / 1000:.1f} ms ({len(mediciones)} módulos)")
+    print()
+    print(f"{'Paquete':<30} {'Tiempo (ms)':>12} {'%':>6} {'Módulos':>8}")
+    print("-" * 60)
+    for paquete, tiempo_us, cantidad in agrupar_por_paquete(mediciones)[:argumentos.top]:
+        porcentaje = 100 * tiempo_us / total_us if total_us else 0
+        print(f"{paquete:<30} {tiempo_us / 1000:>12.1f} {porcentaje:>6.1f} {cantidad:>8}")
+
+
+if __name__ == "__main__":
+    main()
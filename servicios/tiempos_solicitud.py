@@ -0,0 +1,160 @@
+# servicios/tiempos_solicitud.py
+# Desglose del tiempo de cada solicitud en la cabecera Server-Timing
+# (equivalente a los diagnósticos de MiniProfiler en ASP.NET Core)
+#
+# Cuando está activo para una solicitud, se acumula cuánto tiempo se fue en cada etapa:
+#     pool       espera por una conexión libre del pool
+#     connect    apertura de conexiones nuevas
+#     execute    ejecución de las sentencias (cursor.execute)
+#     fetch      lectura de las filas (fetchall/fetchmany)
+#     transform  construcción del DataFrame y conversión celda a celda
+#     serialize  codificación del cuerpo (JSON o MessagePack)
+# y se devuelve como
+#     Server-Timing: pool;dur=0.1, execute;dur=12.4, fetch;dur=3.0, ..., total;dur=20.2
+# junto con una línea JSON en la salida estándar con los mismos datos.
+# La API no comprime respuestas (lo hace el proxy), así que no hay etapa de compresión.
+# En las respuestas en flujo (exportar, eventos) solo se mide hasta que empieza el envío.
+#
+# Se activa por solicitud con la cabecera "X-Server-Timing: 1" o ?timing=1, o para una
+# muestra de las solicitudes (Muestreo). Todo se mide con time.perf_counter (monotónico).
+#
+# Aparte, la etapa execute se acumula siempre para las solicitudes admitidas por el control
+# de admisión (por hilo, con o sin Server-Timing): es la latencia con la que ajusta su límite.
+#
+# Configuración (configuracion/config.json):
+#     "TiemposSolicitud": {"Habilitado": true, "Muestreo": 0.01, "RegistrarEnLog": true}
+
+import json
+import random
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+
+# Etapas en el orden en que se informan
+ETAPAS = ("pool", "connect", "execute", "fetch", "transform", "serialize")
+
+CABECERA_ACTIVAR = "X-Server-Timing"
+
+# Segundos de ejecución en la base de datos del hilo actual (None si no se acumulan)
+_ejecucion = threading.local()
+
+
+def _tiempos_activos():
+    """Acumulador de la solicitud actual, o None si no se está midiendo."""
+    if not has_request_context():
+        return None
+    return g.get("tiempos_etapas")
+
+
+def sumar_tiempo(etapa, segundos):
+    """
+    Suma tiempo a una etapa de la solicitud actual (no hace nada si no se está midiendo).
+
+    Args:
+        etapa (str): Una de ETAPAS.
+        segundos (float): Duración medida con un reloj monotónico.
+    """
+    tiempos = _tiempos_activos()
+    if tiempos is not None:
+        tiempos[etapa] += segundos
+
+
+def iniciar_tiempo_ejecucion():
+    """
+    Empieza a acumular el tiempo de la etapa execute en el hilo actual.
+    """
+    _ejecucion.segundos = 0.0
+
+
+def terminar_tiempo_ejecucion():
+    """
+    Deja de acumular el tiempo de la etapa execute en el hilo actual.
+
+    Returns:
+        float: Segundos acumulados, o None si no se estaba acumulando.
+    """
+    segundos = getattr(_ejecucion, "segundos", None)
+    _ejecucion.segundos = None
+    return segundos
+
+
+class medir:
+    """
+    Mide el bloque y lo suma a una etapa de la solicitud actual:
+        with medir("execute"):
+            cursor.execute(sql)
+    Fuera de una solicitud medida solo cuesta comprobar el contexto.
+    La etapa execute se suma además al acumulador del hilo si está activo.
+    """
+
+    __slots__ = ("etapa", "tiempos", "acumular", "inicio")
+
+    def __init__(self, etapa):
+        self.etapa = etapa
+        self.tiempos = None
+        self.acumular = False
+        self.inicio = 0.0
+
+    def __enter__(self):
+        self.tiempos = _tiempos_activos()
+        self.acumular = self.etapa == "execute" and getattr(_ejecucion, "segundos", None) is not None
+        if self.tiempos is not None or self.acumular:
+            self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        if self.tiempos is None and not self.acumular:
+            return False
+        duracion = time.perf_counter() - self.inicio
+        if self.tiempos is not None:
+            self.tiempos[self.etapa] += duracion
+        if self.acumular:
+            _ejecucion.segundos += duracion
+        return False
+
+
+def iniciar_tiempos():
+    """
+    Decide si se mide la solicitud y prepara el acumulador (before_request).
+    """
+    config_tiempos = current_app.config["DATOS_CONFIG"].get("TiemposSolicitud", {})
+    if not config_tiempos.get("Habilitado", False):
+        return
+    solicitado = (request.headers.get(CABECERA_ACTIVAR, "").lower() in ("1", "true")
+                  or request.args.get("timing") == "1")
+    if solicitado or random.random() < float(config_tiempos.get("Muestreo", 0)):
+        g.tiempos_etapas = dict.fromkeys(ETAPAS, 0.0)
+        g.tiempos_inicio = time.perf_counter()
+
+
+def agregar_server_timing(respuesta):
+    """
+    Añade la cabecera Server-Timing y registra el desglose (after_request).
+
+    Args:
+        respuesta (Response): Respuesta de la solicitud.
+
+    Returns:
+        Response: La misma respuesta.
+    """
+    tiempos = g.pop("tiempos_etapas", None)
+    if tiempos is None:
+        return respuesta
+    total_ms = (time.perf_counter() - g.pop("tiempos_inicio")) * 1000
+    etapas_ms = {etapa: round(segundos * 1000, 2) for etapa, segundos in tiempos.items() if segundos > 0}
+
+    partes = [f"{etapa};dur={duracion}" for etapa, duracion in etapas_ms.items()]
+    partes.append(f"total;dur={round(total_ms, 2)}")
+    respuesta.headers["Server-Timing"] = ", ".join(partes)
+
+    if current_app.config["DATOS_CONFIG"].get("TiemposSolicitud", {}).get("RegistrarEnLog", True):
+        print(json.dumps({
+            "evento": "tiempos_solicitud",
+            "metodo": request.method,
+            "ruta": request.url_rule.rule if request.url_rule is not None else request.path,
+            "estado": respuesta.status_code,
+            "total_ms": round(total_ms, 2),
+            **{f"{etapa}_ms": duracion for etapa, duracion in etapas_ms.items()},
+        }, ensure_ascii=False))
+    return respuesta
@@ -0,0 +1,433 @@
+# servicios/trabajos_consulta.py
+# Trabajos de consulta en segundo plano con el resultado guardado en disco
+# (equivalente a un BackgroundService con una cola de trabajos y resultados en archivos temporales en C#)
+#
+# Los informes pesados de ejecutar-consulta-parametrizada pueden tardar más que el tiempo de
+# espera del proxy. Con ?async=1 la consulta se envía a un pool acotado de hilos y se responde
+# 202 con el id del trabajo:
+#     POST   /api/<proyecto>/<tabla>/ejecutar-consulta-parametrizada?async=1  -> {"id": ..., "url": ...}
+#     GET    /api/<proyecto>/trabajos/<id>              estado (pendiente, ejecutando, terminado, error, cancelado)
+#     GET    /api/<proyecto>/trabajos/<id>/resultado    filas en NDJSON, o ?pagina=N para una página en JSON
+#     DELETE /api/<proyecto>/trabajos/<id>              cancela el trabajo o borra su resultado
+#
+# El resultado se lee con el cursor de solo avance y se escribe por lotes de TamanoLote filas en
+# <id>.datos: cada lote es una trama MessagePack precedida por su longitud (4 bytes), y <id>.indice
+# guarda la posición de cada trama para leer una página sin recorrer las anteriores.
+# El estado se guarda en <id>.json. Como todo está en el directorio de trabajos, cualquier proceso
+# del mismo servidor (trabajadores de gunicorn) puede informar el estado, entregar el resultado o
+# cancelar el trabajo (con el archivo <id>.cancelar, que el proceso que lo ejecuta revisa entre lotes).
+#
+# Un trabajo idéntico (mismo proyecto, SQL y parámetros) que todavía está pendiente o en ejecución
+# en el proceso no se vuelve a ejecutar: se devuelve el id del que ya existe.
+# Los trabajos terminados se borran TTLSegundos después de terminar.
+#
+# Configuración (configuracion/config.json):
+#     "TrabajosConsulta": {"Habilitado": true, "MaxTrabajadores": 2, "MaxPendientes": 20,
+#                          "TamanoLote": 1000, "TiempoMaximoSegundos": 3600, "TTLSegundos": 3600,
+#                          "Directorio": ""}   (vacío = directorio temporal del sistema)
+
+import hashlib
+import json
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from servicios.control_conexion import ControlConexion
+from servicios.errores import ErrorApi, ErrorServicioNoDisponible
+from servicios.formateador_respuesta import convertir_valor
+
+# Estados de un trabajo
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_EJECUTANDO = "ejecutando"
+ESTADO_TERMINADO = "terminado"
+ESTADO_ERROR = "error"
+ESTADO_CANCELADO = "cancelado"
+ESTADOS_FINALES = {ESTADO_TERMINADO, ESTADO_ERROR, ESTADO_CANCELADO}
+
+# Longitud de cada trama del archivo de datos y entrada del índice (posición, filas)
+CABECERA_TRAMA = struct.Struct(">I")
+ENTRADA_INDICE = struct.Struct(">QI")
+
+# Los id son uuid4 en hexadecimal: cualquier otro texto no se usa como nombre de archivo
+PATRON_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class GestorTrabajos:
+    """
+    Pool de hilos y directorio de resultados de los trabajos de consulta del proceso.
+    """
+
+    def __init__(self, configuracion, registro_proyectos):
+        """
+        Args:
+            configuracion (dict): Configuración de la aplicación.
+            registro_proyectos (RegistroProyectos): Registro con los pools de cada proyecto.
+        """
+        config_trabajos = configuracion.get("TrabajosConsulta", {})
+        self.configuracion = configuracion
+        self.registro_proyectos = registro_proyectos
+        self.max_trabajadores = int(config_trabajos.get("MaxTrabajadores", 2))
+        self.max_pendientes = int(config_trabajos.get("MaxPendientes", 20))
+        self.tamano_lote = int(config_trabajos.get("TamanoLote", 1000))
+        self.tiempo_maximo = float(config_trabajos.get("TiempoMaximoSegundos", 3600))
+        self.ttl = float(config_trabajos.get("TTLSegundos", 3600))
+        self.directorio = config_trabajos.get("Directorio") or os.path.join(tempfile.gettempdir(), "api-trabajos")
+        os.makedirs(self.directorio, exist_ok=True)
+
+        self._ejecutor = ThreadPoolExecutor(max_workers=self.max_trabajadores, thread_name_prefix="trabajo-consulta")
+        self._candado = threading.Lock()
+        self._en_curso = {}  # {clave de deduplicación: id}
+        self._futuros = {}  # {id: Future} de los trabajos de este proceso sin terminar
+        self._detener = threading.Event()
+        self._hilo_limpieza = None
+
+        self.enviados = 0
+        self.duplicados = 0
+        self.rechazados = 0
+
+    def _ruta(self, id_trabajo, extension):
+        """Ruta de un archivo del trabajo."""
+        return os.path.join(self.directorio, f"{id_trabajo}.{extension}")
+
+    def _guardar_estado(self, estado):
+        """Escribe el estado de forma atómica (los lectores nunca ven un archivo a medias)."""
+        ruta = self._ruta(estado["id"], "json")
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as archivo:
+            json.dump(estado, archivo, ensure_ascii=False)
+        os.replace(temporal, ruta)
+
+    def _leer_estado(self, id_trabajo):
+        """Lee el estado de un trabajo, o None si no existe."""
+        if not PATRON_ID.match(id_trabajo or ""):
+            return None
+        try:
+            with open(self._ruta(id_trabajo, "json"), encoding="utf-8") as archivo:
+                return json.load(archivo)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _borrar_archivos(self, id_trabajo, incluir_estado=True):
+        """Borra los archivos de un trabajo (los que existan)."""
+        extensiones = ["datos", "indice", "cancelar"] + (["json"] if incluir_estado else [])
+        for extension in extensiones:
+            try:
+                os.remove(self._ruta(id_trabajo, extension))
+            except FileNotFoundError:
+                pass
+
+    def obtener(self, nombre_proyecto, id_trabajo):
+        """
+        Obtiene el estado de un trabajo del proyecto.
+
+        Args:
+            nombre_proyecto (str): Proyecto tomado de la ruta.
+            id_trabajo (str): Id devuelto al enviar el trabajo.
+
+        Returns:
+            dict: Estado del trabajo.
+
+        Raises:
+            ErrorApi: Si el trabajo no existe o es de otro proyecto (404).
+        """
+        estado = self._leer_estado(id_trabajo)
+        proyecto = self.registro_proyectos.obtener_configuracion_proyecto(nombre_proyecto).nombre
+        if estado is None or estado["proyecto"] != proyecto:
+            raise ErrorApi(f"No existe el trabajo '{id_trabajo}'", 404)
+        return estado
+
+    def enviar(self, nombre_proyecto, consulta_sql, parametros, consultas_lentas=None):
+        """
+        Envía una consulta al pool de trabajos.
+
+        Args:
+            nombre_proyecto (str): Proyecto tomado de la ruta.
+            consulta_sql (str): Consulta con parámetros @nombre.
+            parametros (list): Parámetros creados con crear_parametro.
+            consultas_lentas (RegistroConsultasLentas, optional): Registro de consultas lentas.
+
+        Returns:
+            tuple: (estado del trabajo, True si ya había uno idéntico en curso).
+
+        Raises:
+            ErrorServicioNoDisponible: Si ya hay MaxPendientes trabajos sin terminar (503).
+        """
+        proyecto = self.registro_proyectos.obtener_configuracion_proyecto(nombre_proyecto).nombre
+        pool = self.registro_proyectos.obtener_pool(proyecto)
+        clave = hashlib.sha1(
+            json.dumps([proyecto, consulta_sql, sorted(parametros)], default=str).encode("utf-8")
+        ).hexdigest()
+
+        with self._candado:
+            id_existente = self._en_curso.get(clave)
+            estado = None if id_existente is None else self._leer_estado(id_existente)
+            if estado is not None and estado["estado"] not in ESTADOS_FINALES:
+                self.duplicados += 1
+                return estado, True
+            if len(self._futuros) >= self.max_pendientes:
+                self.rechazados += 1
+                raise ErrorServicioNoDisponible(
+                    f"Hay {len(self._futuros)} trabajos de consulta sin terminar; intente más tarde",
+                    segundos_reintento=30,
+                )
+
+            estado = {
+                "id": uuid.uuid4().hex,
+                "proyecto": proyecto,
+                "estado": ESTADO_PENDIENTE,
+                "creado": time.time(),
+                "iniciado": None,
+                "terminado": None,
+                "filas": 0,
+                "paginas": 0,
+                "bytes": 0,
+                "columnas": None,
+                "error": None,
+            }
+            self._guardar_estado(estado)
+            self._en_curso[clave] = estado["id"]
+            self._futuros[estado["id"]] = self._ejecutor.submit(
+                self._ejecutar, estado, clave, pool, consulta_sql, parametros, consultas_lentas
+            )
+            self.enviados += 1
+        return estado, False
+
+    def _ejecutar(self, estado, clave, pool, consulta_sql, parametros, consultas_lentas):
+        """Ejecuta un trabajo y guarda su resultado lote a lote."""
+        import msgspec  # Serialización MessagePack (ya incluido en requirements.txt)
+
+        id_trabajo = estado["id"]
+        marca_cancelar = self._ruta(id_trabajo, "cancelar")
+        try:
+            if os.path.exists(marca_cancelar):
+                self._terminar(estado, ESTADO_CANCELADO)
+                return
+            estado.update(estado=ESTADO_EJECUTANDO, iniciado=time.time())
+            self._guardar_estado(estado)
+
+            control_conexion = ControlConexion(configuracion=self.configuracion, pool=pool)
+            control_conexion.establecer_limite(time.monotonic() + self.tiempo_maximo if self.tiempo_maximo > 0 else None)
+            control_conexion.establecer_consultas_lentas(consultas_lentas)
+            codificador = msgspec.msgpack.Encoder()
+            cancelado = False
+            with open(self._ruta(id_trabajo, "datos"), "wb") as datos, open(self._ruta(id_trabajo, "indice"), "wb") as indice:
+                control_conexion.abrir_bd()
+                recorrido = control_conexion.iterar_consulta_sql(consulta_sql, parametros, self.tamano_lote)
+                try:
+                    for columnas, filas in recorrido:
+                        trama = codificador.encode([[convertir_valor(valor) for valor in fila] for fila in filas])
+                        indice.write(ENTRADA_INDICE.pack(datos.tell(), len(filas)))
+                        datos.write(CABECERA_TRAMA.pack(len(trama)))
+                        datos.write(trama)
+                        estado.update(columnas=columnas, filas=estado["filas"] + len(filas),
+                                      paginas=estado["paginas"] + 1, bytes=datos.tell())
+                        self._guardar_estado(estado)  # Progreso visible para quien consulta el estado
+                        if self._detener.is_set() or os.path.exists(marca_cancelar):
+                            cancelado = True
+                            break
+                finally:
+                    recorrido.close()  # Cierra el cursor aunque se cancele a mitad
+                    control_conexion.cerrar_bd()
+            self._terminar(estado, ESTADO_CANCELADO if cancelado else ESTADO_TERMINADO)
+        except Exception as ex:
+            print(f"Error en el trabajo de consulta {id_trabajo}: {str(ex)}")
+            estado["error"] = str(ex)
+            self._terminar(estado, ESTADO_ERROR)
+        finally:
+            with self._candado:
+                if self._en_curso.get(clave) == id_trabajo:
+                    del self._en_curso[clave]
+                self._futuros.pop(id_trabajo, None)
+
+    def _terminar(self, estado, estado_final):
+        """Guarda el estado final; los trabajos cancelados o con error no conservan datos."""
+        estado.update(estado=estado_final, terminado=time.time())
+        if estado_final != ESTADO_TERMINADO:
+            self._borrar_archivos(estado["id"], incluir_estado=False)
+            estado.update(filas=0, paginas=0, bytes=0)
+        self._guardar_estado(estado)
+
+    def leer_pagina(self, estado, pagina):
+        """
+        Lee una página (un lote) del resultado de un trabajo terminado.
+
+        Args:
+            estado (dict): Estado del trabajo (ver obtener).
+            pagina (int): Número de página, desde 1.
+
+        Returns:
+            list: Filas de la página (listas de valores).
+
+        Raises:
+            ErrorApi: Si la página no existe (404).
+        """
+        import msgspec
+
+        if pagina < 1 or pagina > estado["paginas"]:
+            raise ErrorApi(f"La página debe estar entre 1 y {estado['paginas']}", 404)
+        with open(self._ruta(estado["id"], "indice"), "rb") as indice:
+            indice.seek((pagina - 1) * ENTRADA_INDICE.size)
+            posicion, _ = ENTRADA_INDICE.unpack(indice.read(ENTRADA_INDICE.size))
+        with open(self._ruta(estado["id"], "datos"), "rb") as datos:
+            datos.seek(posicion)
+            longitud, = CABECERA_TRAMA.unpack(datos.read(CABECERA_TRAMA.size))
+            return msgspec.msgpack.decode(datos.read(longitud))
+
+    def iterar_resultado(self, estado):
+        """
+        Recorre el resultado de un trabajo terminado, un lote a la vez.
+
+        Args:
+            estado (dict): Estado del trabajo (ver obtener).
+
+        Yields:
+            list: Filas de cada lote (listas de valores).
+        """
+        import msgspec
+
+        decodificador = msgspec.msgpack.Decoder()
+        with open(self._ruta(estado["id"], "datos"), "rb") as datos:
+            for _ in range(estado["paginas"]):
+                longitud, = CABECERA_TRAMA.unpack(datos.read(CABECERA_TRAMA.size))
+                yield decodificador.decode(datos.read(longitud))
+
+    def cancelar(self, estado):
+        """
+        Cancela un trabajo sin terminar o borra el resultado de uno terminado.
+        Un trabajo en ejecución se detiene al terminar el lote en curso.
+
+        Args:
+            estado (dict): Estado del trabajo (ver obtener).
+
+        Returns:
+            dict: Estado después de la operación ("cancelando", "cancelado" o "eliminado").
+        """
+        id_trabajo = estado["id"]
+        if estado["estado"] in ESTADOS_FINALES:
+            self._borrar_archivos(id_trabajo)
+            return {"id": id_trabajo, "estado": "eliminado"}
+
+        # Marca visible para el proceso que lo ejecuta (puede ser otro trabajador)
+        with open(self._ruta(id_trabajo, "cancelar"), "w", encoding="utf-8"):
+            pass
+        with self._candado:
+            futuro = self._futuros.get(id_trabajo)
+        if futuro is not None and futuro.cancel():
+            # No había empezado: se termina aquí porque _ejecutar ya no se ejecutará
+            with self._candado:
+                self._futuros.pop(id_trabajo, None)
+                for clave, id_en_curso in list(self._en_curso.items()):
+                    if id_en_curso == id_trabajo:
+                        del self._en_curso[clave]
+            self._terminar(estado, ESTADO_CANCELADO)
+            return {"id": id_trabajo, "estado": ESTADO_CANCELADO}
+        return {"id": id_trabajo, "estado": "cancelando"}
+
+    def limpiar(self):
+        """
+        Borra los trabajos terminados hace más de TTLSegundos y los que quedaron sin terminar
+        por un proceso que ya no existe.
+
+        Returns:
+            int: Trabajos borrados.
+        """
+        ahora = time.time()
+        borrados = 0
+        for nombre in os.listdir(self.directorio):
+            id_trabajo, _, extension = nombre.partition(".")
+            if extension != "json":
+                continue
+            estado = self._leer_estado(id_trabajo)
+            if estado is None:
+                continue
+            if estado["estado"] in ESTADOS_FINALES:
+                vencido = ahora - estado["terminado"] > self.ttl
+            else:
+                with self._candado:
+                    propio = id_trabajo in self._futuros
+                vencido = not propio and ahora - estado["creado"] > self.tiempo_maximo + self.ttl
+            if vencido:
+                self._borrar_archivos(id_trabajo)
+                borrados += 1
+        return borrados
+
+    def iniciar(self):
+        """Inicia el hilo que borra los trabajos vencidos."""
+        def ciclo():
+            while not self._detener.wait(min(self.ttl / 4, 60)):
+                try:
+                    self.limpiar()
+                except Exception as ex:
+                    print(f"Error al limpiar los trabajos de consulta: {str(ex)}")
+
+        self._hilo_limpieza = threading.Thread(target=ciclo, name="limpieza-trabajos", daemon=True)
+        self._hilo_limpieza.start()
+
+    def cerrar(self):
+        """Detiene la limpieza y los trabajos del proceso (los que están en ejecución paran en el lote en curso)."""
+        self._detener.set()
+        self._ejecutor.shutdown(wait=False, cancel_futures=True)
+
+    def estadisticas(self):
+        """
+        Obtiene el uso de los trabajos en el proceso.
+
+        Returns:
+            dict: Trabajos sin terminar, contadores y directorio de resultados.
+        """
+        with self._candado:
+            sin_terminar = len(self._futuros)
+        return {
+            "sin_terminar": sin_terminar,
+            "max_trabajadores": self.max_trabajadores,
+            "max_pendientes": self.max_pendientes,
+            "enviados": self.enviados,
+            "duplicados": self.duplicados,
+            "rechazados": self.rechazados,
+            "directorio": self.directorio,
+        }
+
+
+def inicializar_trabajos_consulta(app):
+    """
+    Crea el gestor de trabajos del proceso e inicia su limpieza
+    (se ejecuta después del fork, a continuación del registro de proyectos).
+
+    Args:
+        app (Flask): Aplicación donde se guarda el gestor.
+    """
+    configuracion = app.config["DATOS_CONFIG"]
+    if not configuracion.get("TrabajosConsulta", {}).get("Habilitado", False):
+        return
+    gestor = GestorTrabajos(configuracion, app.extensions["registro_proyectos"])
+    gestor.iniciar()
+    app.extensions["trabajos_consulta"] = gestor
+
+
+def finalizar_trabajos_consulta(app):
+    """
+    Detiene los trabajos de consulta del proceso.
+
+    Args:
+        app (Flask): Aplicación donde se guardó el gestor.
+    """
+    gestor = app.extensions.pop("trabajos_consulta", None)
+    if gestor is not None:
+        gestor.cerrar()
+
+
+def obtener_gestor_trabajos():
+    """
+    Obtiene el gestor de trabajos de consulta del proceso actual.
+
+    Returns:
+        GestorTrabajos: Gestor creado por inicializar_trabajos_consulta, o None si está deshabilitado.
+    """
+    return current_app.extensions.get("trabajos_consulta")
@@ -0,0 +1,43 @@
+# tests/test_binarios.py
+# Pruebas de la interpretación de la cabecera Range en las descargas binarias
+
+import pytest
+
+from servicios.binarios import analizar_rango
+from servicios.errores import ErrorApi
+
+
+@pytest.mark.parametrize("cabecera, esperado", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),     # el final se recorta a la longitud
+    ("bytes=-100", (900, 999)),         # los últimos 100 bytes
+    ("bytes=-5000", (0, 999)),          # sufijo mayor que el contenido
+    (" bytes=0-0 ", (0, 0)),
+])
+def test_rangos_validos(cabecera, esperado):
+    assert analizar_rango(cabecera, 1000) == esperado
+
+
+@pytest.mark.parametrize("cabecera", [
+    None,
+    "",
+    "bytes=0-1,5-9",    # varios rangos: se envía el contenido completo
+    "items=0-9",        # otra unidad
+    "bytes=-",
+    "bytes=50-10",      # final antes del inicio: se ignora
+])
+def test_rangos_que_se_ignoran(cabecera):
+    assert analizar_rango(cabecera, 1000) is None
+
+
+@pytest.mark.parametrize("cabecera, longitud", [
+    ("bytes=1000-", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=0-", 0),
+])
+def test_rangos_no_satisfacibles_dan_416(cabecera, longitud):
+    with pytest.raises(ErrorApi) as error:
+        analizar_rango(cabecera, longitud)
+    assert error.value.codigo_estado == 416
+    assert error.value.cabeceras["Content-Range"] == f"bytes */{longitud}"
@@ -0,0 +1,32 @@
+# tests/test_busqueda_texto.py
+# Pruebas del plegado y la tokenización del índice de búsqueda de texto
+
+import pytest
+
+# busqueda_texto importa ControlConexion, y este pyodbc (necesita el controlador ODBC)
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from servicios.busqueda_texto import plegar_texto, tokenizar  # noqa: E402
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Peña Ñandú", "pena nandu"),
+    ("CAFÉ Crème", "cafe creme"),
+    ("Straße", "strasse"),           # casefold, no solo lower
+    ("pingüino", "pinguino"),
+])
+def test_plegar_quita_mayusculas_y_diacriticos(texto, esperado):
+    assert plegar_texto(texto) == esperado
+
+
+def test_tokenizar_parte_en_palabras_plegadas_en_orden():
+    assert tokenizar("José-María, calle 12 (Bogotá)") == ["jose", "maria", "calle", "12", "bogota"]
+
+
+@pytest.mark.parametrize("valor", [None, float("nan"), "", "  ,.; "])
+def test_tokenizar_valores_vacios_o_nulos(valor):
+    assert tokenizar(valor) == []
+
+
+def test_tokenizar_convierte_valores_que_no_son_texto():
+    assert tokenizar(2024) == ["2024"]
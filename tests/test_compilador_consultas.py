@@ -0,0 +1,52 @@
+# tests/test_compilador_consultas.py
+# Pruebas de la traducción de parámetros @nombre a marcadores "?" de ODBC
+
+from servicios.compilador_consultas import compilar_consulta, normalizar_nombre, preparar_consulta
+
+
+def test_normalizar_nombre_agrega_arroba_y_pasa_a_minusculas():
+    assert normalizar_nombre("Id") == "@id"
+    assert normalizar_nombre(" @Id ") == "@id"
+
+
+def test_reemplaza_los_parametros_y_ordena_los_valores_segun_el_sql():
+    sql, valores = preparar_consulta(
+        "SELECT * FROM t WHERE b = @b AND a = @A",
+        [("@a", 1), ("@B", 2)],
+    )
+    assert sql == "SELECT * FROM t WHERE b = ? AND a = ?"
+    assert valores == [2, 1]
+
+
+def test_un_parametro_repetido_se_envia_en_cada_aparicion():
+    sql, valores = preparar_consulta("SELECT @x, @x + 1", [("@x", 5)])
+    assert sql == "SELECT ?, ? + 1"
+    assert valores == [5, 5]
+
+
+def test_no_toca_cadenas_identificadores_comentarios_ni_variables():
+    consulta = (
+        "DECLARE @total INT; SELECT '@id', N'a''@id', [@id], \"@id\", @@ROWCOUNT, @total "
+        "-- @id\n/* @id */ FROM t WHERE id = @id"
+    )
+    sql, valores = preparar_consulta(consulta, [("@id", 7)])
+    assert sql == consulta[:-3] + "?"
+    assert valores == [7]
+
+
+def test_sql_con_marcadores_posicionales_conserva_el_orden_recibido():
+    assert preparar_consulta("UPDATE t SET a = ? WHERE id = ?", [("@a", 1), ("@id", 2)]) == (
+        "UPDATE t SET a = ? WHERE id = ?", [1, 2]
+    )
+
+
+def test_sin_parametros_devuelve_el_sql_tal_cual():
+    assert preparar_consulta("SELECT 1", None) == ("SELECT 1", [])
+
+
+def test_la_compilacion_se_guarda_en_cache():
+    compilar_consulta.cache_clear()
+    nombres = frozenset({"@id"})
+    primera = compilar_consulta("SELECT * FROM t WHERE id = @id", nombres)
+    assert compilar_consulta("SELECT * FROM t WHERE id = @id", nombres) is primera
+    assert compilar_consulta.cache_info().hits == 1
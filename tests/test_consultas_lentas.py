@@ -0,0 +1,44 @@
+# tests/test_consultas_lentas.py
+# Pruebas de la normalización de consultas con la que se agrupan las consultas lentas
+
+import pytest
+
+# consultas_lentas importa ControlConexion, y este pyodbc (necesita el controlador ODBC)
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from servicios.consultas_lentas import normalizar_sql  # noqa: E402
+
+
+def test_literales_y_parametros_se_reemplazan_por_marcadores():
+    forma, _ = normalizar_sql("SELECT * FROM t WHERE id = 5 AND nombre = N'x''y' AND b = @b")
+    assert forma == "SELECT * FROM t WHERE id = ? AND nombre = ? AND b = ?"
+
+
+def test_comentarios_y_espacios_no_cambian_la_forma():
+    forma, _ = normalizar_sql("SELECT *\n  FROM t  -- comentario\n /* otro */ WHERE id = 1")
+    assert forma == "SELECT * FROM t WHERE id = ?"
+
+
+def test_identificadores_y_variables_del_sistema_se_conservan():
+    forma, _ = normalizar_sql("SELECT [col 1], t2.a, @@ROWCOUNT FROM t2 WHERE x = 0x1F OR y = 1.5e3")
+    assert forma == "SELECT [col 1], t2.a, @@ROWCOUNT FROM t2 WHERE x = ? OR y = ?"
+
+
+def test_listas_de_distinta_longitud_comparten_forma():
+    corta = normalizar_sql("SELECT * FROM t WHERE id IN (1, 2)")
+    larga = normalizar_sql("SELECT * FROM t WHERE id IN (?, ?, ?, ?)")
+    assert corta == larga
+    assert corta[0] == "SELECT * FROM t WHERE id IN (?, ...)"
+
+
+def test_varias_filas_de_values_comparten_forma():
+    forma, _ = normalizar_sql("INSERT INTO t VALUES (?, ?), (?, ?), (?, ?)")
+    assert forma == normalizar_sql("INSERT INTO t VALUES (1, 'a'), (2, 'b')")[0]
+
+
+def test_el_identificador_depende_solo_de_la_forma():
+    _, primero = normalizar_sql("SELECT * FROM t WHERE id = 1")
+    _, segundo = normalizar_sql("SELECT * FROM t WHERE id = 2")
+    _, otro = normalizar_sql("SELECT * FROM u WHERE id = 1")
+    assert primero == segundo != otro
+    assert len(primero) == 12
@@ -0,0 +1,94 @@
+# tests/test_control_admision.py
+# Pruebas del control de admisión: ajuste adaptativo del límite, cola acotada y
+# tiempo de ejecución en la base de datos con el que se alimenta el ajuste
+
+import time
+
+import pytest
+
+from servicios.control_admision import AjusteAdaptativo, LimitadorConcurrencia
+from servicios.errores import ErrorServicioNoDisponible
+from servicios.tiempos_solicitud import iniciar_tiempo_ejecucion, medir, terminar_tiempo_ejecucion
+
+
+def registrar(ajuste, limite, en_curso, latencia, muestras):
+    """Registra varias muestras iguales y devuelve el último límite calculado."""
+    for _ in range(muestras):
+        limite = ajuste.calcular_limite(limite, en_curso, latencia)
+    return limite
+
+
+def test_ajuste_no_cambia_antes_de_completar_las_muestras():
+    ajuste = AjusteAdaptativo(4, 128, muestras_por_ajuste=20)
+    assert registrar(ajuste, 32, 32, 0.01, 19) == 32
+
+
+def test_ajuste_sube_de_uno_en_uno_con_latencia_buena_y_limite_casi_lleno():
+    ajuste = AjusteAdaptativo(4, 128, muestras_por_ajuste=20)
+    assert registrar(ajuste, 32, 30, 0.01, 20) == 33
+
+
+def test_ajuste_no_sube_si_el_limite_no_se_usa():
+    ajuste = AjusteAdaptativo(4, 128, muestras_por_ajuste=20)
+    assert registrar(ajuste, 32, 4, 0.01, 20) == 32
+
+
+def test_ajuste_baja_un_diez_por_ciento_cuando_la_latencia_se_dispara():
+    ajuste = AjusteAdaptativo(4, 128, tolerancia=2.0, muestras_por_ajuste=20)
+    limite = registrar(ajuste, 40, 40, 0.01, 20)
+    limite = registrar(ajuste, limite, limite, 1.0, 20)
+    assert limite == int(41 * 0.9)
+
+
+def test_ajuste_respeta_los_limites_minimo_y_maximo():
+    ajuste = AjusteAdaptativo(4, 10, muestras_por_ajuste=1)
+    assert registrar(ajuste, 10, 10, 0.01, 5) == 10
+    ajuste = AjusteAdaptativo(4, 10, muestras_por_ajuste=1)
+    ajuste.calcular_limite(5, 5, 0.001)
+    assert registrar(ajuste, 5, 5, 10.0, 10) == 4
+
+
+def test_limitador_rechaza_con_503_si_la_cola_esta_llena():
+    limitador = LimitadorConcurrencia("global", 1, max_cola=0, max_espera=1)
+    limitador.adquirir()
+    with pytest.raises(ErrorServicioNoDisponible):
+        limitador.adquirir()
+    assert limitador.rechazadas == 1
+    limitador.liberar()
+    limitador.adquirir()
+
+
+def test_limitador_rechaza_si_vence_la_espera():
+    limitador = LimitadorConcurrencia("global", 1, max_cola=1, max_espera=0.05)
+    limitador.adquirir()
+    with pytest.raises(ErrorServicioNoDisponible):
+        limitador.adquirir()
+
+
+def test_limitador_sin_duracion_no_alimenta_el_ajuste():
+    ajuste = AjusteAdaptativo(4, 128, muestras_por_ajuste=1)
+    limitador = LimitadorConcurrencia("global", 8, max_cola=0, max_espera=1, ajuste=ajuste)
+    limitador.adquirir()
+    limitador.liberar(None)
+    assert ajuste.latencia_media is None
+    limitador.adquirir()
+    limitador.liberar(0.02)
+    assert ajuste.latencia_media == pytest.approx(0.02)
+
+
+def test_tiempo_ejecucion_solo_acumula_la_etapa_execute():
+    iniciar_tiempo_ejecucion()
+    with medir("execute"):
+        time.sleep(0.02)
+    with medir("fetch"):
+        time.sleep(0.05)
+    segundos = terminar_tiempo_ejecucion()
+    assert 0.02 <= segundos < 0.05
+    assert terminar_tiempo_ejecucion() is None
+
+
+def test_tiempo_ejecucion_no_acumula_si_no_se_inicio():
+    terminar_tiempo_ejecucion()
+    with medir("execute"):
+        pass
+    assert terminar_tiempo_ejecucion() is None
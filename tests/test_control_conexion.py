@@ -0,0 +1,88 @@
+# tests/test_control_conexion.py
+# Pruebas de la ejecución por lotes de ControlConexion sobre una base sqlite3 en memoria
+# (sqlite3 usa los mismos marcadores "?" que pyodbc)
+
+import sqlite3
+
+import pytest
+
+# control_conexion importa pyodbc, que necesita el controlador ODBC instalado
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from servicios.control_conexion import ControlConexion  # noqa: E402
+
+
+class CursorPrueba:
+    """Cursor de sqlite3 con los atributos de pyodbc que usa ControlConexion."""
+
+    def __init__(self, cursor, ejecutadas):
+        self._cursor = cursor
+        self._ejecutadas = ejecutadas
+        self.fast_executemany = False
+
+    def executemany(self, sql, filas):
+        self._ejecutadas.append(sql)
+        self._cursor.executemany(sql, filas)
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexionPrueba:
+    """Conexión de sqlite3 con autocommit y timeout como atributos, igual que en pyodbc."""
+
+    def __init__(self):
+        self._conexion = sqlite3.connect(":memory:")
+        self._conexion.execute("CREATE TABLE t (a INTEGER PRIMARY KEY, b TEXT)")
+        self._conexion.commit()
+        self.autocommit = True
+        self.timeout = 0
+        self.ejecutadas = []  # SQL enviado, tal como lo recibiría pyodbc
+
+    def cursor(self):
+        return CursorPrueba(self._conexion.cursor(), self.ejecutadas)
+
+    def commit(self):
+        self._conexion.commit()
+
+    def rollback(self):
+        self._conexion.rollback()
+
+    def filas(self):
+        return self._conexion.execute("SELECT a, b FROM t ORDER BY a").fetchall()
+
+
+@pytest.fixture
+def conexion():
+    control = ControlConexion(configuracion={})
+    control.conexion_bd = ConexionPrueba()
+    return control
+
+
+def test_lote_con_parametros_con_nombre(conexion):
+    filas = conexion.ejecutar_comando_sql_lote(
+        "INSERT INTO t (b, a) VALUES (@b, @a)", [[1, "x"], [2, "y"]], ["@a", "@b"]
+    )
+    assert filas == 2
+    assert conexion.conexion_bd.ejecutadas == ["INSERT INTO t (b, a) VALUES (?, ?)"]
+    assert conexion.conexion_bd.filas() == [(1, "x"), (2, "y")]
+    assert conexion.conexion_bd.autocommit is True
+
+
+def test_lote_con_marcadores_posicionales(conexion):
+    conexion.ejecutar_comando_sql_lote("INSERT INTO t (a, b) VALUES (?, ?)", [[1, "x"]])
+    assert conexion.conexion_bd.filas() == [(1, "x")]
+
+
+def test_lote_fallido_se_deshace_completo(conexion):
+    conexion.ejecutar_comando_sql_lote("INSERT INTO t (a, b) VALUES (?, ?)", [[1, "x"]])
+    with pytest.raises(ValueError):
+        conexion.ejecutar_comando_sql_lote(
+            "INSERT INTO t (a, b) VALUES (@a, @b)", [[2, "y"], [1, "duplicada"]], ["@a", "@b"]
+        )
+    assert conexion.conexion_bd.filas() == [(1, "x")]
+    assert conexion.conexion_bd.autocommit is True
+
+
+def test_lote_vacio_no_ejecuta_nada(conexion):
+    assert conexion.ejecutar_comando_sql_lote("INSERT INTO t (a, b) VALUES (?, ?)", []) == 0
@@ -0,0 +1,42 @@
+# tests/test_expansion.py
+# Pruebas del análisis de ?expand= (árbol de relaciones y límites)
+
+import pytest
+
+# expansion importa las instantáneas, y estas pyodbc (necesita el controlador ODBC)
+pytest.importorskip("pyodbc", exc_type=ImportError)
+
+from servicios.errores import ErrorApi  # noqa: E402
+from servicios.expansion import _Limites, analizar_expansiones  # noqa: E402
+
+
+def limites(**valores):
+    """Límites de expansión con la configuración indicada."""
+    return _Limites({"Expansion": valores})
+
+
+def test_rutas_separadas_por_comas_y_repetidas_forman_un_arbol():
+    arbol = analizar_expansiones(["cliente.Pais,producto", "cliente.ciudad"], limites())
+    assert arbol == {"cliente": {"pais": {}, "ciudad": {}}, "producto": {}}
+
+
+def test_relaciones_repetidas_cuentan_una_vez():
+    arbol = analizar_expansiones(["cliente", "CLIENTE", "cliente"], limites(MaxRelaciones=1))
+    assert arbol == {"cliente": {}}
+
+
+@pytest.mark.parametrize("valor", ["cliente..pais", ".cliente", "cliente,"])
+def test_rutas_mal_formadas_dan_400(valor):
+    with pytest.raises(ErrorApi) as error:
+        analizar_expansiones([valor], limites())
+    assert error.value.codigo_estado == 400
+
+
+def test_se_limita_la_profundidad():
+    with pytest.raises(ErrorApi):
+        analizar_expansiones(["a.b.c"], limites(MaxProfundidad=2))
+
+
+def test_se_limita_el_numero_de_relaciones():
+    with pytest.raises(ErrorApi):
+        analizar_expansiones(["a,b,c"], limites(MaxRelaciones=2))
@@ -0,0 +1,129 @@
+# tests/test_filtros.py
+# Pruebas de la gramática de filtros columna:operador:valor, tanto traducida a SQL
+# como evaluada sobre filas en memoria (instantáneas)
+
+import datetime
+import decimal
+
+import pandas as pd
+import pytest
+
+from servicios.errores import ErrorApi
+from servicios.filtros import MAX_VALORES_IN, construir_filtros, filtrar_dataframe
+
+TIPOS = {"Id": "int", "Nombre": "nvarchar", "Monto": "decimal", "Fecha": "datetime", "Activo": "bit"}
+
+
+def crear_parametro(nombre, valor):
+    """Parámetro con la misma forma que ControlConexion.crear_parametro."""
+    return (nombre, valor)
+
+
+def test_sin_filtros_no_hay_where():
+    assert construir_filtros([], TIPOS, crear_parametro) == ("", [])
+
+
+def test_filtros_se_combinan_con_and_y_convierten_los_valores():
+    clausula, parametros = construir_filtros(
+        ["monto:gt:100", "fecha:ge:2025-01-01", "activo:eq:si"], TIPOS, crear_parametro
+    )
+    assert clausula == "WHERE [Monto] > @f0 AND [Fecha] >= @f1 AND [Activo] = @f2"
+    assert parametros == [
+        ("@f0", decimal.Decimal("100")),
+        ("@f1", datetime.datetime(2025, 1, 1)),
+        ("@f2", True),
+    ]
+
+
+def test_in_genera_un_parametro_por_valor():
+    clausula, parametros = construir_filtros(["id:in:1,2,3"], TIPOS, crear_parametro)
+    assert clausula == "WHERE [Id] IN (@f0, @f1, @f2)"
+    assert [valor for _, valor in parametros] == [1, 2, 3]
+
+
+def test_null_y_notnull_no_llevan_parametros():
+    clausula, parametros = construir_filtros(["nombre:null", "monto:notnull"], TIPOS, crear_parametro)
+    assert clausula == "WHERE [Nombre] IS NULL AND [Monto] IS NOT NULL"
+    assert parametros == []
+
+
+def test_like_no_convierte_el_patron():
+    clausula, parametros = construir_filtros(["id:like:1%"], TIPOS, crear_parametro)
+    assert clausula == "WHERE [Id] LIKE @f0"
+    assert parametros == [("@f0", "1%")]
+
+
+def test_el_valor_puede_contener_dos_puntos():
+    _, parametros = construir_filtros(["fecha:lt:2025-01-01T10:30:00"], TIPOS, crear_parametro)
+    assert parametros == [("@f0", datetime.datetime(2025, 1, 1, 10, 30))]
+
+
+def test_prefijo_de_parametro_configurable():
+    clausula, _ = construir_filtros(["id:eq:1"], TIPOS, crear_parametro, prefijo_parametro=":")
+    assert clausula == "WHERE [Id] = :f0"
+
+
+@pytest.mark.parametrize("filtro", [
+    "id",                 # sin operador
+    "id:eq",              # sin valor
+    "zz:eq:1",            # columna inexistente
+    "id:between:1",       # operador no soportado
+    "id:eq:uno",          # valor no convertible
+    "id;drop:eq:1",       # la columna nunca se concatena sin validar
+])
+def test_filtros_no_validos_dan_400(filtro):
+    with pytest.raises(ErrorApi) as error:
+        construir_filtros([filtro], TIPOS, crear_parametro)
+    assert error.value.codigo_estado == 400
+
+
+def test_in_limita_el_numero_de_valores():
+    valores = ",".join(str(numero) for numero in range(MAX_VALORES_IN + 1))
+    with pytest.raises(ErrorApi):
+        construir_filtros([f"id:in:{valores}"], TIPOS, crear_parametro)
+
+
+def crear_filas():
+    """Filas como las construye ControlConexion a partir de pyodbc."""
+    return pd.DataFrame.from_records([
+        (1, "Ana  ", decimal.Decimal("1.50"), datetime.datetime(2025, 1, 2, 10), None),
+        (2, "bob", decimal.Decimal("3"), datetime.datetime(2025, 1, 1), True),
+        (3, None, None, None, False),
+    ], columns=list(TIPOS))
+
+
+def ids(filas):
+    """Claves de las filas resultantes, en orden."""
+    return filas["Id"].tolist()
+
+
+@pytest.mark.parametrize("filtros, esperados", [
+    (["nombre:eq:ANA"], [1]),                  # sin mayúsculas ni espacios finales
+    (["nombre:ne:ana"], [2]),                  # NULL no cumple ninguna comparación
+    (["monto:gt:1.5"], [2]),
+    (["monto:le:1.5"], [1]),
+    (["fecha:ge:2025-01-02"], [1]),
+    (["id:in:1,3"], [1, 3]),
+    (["nombre:null"], [3]),
+    (["monto:notnull"], [1, 2]),
+    (["activo:eq:true"], [2]),
+    (["nombre:like:%o_"], [2]),
+    (["nombre:like:[ab]%"], [1, 2]),
+    (["nombre:like:[^a]%"], [2]),
+    (["id:ne:2", "monto:notnull"], [1]),
+    ([], [1, 2, 3]),
+])
+def test_filtrar_en_memoria_como_sql_server(filtros, esperados):
+    assert ids(filtrar_dataframe(crear_filas(), filtros, TIPOS)) == esperados
+
+
+def test_filtrar_en_memoria_valida_igual_que_en_sql():
+    with pytest.raises(ErrorApi) as error:
+        filtrar_dataframe(crear_filas(), ["zz:eq:1"], TIPOS)
+    assert error.value.codigo_estado == 400
+
+
+def test_filtrar_tabla_vacia_conserva_las_columnas():
+    filas = filtrar_dataframe(crear_filas().iloc[0:0], ["id:eq:1"], TIPOS)
+    assert filas.empty
+    assert list(filas.columns) == list(TIPOS)
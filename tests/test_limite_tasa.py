@@ -0,0 +1,76 @@
+# tests/test_limite_tasa.py
+# Pruebas de las cubetas de fichas del limitador de tasa
+
+import pytest
+
+from servicios import limite_tasa
+from servicios.errores import ErrorLimiteTasa
+from servicios.limite_tasa import ClaseLimite, FragmentoCubetas, LimitadorTasa
+
+
+def crear_clases():
+    """Clases con los valores por defecto de la configuración."""
+    return {
+        "lectura": ClaseLimite("lectura", 120, 20),
+        "contrasena": ClaseLimite("contrasena", 5, 0.05),
+    }
+
+
+def test_cubeta_consume_hasta_vaciarse():
+    clases = crear_clases()
+    fragmento = FragmentoCubetas(clases)
+    clave = ("contrasena", "ip:1")
+    for restantes in (4, 3, 2, 1, 0):
+        assert fragmento.consumir(clave, clases["contrasena"], 0.0) == (True, restantes)
+    admitida, _ = fragmento.consumir(clave, clases["contrasena"], 0.0)
+    assert not admitida
+
+
+def test_cubeta_se_recarga_con_el_tiempo_sin_superar_la_capacidad():
+    clases = crear_clases()
+    fragmento = FragmentoCubetas(clases)
+    clave = ("lectura", "ip:1")
+    fragmento.consumir(clave, clases["lectura"], 0.0, fichas=120)
+    assert fragmento.consumir(clave, clases["lectura"], 1.0) == (True, 19)
+    assert fragmento.consumir(clave, clases["lectura"], 100.0) == (True, 119)
+
+
+def test_poda_usa_el_tiempo_de_recarga_de_cada_clase(monkeypatch):
+    monkeypatch.setattr(limite_tasa, "MAX_CUBETAS_POR_FRAGMENTO", 2)
+    clases = crear_clases()
+    fragmento = FragmentoCubetas(clases)
+    for _ in range(5):
+        fragmento.consumir(("contrasena", "ip:1"), clases["contrasena"], 0.0)
+    fragmento.consumir(("lectura", "ip:2"), clases["lectura"], 0.0)
+
+    # 10 s después la cubeta de lectura ya se llenó, la de contraseña no (tarda 100 s)
+    fragmento.consumir(("lectura", "ip:3"), clases["lectura"], 10.0)
+    assert ("lectura", "ip:2") not in fragmento.cubetas
+    admitida, _ = fragmento.consumir(("contrasena", "ip:1"), clases["contrasena"], 10.0)
+    assert not admitida
+
+
+def test_limitador_devuelve_cabeceras_y_rechaza_con_retry_after():
+    limitador = LimitadorTasa({"LimitesTasa": {"Clases": {"escritura": {"Capacidad": 2, "RecargaPorSegundo": 0.5}}}})
+    cabeceras = limitador.consumir("escritura", "ip:1")
+    assert cabeceras["RateLimit-Limit"] == "2"
+    assert cabeceras["RateLimit-Remaining"] == "1"
+    limitador.consumir("escritura", "ip:1")
+    with pytest.raises(ErrorLimiteTasa) as error:
+        limitador.consumir("escritura", "ip:1")
+    assert error.value.codigo_estado == 429
+    assert error.value.cabeceras["Retry-After"] == "2"
+
+
+def test_limitador_limita_el_costo_a_la_capacidad():
+    limitador = LimitadorTasa({"LimitesTasa": {"Clases": {"lectura": {"Capacidad": 10, "RecargaPorSegundo": 1}}}})
+    cabeceras = limitador.consumir("lectura", "ip:1", fichas=50)
+    assert cabeceras["RateLimit-Remaining"] == "0"
+
+
+def test_clientes_distintos_no_comparten_cubeta():
+    limitador = LimitadorTasa({"LimitesTasa": {"Clases": {"contrasena": {"Capacidad": 1, "RecargaPorSegundo": 0.01}}}})
+    limitador.consumir("contrasena", "ip:1")
+    limitador.consumir("contrasena", "ip:2")
+    with pytest.raises(ErrorLimiteTasa):
+        limitador.consumir("contrasena", "ip:1")
@@ -0,0 +1,95 @@
+# tests/test_planes_escritura.py
+# Pruebas de la compilación de los planes de escritura (SQL, conversiones y contraseñas)
+
+import decimal
+
+import bcrypt
+import pytest
+
+from servicios.errores import ErrorApi
+from servicios.planes_escritura import (
+    CachePlanes, _EsquemaTabla, buscar_columna_contrasena, OPERACION_ACTUALIZAR, OPERACION_COMBINAR,
+    OPERACION_INSERTAR,
+)
+
+ESQUEMA = _EsquemaTabla({"Id": "int", "Nombre": "nvarchar", "Monto": "decimal", "Password": "nvarchar"}, ("Id",))
+
+
+def compilar(operacion, datos_entidad, nombre_clave=None, filas=1, esquema=ESQUEMA):
+    """Compila un plan sin pasar por la caché ni la base de datos."""
+    return CachePlanes._compilar(esquema, "usuario", operacion, datos_entidad, nombre_clave, filas)
+
+
+def test_insertar_con_la_clave_completa_no_usa_output():
+    plan = compilar(OPERACION_INSERTAR, {"id": 1, "nombre": "Ana"})
+    assert plan.sql == "INSERT INTO usuario ([Id], [Nombre]) VALUES (?, ?)"
+    assert not plan.devuelve_clave
+    assert plan.clave_insertada(plan.preparar({"id": 1, "nombre": "Ana"})) == {"Id": 1}
+
+
+def test_insertar_sin_la_clave_la_devuelve_por_una_variable_de_tabla():
+    plan = compilar(OPERACION_INSERTAR, {"nombre": "Ana"})
+    assert "OUTPUT CAST(inserted.[Id] AS NVARCHAR(400)) INTO @api_claves_generadas" in plan.sql
+    assert plan.sql.endswith("SELECT * FROM @api_claves_generadas;")
+    assert plan.devuelve_clave
+    assert plan.clave_insertada(["Ana"], ("7",)) == {"Id": "7"}
+    assert plan.clave_insertada(["Ana"]) is None
+
+
+def test_preparar_convierte_al_tipo_de_cada_columna():
+    plan = compilar(OPERACION_INSERTAR, {"id": "5", "monto": 1.1})
+    assert plan.preparar({"id": "5", "monto": 1.1}) == [5, decimal.Decimal("1.1")]
+
+
+def test_preparar_rechaza_valores_no_validos():
+    plan = compilar(OPERACION_INSERTAR, {"id": 1, "monto": "mucho"})
+    with pytest.raises(ErrorApi) as error:
+        plan.preparar({"id": 1, "monto": "mucho"})
+    assert error.value.codigo_estado == 400
+
+
+def test_preparar_cifra_la_contrasena():
+    plan = compilar(OPERACION_INSERTAR, {"id": 1, "password": "secreta"})
+    _, cifrada = plan.preparar({"id": 1, "password": "secreta"})
+    assert cifrada != "secreta"
+    assert bcrypt.checkpw(b"secreta", cifrada.encode("utf-8"))
+
+
+def test_actualizar_deja_la_clave_al_final():
+    plan = compilar(OPERACION_ACTUALIZAR, {"nombre": "Ana", "monto": 2}, nombre_clave="ID")
+    assert plan.sql == "UPDATE usuario SET [Nombre]=?, [Monto]=? WHERE [Id]=?"
+    assert plan.convertir_clave("3") == 3
+
+
+def test_columnas_inexistentes_dan_400():
+    with pytest.raises(ErrorApi) as error:
+        compilar(OPERACION_INSERTAR, {"id": 1, "apellido": "x"})
+    assert error.value.codigo_estado == 400
+
+
+
+def test_combinar_usa_un_merge_con_output_a_una_variable_de_tabla():
+    plan = compilar(OPERACION_COMBINAR, {"id": 1, "nombre": "Ana"}, nombre_clave="id", filas=2)
+    assert "USING (VALUES (?, ?), (?, ?)) AS origen ([Id], [Nombre])" in plan.sql
+    assert "WHEN MATCHED THEN UPDATE SET destino.[Nombre] = origen.[Nombre]" in plan.sql
+    # OUTPUT sin INTO falla si la tabla tiene triggers
+    assert "OUTPUT $action, CAST(inserted.[Id] AS NVARCHAR(400)) INTO @api_acciones;" in plan.sql
+    assert plan.sql.endswith("SELECT accion, clave FROM @api_acciones;")
+    assert plan.posicion_clave == 0
+
+
+def test_combinar_solo_con_la_clave_no_actualiza_nada():
+    plan = compilar(OPERACION_COMBINAR, {"id": 1}, nombre_clave="id")
+    assert "WHEN MATCHED" not in plan.sql
+
+
+def test_combinar_exige_la_columna_clave_en_cada_fila():
+    with pytest.raises(ErrorApi) as error:
+        compilar(OPERACION_COMBINAR, {"nombre": "Ana"}, nombre_clave="id")
+    assert error.value.codigo_estado == 400
+
+
+def test_la_columna_clave_nunca_se_trata_como_contrasena():
+    assert buscar_columna_contrasena(["clave", "nombre"]) == 0
+    assert buscar_columna_contrasena(["clave", "nombre"], columna_clave="clave") is None
+    assert buscar_columna_contrasena(["clave", "password"], columna_clave="clave") == 1